@@ -0,0 +1,639 @@
+"""A compact binary serialization of lists of directives.
+
+This is used to cache the result of loading a ledger. Unpickling a large list of
+entries is slow, because pickle rebuilds every namedtuple, Decimal and metadata
+dict through their Python-level constructors and stores the same account,
+currency and filename strings over and over again. Instead, directives are
+converted to nested tuples of plain values which the 'marshal' module can write
+and read very quickly:
+
+- Account names, currencies, filenames and metadata keys are interned, so that
+  they are written once per block and are shared after reading.
+- Numbers are stored as their string representation, which preserves their
+  precision, and dates as their ordinal.
+- The common 'filename' and 'lineno' metadata are stored positionally.
+- The directive objects are rebuilt without going through their constructors.
+
+Values of types which this module does not know about are pickled individually.
+
+The entries are written in blocks of a fixed number of entries, each of which is
+marshalled independently and can be decoded on its own. A header holds the
+offsets and date ranges of the blocks, along with the pickled errors and options
+map. The format is versioned along with the version of Beancount; a file written
+by a different version is rejected.
+
+The same encoding provides a fast fingerprint of a list of directives, see
+fingerprint().
+"""
+__copyright__ = "Copyright (C) 2026  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import bisect
+import collections
+import collections.abc
+import datetime
+import gc
+import hashlib
+import itertools
+import marshal
+import mmap
+import pickle
+import struct
+
+from beancount import __version__
+from beancount.core.number import Decimal
+from beancount.core.amount import Amount
+from beancount.core.position import Cost
+from beancount.core.position import CostSpec
+from beancount.core.position import Position
+from beancount.core import data
+from beancount.utils.defdict import ImmutableDictWithDefault
+
+
+# A magic string at the start of compact files.
+MAGIC = b'BEANCPT\n'
+
+# The version of the format. Increment this on any change to the encoding.
+FORMAT_VERSION = 2
+
+# The number of entries in each independently decodable block.
+BLOCK_SIZE = 1024
+
+# The fixed-size prefix of the file: magic, format version and header length.
+_PREFIX = struct.Struct('<8sII')
+
+
+class CompactFormatError(ValueError):
+    """An error raised when reading a file which is not in the expected format."""
+
+
+# Tags for the encoded values which are not stored as themselves. Note that
+# since all tuples are tagged, a tuple is always an encoded value.
+(_DECIMAL,
+ _DATE,
+ _AMOUNT,
+ _COST,
+ _LIST,
+ _TUPLE,
+ _SET,
+ _FROZENSET,
+ _DICT,
+ _IMMUTABLE_DICT,
+ _NAMEDTUPLE,
+ _PICKLE) = range(12)
+
+# Types which are stored as themselves.
+_RAW_TYPES = frozenset([str, int, float, bool, bytes, type(None)])
+
+# Namedtuple types rebuilt from their fields, with their indexes in the stream.
+_NAMEDTUPLE_TYPES = data.ALL_DIRECTIVES + (data.Posting, data.TxnPosting,
+                                           Cost, CostSpec, Position)
+_NAMEDTUPLE_CODES = {cls: code for code, cls in enumerate(_NAMEDTUPLE_TYPES)}
+
+# The code of entries which are pickled as a whole.
+_PICKLED_ENTRY = -1
+
+_TRANSACTION = _NAMEDTUPLE_CODES[data.Transaction]
+
+_new_tuple = tuple.__new__
+_fromordinal = datetime.date.fromordinal
+
+
+def dump(result, file):
+    """Write the result of loading a ledger to a file in the compact format.
+
+    Args:
+      result: A triple of (entries, errors, options_map), as per loader.load_file().
+      file: A binary file object to write to.
+    """
+    file.write(dumps(result))
+
+
+def dumps(result):
+    """Serialize the result of loading a ledger to the compact format.
+
+    Args:
+      result: A triple of (entries, errors, options_map), as per loader.load_file().
+    Returns:
+      A bytes object.
+    """
+    entries, errors, options_map = result
+    encoder = _Encoder()
+    blocks = []
+    index = []
+    offset = 0
+    for start in range(0, len(entries), BLOCK_SIZE):
+        block_entries = entries[start:start + BLOCK_SIZE]
+        block = marshal.dumps(tuple(encoder.encode_entry(entry)
+                                    for entry in block_entries))
+        # Note: Plugins are not required to return sorted entries, so the date
+        # range of a block is not necessarily that of its first and last entries.
+        dates = [entry.date.toordinal() for entry in block_entries]
+        index.append((offset, len(block), len(block_entries), min(dates), max(dates)))
+        blocks.append(block)
+        offset += len(block)
+    extra = pickle.dumps((errors, options_map), protocol=pickle.HIGHEST_PROTOCOL)
+    header = marshal.dumps((__version__, len(entries), tuple(index), extra))
+    return b''.join([_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)), header] + blocks)
+
+
+def load(file):
+    """Read the result of loading a ledger from a file in the compact format.
+
+    Args:
+      file: A binary file object to read from.
+    Returns:
+      A triple of (entries, errors, options_map).
+    Raises:
+      CompactFormatError: If the file is not in the compact format, or it was
+        written by another version.
+    """
+    return loads(file.read())
+
+
+def loads(contents):
+    """Deserialize the result of loading a ledger from the compact format.
+
+    Args:
+      contents: A bytes object, as produced by dumps().
+    Returns:
+      A triple of (entries, errors, options_map).
+    Raises:
+      CompactFormatError: If the contents are not in the compact format, or they
+        were written by another version.
+    """
+    header, data_offset = read_header(contents)
+    _, __, index, extra = header
+    entries = []
+    # Suspend the garbage collector while allocating the large number of objects
+    # of the entries, none of which are garbage; it would otherwise be triggered
+    # repeatedly, each time traversing all the objects allocated so far.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for offset, length, _, __, ___ in index:
+            start = data_offset + offset
+            entries.extend(decode_block(contents[start:start + length]))
+        errors, options_map = pickle.loads(extra)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return entries, errors, options_map
+
+
+def read_header(contents):
+    """Read and validate the header of compact contents.
+
+    Args:
+      contents: A bytes-like object, the beginning of which holds the header.
+    Returns:
+      A pair of the header tuple, (version, number of entries, index of blocks,
+      pickled errors and options), and the offset of the first block.
+    Raises:
+      CompactFormatError: If the contents are not in the compact format, or they
+        were written by another version.
+    """
+    if len(contents) < _PREFIX.size:
+        raise CompactFormatError("Truncated file")
+    magic, version, header_length = _PREFIX.unpack_from(contents)
+    if magic != MAGIC:
+        raise CompactFormatError("Not a compact file")
+    if version != FORMAT_VERSION:
+        raise CompactFormatError("Unsupported compact format version {}".format(version))
+    try:
+        header = marshal.loads(contents[_PREFIX.size:_PREFIX.size + header_length])
+    except (EOFError, ValueError, TypeError) as exc:
+        raise CompactFormatError("Invalid header: {}".format(exc))
+    if header[0] != __version__:
+        raise CompactFormatError("Written by another version: {}".format(header[0]))
+    return header, _PREFIX.size + header_length
+
+
+def decode_block(block):
+    """Decode a block of entries.
+
+    Args:
+      block: A bytes-like object, a block of marshalled encoded entries.
+    Returns:
+      A list of directives.
+    """
+    # Note: This is the hot path of reading and deliberately inlines the decoding
+    # of the transactions and their postings.
+    new_tuple = _new_tuple
+    fromordinal = _fromordinal
+    transaction_code = _TRANSACTION
+    transaction_type = data.Transaction
+    posting_type = data.Posting
+    new_location_meta = data.LocationMeta
+    amount_type = Amount
+    decimal_type = Decimal
+    decode_value = _decode_value
+    # Numbers and dates are immutable and recur a lot; share their instances.
+    numbers = {}
+    dates = {}
+    entries = []
+    append = entries.append
+    for encoded in marshal.loads(block):
+        if encoded[0] != transaction_code:
+            append(_decode_entry(encoded))
+            continue
+        (_, meta, date, flag, payee, narration, tags, links, encoded_postings) = encoded
+        if meta is not None and type(meta[0]) is str:
+            filename, lineno, extra = meta
+            meta = {'filename': filename, 'lineno': lineno}
+            if extra is not None:
+                for key, value in extra:
+                    meta[key] = decode_value(value)
+        else:
+            # Metadata without the usual filename and line number, e.g. that
+            # of a transaction created by a plugin.
+            meta = _decode_meta(meta)
+            filename = meta.get('filename') if type(meta) is dict else None
+        postings = []
+        for (account, number, currency, cost, price,
+             posting_flag, posting_meta) in encoded_postings:
+            postings.append(new_tuple(posting_type, (
+                account,
+                (new_tuple(amount_type, (numbers.get(number) or
+                                         numbers.setdefault(number, decimal_type(number)),
+                                         currency))
+                 if currency is not None
+                 else decode_value(number)),
+                cost if cost is None else decode_value(cost),
+                price if price is None else decode_value(price),
+                posting_flag,
+                (new_location_meta(filename, posting_meta)
+                 if type(posting_meta) is int
+                 else _decode_meta(posting_meta)))))
+        append(new_tuple(transaction_type, (
+            meta, dates.get(date) or dates.setdefault(date, fromordinal(date)),
+            flag, payee, narration,
+            tags if type(tags) is frozenset else decode_value(tags),
+            links if type(links) is frozenset else decode_value(links),
+            postings)))
+    return entries
+
+
+class EntryStore(collections.abc.Sequence):
+    """A read-only sequence of the entries of a compact file, decoded on demand.
+
+    The file is memory-mapped and only its header is read when opening it. The
+    blocks of entries get decoded when one of their entries is indexed or
+    iterated over, and the most recently used ones are kept around. Note that
+    directives are thus not guaranteed to be the same objects when accessed
+    again, only equal ones. Use iter_dates() to iterate over a range of dates,
+    which only decodes the blocks covering it.
+
+    Attributes:
+      errors: The list of errors stored in the file.
+      options_map: The options map stored in the file.
+    """
+
+    def __init__(self, filename, num_cached_blocks=16):
+        """Open a compact file.
+
+        Args:
+          filename: A string, the name of a file written by dump(), or a binary
+            file object open on it. The file object may be closed afterwards.
+          num_cached_blocks: An integer, the number of decoded blocks to keep.
+        Raises:
+          CompactFormatError: If the file is not in the compact format, or it was
+            written by another version.
+        """
+        if isinstance(filename, str):
+            with open(filename, 'rb') as file:
+                self._mmap = self._map(file)
+        else:
+            self._mmap = self._map(filename)
+        header, self._data_offset = read_header(self._mmap)
+        _, self._num_entries, self._index, extra = header
+        self.errors, self.options_map = pickle.loads(extra)
+        # The index of the first entry of each block.
+        self._starts = list(itertools.accumulate(
+            [0] + [num_entries for _, __, num_entries, ___, ____ in self._index[:-1]]))
+        self._num_cached_blocks = num_cached_blocks
+        self._blocks = collections.OrderedDict()
+
+    @staticmethod
+    def _map(file):
+        """Memory-map an open file."""
+        try:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as exc:
+            # This is raised for empty files.
+            raise CompactFormatError("Cannot map file: {}".format(exc))
+
+    def close(self):
+        """Release the memory map."""
+        self._blocks.clear()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._num_entries
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._num_entries))]
+        if index < 0:
+            index += self._num_entries
+        if not 0 <= index < self._num_entries:
+            raise IndexError("Entry index out of range")
+        block_index = bisect.bisect_right(self._starts, index) - 1
+        return self._get_block(block_index)[index - self._starts[block_index]]
+
+    def __iter__(self):
+        for block_index in range(len(self._index)):
+            yield from self._get_block(block_index)
+
+    def iter_dates(self, date_begin=None, date_end=None):
+        """Iterate over the entries in a date window.
+
+        Args:
+          date_begin: A datetime.date instance, the first date to include, or
+            None, to start from the first entry.
+          date_end: A datetime.date instance, one day beyond the last date, or
+            None, to continue until the last entry.
+        Yields:
+          The directives between the dates, in the order in which they appear.
+        """
+        begin = date_begin.toordinal() if date_begin is not None else None
+        end = date_end.toordinal() if date_end is not None else None
+        for block_index, (_, __, ___, min_date, max_date) in enumerate(self._index):
+            if (begin is not None and max_date < begin or
+                    end is not None and min_date >= end):
+                continue
+            for entry in self._get_block(block_index):
+                if ((date_begin is None or entry.date >= date_begin) and
+                        (date_end is None or entry.date < date_end)):
+                    yield entry
+
+    def _get_block(self, block_index):
+        """Return the decoded entries of a block, decoding it if necessary."""
+        entries = self._blocks.get(block_index)
+        if entries is None:
+            offset, length, _, __, ___ = self._index[block_index]
+            start = self._data_offset + offset
+            entries = decode_block(self._mmap[start:start + length])
+            self._blocks[block_index] = entries
+            if len(self._blocks) > self._num_cached_blocks:
+                self._blocks.popitem(last=False)
+        else:
+            self._blocks.move_to_end(block_index)
+        return entries
+
+
+class _Encoder:
+    """Convert directives to the nested tuples of plain values we marshal.
+
+    Attributes:
+      strings: A dict of strings to themselves, used to intern them.
+    """
+
+    def __init__(self):
+        self.strings = {}
+
+    def intern(self, string):
+        """Return the unique instance of a string, for it to be marshalled once."""
+        if type(string) is not str:
+            return string
+        return self.strings.setdefault(string, string)
+
+    def encode_entry(self, entry):
+        """Encode a directive.
+
+        Args:
+          entry: A directive instance.
+        Returns:
+          A tuple of (type code, encoded meta, date ordinal, encoded fields...).
+        """
+        code = _NAMEDTUPLE_CODES.get(type(entry))
+        if code is None or code >= len(data.ALL_DIRECTIVES):
+            return (_PICKLED_ENTRY, pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+        meta = self.encode_meta(entry.meta)
+        date = entry.date.toordinal()
+        if code == _TRANSACTION:
+            tags, links = entry.tags, entry.links
+            return (code, meta, date, entry.flag, entry.payee, entry.narration,
+                    tags if type(tags) is frozenset else self.encode_value(tags),
+                    links if type(links) is frozenset else self.encode_value(links),
+                    tuple(self.encode_posting(posting, entry.meta)
+                          for posting in entry.postings))
+        return (code, meta, date) + tuple(self.encode_value(value)
+                                          for value in entry[2:])
+
+    def encode_posting(self, posting, entry_meta):
+        """Encode a posting of a transaction.
+
+        Args:
+          posting: An instance of Posting.
+          entry_meta: The metadata dict of its transaction.
+        Returns:
+          A tuple of (account, number, currency, cost, price, flag, meta). If the
+          units are not an amount with a number and a currency, such as the
+          incomplete units of parsed postings, the number is the encoded units
+          and the currency None. If the metadata is a LocationMeta with
+          the filename of the transaction, it is stored as its line number
+          alone.
+        """
+        units = posting.units
+        if (type(units) is Amount and type(units.number) is Decimal and
+                type(units.currency) is str):
+            number, currency = str(units.number), self.intern(units.currency)
+        else:
+            number, currency = self.encode_value(units), None
+        meta = posting.meta
+        if (type(meta) is data.LocationMeta and type(meta.lineno) is int and
+                type(entry_meta) is dict and
+                meta.filename == entry_meta.get('filename')):
+            meta = meta.lineno
+        else:
+            meta = self.encode_meta(meta)
+        return (self.intern(posting.account), number, currency,
+                self.encode_value(posting.cost), self.encode_value(posting.price),
+                posting.flag, meta)
+
+    def encode_meta(self, meta):
+        """Encode a metadata dict.
+
+        Args:
+          meta: A metadata dict, or None.
+        Returns:
+          None, a tuple of (filename, lineno, extra items) for the usual dicts
+          with a filename and line number, or otherwise the encoded value.
+        """
+        if meta is None:
+            return None
+        filename = meta.get('filename')
+        if type(meta) is not dict or type(filename) is not str or 'lineno' not in meta:
+            return self.encode_value(meta)
+        extra = tuple((self.intern(key), self.encode_value(value))
+                      for key, value in meta.items()
+                      if key != 'filename' and key != 'lineno')
+        return (self.intern(filename), meta['lineno'], extra or None)
+
+    def encode_value(self, value):
+        """Encode an arbitrary value.
+
+        Args:
+          value: Any object.
+        Returns:
+          The value itself if it can be marshalled as is, or a tuple of a tag
+          and the encoded contents of the value.
+        """
+        vtype = type(value)
+        if vtype in _RAW_TYPES:
+            return self.intern(value) if vtype is str else value
+        if vtype is Decimal:
+            return (_DECIMAL, str(value))
+        if vtype is datetime.date:
+            return (_DATE, value.toordinal())
+        # Note: The incomplete amounts of the parser may have a MISSING currency,
+        # which is pickled below.
+        if vtype is Amount and type(value.currency) is str:
+            return (_AMOUNT, self.encode_value(value.number), self.intern(value.currency))
+        if vtype is Cost and type(value.currency) is str:
+            return (_COST, self.encode_value(value.number), self.intern(value.currency),
+                    self.encode_value(value.date), self.encode_value(value.label))
+        if vtype is list:
+            return (_LIST, tuple(self.encode_value(elem) for elem in value))
+        if vtype is tuple:
+            return (_TUPLE, tuple(self.encode_value(elem) for elem in value))
+        if vtype is set:
+            return (_SET, tuple(self.encode_value(elem) for elem in value))
+        if vtype is frozenset:
+            return (_FROZENSET, tuple(self.encode_value(elem) for elem in value))
+        if vtype is dict:
+            return (_DICT, tuple((self.encode_value(key), self.encode_value(elem))
+                                 for key, elem in value.items()))
+        if vtype is ImmutableDictWithDefault:
+            # This is used for the tolerances inserted in the metadata.
+            return (_IMMUTABLE_DICT, self.encode_value(value.default),
+                    tuple((self.encode_value(key), self.encode_value(elem))
+                          for key, elem in value.items()))
+        code = _NAMEDTUPLE_CODES.get(vtype)
+        if code is not None:
+            return (_NAMEDTUPLE, code) + tuple(self.encode_value(elem) for elem in value)
+        return (_PICKLE, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class _FingerprintEncoder(_Encoder):
+    """An encoder whose output does not depend on the order of iteration of sets.
+
+    The order of the elements of a set of strings varies between processes, as
+    the hashing of strings is randomized.
+    """
+
+    def encode_entry(self, entry):
+        encoded = super().encode_entry(entry)
+        if encoded[0] == _TRANSACTION:
+            encoded = encoded[:6] + (self.encode_value(entry.tags),
+                                     self.encode_value(entry.links)) + encoded[8:]
+        return encoded
+
+    def encode_value(self, value):
+        vtype = type(value)
+        if vtype is set or vtype is frozenset:
+            return (_SET if vtype is set else _FROZENSET,
+                    tuple(sorted((self.encode_value(elem) for elem in value), key=repr)))
+        return super().encode_value(value)
+
+
+def fingerprint(entries, extra=None):
+    """Compute a hash of the contents of a list of directives.
+
+    Two lists of directives have the same fingerprint if they would be written
+    identically to the compact format, regardless of which objects they share,
+    in this process or any other.
+
+    Args:
+      entries: A list of directives.
+      extra: An optional value to include in the fingerprint, e.g. an options
+        map. It is encoded like the values in the metadata of the directives.
+    Returns:
+      A string, the hex digest of the encoded directives.
+    """
+    encoder = _FingerprintEncoder()
+    hasher = hashlib.blake2b(digest_size=16)
+    # Note: Version 2 of marshal does not write references to shared objects.
+    hasher.update(marshal.dumps(encoder.encode_value(extra), 2))
+    for start in range(0, len(entries), BLOCK_SIZE):
+        hasher.update(marshal.dumps(tuple(encoder.encode_entry(entry)
+                                          for entry in entries[start:start + BLOCK_SIZE]),
+                                    2))
+    return hasher.hexdigest()
+
+
+def _decode_entry(encoded):
+    """Decode a directive encoded by _Encoder.encode_entry(), other than a
+    Transaction, which is decoded by decode_block()."""
+    code = encoded[0]
+    if code == _PICKLED_ENTRY:
+        return pickle.loads(encoded[1])
+    return _new_tuple(_NAMEDTUPLE_TYPES[code], (
+        _decode_meta(encoded[1]), _fromordinal(encoded[2]),
+        *[_decode_value(value) for value in encoded[3:]]))
+
+
+def _decode_meta(encoded):
+    """Decode a metadata dict encoded by _Encoder.encode_meta()."""
+    if encoded is None:
+        return None
+    if type(encoded[0]) is not str:
+        return _decode_value(encoded)
+    filename, lineno, extra = encoded
+    meta = {'filename': filename, 'lineno': lineno}
+    if extra is not None:
+        for key, value in extra:
+            meta[key] = _decode_value(value)
+    return meta
+
+
+def _decode_value(encoded):
+    """Decode a value encoded by _Encoder.encode_value()."""
+    if type(encoded) is not tuple:
+        return encoded
+    return _DECODERS[encoded[0]](encoded)
+
+
+def _decode_namedtuple(encoded):
+    """Decode a namedtuple of a known type."""
+    return _new_tuple(_NAMEDTUPLE_TYPES[encoded[1]],
+                      [_decode_value(value) for value in encoded[2:]])
+
+
+def _decode_amount(encoded):
+    """Decode an Amount."""
+    _, number, currency = encoded
+    return _new_tuple(Amount, (_decode_value(number), currency))
+
+
+def _decode_cost(encoded):
+    """Decode a Cost."""
+    _, number, currency, date, label = encoded
+    return _new_tuple(Cost, (_decode_value(number), currency,
+                             _decode_value(date), _decode_value(label)))
+
+
+_DECODERS = [
+    lambda encoded: Decimal(encoded[1]),
+    lambda encoded: _fromordinal(encoded[1]),
+    _decode_amount,
+    _decode_cost,
+    lambda encoded: [_decode_value(value) for value in encoded[1]],
+    lambda encoded: tuple(_decode_value(value) for value in encoded[1]),
+    lambda encoded: {_decode_value(value) for value in encoded[1]},
+    lambda encoded: frozenset(_decode_value(value) for value in encoded[1]),
+    lambda encoded: {_decode_value(key): _decode_value(value)
+                     for key, value in encoded[1]},
+    lambda encoded: ImmutableDictWithDefault(
+        [(_decode_value(key), _decode_value(value)) for key, value in encoded[2]],
+        default=_decode_value(encoded[1])),
+    _decode_namedtuple,
+    lambda encoded: pickle.loads(encoded[1]),
+]
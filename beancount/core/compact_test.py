@@ -0,0 +1,294 @@
+__copyright__ = "Copyright (C) 2026  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import collections
+import datetime
+import io
+import pickle
+import tempfile
+import unittest
+from os import path
+from unittest import mock
+
+from beancount.core.number import D
+from beancount.core.number import MISSING
+from beancount.core import compact
+from beancount.core import data
+from beancount.parser import parser
+from beancount import loader
+
+
+# A directive type unknown to the compact format.
+Unknown = collections.namedtuple('Unknown', 'meta date value')
+
+
+class TestCompact(unittest.TestCase):
+
+    def assertRoundTrip(self, result):
+        """Check that a loader result survives serialization, and return the copy."""
+        contents = compact.dumps(result)
+        new_result = compact.loads(contents)
+        entries, errors, options_map = result
+        new_entries, new_errors, new_options_map = new_result
+        self.assertEqual(entries, new_entries)
+        self.assertEqual([type(entry) for entry in entries],
+                         [type(entry) for entry in new_entries])
+        self.assertEqual([entry.meta for entry in entries],
+                         [entry.meta for entry in new_entries])
+        self.assertEqual([type(posting.meta)
+                          for entry in data.filter_txns(entries)
+                          for posting in entry.postings],
+                         [type(posting.meta)
+                          for entry in data.filter_txns(new_entries)
+                          for posting in entry.postings])
+        self.assertEqual(len(errors), len(new_errors))
+        self.assertEqual(set(options_map), set(new_options_map))
+        # Numbers must retain their precision, which equality does not check.
+        self.assertEqual(repr(entries), repr(new_entries))
+        return new_result
+
+    @loader.load_doc(expect_errors=True)
+    def test_all_directives(self, entries, errors, options_map):
+        """
+        option "operating_currency" "USD"
+
+        2000-01-01 open Assets:Investing   HOOL,USD  "FIFO"
+          description: "Investments"
+        2000-01-01 open Assets:Cash
+        2000-01-01 open Equity:Opening-Balances
+        2000-01-01 open Income:Gains
+        2000-01-01 commodity HOOL
+          name: "Hooli"
+          quote: USD
+          since: 1999-12-31
+          size: 10.00 USD
+          active: TRUE
+
+        2000-01-02 pad Assets:Cash Equity:Opening-Balances
+        2000-01-03 balance Assets:Cash   1000.00 USD
+
+        2000-01-04 * "Broker" "Buy" #trip ^invoice
+          Assets:Investing       10 HOOL {50.00 USD}
+            note: "lot"
+          Assets:Cash      -500.000 USD
+
+        2000-01-05 ! "Sell"
+          Assets:Investing       -4 HOOL {50.00 USD} @ 60.00 USD
+          Assets:Cash         240.00 USD
+          Income:Gains
+
+        2000-01-06 balance Assets:Cash   1.00 USD
+        2000-01-07 note Assets:Cash "Called the bank"
+        2000-01-08 event "location" "Paris"
+        2000-01-09 query "cash" "SELECT account WHERE account ~ 'Cash'"
+        2000-01-10 price HOOL  61.25 USD
+        2000-01-11 document Assets:Cash "/path/to/statement.pdf"
+        2000-01-12 custom "budget" Assets:Cash "monthly" 100.00 USD TRUE
+        2000-01-13 close Income:Gains
+        """
+        self.assertEqual({data.Open, data.Commodity, data.Pad, data.Balance,
+                          data.Transaction, data.Note, data.Event, data.Query,
+                          data.Price, data.Document, data.Custom, data.Close},
+                         set(map(type, entries)))
+        self.assertTrue(errors)
+        new_entries, new_errors, new_options_map = self.assertRoundTrip(
+            (entries, errors, options_map))
+        self.assertEqual(str(errors[0].message), str(new_errors[0].message))
+        self.assertEqual(options_map['operating_currency'],
+                         new_options_map['operating_currency'])
+
+    @parser.parse_doc(allow_incomplete=True)
+    def test_incomplete_entries(self, entries, errors, options_map):
+        """
+        2000-01-04 * "Buy"
+          Assets:Investing       10 HOOL {}
+          Assets:Cash
+        """
+        self.assertIs(MISSING, entries[0].postings[1].units)
+        self.assertRoundTrip((entries, errors, options_map))
+
+    @parser.parse_doc(allow_incomplete=True)
+    def test_incomplete_units(self, entries, errors, options_map):
+        """
+        2000-01-04 * "Buy"
+          Assets:Investing       10 HOOL {USD}
+          Assets:Cash           -100
+          Assets:Other               USD @ EUR
+        """
+        units = [posting.units for posting in entries[0].postings]
+        self.assertIs(MISSING, units[1].currency)
+        self.assertIs(MISSING, units[2].number)
+        new_entries, _, __ = self.assertRoundTrip((entries, errors, options_map))
+        self.assertEqual(units, [posting.units for posting in new_entries[0].postings])
+        self.assertIs(MISSING, new_entries[0].postings[1].units.currency)
+
+    def test_multiple_blocks(self):
+        entries = [
+            data.Price(data.new_metadata('prices.beancount', index),
+                       datetime.date(2000, 1, 1) + datetime.timedelta(days=index),
+                       'HOOL', data.Amount(D('{}.0'.format(index)), 'USD'))
+            for index in range(10)]
+        with mock.patch.object(compact, 'BLOCK_SIZE', 3):
+            contents = compact.dumps((entries, [], {}))
+        header, offset = compact.read_header(contents)
+        version, num_entries, index, _ = header
+        self.assertEqual(10, num_entries)
+        self.assertEqual([3, 3, 3, 1], [block[2] for block in index])
+        self.assertEqual(datetime.date(2000, 1, 4).toordinal(), index[1][3])
+        self.assertEqual(datetime.date(2000, 1, 6).toordinal(), index[1][4])
+        block_offset, block_length = index[1][:2]
+        self.assertEqual(entries[3:6], compact.decode_block(
+            contents[offset + block_offset:offset + block_offset + block_length]))
+        self.assertRoundTrip((entries, [], {}))
+
+    def test_unknown_types(self):
+        meta = data.new_metadata('other.beancount', 1)
+        meta['unknown'] = Unknown(None, datetime.date(2000, 1, 1), 1)
+        entries = [
+            Unknown(data.new_metadata('other.beancount', 2),
+                    datetime.date(2000, 1, 1), D('1.10')),
+            data.Event(meta, datetime.date(2000, 1, 2), 'location', 'Paris'),
+            data.Event(None, datetime.date(2000, 1, 3), 'location', 'London'),
+            data.Event({'lineno': 3}, datetime.date(2000, 1, 4), 'location', 'Rome'),
+        ]
+        new_entries, _, __ = self.assertRoundTrip((entries, [], {}))
+        self.assertIsInstance(new_entries[0], Unknown)
+        self.assertIsInstance(new_entries[1].meta['unknown'], Unknown)
+        self.assertIsNone(new_entries[2].meta)
+        self.assertEqual({'lineno': 3}, new_entries[3].meta)
+
+    def test_nonstandard_transaction_meta(self):
+        postings = [
+            data.Posting('Assets:Cash', data.Amount(D('-1.00'), 'USD'),
+                         None, None, None, None),
+            data.Posting('Expenses:Food', data.Amount(D('1.00'), 'USD'),
+                         None, None, None, data.LocationMeta('plugin.py', 2)),
+        ]
+        entries = [
+            data.Transaction(meta, datetime.date(2000, 1, 1), '*', None, 'Lunch',
+                             data.EMPTY_SET, data.EMPTY_SET, postings)
+            for meta in ({'note': 'x'}, {}, None, {'filename': 'plugin.py'})]
+        new_entries, _, __ = self.assertRoundTrip((entries, [], {}))
+        self.assertIsNone(new_entries[2].meta)
+        self.assertEqual(data.LocationMeta('plugin.py', 2),
+                         new_entries[3].postings[1].meta)
+
+    def test_dump_load(self):
+        entries, errors, options_map = loader.load_string("""
+          2000-01-01 open Assets:Cash
+        """, dedent=True)
+        file = io.BytesIO()
+        compact.dump((entries, errors, options_map), file)
+        file.seek(0)
+        new_entries, _, __ = compact.load(file)
+        self.assertEqual(entries, new_entries)
+
+    def test_invalid(self):
+        contents = compact.dumps(([], [], {}))
+        with self.assertRaises(compact.CompactFormatError):
+            compact.loads(b'')
+        with self.assertRaises(compact.CompactFormatError):
+            compact.loads(pickle.dumps(([], [], {})))
+        with self.assertRaises(compact.CompactFormatError):
+            compact.loads(contents.replace(compact.MAGIC, b'X' * len(compact.MAGIC)))
+        with mock.patch.object(compact, 'FORMAT_VERSION', compact.FORMAT_VERSION + 1):
+            with self.assertRaises(compact.CompactFormatError):
+                compact.loads(contents)
+        with mock.patch.object(compact, '__version__', '0.0.0'):
+            with self.assertRaises(compact.CompactFormatError):
+                compact.loads(contents)
+
+
+class TestFingerprint(unittest.TestCase):
+
+    @loader.load_doc()
+    def test_fingerprint(self, entries, _, options_map):
+        """
+        2000-01-01 open Assets:Cash
+        2000-01-01 open Expenses:Food
+        2000-01-04 * "Lunch" #trip #food ^invoice
+          Expenses:Food    10.00 USD
+          Assets:Cash
+        """
+        fingerprint = compact.fingerprint(entries)
+        self.assertEqual(fingerprint,
+                         compact.fingerprint(pickle.loads(pickle.dumps(entries))))
+        self.assertNotEqual(fingerprint, compact.fingerprint(entries, 'extra'))
+
+        # The order of the tags does not matter.
+        txn = entries[-1]
+        reordered = entries[:-1] + [txn._replace(tags=frozenset(reversed(list(txn.tags))))]
+        self.assertEqual(fingerprint, compact.fingerprint(reordered))
+
+        # The precision of the numbers does.
+        posting = txn.postings[0]
+        changed = entries[:-1] + [txn._replace(postings=[
+            posting._replace(units=data.Amount(D('10.0'), 'USD'))] + txn.postings[1:])]
+        self.assertNotEqual(fingerprint, compact.fingerprint(changed))
+
+
+class TestEntryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.entries = [
+            data.Price(data.new_metadata('prices.beancount', index),
+                       datetime.date(2000, 1, 1) + datetime.timedelta(days=index),
+                       'HOOL', data.Amount(D('{}.0'.format(index)), 'USD'))
+            for index in range(10)]
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = path.join(self.tmpdir.name, 'entries.cache')
+        with mock.patch.object(compact, 'BLOCK_SIZE', 3):
+            with open(self.filename, 'wb') as file:
+                compact.dump((self.entries, [], {'title': 'Prices'}), file)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_sequence(self):
+        with compact.EntryStore(self.filename) as store:
+            self.assertEqual(10, len(store))
+            self.assertEqual([], store.errors)
+            self.assertEqual({'title': 'Prices'}, store.options_map)
+            self.assertEqual(self.entries[0], store[0])
+            self.assertEqual(self.entries[4], store[4])
+            self.assertEqual(self.entries[9], store[-1])
+            self.assertEqual(self.entries[2:7], store[2:7])
+            self.assertEqual(self.entries[::-3], store[::-3])
+            self.assertEqual(self.entries, list(store))
+            self.assertIn(self.entries[5], store)
+            with self.assertRaises(IndexError):
+                store[10]  # pylint: disable=pointless-statement
+            with self.assertRaises(IndexError):
+                store[-11]  # pylint: disable=pointless-statement
+
+    def test_decode_on_demand(self):
+        with mock.patch.object(compact, 'decode_block',
+                               wraps=compact.decode_block) as decode_mock:
+            with compact.EntryStore(self.filename, num_cached_blocks=2) as store:
+                self.assertEqual(0, decode_mock.call_count)
+                store[4]  # pylint: disable=pointless-statement
+                store[5]  # pylint: disable=pointless-statement
+                self.assertEqual(1, decode_mock.call_count)
+                store[0]  # pylint: disable=pointless-statement
+                store[9]  # pylint: disable=pointless-statement
+                store[4]  # pylint: disable=pointless-statement
+                self.assertEqual(4, decode_mock.call_count)
+
+                decode_mock.reset_mock()
+                self.assertEqual(self.entries[4:7], list(store.iter_dates(
+                    datetime.date(2000, 1, 5), datetime.date(2000, 1, 8))))
+                self.assertEqual(1, decode_mock.call_count)
+                self.assertEqual(self.entries[8:], list(store.iter_dates(
+                    datetime.date(2000, 1, 9))))
+                self.assertEqual(self.entries[:2], list(store.iter_dates(
+                    None, datetime.date(2000, 1, 3))))
+
+    def test_invalid(self):
+        empty_filename = path.join(self.tmpdir.name, 'empty.cache')
+        open(empty_filename, 'wb').close()
+        with self.assertRaises(compact.CompactFormatError):
+            compact.EntryStore(empty_filename)
+
+
+if __name__ == '__main__':
+    unittest.main()
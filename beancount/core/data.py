@@ -4,6 +4,7 @@ __copyright__ = "Copyright (C) 2013-2017  Martin Blais"
 __license__ = "GNU GPLv2"
 
 import builtins
+import collections.abc
 import datetime
 import enum
 import sys
@@ -417,6 +418,63 @@ def new_metadata(filename, lineno, kvlist=None):
     return meta
 
 
+class LocationMeta(collections.abc.Mapping):
+    """An immutable metadata mapping with only a filename and line number.
+
+    Most postings have no metadata other than their location, and a dict for
+    each of them accounts for a large part of the memory used by the postings of
+    a large ledger. This is a much smaller read-only equivalent of such a dict.
+    It compares equal to the dict with the same contents, and its copy() method
+    returns a plain dict, to be updated by code that adds metadata.
+
+    Attributes:
+      filename: A string, the filename for the creator of this directive.
+      lineno: An integer, the line number where the directive has been created.
+    """
+    __slots__ = ('filename', 'lineno')
+
+    def __init__(self, filename, lineno):
+        self.filename = filename
+        self.lineno = lineno
+
+    def __getitem__(self, key):
+        if key == 'lineno':
+            return self.lineno
+        if key == 'filename':
+            return self.filename
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(('filename', 'lineno'))
+
+    def __len__(self):
+        return 2
+
+    def __contains__(self, key):
+        return key == 'filename' or key == 'lineno'
+
+    def get(self, key, default=None):
+        if key == 'lineno':
+            return self.lineno
+        if key == 'filename':
+            return self.filename
+        return default
+
+    def copy(self):
+        """Return a mutable copy of this metadata.
+
+        Returns:
+          A new metadata dict.
+        """
+        return {'filename': self.filename, 'lineno': self.lineno}
+
+    def __repr__(self):
+        return repr(self.copy())
+
+    def __reduce__(self):
+        return (LocationMeta, (self.filename, self.lineno))
+
+
 def create_simple_posting(entry, account, number, currency):
     """Create a simple posting on the entry, with just a number and currency (no cost).
 
@@ -308,6 +308,41 @@ class TestData(unittest.TestCase):
                                                              datetime.date(2016, 1, 30))])
 
 
+class TestLocationMeta(unittest.TestCase):
+
+    def test_mapping(self):
+        meta = data.LocationMeta('beancount/core/testing.beancount', 12345)
+        self.assertEqual('beancount/core/testing.beancount', meta['filename'])
+        self.assertEqual(12345, meta['lineno'])
+        with self.assertRaises(KeyError):
+            meta['other']  # pylint: disable=pointless-statement
+        self.assertEqual(12345, meta.get('lineno'))
+        self.assertEqual(None, meta.get('other'))
+        self.assertIn('filename', meta)
+        self.assertNotIn('other', meta)
+        self.assertEqual(['filename', 'lineno'], list(meta))
+        self.assertEqual(2, len(meta))
+        self.assertEqual(META, meta)
+        self.assertEqual(meta, META)
+        self.assertNotEqual(data.new_metadata('other.beancount', 12345), meta)
+        self.assertEqual(repr(META), repr(meta))
+
+    def test_immutable(self):
+        meta = data.LocationMeta('beancount/core/testing.beancount', 12345)
+        with self.assertRaises(TypeError):
+            meta['other'] = 1
+        new_meta = meta.copy()
+        self.assertIs(dict, type(new_meta))
+        new_meta['other'] = 1
+        self.assertNotIn('other', meta)
+
+    def test_pickle(self):
+        meta = data.LocationMeta('beancount/core/testing.beancount', 12345)
+        new_meta = pickle.loads(pickle.dumps(meta))
+        self.assertIs(data.LocationMeta, type(new_meta))
+        self.assertEqual(meta, new_meta)
+
+
 class TestPickle(unittest.TestCase):
 
     def test_data_tuples_support_pickle(self):
@@ -152,6 +152,32 @@ class _CurrencyContext:
         integer_digits = len(num_tuple.digits) + num_tuple.exponent
         self.integer_max = max(self.integer_max, integer_digits)
 
+    def update_digits(self, sign, exponent, num_digits, count=1):
+        """Update this context with numbers of a given shape.
+
+        This is equivalent to calling update() once for each of the numbers.
+
+        Args:
+          sign: The sign of the numbers, as from Decimal.as_tuple().
+          exponent: An integer, the exponent of the numbers.
+          num_digits: An integer, the number of digits of the numbers.
+          count: An integer, the number of such numbers.
+        """
+        if sign:
+            self.has_sign = True
+        self.fractional_dist.update(-exponent, count)
+        self.integer_max = max(self.integer_max, num_digits + exponent)
+
+    def update_from(self, other):
+        """Update this context with the numbers seen by another one.
+
+        Args:
+          other: Another instance of _CurrencyContext.
+        """
+        self.has_sign = self.has_sign or other.has_sign
+        self.integer_max = max(self.integer_max, other.integer_max)
+        self.fractional_dist.update_from(other.fractional_dist)
+
     def get_fractional(self, precision):
         """
         Returns:
@@ -200,6 +226,30 @@ class DisplayContext:
         """
         self.ccontexts[currency].update(number)
 
+    def update_digits(self, currency, sign, exponent, num_digits, count=1):
+        """Update the builder with numbers of a given shape for the given currency.
+
+        Args:
+          currency: A string, the currency these numbers apply to.
+          sign: The sign of the numbers, as from Decimal.as_tuple().
+          exponent: An integer, the exponent of the numbers.
+          num_digits: An integer, the number of digits of the numbers.
+          count: An integer, the number of such numbers.
+        """
+        self.ccontexts[currency].update_digits(sign, exponent, num_digits, count)
+
+    def update_from(self, other):
+        """Update the builder with the numbers seen by another one.
+
+        This is used to merge the display contexts built from parsing separate
+        parts of the same input.
+
+        Args:
+          other: Another instance of DisplayContext.
+        """
+        for currency, ccontext in other.ccontexts.items():
+            self.ccontexts[currency].update_from(ccontext)
+
     def quantize(self, number, currency, precision=Precision.MOST_COMMON):
         """Quantize the given number to the given precision.
 
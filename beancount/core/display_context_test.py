@@ -56,6 +56,34 @@ class TestDisplayContext(DisplayContextBaseTest):
         dcontext.update(Decimal('7'), 'HOOL')
         self.assertRegex(str(dcontext), 'sign=')
 
+    def test_update_from(self):
+        numbers = [('1.234', None), ('-1.23', 'USD'), ('7', 'HOOL'), ('1000.23', 'USD')]
+        dcontext = display_context.DisplayContext()
+        for number, currency in numbers:
+            dcontext.update(Decimal(number), currency or '__default__')
+
+        dcontext1 = display_context.DisplayContext()
+        dcontext2 = display_context.DisplayContext()
+        for index, (number, currency) in enumerate(numbers):
+            (dcontext1 if index % 2 else dcontext2).update(Decimal(number),
+                                                           currency or '__default__')
+        dcontext1.update_from(dcontext2)
+        self.assertEqual(str(dcontext), str(dcontext1))
+
+    def test_update_digits(self):
+        numbers = [('1.234', 'USD'), ('-1.23', 'USD'), ('7', 'HOOL'), ('1000.23', 'USD'),
+                   ('1000.23', 'USD')]
+        dcontext = display_context.DisplayContext()
+        for number, currency in numbers:
+            dcontext.update(Decimal(number), currency)
+
+        dcontext_digits = display_context.DisplayContext()
+        dcontext_digits.update_digits('USD', 0, -3, 4)
+        dcontext_digits.update_digits('USD', 1, -2, 3)
+        dcontext_digits.update_digits('HOOL', 0, 0, 1)
+        dcontext_digits.update_digits('USD', 0, -2, 6, 2)
+        self.assertEqual(str(dcontext), str(dcontext_digits))
+
 
 class TestDisplayContextNatural(DisplayContextBaseTest):
 
@@ -21,13 +21,24 @@ class Distribution:
         """
         return len(self.hist) == 0
 
-    def update(self, value):
+    def update(self, value, count=1):
         """Add a sample to the distribution.
 
         Args:
           value: A value of the function.
+          count: An integer, the number of times to add the sample.
         """
-        self.hist[value] += 1
+        self.hist[value] += count
+
+    def update_from(self, other):
+        """Add the samples of another distribution to this one.
+
+        Args:
+          other: Another instance of Distribution.
+        """
+        hist = self.hist
+        for value, count in other.hist.items():
+            hist[value] += count
 
     def min(self):
         """Return the minimum value seen in the distribution.
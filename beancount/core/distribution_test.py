@@ -26,6 +26,24 @@ class TestDistribution(unittest.TestCase):
         self.assertEqual(4, dist.max())
         self.assertEqual(False, dist.empty())
 
+    def test_update_from(self):
+        dist1 = distribution.Distribution()
+        dist1.update(1)
+        dist1.update(2)
+        dist2 = distribution.Distribution()
+        dist2.update(2)
+        dist2.update(3)
+        dist1.update_from(dist2)
+        self.assertEqual({1: 1, 2: 2, 3: 1}, dict(dist1.hist))
+        self.assertEqual(2, dist1.mode())
+
+    def test_update_count(self):
+        dist = distribution.Distribution()
+        dist.update(1)
+        dist.update(2, 3)
+        self.assertEqual({1: 1, 2: 3}, dict(dist.hist))
+        self.assertEqual(2, dist.mode())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -166,27 +166,7 @@ def infer_tolerances(postings, options_map, use_cost=None):
             if not use_cost:
                 continue
 
-            # Compute bounds on the smallest digit of the number implied as cost.
-            cost = posting.cost
-            if cost is not None:
-                cost_currency = cost.currency
-                if isinstance(cost, Cost):
-                    cost_tolerance = min(tolerance * cost.number, MAXIMUM_TOLERANCE)
-                else:
-                    assert isinstance(cost, CostSpec)
-                    cost_tolerance = MAXIMUM_TOLERANCE
-                    for cost_number in cost.number_total, cost.number_per:
-                        if cost_number is None or cost_number is MISSING:
-                            continue
-                        cost_tolerance = min(tolerance * cost_number, cost_tolerance)
-                cost_tolerances[cost_currency] += cost_tolerance
-
-            # Compute bounds on the smallest digit of the number implied as cost.
-            price = posting.price
-            if isinstance(price, Amount) and isinstance(price.number, Decimal):
-                price_currency = price.currency
-                price_tolerance = min(tolerance * price.number, MAXIMUM_TOLERANCE)
-                cost_tolerances[price_currency] += price_tolerance
+            _add_cost_tolerances(cost_tolerances, posting, tolerance)
 
     for currency, tolerance in cost_tolerances.items():
         tolerances[currency] = max(tolerance, tolerances.get(currency, -1024))
@@ -195,6 +175,138 @@ def infer_tolerances(postings, options_map, use_cost=None):
     return defdict.ImmutableDictWithDefault(tolerances, default=default)
 
 
+def _add_cost_tolerances(cost_tolerances, posting, tolerance):
+    """Add the tolerances implied by the cost and price of a posting.
+
+    Args:
+      cost_tolerances: A defaultdict of currency to the sum of the tolerances
+        implied by costs and prices, to be updated.
+      posting: A Posting instance.
+      tolerance: The tolerance inferred from the number of units of the posting.
+    """
+    # Compute bounds on the smallest digit of the number implied as cost.
+    cost = posting.cost
+    if cost is not None:
+        cost_currency = cost.currency
+        if isinstance(cost, Cost):
+            cost_tolerance = min(tolerance * cost.number, MAXIMUM_TOLERANCE)
+        else:
+            assert isinstance(cost, CostSpec)
+            cost_tolerance = MAXIMUM_TOLERANCE
+            for cost_number in cost.number_total, cost.number_per:
+                if cost_number is None or cost_number is MISSING:
+                    continue
+                cost_tolerance = min(tolerance * cost_number, cost_tolerance)
+        cost_tolerances[cost_currency] += cost_tolerance
+
+    # Compute bounds on the smallest digit of the number implied as cost.
+    price = posting.price
+    if isinstance(price, Amount) and isinstance(price.number, Decimal):
+        price_currency = price.currency
+        price_tolerance = min(tolerance * price.number, MAXIMUM_TOLERANCE)
+        cost_tolerances[price_currency] += price_tolerance
+
+
+def infer_tolerances_batch(postings_lists, options_map, use_cost=None, exponents=None):
+    """Infer tolerances from many lists of postings in a single pass.
+
+    This infers the same tolerances as infer_tolerances() does for each list of
+    postings, e.g. for the postings of all the transactions of a ledger, but the
+    tolerance of each currency is only computed once for each exponent, and the
+    lists whose tolerances are inferred from the same exponents share the same
+    resulting dict.
+
+    Args:
+      postings_lists: An iterable of lists of Posting instances.
+      options_map: A dict of options.
+      use_cost: A boolean, as per infer_tolerances().
+      exponents: An optional function which returns the exponent of the number
+        of an Amount, e.g. from the exponents recorded when the amounts were
+        parsed. If it is left unspecified, the exponents are obtained from the
+        Decimal numbers themselves.
+    Returns:
+      A list of the dicts of currency to the tolerated difference amount to be
+      used for it, one for each list of postings, as per infer_tolerances().
+    """
+    if use_cost is None:
+        use_cost = options_map["infer_tolerance_from_cost"]
+
+    inferred_tolerance_multiplier = options_map["inferred_tolerance_multiplier"]
+
+    default_tolerances = options_map["inferred_tolerance_default"]
+
+    # A mapping of exponent to the tolerance it implies, of (currency, exponent)
+    # to the tolerance of the currency combined with its default, and of the
+    # largest exponents of each currency to the resulting dict of tolerances.
+    exponent_tolerances = {}
+    currency_tolerances = {}
+    cached_tolerances = {}
+
+    tolerances_list = []
+    for postings in postings_lists:
+        currency_exponents = {}
+        cost_tolerances = None
+        for posting in postings:
+            # Skip the precision on automatically inferred postings.
+            if posting.meta and AUTOMATIC_META in posting.meta:
+                continue
+            units = posting.units
+            if not (isinstance(units, Amount) and isinstance(units.number, Decimal)):
+                continue
+
+            # Compute bounds on the number.
+            currency = units.currency
+            expo = (units.number.as_tuple().exponent
+                    if exponents is None
+                    else exponents(units))
+            if expo < 0:
+                # Note: the exponent is a negative value.
+                if expo > currency_exponents.get(currency, expo - 1):
+                    currency_exponents[currency] = expo
+
+                if not use_cost or (posting.cost is None and posting.price is None):
+                    continue
+
+                tolerance = exponent_tolerances.get(expo, None)
+                if tolerance is None:
+                    tolerance = exponent_tolerances[expo] = (
+                        ONE.scaleb(expo) * inferred_tolerance_multiplier)
+                if cost_tolerances is None:
+                    cost_tolerances = collections.defaultdict(D)
+                _add_cost_tolerances(cost_tolerances, posting, tolerance)
+
+        key = tuple(currency_exponents.items())
+        if cost_tolerances is None:
+            result = cached_tolerances.get(key, None)
+            if result is not None:
+                tolerances_list.append(result)
+                continue
+
+        tolerances = default_tolerances.copy()
+        for currency, expo in key:
+            tolerance = currency_tolerances.get((currency, expo), None)
+            if tolerance is None:
+                tolerance = exponent_tolerances.get(expo, None)
+                if tolerance is None:
+                    tolerance = exponent_tolerances[expo] = (
+                        ONE.scaleb(expo) * inferred_tolerance_multiplier)
+                tolerance = currency_tolerances[(currency, expo)] = max(
+                    tolerance, default_tolerances.get(currency, -1024))
+            tolerances[currency] = tolerance
+
+        if cost_tolerances is not None:
+            for currency, tolerance in cost_tolerances.items():
+                tolerances[currency] = max(tolerance, tolerances.get(currency, -1024))
+
+        default = tolerances.pop('*', ZERO)
+        result = defdict.ImmutableDictWithDefault(tolerances, default=default)
+        if cost_tolerances is None:
+            cached_tolerances[key] = result
+        tolerances_list.append(result)
+
+    return tolerances_list
+
+
 # Meta-data field appended to automatically inserted postings.
 # (Note: A better name might have been '__interpolated__'.)
 AUTOMATIC_META = '__automatic__'
@@ -202,10 +314,31 @@ AUTOMATIC_META = '__automatic__'
 # Meta-data field appended to postings inserted to absorb rounding error.
 AUTOMATIC_RESIDUAL = '__residual__'
 
-# Meta-data field added for the tolerances inferred for this entry.
+# Meta-data field added for the tolerances inferred for this entry. Booking only
+# adds it to the transactions it modifies; see get_tolerances().
 AUTOMATIC_TOLERANCES = '__tolerances__'
 
 
+def get_tolerances(entry, options_map):
+    """Get the tolerances inferred for a transaction during booking.
+
+    These are stored in the metadata of the transactions modified by booking.
+    The transactions whose postings were all left unchanged pass through booking
+    as they are, and their tolerances are inferred again from the same postings.
+
+    Args:
+      entry: An instance of Transaction, as produced by booking.
+      options_map: A dict of options.
+    Returns:
+      A dict of currency to the tolerated difference amount to be used for it,
+      as per infer_tolerances().
+    """
+    tolerances = entry.meta.get(AUTOMATIC_TOLERANCES, None) if entry.meta else None
+    if tolerances is None:
+        tolerances = infer_tolerances(entry.postings, options_map)
+    return tolerances
+
+
 def get_residual_postings(residual, account_rounding):
     """Create postings to book the given residuals.
 
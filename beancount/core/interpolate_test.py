@@ -564,6 +564,92 @@ class TestInferTolerances(cmptest.TestCase):
           Assets:Cash     400 CAD
         """
 
+    @loader.load_doc()
+    def test_get_tolerances(self, entries, errors, options_map):
+        """
+        2017-01-01 open Assets:Checking
+        2017-01-01 open Assets:Cash
+
+        2017-06-23 * "Complete"
+          Assets:Checking     -400.0 USD
+          Assets:Cash          400.00 USD
+
+        2017-06-24 * "Interpolated"
+          Assets:Checking     -400.000 USD
+          Assets:Cash
+        """
+        self.assertFalse(errors)
+        complete, interpolated = [entry
+                                  for entry in entries
+                                  if isinstance(entry, data.Transaction)]
+        self.assertNotIn(interpolate.AUTOMATIC_TOLERANCES, complete.meta)
+        self.assertEqual({'USD': D('0.05')},
+                         interpolate.get_tolerances(complete, options_map))
+        self.assertIs(interpolated.meta[interpolate.AUTOMATIC_TOLERANCES],
+                      interpolate.get_tolerances(interpolated, options_map))
+        self.assertEqual({'USD': D('0.0005')},
+                         interpolate.get_tolerances(interpolated, options_map))
+
+    @loader.load_doc()
+    def test_infer_tolerances_batch(self, entries, errors, options_map):
+        """
+        option "inferred_tolerance_default" "*:0.001"
+        option "inferred_tolerance_default" "EUR:0.02"
+
+        2017-01-01 open Assets:Checking
+        2017-01-01 open Assets:Cash
+        2017-01-01 open Assets:Investments
+
+        2017-06-23 *
+          Assets:Checking     -400.0 USD
+          Assets:Cash          400.00 USD
+
+        2017-06-24 *
+          Assets:Checking     -100.00 USD
+          Assets:Cash          100.0 USD
+
+        2017-06-25 *
+          Assets:Checking     -100.000 EUR
+          Assets:Cash          100 EUR
+
+        2017-06-26 *
+          Assets:Checking     -100.0 EUR
+          Assets:Cash          100.0 EUR
+
+        2017-06-27 *
+          Assets:Investments   10.2 HOOL {1.0 USD}
+          Assets:Cash          -10 EUR @ 1.00 USD
+          Assets:Cash          -0.20 USD
+        """
+        postings_lists = [entry.postings
+                          for entry in entries
+                          if isinstance(entry, data.Transaction)]
+        for use_cost in False, True:
+            tolerances_list = interpolate.infer_tolerances_batch(
+                postings_lists, options_map, use_cost)
+            self.assertEqual(len(postings_lists), len(tolerances_list))
+            for postings, tolerances in zip(postings_lists, tolerances_list):
+                expected = interpolate.infer_tolerances(postings, options_map, use_cost)
+                self.assertEqual(expected, tolerances)
+                self.assertEqual(expected.default, tolerances.default)
+            self.assertIs(tolerances_list[0], tolerances_list[1])
+            self.assertEqual({'USD': D('0.05'), 'EUR': D('0.02')}, tolerances_list[0])
+            self.assertEqual({'EUR': D('0.02')}, tolerances_list[2])
+            self.assertEqual({'EUR': D('0.05')}, tolerances_list[3])
+            self.assertEqual(D('0.001'), tolerances_list[3]['HOOL'])
+
+        self.assertEqual({'USD': D('0.05'), 'EUR': D('0.02'), 'HOOL': D('0.05')},
+                         tolerances_list[4])
+
+    def test_infer_tolerances_batch__exponents(self):
+        postings = [P(None, 'Assets:Checking', '-400.0', 'USD'),
+                    P(None, 'Assets:Cash', '400.00', 'USD')]
+        exponents = {id(posting.units): -3 for posting in postings}
+        tolerances_list = interpolate.infer_tolerances_batch(
+            [postings], OPTIONS_MAP, exponents=lambda units: exponents[id(units)])
+        self.assertEqual([{'USD': D('0.0005')}], tolerances_list)
+
+
 class TestQuantize(unittest.TestCase):
 
     def test_quantize_with_tolerance(self):
@@ -5,6 +5,8 @@ __license__ = "GNU GPLv2"
 
 from os import path
 import collections
+import concurrent.futures
+import copy
 import functools
 import glob
 import hashlib
@@ -12,23 +14,32 @@ import importlib
 import io
 import itertools
 import logging
+import mmap
+import operator
 import os
 import pickle
+import re
 import struct
+import sys
 import textwrap
 import time
 import warnings
 from typing import Optional
 
+from beancount import __version__
 from beancount.utils import misc_utils
+from beancount.core import compact
 from beancount.core import data
+from beancount.core import inventory
 from beancount.parser import parser
 from beancount.parser import booking
+from beancount.parser import booking_full
 from beancount.parser import options
 from beancount.parser import printer
 from beancount.ops import validation
 from beancount.utils import encryption
 from beancount.utils import file_utils
+from beancount.utils import profiler
 
 
 LoadError = collections.namedtuple('LoadError', 'source message entry')
@@ -55,9 +66,35 @@ PICKLE_CACHE_FILENAME = '.{filename}.picklecache'
 # seconds.
 PICKLE_CACHE_THRESHOLD = 1.0
 
+# The ways to validate the load cache against the input files. 'stat' compares
+# the timestamps and sizes of the files, 'content' hashes their contents, and
+# 'stat+content' only hashes the files whose timestamp or size has changed.
+CACHE_VALIDATION_MODES = ('stat', 'content', 'stat+content')
+
+# Directory name pattern for the per-file parse cache.
+PARSE_CACHE_DIRNAME = '.{filename}.parsecache'
+
+# The approximate size of the chunks large files are split into to be parsed in
+# parallel, in bytes. Files less than twice as large are not split.
+PARSE_CHUNK_SIZE = 16 << 20
+
+# Filename pattern for the cache of the booking stage checkpoints.
+STAGE_CACHE_FILENAME = '.{filename}.stagecache'
+
+# Directory name pattern for the cache of the results of pure plugins.
+PLUGIN_CACHE_DIRNAME = '.{filename}.plugincache'
+
+# Options which the pure plugins may not depend upon, as they vary between
+# loads of the same input or are only used for rendering.
+PLUGIN_CACHE_IGNORED_OPTIONS = frozenset(['input_hash', 'input_fingerprints',
+                                          'dcontext'])
+
+# The default maximum total size of a shared cache directory, in bytes.
+CACHE_DIR_MAX_SIZE = 1 << 30
+
 
 def load_file(filename, log_timings=None, log_errors=None, extra_validations=None,
-              encoding=None):
+              encoding=None, lazy=False):
     """Open a Beancount input file, parse it, run transformations and validate.
 
     Args:
@@ -69,6 +106,11 @@ def load_file(filename, log_timings=None, log_errors=None, extra_validations=Non
       extra_validations: A list of extra validation functions to run after loading
         this list of entries.
       encoding: A string or None, the encoding to decode the input filename with.
+      lazy: A boolean, true if the entries may be returned as a read-only
+        sequence whose directives are only materialized as they are accessed,
+        if they can be read from the cache. This is an instance of
+        beancount.core.compact.EntryStore; see its iter_dates() method. This is
+        meant for read-only consumers of a large ledger.
     Returns:
       A triple of (entries, errors, option_map) where "entries" is a date-sorted
       list of entries from the file, "errors" a list of error objects generated
@@ -88,7 +130,7 @@ def load_file(filename, log_timings=None, log_errors=None, extra_validations=Non
     else:
         entries, errors, options_map = _load_file(
             filename, log_timings,
-            extra_validations, encoding)
+            extra_validations, encoding, lazy=lazy)
         _log_errors(errors, log_errors)
     return entries, errors, options_map
 
@@ -152,11 +194,386 @@ def get_cache_filename(pattern: str, filename: str) -> str:
     return abs_pattern.format(filename=path.basename(filename))
 
 
-def pickle_cache_function(cache_getter, time_threshold, function):
+class CacheDirectory:
+    """A cache directory shared between ledgers and processes.
+
+    Instead of writing them next to the top-level file, the cache files of all
+    the ledgers are gathered in a single directory, e.g. on a writable volume
+    when the ledger is on a read-only mount, or shared by CI workers. Each cache
+    file is named after a hash of the name of the top-level file, the version of
+    Beancount, the version of Python and the user, so that different versions
+    never read each other's cache files; the cache files are validated against
+    the contents of the input files (and thus the plugins they declare) as
+    usual. All cache files are written atomically, so concurrent loads of the
+    same ledger are safe. When the directory grows over a maximum size, the
+    least recently used files are evicted.
+
+    The name of the top-level file is taken relative to a root directory, if
+    there is one, so that checkouts of a ledger at different locations, e.g.
+    those of several CI workers, share their cache files. The results cached by
+    another checkout refer to the names of its files, which get replaced by the
+    names of the files of the current checkout when they are read (see
+    relocate()).
+
+    The cache files are not shared between users: each user of a shared
+    directory has their own, and as they are unpickled, the files owned by other
+    users are never read anyway (see open_cache_file()).
+
+    Attributes:
+      directory: A string, the name of the cache directory.
+      max_size: An integer, the maximum total size of the cache files, in bytes.
+      root: A string, the absolute name of the root directory, or None.
+    """
+
+    # The age in seconds beyond which temporary files are considered leftovers
+    # of an interrupted process, and get evicted.
+    TMP_FILE_MAX_AGE = 24 * 60 * 60
+
+    # The names of the cache files and directories in the directory, and of the
+    # cache files within these directories, with their temporary files. Only
+    # these are ever evicted, as the directory may hold other files.
+    CACHE_NAME_REGEX = re.compile(r'[0-9a-f]{32}(\.\w+)?(\.\d+\.tmp)?')
+    CACHE_SUBDIR_NAME_REGEX = re.compile(r'[0-9a-f]{32}\.pickle(\.\d+\.tmp)?')
+
+    def __init__(self, directory, max_size=CACHE_DIR_MAX_SIZE, root=None):
+        self.directory = path.abspath(path.expandvars(path.expanduser(directory)))
+        self.max_size = max_size
+        self.root = (path.abspath(path.expandvars(path.expanduser(root)))
+                     if root else None)
+        # The extensions of the cache files and directories.
+        self.extensions = {path.splitext(pattern)[1]
+                           for pattern in (PICKLE_CACHE_FILENAME, PARSE_CACHE_DIRNAME,
+                                           STAGE_CACHE_FILENAME, PLUGIN_CACHE_DIRNAME)}
+
+    def get_cache_filename(self, pattern: str, filename: str) -> str:
+        """Compute the name of a cache file in the directory.
+
+        This has the same signature as the module's get_cache_filename().
+
+        Args:
+          pattern: A cache filename pattern; only its extension is used, to
+            tell apart the different caches of the same top-level file.
+          filename: The top-level filename.
+        Returns:
+          The name of the cache file, in the cache directory.
+        """
+        getuid = getattr(os, 'getuid', None)
+        user = str(getuid()) if getuid is not None else ''
+        key = '\0'.join((pattern, __version__, sys.version, user,
+                          self.get_key(filename)))
+        digest = hashlib.blake2b(key.encode('utf8'), digest_size=16).hexdigest()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError as exc:
+            logging.warning("Could not create cache directory %s: %s",
+                            self.directory, exc)
+        extension = path.splitext(pattern)[1]
+        self.extensions.add(extension)
+        return path.join(self.directory, digest + extension)
+
+    def get_key(self, filename):
+        """Return the name of a file, as used to name its cache files.
+
+        Args:
+          filename: A string, the name of an input file.
+        Returns:
+          The absolute name of the file, or its name relative to the root
+          directory if there is one.
+        """
+        filename = path.abspath(filename)
+        return filename if self.root is None else path.relpath(filename, self.root)
+
+    def relocate(self, result, filename):
+        """Adapt a cached result to the location of the file it is read for.
+
+        Args:
+          result: A cached triple of (entries, errors, options_map), the result
+            of loading or parsing a file.
+          filename: A string, the name of the file in the current checkout.
+        Returns:
+          The result, in which the names of the files under the root directory
+          of the checkout which computed it are replaced by those under the
+          root directory, or None if the result was computed for another file.
+        """
+        filename = path.abspath(filename)
+        cached_filename = result[2]['filename']
+        if cached_filename == filename:
+            return result
+        if self.root is None:
+            return None
+        key = self.get_key(filename)
+        if (key == os.pardir or key.startswith(os.pardir + os.sep) or
+                not cached_filename.endswith(os.sep + key)):
+            return None
+        prefix = cached_filename[:-len(key) - 1] + os.sep
+        entries, errors, options_map = result
+        return (_relocate_entries(entries, prefix, self.root),
+                _relocate_filenames(errors, prefix, self.root),
+                _relocate_filenames(options_map, prefix, self.root))
+
+    def touch(self, filename):
+        """Mark a cache file as recently used.
+
+        Args:
+          filename: A string, the name of a cache file in the directory.
+        """
+        try:
+            os.utime(filename)
+        except OSError:
+            # The file may belong to another user; this only affects eviction.
+            pass
+
+    def evict(self):
+        """Remove the least recently used files until the directory fits its size.
+
+        Only the cache files are considered; the other files in the directory
+        are left alone.
+
+        Returns:
+          A list of the names of the removed files.
+        """
+        now = time.time()
+        files = []
+        for filename in self._iter_cache_files():
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue  # Removed concurrently.
+            if filename.endswith('.tmp'):
+                # Leave alone the files another process is writing.
+                if now - stat.st_mtime < self.TMP_FILE_MAX_AGE:
+                    continue
+                mtime = 0
+            else:
+                mtime = stat.st_mtime
+            files.append((mtime, stat.st_size, filename))
+
+        total_size = sum(size for _, size, __ in files)
+        removed = []
+        for mtime, size, filename in sorted(files):
+            if total_size <= self.max_size and mtime:
+                break
+            try:
+                os.remove(filename)
+            except OSError as exc:
+                logging.warning("Could not evict cache file %s: %s", filename, exc)
+                continue
+            total_size -= size
+            removed.append(filename)
+        return removed
+
+    def _iter_cache_files(self):
+        """Iterate over the cache files in the directory, and in its cache
+        subdirectories.
+
+        Yields:
+          The names of the cache files and of their temporary files.
+        """
+        try:
+            dir_entries = list(os.scandir(self.directory))
+        except OSError:
+            return
+        for dir_entry in dir_entries:
+            match = self.CACHE_NAME_REGEX.fullmatch(dir_entry.name)
+            if match is None or (match.group(1) or '') not in self.extensions:
+                continue
+            try:
+                is_dir = dir_entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if not is_dir:
+                yield dir_entry.path
+                continue
+            if match.group(2):
+                continue
+            try:
+                sub_entries = list(os.scandir(dir_entry.path))
+            except OSError:
+                continue
+            for sub_entry in sub_entries:
+                if (self.CACHE_SUBDIR_NAME_REGEX.fullmatch(sub_entry.name) and
+                        not sub_entry.is_dir(follow_symlinks=False)):
+                    yield sub_entry.path
+
+
+def _relocate_filenames(value, prefix, root):
+    """Move the names of files under a directory to another root directory.
+
+    Args:
+      value: A string or a nested structure of lists, tuples, namedtuples, sets,
+        dicts and location metadata. Values of other types are left unchanged.
+      prefix: A string, the name of the former root directory, with a trailing
+        separator.
+      root: A string, the name of the new root directory.
+    Returns:
+      A copy of the value, in which the strings starting with the prefix start
+      with the new root directory instead.
+    """
+    vtype = type(value)
+    if vtype is str:
+        return path.join(root, value[len(prefix):]) if value.startswith(prefix) else value
+    if vtype is list:
+        return [_relocate_filenames(item, prefix, root) for item in value]
+    if vtype is dict:
+        return {_relocate_filenames(key, prefix, root):
+                _relocate_filenames(item, prefix, root)
+                for key, item in value.items()}
+    if vtype is set or vtype is frozenset:
+        return vtype(_relocate_filenames(item, prefix, root) for item in value)
+    if vtype is data.LocationMeta:
+        return data.LocationMeta(_relocate_filenames(value.filename, prefix, root),
+                                 value.lineno)
+    if vtype is tuple:
+        return tuple(_relocate_filenames(item, prefix, root) for item in value)
+    if isinstance(value, tuple) and hasattr(vtype, '_make'):
+        return vtype._make(_relocate_filenames(item, prefix, root) for item in value)
+    return value
+
+
+def _relocate_entries(entries, prefix, root):
+    """Move the names of the files of directives to another root directory.
+
+    Only the filenames of the metadata of the directives and their postings and
+    those of the documents are relocated, which is much faster than going
+    through all their values with _relocate_filenames().
+
+    Args:
+      entries: A list of directives.
+      prefix: A string, the name of the former root directory, with a trailing
+        separator.
+      root: A string, the name of the new root directory.
+    Returns:
+      A list of copies of the directives, with their filenames relocated.
+    """
+    filenames = {}
+
+    def relocate(filename):
+        new_filename = filenames.get(filename)
+        if new_filename is None:
+            new_filename = filenames[filename] = _relocate_filenames(filename, prefix, root)
+        return new_filename
+
+    def relocate_meta(meta):
+        if type(meta) is data.LocationMeta:
+            return data.LocationMeta(relocate(meta.filename), meta.lineno)
+        if type(meta) is dict and type(meta.get('filename')) is str:
+            meta = meta.copy()
+            meta['filename'] = relocate(meta['filename'])
+        return meta
+
+    new_entries = []
+    for entry in entries:
+        if isinstance(entry, data.Transaction):
+            entry = entry._replace(meta=relocate_meta(entry.meta), postings=[
+                posting._replace(meta=relocate_meta(posting.meta))
+                for posting in entry.postings])
+        elif isinstance(entry, data.Document):
+            entry = entry._replace(meta=relocate_meta(entry.meta),
+                                   filename=relocate(entry.filename))
+        else:
+            entry = entry._replace(meta=relocate_meta(entry.meta))
+        new_entries.append(entry)
+    return new_entries
+
+
+def open_cache_file(cache_filename):
+    """Open a cache file for reading, if it belongs to the current user.
+
+    The cache files hold pickled objects, and unpickling a file written by
+    another user, e.g. in a cache directory others can write to, could run
+    arbitrary code on their behalf. Such files are never read. The owner is
+    checked on the open file, so that the file cannot be replaced in between.
+
+    Args:
+      cache_filename: A string, the name of the cache file.
+    Returns:
+      A binary file object, or None if the file cannot be opened or belongs to
+      another user.
+    """
+    try:
+        file = open(cache_filename, 'rb')
+    except OSError:
+        return None
+    getuid = getattr(os, 'getuid', None)
+    if getuid is not None and os.fstat(file.fileno()).st_uid != getuid():
+        file.close()
+        logging.warning("Ignoring cache file %s owned by another user.", cache_filename)
+        return None
+    return file
+
+
+def read_cache_record(cache_filename):
+    """Read a pickled cache record.
+
+    Args:
+      cache_filename: A string, the name of the cache file.
+    Returns:
+      The record, or None if the file is absent, unreadable or not trusted, as
+      per open_cache_file().
+    """
+    file = open_cache_file(cache_filename)
+    if file is None:
+        return None
+    with file:
+        try:
+            return pickle.load(file)
+        except Exception as exc:
+            # Unpickling an old or corrupted cache file manifests as a variety
+            # of different exception types.
+            logging.error("Cache file is corrupted: %s; recomputing.", exc)
+            return None
+
+
+def write_cache_record(cache_filename, record, description):
+    """Atomically write a pickled cache record, warning if this fails.
+
+    Args:
+      cache_filename: A string, the name of the cache file.
+      record: The object to pickle.
+      description: A string, the kind of cache, for the warning.
+    """
+    write_cache_file(cache_filename,
+                     functools.partial(pickle.dump, record,
+                                       protocol=pickle.HIGHEST_PROTOCOL),
+                     description)
+
+
+def write_cache_file(cache_filename, dump, description):
+    """Atomically write a cache file, warning if this fails.
+
+    The contents are written to a temporary file which replaces the cache file
+    once complete, so that concurrent readers never see a partial file. The
+    temporary file is removed if writing fails.
+
+    Args:
+      cache_filename: A string, the name of the cache file.
+      dump: A function which writes the contents to the binary file object it is
+        given.
+      description: A string, the kind of cache, for the warning.
+    """
+    tmp_filename = '{}.{}.tmp'.format(cache_filename, os.getpid())
+    try:
+        os.makedirs(path.dirname(cache_filename), exist_ok=True)
+        with open(tmp_filename, 'wb') as file:
+            dump(file)
+        os.replace(tmp_filename, cache_filename)
+    except Exception as exc:
+        logging.warning("Could not write to %s file %s: %s",
+                        description, cache_filename, exc)
+        try:
+            os.remove(tmp_filename)
+        except OSError:
+            pass
+
+
+def pickle_cache_function(cache_getter, time_threshold, function, validation='stat',
+                          cache_directory=None):
     """Decorate a loader function to make it loads its result from a pickle cache.
 
     This considers the first argument as a top-level filename and assumes the
-    function to be cached returns an (entries, errors, options_map) triple. We
+    function to be cached returns an (entries, errors, options_map) triple,
+    which gets stored in the compact binary format of beancount.core.compact,
+    much faster to read back than a pickle. (The name is historical.) We
     use the 'include' option value in order to check whether any of the included
     files has changed. It's essentially a special case for an on-disk memoizer.
     If any of the included files are more recent than the cache, the function is
@@ -168,26 +585,42 @@ def pickle_cache_function(cache_getter, time_threshold, function):
       time_threshold: A float, the number of seconds below which we don't bother
         caching.
       function: A function object to decorate for caching.
+      validation: One of CACHE_VALIDATION_MODES, how to detect that the input
+        files have changed since the cache was written. With the modes hashing
+        the contents of the files, the cache survives its input files being
+        rewritten with the same contents, e.g. by a VCS checkout.
+      cache_directory: A CacheDirectory instance or None. If set, the cache
+        files live in it, and get touched on use and evicted on write.
     Returns:
       A decorated function which will pull its result from a cache file if
       it is available.
     """
+    assert validation in CACHE_VALIDATION_MODES, validation
+
     @functools.wraps(function)
-    def wrapped(toplevel_filename, *args, **kw):
+    def wrapped(toplevel_filename, *args, lazy=False, **kw):
         cache_filename = cache_getter(toplevel_filename)
 
         # Read the cache if it exists in order to get the list of files whose
         # timestamps to check.
         exists = path.exists(cache_filename)
-        if exists:
-            with open(cache_filename, 'rb') as file:
+        file = open_cache_file(cache_filename) if exists else None
+        if file is not None:
+            with file:
                 try:
-                    result = pickle.load(file)
+                    if lazy:
+                        store = compact.EntryStore(file)
+                        result = (store, store.errors, store.options_map)
+                    else:
+                        result = compact.load(file)
+                except compact.CompactFormatError as exc:
+                    # The cache file was written by another version.
+                    logging.info("Cache file is obsolete: %s; recomputing.", exc)
+                    result = None
                 except Exception as exc:
                     # Note: Not a big fan of doing this, but here we handle all
-                    # possible exceptions because unpickling of an old or
-                    # corrupted pickle file manifests as a variety of different
-                    # exception types.
+                    # possible exceptions because reading a corrupted cache file
+                    # manifests as a variety of different exception types.
 
                     # The cache file is corrupted; ignore it and recompute.
                     logging.error("Cache file is corrupted: %s; recomputing.", exc)
@@ -197,9 +630,26 @@ def pickle_cache_function(cache_getter, time_threshold, function):
                     # Check that the latest timestamp has not been written after the
                     # cache file.
                     entries, errors, options_map = result
-                    if not needs_refresh(options_map):
-                        # All timestamps are legit; cache hit.
-                        return result
+                    if cache_directory is None:
+                        relocated = result
+                    elif lazy:
+                        # The entries of a lazy load cannot be relocated.
+                        relocated = (result
+                                     if options_map['filename'] == path.abspath(
+                                         toplevel_filename)
+                                     else None)
+                    else:
+                        # The cache may have been written by another checkout.
+                        relocated = cache_directory.relocate(result, toplevel_filename)
+                    if relocated is not None:
+                        entries, errors, options_map = result = relocated
+                        if not needs_refresh(options_map):
+                            # All timestamps are legit; cache hit.
+                            if cache_directory is not None:
+                                cache_directory.touch(cache_filename)
+                            return result
+                    if lazy:
+                        entries.close()
 
         # We failed; recompute the value.
         if exists:
@@ -214,15 +664,20 @@ def pickle_cache_function(cache_getter, time_threshold, function):
         result = function(toplevel_filename, *args, **kw)
         time_after = time.time()
 
+        if validation != 'stat':
+            _, __, options_map = result
+            options_map['input_fingerprints'] = (
+                validation == 'stat+content',
+                compute_input_fingerprints(options_map['include']))
+
         # Overwrite the cache file if the time it takes to compute it
-        # justifies it.
+        # justifies it. Note: The file is replaced atomically, as it may be
+        # memory-mapped by another lazy load.
         if time_after - time_before > time_threshold:
-            try:
-                with open(cache_filename, 'wb') as file:
-                    pickle.dump(result, file)
-            except Exception as exc:
-                logging.warning("Could not write to picklecache file %s: %s",
-                                cache_filename, exc)
+            write_cache_file(cache_filename, functools.partial(compact.dump, result),
+                             'picklecache')
+            if cache_directory is not None:
+                cache_directory.evict()
 
         return result
     return wrapped
@@ -250,8 +705,452 @@ def delete_cache_function(cache_getter, function):
     return wrapped
 
 
-def _uncached_load_file(filename, *args, **kw):
-    """Delegate to _load. Note: This gets conditionally advised by caching below."""
+def parse_cache_function(cache_getter, function, cache_directory=None):
+    """Decorate a loader function to reuse the parse results of unchanged files.
+
+    Unlike pickle_cache_function(), this does not cache the final result of the
+    loader; it provides the decorated function with a FileParseCache instance
+    on which the parsing of each of the included files is carried out, so that
+    only the files that have changed since the last load get parsed again.
+
+    Args:
+      cache_getter: A function of one argument, the top-level filename, which
+        will return the name of the corresponding parse cache directory.
+      function: A function object to decorate, which accepts a 'parse_cache'
+        keyword argument.
+      cache_directory: A CacheDirectory instance or None. If set, the parse
+        cache directory is in it.
+    Returns:
+      A decorated function which will parse its input files through the cache.
+    """
+    @functools.wraps(function)
+    def wrapped(toplevel_filename, *args, **kw):
+        kw['parse_cache'] = FileParseCache(cache_getter(toplevel_filename),
+                                           cache_directory)
+        return function(toplevel_filename, *args, **kw)
+    return wrapped
+
+
+class FileParseCache:
+    """An on-disk cache of the parse results of individual input files.
+
+    Each parsed file gets its own pickle file in the cache directory, holding
+    the result of parsing it along with the modification time, size and a hash
+    of the contents of the input file. A cached result is reused if the
+    modification time and size of the file have not changed, or failing that,
+    if its contents still hash to the same value, so that merely touching a file
+    does not force it to be parsed again.
+
+    Attributes:
+      directory: A string, the name of the directory holding the cache files.
+      cache_directory: A CacheDirectory instance if the directory is in a shared
+        cache directory, or None. The cache files are then named and relocated
+        as per its root directory.
+    """
+
+    def __init__(self, directory, cache_directory=None):
+        self.directory = directory
+        self.cache_directory = cache_directory
+
+    def get_cache_filename(self, filename):
+        """Return the name of the cache file for a particular input file.
+
+        Args:
+          filename: A string, the absolute name of the input file.
+        Returns:
+          A string, the name of its cache file.
+        """
+        if self.cache_directory is not None:
+            filename = self.cache_directory.get_key(filename)
+        md5 = hashlib.md5(filename.encode('utf8'))
+        return path.join(self.directory, '{}.pickle'.format(md5.hexdigest()))
+
+    def parse_file(self, filename, encoding=None, symbols=None):
+        """Parse an input file, reusing the cached result if it has not changed.
+
+        Args:
+          filename: A string, the absolute name of the file to parse.
+          encoding: A string or None, the encoding to decode the input file with.
+          symbols: A dict of strings to intern the parsed strings with, or None.
+            This is only used if the file has to be parsed.
+        Returns:
+          A triple of (entries, errors, options_map), as per parser.parse_file().
+        """
+        # The parser and the arguments it is invoked with must match too.
+        parser_key = (__version__, parser._parser.SOURCE_HASH, encoding)
+        stat = os.stat(filename)
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+
+        cache_filename = self.get_cache_filename(filename)
+        record = read_cache_record(cache_filename)
+        if record is not None:
+            cached_parser_key, cached_stat_key, cached_hash, result = record
+            if cached_parser_key == parser_key and self.cache_directory is not None:
+                result = self.cache_directory.relocate(result, filename)
+            if cached_parser_key == parser_key and result is not None:
+                if cached_stat_key == stat_key:
+                    return self._reuse(filename, result)
+            else:
+                record = None
+
+        with open(filename, 'rb') as file:
+            contents = file.read()
+        content_hash = hash_contents(contents)
+        if record is not None and cached_hash == content_hash:
+            # The file has been touched but its contents have not changed;
+            # update the file statistics to hit directly the next time.
+            write_cache_record(cache_filename,
+                               (parser_key, stat_key, content_hash, result),
+                               'parse cache')
+            return self._reuse(filename, result)
+
+        result = parser.parse_file(io.BytesIO(contents),
+                                   report_filename=filename, encoding=encoding,
+                                   symbols=symbols)
+        write_cache_record(cache_filename, (parser_key, stat_key, content_hash, result),
+                           'parse cache')
+        return result
+
+    @staticmethod
+    def _reuse(filename, result):
+        """Apply the side-effects the parsing of a file would have had.
+
+        Args:
+          filename: A string, the absolute name of the parsed file.
+          result: The cached (entries, errors, options_map) triple.
+        Returns:
+          The result triple.
+        """
+        _, __, options_map = result
+        if options_map['insert_pythonpath']:
+            sys.path.insert(0, path.dirname(filename))
+        return result
+
+
+def stage_cache_function(cache_getter, function):
+    """Decorate a loader function to resume booking from saved checkpoints.
+
+    This provides the decorated function with a StageCache instance through
+    which the booking stage is carried out. See StageCache for details.
+
+    Args:
+      cache_getter: A function of one argument, the top-level filename, which
+        will return the name of the corresponding stage cache file.
+      function: A function object to decorate, which accepts a 'stage_cache'
+        keyword argument.
+    Returns:
+      A decorated function which will book its entries through the cache.
+    """
+    @functools.wraps(function)
+    def wrapped(toplevel_filename, *args, **kw):
+        kw['stage_cache'] = StageCache(cache_getter(toplevel_filename))
+        return function(toplevel_filename, *args, **kw)
+    return wrapped
+
+
+# A checkpoint of the booking stage, at the start of a month. 'index' is the
+# number of parsed entries preceding it, 'month' a (year, month) pair, the
+# 'num_*' attributes are the numbers of booked entries and errors preceding it,
+# and 'balances' a dict of account name to Inventory at that point.
+_BookingCheckpoint = collections.namedtuple(
+    '_BookingCheckpoint',
+    'index month num_booked num_booking_errors num_missing_errors balances')
+
+
+class StageCache:
+    """An on-disk cache of checkpoints of the booking stage.
+
+    Booking processes the sorted entries in order, carrying the balances of all
+    the accounts along, so the booking of a prefix of the entries does not
+    depend on anything that follows. Entries are booked one month at a time and
+    a snapshot of the balance inventories is kept at the start of each year and
+    at the start of the last month. The parsed and booked entries up to the last
+    of these checkpoints get saved along with the snapshots. On the next load,
+    the new parsed entries are compared to the saved ones, and booking resumes
+    from the latest checkpoint before the first difference, reusing the booked
+    entries preceding it. The common case of adding recent transactions to a
+    ledger with a long history thus only books the current month.
+
+    The cache is only valid for the same booking options and booking methods;
+    it is ignored otherwise. Plugins and validation are always run on the full
+    list of entries, as they may look at all of them and at the filesystem.
+
+    Attributes:
+      filename: A string, the name of the cache file.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def book(self, entries, options_map):
+        """Book the parsed entries, resuming from a checkpoint if possible.
+
+        Args:
+          entries: A sorted list of directives, as produced by the parser.
+          options_map: An options dict as produced by the parser.
+        Returns:
+          A pair of (entries, errors), as per booking.book().
+        """
+        booking_methods = booking.get_booking_methods(entries, options_map)
+        key = (__version__,
+               tuple(options_map[name] for name in ('booking_method',
+                                                    'infer_tolerance_from_cost',
+                                                    'inferred_tolerance_multiplier',
+                                                    'inferred_tolerance_default')),
+               dict(booking_methods))
+
+        # Find the latest checkpoint whose preceding entries are all unchanged.
+        record = read_cache_record(self.filename)
+        if record is None or record[0] != key:
+            record = (key, [], [], [], [], [])
+        (_, cached_entries, booked_entries,
+         booking_errors, missing_errors, checkpoints) = record
+        num_same = _count_same_entries(entries, cached_entries)
+        num_reused = 0
+        while num_reused < len(checkpoints) and checkpoints[num_reused].index <= num_same:
+            num_reused += 1
+        changed = num_reused < len(checkpoints)
+        checkpoints = checkpoints[:num_reused]
+        if checkpoints:
+            checkpoint = checkpoints[-1]
+            index = checkpoint.index
+            booked_entries = booked_entries[:checkpoint.num_booked]
+            booking_errors = booking_errors[:checkpoint.num_booking_errors]
+            missing_errors = missing_errors[:checkpoint.num_missing_errors]
+            balances = collections.defaultdict(inventory.Inventory, {
+                account: copy.copy(balance)
+                for account, balance in checkpoint.balances.items()})
+        else:
+            index = 0
+            balances = collections.defaultdict(inventory.Inventory)
+            booked_entries, booking_errors, missing_errors = [], [], []
+
+        # Book the remaining entries one month at a time.
+        for month, month_entries in itertools.groupby(
+                entries[index:], key=lambda entry: (entry.date.year, entry.date.month)):
+            month_entries = list(month_entries)
+            if index > 0 and not (checkpoints and checkpoints[-1].index == index):
+                # Only retain the last of the checkpoints within a year.
+                if checkpoints and checkpoints[-1].month[1] != 1:
+                    checkpoints.pop()
+                checkpoints.append(_BookingCheckpoint(
+                    index, month,
+                    len(booked_entries), len(booking_errors), len(missing_errors),
+                    {account: copy.copy(balance)
+                     for account, balance in balances.items()}))
+                changed = True
+            month_booked, month_errors, _ = booking_full._book(
+                month_entries, options_map, booking_methods, balances)
+            booked_entries.extend(month_booked)
+            booking_errors.extend(month_errors)
+            missing_errors.extend(
+                booking.validate_missing_eliminated(month_booked, options_map))
+            index += len(month_entries)
+
+        # Save the entries up to the last checkpoint, if it has changed.
+        if changed:
+            checkpoint = checkpoints[-1]
+            write_cache_record(self.filename,
+                               (key,
+                                entries[:checkpoint.index],
+                                booked_entries[:checkpoint.num_booked],
+                                booking_errors[:checkpoint.num_booking_errors],
+                                missing_errors[:checkpoint.num_missing_errors],
+                                checkpoints),
+                               'stage cache')
+
+        return booked_entries, booking_errors + missing_errors
+
+
+def _count_same_entries(entries, cached_entries):
+    """Count the number of leading entries which are identical to cached ones.
+
+    Note that the numbers have to have the same precision too, not just be
+    equal, as this influences the tolerances inferred during booking.
+
+    Args:
+      entries: A list of directives.
+      cached_entries: Another list of directives.
+    Returns:
+      An integer, the length of the common prefix of both lists.
+    """
+    count = 0
+    for entry, cached_entry in zip(entries, cached_entries):
+        if entry != cached_entry:
+            break
+        if isinstance(entry, data.Transaction):
+            if any(_posting_numbers(posting) != _posting_numbers(cached_posting)
+                   for posting, cached_posting in zip(entry.postings,
+                                                      cached_entry.postings)):
+                break
+        count += 1
+    return count
+
+
+def _posting_numbers(posting):
+    """Render all the numbers of a posting, with their precision.
+
+    Args:
+      posting: An instance of Posting, possibly incomplete.
+    Returns:
+      A tuple of strings, the numbers of its units, cost and price.
+    """
+    units, cost, price = posting.units, posting.cost, posting.price
+    return (str(getattr(units, 'number', None)),
+            None if cost is None else (str(getattr(cost, 'number', None)),
+                                       str(getattr(cost, 'number_per', None)),
+                                       str(getattr(cost, 'number_total', None))),
+            str(getattr(price, 'number', None)))
+
+
+def plugin_cache_function(cache_getter, function):
+    """Decorate a loader function to reuse the results of pure plugins.
+
+    This provides the decorated function with a PluginCache instance through
+    which the plugins declared pure are run.
+
+    Args:
+      cache_getter: A function of one argument, the top-level filename, which
+        will return the name of the corresponding plugin cache directory.
+      function: A function object to decorate, which accepts a 'plugin_cache'
+        keyword argument.
+    Returns:
+      A decorated function which will run the pure plugins through the cache.
+    """
+    @functools.wraps(function)
+    def wrapped(toplevel_filename, *args, **kw):
+        kw['plugin_cache'] = PluginCache(cache_getter(toplevel_filename))
+        return function(toplevel_filename, *args, **kw)
+    return wrapped
+
+
+class PluginCache:
+    """An on-disk cache of the results of pure plugins.
+
+    A plugin module declares that its functions are pure by setting a
+    '__plugins_pure__' attribute to a true value: the entries and errors they
+    return only depend on the entries, options and configuration they are
+    given, and they modify neither the entries nor the options map in place.
+    The output of a pure plugin is then stored along with a key computed from
+    the fingerprint of its input, the identity of the plugin and its
+    configuration, and it is reused if the key matches on a later load.
+
+    The fingerprint of the entries is expensive to compute, so it is computed
+    at most once per load and chained: the output of a pure plugin is
+    identified by its key, and an impure plugin which returns the very same
+    directives it was given is assumed not to change the fingerprint.
+
+    Each plugin function only keeps its latest result, stored as references to
+    the directives of its input, for those it passes through, and the new
+    directives it produced.
+
+    Attributes:
+      directory: A string, the name of the directory holding the cache files.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def get_cache_filename(self, plugin_name, function_name, plugin_config):
+        """Return the name of the cache file for a particular plugin function.
+
+        Args:
+          plugin_name: A string, the name of the plugin module.
+          function_name: A string, the name of the plugin function.
+          plugin_config: The configuration string of the plugin, or None.
+        Returns:
+          A string, the name of its cache file.
+        """
+        md5 = hashlib.md5(repr((plugin_name, function_name, plugin_config)).encode('utf8'))
+        return path.join(self.directory, '{}.pickle'.format(md5.hexdigest()))
+
+    @staticmethod
+    def fingerprint(entries, options_map):
+        """Compute the fingerprint of the input of a plugin.
+
+        Args:
+          entries: A list of directives.
+          options_map: An options dict.
+        Returns:
+          A string, the fingerprint of the directives and options.
+        """
+        options_items = sorted((key, value) for key, value in options_map.items()
+                               if key not in PLUGIN_CACHE_IGNORED_OPTIONS)
+        return compact.fingerprint(entries, options_items)
+
+    @staticmethod
+    def get_key(fingerprint, module, function_name, plugin_config):
+        """Compute the key of the result of running a plugin function.
+
+        Args:
+          fingerprint: A string, the fingerprint of the input of the plugin.
+          module: The plugin module object.
+          function_name: A string, the name of the plugin function.
+          plugin_config: The configuration string of the plugin, or None.
+        Returns:
+          A string, which also serves as the fingerprint of the output.
+        """
+        # Changes to the source of the plugin invalidate its results.
+        module_filename = getattr(module, '__file__', None)
+        try:
+            stat = os.stat(module_filename)
+            module_key = (module_filename, stat.st_mtime_ns, stat.st_size)
+        except (OSError, TypeError):
+            module_key = module_filename
+        key = repr((__version__, fingerprint, module.__name__, module_key,
+                    function_name, plugin_config))
+        return hash_contents(key.encode('utf8'))
+
+    def run(self, module, function_name, callback, entries, options_map,
+            plugin_config, fingerprint):
+        """Run a pure plugin function, reusing its cached result if possible.
+
+        Args:
+          module: The plugin module object.
+          function_name: A string, the name of the plugin function.
+          callback: The plugin function.
+          entries: A list of directives, the input of the plugin.
+          options_map: An options dict.
+          plugin_config: The configuration string of the plugin, or None.
+          fingerprint: A string, the fingerprint of the input of the plugin.
+        Returns:
+          A tuple of (entries, errors, key), the output of the plugin along with
+          its key, the fingerprint of its output.
+        """
+        key = self.get_key(fingerprint, module, function_name, plugin_config)
+        cache_filename = self.get_cache_filename(module.__name__, function_name,
+                                                 plugin_config)
+        record = read_cache_record(cache_filename)
+        if record is not None and record[0] == key:
+            _, refs, new_entries, errors = record
+            iter_new_entries = iter(new_entries)
+            return ([entries[ref] if ref >= 0 else next(iter_new_entries)
+                     for ref in refs], errors, key)
+
+        input_entries = list(entries)
+        if plugin_config is not None:
+            new_entries, errors = callback(entries, options_map, plugin_config)
+        else:
+            new_entries, errors = callback(entries, options_map)
+
+        # Store the output as references to the input entries where possible.
+        indexes = {id(entry): index for index, entry in enumerate(input_entries)}
+        refs = []
+        created_entries = []
+        for entry in new_entries:
+            index = indexes.get(id(entry))
+            if index is None or input_entries[index] is not entry:
+                index = -1
+                created_entries.append(entry)
+            refs.append(index)
+        write_cache_record(cache_filename, (key, refs, created_entries, errors),
+                           'plugin cache')
+        return new_entries, errors, key
+
+
+def _uncached_load_file(filename, *args, lazy=False, **kw):
+    """Delegate to _load. Note: This gets conditionally advised by caching below.
+    The 'lazy' option only applies to results read from the cache."""
     return _load([(filename, True)], *args, **kw)
 
 
@@ -266,6 +1165,15 @@ def needs_refresh(options_map):
     """
     if options_map is None:
         return True
+    if options_map.get('input_fingerprints') is not None:
+        # Compare the hashes of the contents of the files, ignoring timestamps.
+        use_stat, fingerprints = options_map['input_fingerprints']
+        for filename, fingerprint in fingerprints.items():
+            new_fingerprint = compute_file_fingerprint(filename,
+                                                       fingerprint if use_stat else None)
+            if (fingerprint and fingerprint[2]) != (new_fingerprint and new_fingerprint[2]):
+                return True
+        return False
     input_hash = compute_input_hash(options_map['include'])
     return 'input_hash' not in options_map or input_hash != options_map['input_hash']
 
@@ -286,6 +1194,52 @@ def compute_input_hash(filenames):
     return md5.hexdigest()
 
 
+def compute_input_fingerprints(filenames):
+    """Compute a fingerprint of the contents of each of the input files.
+
+    Args:
+      filenames: A list of input files.
+    Returns:
+      A dict of filename to its fingerprint, as per compute_file_fingerprint().
+    """
+    return {filename: compute_file_fingerprint(filename) for filename in filenames}
+
+
+def compute_file_fingerprint(filename, previous=None):
+    """Compute a fingerprint of the contents of a file.
+
+    Args:
+      filename: A string, the name of the file.
+      previous: A fingerprint previously computed for the same file, or None. If
+        the timestamp and size of the file have not changed since, it is
+        returned as is, without reading the file.
+    Returns:
+      A tuple of (modification time in ns, size, hash of the contents), or
+      None if the file does not exist.
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    if (previous is not None and
+            previous[0] == stat.st_mtime_ns and previous[1] == stat.st_size):
+        return previous
+    with open(filename, 'rb') as file:
+        content_hash = hash_contents(file.read())
+    return (stat.st_mtime_ns, stat.st_size, content_hash)
+
+
+def hash_contents(contents):
+    """Compute a fast hash of the contents of an input file.
+
+    Args:
+      contents: A bytes object.
+    Returns:
+      A string, the hex digest of the contents.
+    """
+    return hashlib.blake2b(contents, digest_size=16).hexdigest()
+
+
 def load_string(string, log_timings=None, log_errors=None, extra_validations=None,
                 dedent=False, encoding=None):
 
@@ -315,7 +1269,8 @@ def load_string(string, log_timings=None, log_errors=None, extra_validations=Non
     return entries, errors, options_map
 
 
-def _parse_recursive(sources, log_timings, encoding=None):
+def _parse_recursive(sources, log_timings, encoding=None, parse_cache=None,
+                     num_workers=None):
     """Parse Beancount input, run its transformations and validate it.
 
     Recursively parse a list of files or strings and their include files and
@@ -323,6 +1278,18 @@ def _parse_recursive(sources, log_timings, encoding=None):
     options-map. If the same file is being parsed twice, ignore it and issue an
     error.
 
+    The sources are processed in waves: all the sources known at a particular
+    point are parsed, then all the files they include, and so on. The parsing of
+    the sources of a wave is independent, and may be carried out on a pool of
+    processes. Either way, the results are merged in the order in which the
+    sources were discovered, so the output does not depend on the number of
+    workers.
+
+    When parsing in this process, the strings repeated across the parsed sources
+    (account names, currencies, tags, links, metadata keys and filenames) are
+    interned in a table shared by all of them, so that the entries of all the
+    files share the same string objects.
+
     Args:
       sources: A list of (filename-or-string, is-filename) where the first
         element is a string, with either a filename or a string to be parsed directly,
@@ -331,6 +1298,11 @@ def _parse_recursive(sources, log_timings, encoding=None):
         paths.
       log_timings: A function to write timings to, or None, if it should remain quiet.
       encoding: A string or None, the encoding to decode the input filename with.
+      parse_cache: An instance of FileParseCache to parse the files through, or
+        None, if all the files should be parsed.
+      num_workers: An integer, the number of processes to parse the included files
+        with, or None, to parse them all in this process. Files larger than twice
+        PARSE_CHUNK_SIZE are also split into chunks parsed on these processes.
     Returns:
       A tuple of (entries, parse_errors, options_map).
     """
@@ -347,99 +1319,94 @@ def _parse_recursive(sources, log_timings, encoding=None):
     # detect and avoid duplicates (cycles).
     filenames_seen = set()
 
-    with misc_utils.log_time('beancount.parser.parser', log_timings, indent=1):
-        while source_stack:
-            source, is_file = source_stack.pop(0)
-            is_top_level = options_map is None
-
-            # If the file is encrypted, read it in and process it as a string.
-            if is_file:
-                cwd = path.dirname(source)
-                source_filename = source
-                if encryption.is_encrypted_file(source):
-                    source = encryption.read_encrypted_file(source)
-                    is_file = False
-            else:
-                # If we're parsing a string, the CWD is the current process
-                # working directory.
-                cwd = os.getcwd()
-                source_filename = None
-
-            if is_file:
-                # All filenames here must be absolute.
-                assert path.isabs(source)
-                filename = path.normpath(source)
-
-                # Check for file previously parsed... detect duplicates.
-                if filename in filenames_seen:
-                    parse_errors.append(
-                        LoadError(data.new_metadata("<load>", 0),
-                                  'Duplicate filename parsed: "{}"'.format(filename),
-                                  None))
-                    continue
-
-                # Check for a file that does not exist.
-                if not path.exists(filename):
-                    parse_errors.append(
-                        LoadError(data.new_metadata("<load>", 0),
-                                  'File "{}" does not exist'.format(filename), None))
-                    continue
-
-                # Parse a file from disk directly.
-                filenames_seen.add(filename)
-                with misc_utils.log_time('beancount.parser.parser.parse_file',
-                                         log_timings, indent=2):
-                    (src_entries,
-                     src_errors,
-                     src_options_map) = parser.parse_file(filename, encoding=encoding)
-
-                cwd = path.dirname(filename)
-            else:
-                # Encode the contents if necessary.
-                if encoding:
-                    if isinstance(source, bytes):
-                        source = source.decode(encoding)
-                    source = source.encode('ascii', 'replace')
-
-                # Parse a string buffer from memory.
-                with misc_utils.log_time('beancount.parser.parser.parse_string',
-                                         log_timings, indent=2):
-                    (src_entries,
-                     src_errors,
-                     src_options_map) = parser.parse_string(source, source_filename)
-
-            # Merge the entries resulting from the parsed file.
-            entries.extend(src_entries)
-            parse_errors.extend(src_errors)
-
-            # We need the options from the very top file only (the very
-            # first file being processed). No merging of options should
-            # occur.
-            if is_top_level:
-                options_map = src_options_map
-            else:
-                aggregate_options_map(options_map, src_options_map)
-
-            # Add includes to the list of sources to process. chdir() for glob,
-            # which uses it indirectly.
-            include_expanded = []
-            with file_utils.chdir(cwd):
-                for include_filename in src_options_map['include']:
-                    matched_filenames = glob.glob(include_filename, recursive=True)
-                    if matched_filenames:
-                        include_expanded.extend(matched_filenames)
+    # A table of the strings interned by the parser, shared by all the sources.
+    symbols = {}
+
+    executor = (concurrent.futures.ProcessPoolExecutor(num_workers)
+                if num_workers and num_workers > 1
+                else None)
+
+    try:
+        with misc_utils.log_time('beancount.parser.parser', log_timings, indent=1):
+            while source_stack:
+                # Check all the pending sources in order, producing either an error
+                # or a parse job for each of them.
+                wave = []
+                for source, is_file in source_stack:
+                    # If the file is encrypted, read it in and process it as a string.
+                    if is_file:
+                        cwd = path.dirname(source)
+                        source_filename = source
+                        if encryption.is_encrypted_file(source):
+                            source = encryption.read_encrypted_file(source)
+                            is_file = False
+                    else:
+                        # If we're parsing a string, the CWD is the current process
+                        # working directory.
+                        cwd = os.getcwd()
+                        source_filename = None
+
+                    if is_file:
+                        # All filenames here must be absolute.
+                        assert path.isabs(source)
+                        filename = path.normpath(source)
+
+                        # Check for file previously parsed... detect duplicates.
+                        if filename in filenames_seen:
+                            wave.append(LoadError(
+                                data.new_metadata("<load>", 0),
+                                'Duplicate filename parsed: "{}"'.format(filename), None))
+                            continue
+
+                        # Check for a file that does not exist.
+                        if not path.exists(filename):
+                            wave.append(LoadError(
+                                data.new_metadata("<load>", 0),
+                                'File "{}" does not exist'.format(filename), None))
+                            continue
+
+                        filenames_seen.add(filename)
+                        source = source_filename = filename
+                        cwd = path.dirname(filename)
+
+                    wave.append((source, is_file, source_filename, cwd))
+                source_stack = []
+
+                # Parse the sources of this wave.
+                jobs = [item for item in wave if not isinstance(item, LoadError)]
+                results = _parse_sources(jobs, executor, log_timings,
+                                         encoding, parse_cache, symbols)
+                results_iter = iter(results)
+
+                # Merge the results in order.
+                for item in wave:
+                    if isinstance(item, LoadError):
+                        parse_errors.append(item)
+                        continue
+                    _, __, ___, cwd = item
+                    src_entries, src_errors, src_options_map = next(results_iter)
+
+                    # Merge the entries resulting from the parsed file.
+                    entries.extend(src_entries)
+                    parse_errors.extend(src_errors)
+
+                    # We need the options from the very top file only (the very
+                    # first file being processed). No merging of options should
+                    # occur.
+                    if options_map is None:
+                        options_map = src_options_map
                     else:
-                        parse_errors.append(
-                            LoadError(data.new_metadata("<load>", 0),
-                                      'File glob "{}" does not match any files'.format(
-                                          include_filename), None))
-            for include_filename in include_expanded:
-                if not path.isabs(include_filename):
-                    include_filename = path.join(cwd, include_filename)
-                include_filename = path.normpath(include_filename)
-
-                # Add the include filenames to be processed later.
-                source_stack.append((include_filename, True))
+                        aggregate_options_map(options_map, src_options_map)
+
+                    # Add includes to the list of sources to process.
+                    include_filenames, include_errors = _expand_includes(
+                        src_options_map['include'], cwd)
+                    parse_errors.extend(include_errors)
+                    source_stack.extend((include_filename, True)
+                                        for include_filename in include_filenames)
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
     # Make sure we have at least a dict of valid options.
     if options_map is None:
@@ -451,6 +1418,275 @@ def _parse_recursive(sources, log_timings, encoding=None):
     return entries, parse_errors, options_map
 
 
+def _parse_sources(jobs, executor, log_timings, encoding, parse_cache,
+                   symbols=None):
+    """Parse a list of independent sources, possibly on a pool of processes.
+
+    Args:
+      jobs: A list of (source, is_file, source_filename, cwd) tuples, as prepared
+        by _parse_recursive().
+      executor: An instance of concurrent.futures.Executor to parse the sources
+        with, or None, to parse them in this process.
+      log_timings: A function to write timings to, or None, if it should remain quiet.
+      encoding: A string or None, the encoding to decode the input with.
+      parse_cache: An instance of FileParseCache to parse files through, or None.
+      symbols: A dict of strings to intern the parsed strings with, or None. This
+        cannot be shared with worker processes and is only used in this process.
+    Returns:
+      A list of (entries, errors, options_map) triples, one for each job, in the
+      same order.
+    """
+    # Split the large files into chunks, to parse them in parallel.
+    chunked_results = {}
+    if executor is not None and parse_cache is None:
+        for index, (source, is_file, _, __) in enumerate(jobs):
+            if is_file and path.getsize(source) >= 2 * PARSE_CHUNK_SIZE:
+                with misc_utils.log_time('beancount.parser.parser.parse_chunks',
+                                         log_timings, indent=2):
+                    chunked_results[index] = _parse_file_chunks(
+                        source, executor, encoding, symbols)
+    if chunked_results:
+        results = _parse_sources([job for index, job in enumerate(jobs)
+                                  if index not in chunked_results],
+                                 executor, log_timings, encoding, parse_cache, symbols)
+        results_iter = iter(results)
+        return [chunked_results[index] if index in chunked_results else next(results_iter)
+                for index in range(len(jobs))]
+
+    if executor is None or len(jobs) < 2:
+        results = []
+        for source, is_file, source_filename, _ in jobs:
+            with misc_utils.log_time('beancount.parser.parser.parse_file'
+                                     if is_file else
+                                     'beancount.parser.parser.parse_string',
+                                     log_timings, indent=2):
+                results.append(_parse_source(source, is_file, source_filename,
+                                             encoding, parse_cache, symbols))
+        return results
+
+    with misc_utils.log_time('beancount.parser.parser.parse_parallel',
+                             log_timings, indent=2):
+        results = list(executor.map(_parse_source,
+                                    [job[0] for job in jobs],
+                                    [job[1] for job in jobs],
+                                    [job[2] for job in jobs],
+                                    itertools.repeat(encoding),
+                                    itertools.repeat(parse_cache)))
+
+    # Replicate the side-effects parsing would have had in this process.
+    for _, __, src_options_map in results:
+        if src_options_map['insert_pythonpath']:
+            sys.path.insert(0, path.dirname(src_options_map['filename']))
+    return results
+
+
+def _parse_source(source, is_file, source_filename, encoding, parse_cache,
+                  symbols=None):
+    """Parse a single file or string, without following its includes.
+
+    This is run on worker processes when parsing in parallel.
+
+    Args:
+      source: A string, the absolute name of a file, or the contents to parse.
+      is_file: A boolean, true if 'source' is a filename.
+      source_filename: A string, the filename to report for a string source, or None.
+      encoding: A string or None, the encoding to decode the input with.
+      parse_cache: An instance of FileParseCache to parse files through, or None.
+      symbols: A dict of strings to intern the parsed strings with, or None.
+    Returns:
+      A triple of (entries, errors, options_map), as per parser.parse_file().
+    """
+    if is_file:
+        if parse_cache is not None:
+            return parse_cache.parse_file(source, encoding, symbols)
+        return parser.parse_file(source, encoding=encoding, symbols=symbols)
+
+    # Encode the contents if necessary.
+    if encoding:
+        if isinstance(source, bytes):
+            source = source.decode(encoding)
+        source = source.encode('ascii', 'replace')
+
+    # Parse a string buffer from memory.
+    return parser.parse_string(source, source_filename, symbols=symbols)
+
+
+def _parse_file_chunks(filename, executor, encoding, symbols=None):
+    """Parse a large file by splitting it in chunks parsed in parallel.
+
+    The first chunk, which contains all the option directives, is parsed in this
+    process, and the others are parsed on the pool of processes, starting from
+    the options of the first one. See parser.find_chunk_boundaries(). If there
+    are any errors, the file is parsed again as a whole, so that they are the
+    same as if it had not been split.
+
+    Args:
+      filename: A string, the absolute name of the file to parse.
+      executor: An instance of concurrent.futures.Executor to parse the chunks with.
+      encoding: A string or None, the encoding to decode the input with.
+      symbols: A dict of strings to intern the strings of the first chunk with,
+        or None.
+    Returns:
+      A triple of (entries, errors, options_map), as per parser.parse_file().
+    """
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0,
+                                               access=mmap.ACCESS_READ) as contents:
+        boundaries = parser.find_chunk_boundaries(contents, PARSE_CHUNK_SIZE)
+        if len(boundaries) < 2:
+            return _parse_source(filename, True, filename, encoding, None, symbols)
+        size = len(contents)
+        contents = contents[:boundaries[0][0]]
+
+    entries, errors, options_map = parser.parse_file(
+        io.BytesIO(contents), report_filename=filename, encoding=encoding,
+        symbols=symbols)
+
+    # Parse the other chunks, only collecting the additional plugins and includes.
+    chunk_options_map = {key: value
+                         for key, value in options_map.items()
+                         if key != 'dcontext'}
+    chunk_options_map['plugin'] = []
+    chunk_options_map['include'] = []
+    offsets, linenos = zip(*boundaries)
+    chunk_results = executor.map(_parse_chunk,
+                                 itertools.repeat(filename),
+                                 offsets,
+                                 [end - offset
+                                  for offset, end in zip(offsets, offsets[1:] + (size,))],
+                                 linenos,
+                                 itertools.repeat(encoding),
+                                 itertools.repeat(chunk_options_map))
+
+    # Merge the results of the chunks.
+    for chunk_contents in chunk_results:
+        chunk_entries, chunk_errors, chunk_options = compact.loads(chunk_contents)
+        entries.extend(chunk_entries)
+        errors.extend(chunk_errors)
+        options_map['plugin'].extend(chunk_options['plugin'])
+        options_map['include'].extend(chunk_options['include'])
+        options_map['dcontext'].update_from(chunk_options['dcontext'])
+    if errors:
+        return _parse_source(filename, True, filename, encoding, None, symbols)
+    entries.sort(key=data.entry_sortkey)
+    return entries, errors, options_map
+
+
+def _parse_chunk(filename, offset, size, lineno, encoding, options_map):
+    """Parse a chunk of a file.
+
+    This is run on worker processes.
+
+    Args:
+      filename: A string, the absolute name of the file.
+      offset: An integer, the offset of the start of the chunk, in bytes.
+      size: An integer, the size of the chunk, in bytes.
+      lineno: An integer, the line number of the start of the chunk.
+      encoding: A string or None, the encoding to decode the input with.
+      options_map: A dict of the options to start parsing with.
+    Returns:
+      The triple of (entries, errors, options_map), as per parser.parse_file(),
+      serialized with compact.dumps(), which is much faster to transfer between
+      processes than pickling it.
+    """
+    with open(filename, 'rb') as file:
+        file.seek(offset)
+        contents = file.read(size)
+    return compact.dumps(parser.parse_file(io.BytesIO(contents),
+                                           report_filename=filename,
+                                           report_firstline=lineno, encoding=encoding,
+                                           options_map=options_map))
+
+
+def scan_file(filename, encoding=None):
+    """Find the options, plugins and included files of a ledger without loading it.
+
+    The file and the files it includes, recursively, are only scanned for their
+    option, plugin and include directives, with parser.scan_file(), which is
+    much faster than parsing them. The includes are followed and the options
+    aggregated in the same order as when loading the file.
+
+    Args:
+      filename: A string, the name of the top-level file.
+      encoding: A string or None, the encoding to decode the input filename with.
+    Returns:
+      A pair of the list of errors from the scanned directives and the includes,
+      and the options map of the top-level file. Its 'include' option is the
+      sorted list of the absolute names of all the files of the ledger, as it
+      would be after loading it.
+    """
+    errors = []
+    options_map = None
+    filenames_seen = set()
+    source_stack = [path.abspath(filename)]
+    while source_stack:
+        filename = path.normpath(source_stack.pop(0))
+        if filename in filenames_seen:
+            errors.append(LoadError(
+                data.new_metadata("<load>", 0),
+                'Duplicate filename parsed: "{}"'.format(filename), None))
+            continue
+        if not path.exists(filename):
+            errors.append(LoadError(
+                data.new_metadata("<load>", 0),
+                'File "{}" does not exist'.format(filename), None))
+            continue
+        filenames_seen.add(filename)
+
+        if encryption.is_encrypted_file(filename):
+            contents = encryption.read_encrypted_file(filename)
+            _, src_errors, src_options_map = parser.scan_string(contents, filename)
+        else:
+            _, src_errors, src_options_map = parser.scan_file(filename,
+                                                              encoding=encoding)
+        errors.extend(src_errors)
+        if options_map is None:
+            options_map = src_options_map
+        else:
+            aggregate_options_map(options_map, src_options_map)
+
+        include_filenames, include_errors = _expand_includes(
+            src_options_map['include'], path.dirname(filename))
+        errors.extend(include_errors)
+        source_stack.extend(include_filenames)
+
+    if options_map is None:
+        options_map = options.OPTIONS_DEFAULTS.copy()
+    options_map['include'] = sorted(filenames_seen)
+    return errors, options_map
+
+
+def _expand_includes(include_patterns, cwd):
+    """Expand the include directives of a parsed file to absolute filenames.
+
+    Args:
+      include_patterns: A list of filenames or glob patterns, as they appear in
+        the include directives of a file.
+      cwd: A string, the directory the patterns are relative to.
+    Returns:
+      A pair of a list of absolute normalized filenames and a list of errors for
+      the patterns that did not match any files.
+    """
+    # chdir() for glob, which uses it indirectly.
+    include_expanded = []
+    errors = []
+    with file_utils.chdir(cwd):
+        for include_filename in include_patterns:
+            matched_filenames = glob.glob(include_filename, recursive=True)
+            if matched_filenames:
+                include_expanded.extend(matched_filenames)
+            else:
+                errors.append(
+                    LoadError(data.new_metadata("<load>", 0),
+                              'File glob "{}" does not match any files'.format(
+                                  include_filename), None))
+    filenames = []
+    for include_filename in include_expanded:
+        if not path.isabs(include_filename):
+            include_filename = path.join(cwd, include_filename)
+        filenames.append(path.normpath(include_filename))
+    return filenames, errors
+
+
 def aggregate_options_map(options_map, src_options_map):
     """Aggregate some of the attributes of options map.
 
@@ -465,7 +1701,8 @@ def aggregate_options_map(options_map, src_options_map):
             op_currencies.append(currency)
 
 
-def _load(sources, log_timings, extra_validations, encoding):
+def _load(sources, log_timings, extra_validations, encoding, parse_cache=None,
+          parse_workers=None, stage_cache=None, plugin_cache=None, book_workers=None):
     """Parse Beancount input, run its transformations and validate it.
 
     (This is an internal method.)
@@ -485,6 +1722,18 @@ def _load(sources, log_timings, extra_validations, encoding):
       extra_validations: A list of extra validation functions to run after loading
         this list of entries.
       encoding: A string or None, the encoding to decode the input filename with.
+      parse_cache: An instance of FileParseCache to parse the files through, or
+        None, if all the files should be parsed.
+      parse_workers: An integer, the number of processes to parse the included
+        files and the chunks of the large files with, or None, to parse them all
+        in this process.
+      stage_cache: An instance of StageCache to book the entries through, or
+        None, if all the entries should be booked.
+      plugin_cache: An instance of PluginCache to run the pure plugins through,
+        or None, if all the plugins should be run.
+      book_workers: An integer, the number of processes to book the transactions
+        of independent sets of accounts on, or None, to book them all in this
+        process. This does not apply when booking through 'stage_cache'.
     Returns:
       See load() or load_string().
     """
@@ -497,21 +1746,37 @@ def _load(sources, log_timings, extra_validations, encoding):
     # running any processes on them.
     with misc_utils.log_time('parse', log_timings, indent=1):
         entries, parse_errors, options_map = _parse_recursive(
-            sources, log_timings, encoding)
+            sources, log_timings, encoding, parse_cache, parse_workers)
         entries.sort(key=data.entry_sortkey)
+        profiler.count_entries(log_timings, entries_out=len(entries))
 
     # Run interpolation on incomplete entries.
     with misc_utils.log_time('booking', log_timings, indent=1):
-        entries, balance_errors = booking.book(entries, options_map)
+        profiler.count_entries(log_timings, entries_in=len(entries))
+        if stage_cache is not None:
+            entries, balance_errors = stage_cache.book(entries, options_map)
+        else:
+            entries, balance_errors = booking.book(entries, options_map, book_workers)
         parse_errors.extend(balance_errors)
+        profiler.count_entries(log_timings, entries_out=len(entries))
 
     # Transform the entries.
     with misc_utils.log_time('run_transformations', log_timings, indent=1):
+        profiler.count_entries(log_timings, entries_in=len(entries))
+
+        # The booked entries are fully determined by the input files, so their
+        # fingerprint needs not be computed from the entries.
+        fingerprint = None
+        if plugin_cache is not None and all(is_file for _, is_file in sources):
+            input_key = repr((compute_input_hash(options_map['include']), encoding))
+            fingerprint = hash_contents(input_key.encode('utf8'))
         entries, errors = run_transformations(entries, parse_errors, options_map,
-                                              log_timings)
+                                              log_timings, plugin_cache, fingerprint)
+        profiler.count_entries(log_timings, entries_out=len(entries))
 
     # Validate the list of entries.
     with misc_utils.log_time('beancount.ops.validate', log_timings, indent=1):
+        profiler.count_entries(log_timings, len(entries), len(entries))
         valid_errors = validation.validate(entries, options_map, log_timings,
                                            extra_validations)
         errors.extend(valid_errors)
@@ -526,7 +1791,8 @@ def _load(sources, log_timings, extra_validations, encoding):
     return entries, errors, options_map
 
 
-def run_transformations(entries, parse_errors, options_map, log_timings):
+def run_transformations(entries, parse_errors, options_map, log_timings,
+                        plugin_cache=None, fingerprint=None):
     """Run the various transformations on the entries.
 
     This is where entries are being synthesized, checked, plugins are run, etc.
@@ -537,6 +1803,10 @@ def run_transformations(entries, parse_errors, options_map, log_timings):
       options_map: An options dict as read from the parser.
       log_timings: A function to write timing log entries to, or None, if it
         should be quiet.
+      plugin_cache: An instance of PluginCache to run the plugins declared pure
+        through, or None, if all the plugins should be run.
+      fingerprint: A string identifying the given entries and options, or None,
+        if it should be computed from them, if needed by the plugin cache.
     Returns:
       A list of modified entries, and a list of errors, also possibly modified.
     """
@@ -554,6 +1824,9 @@ def run_transformations(entries, parse_errors, options_map, log_timings):
         assert "Invalid value for plugin_processing_mode: {}".format(
             options_map['plugin_processing_mode'])
 
+    # Whether the entries are known to be sorted.
+    entries_sorted = False
+
     for plugin_name, plugin_config in plugins_iter:
 
         # Issue a warning on a renamed module.
@@ -570,7 +1843,9 @@ def run_transformations(entries, parse_errors, options_map, log_timings):
             if not hasattr(module, '__plugins__'):
                 continue
 
+            input_entries = list(entries)
             with misc_utils.log_time(plugin_name, log_timings, indent=2):
+                profiler.count_entries(log_timings, entries_in=len(entries))
 
                 # Run each transformer function in the plugin.
                 for function_name in module.__plugins__:
@@ -580,19 +1855,42 @@ def run_transformations(entries, parse_errors, options_map, log_timings):
                     else:
                         # Support function types directly, not just names.
                         callback = function_name
-
-                    if plugin_config is not None:
-                        entries, plugin_errors = callback(entries, options_map,
-                                                          plugin_config)
+                        function_name = callback.__qualname__
+
+                    if plugin_cache is not None and getattr(module, '__plugins_pure__',
+                                                            False):
+                        if fingerprint is None:
+                            fingerprint = plugin_cache.fingerprint(entries, options_map)
+                        entries, plugin_errors, fingerprint = plugin_cache.run(
+                            module, function_name, callback, entries, options_map,
+                            plugin_config, fingerprint)
                     else:
-                        entries, plugin_errors = callback(entries, options_map)
+                        # Note: A plugin not declared pure may modify the entries in
+                        # place, so that its output must be fingerprinted again.
+                        fingerprint = None
+                        if plugin_config is not None:
+                            entries, plugin_errors = callback(entries, options_map,
+                                                              plugin_config)
+                        else:
+                            entries, plugin_errors = callback(entries, options_map)
                     errors.extend(plugin_errors)
+                profiler.count_entries(log_timings, entries_out=len(entries))
 
             # Ensure that the entries are sorted. Don't trust the plugins
-            # themselves.
-            entries.sort(key=data.entry_sortkey)
+            # themselves, unless they declare to preserve the order.
+            if entries_sorted:
+                entries = _sort_entries(
+                    entries, input_entries,
+                    getattr(module, '__plugins_preserve_order__', False))
+            else:
+                entries.sort(key=data.entry_sortkey)
+                entries_sorted = True
 
         except (ImportError, TypeError) as exc:
+            # The entries may have been modified before the failure.
+            entries_sorted = False
+            fingerprint = None
+
             # Upon failure, just issue an error.
             errors.append(LoadError(data.new_metadata("<load>", 0),
                                     'Error importing "{}": {}'.format(
@@ -601,6 +1899,57 @@ def run_transformations(entries, parse_errors, options_map, log_timings):
     return entries, errors
 
 
+def _sort_entries(entries, input_entries, preserves_order=False):
+    """Sort the entries output by a plugin, given the sorted entries it was given.
+
+    Sorting all the entries after each plugin is a noticeable part of the time
+    spent running them, and it is wasted on the plugins which return the entries
+    they were given unchanged, or with a few more appended to them. In the
+    latter case, only the appended entries are sorted, and they are inserted
+    into position by bisection. The result is the same as that of a stable sort
+    of all the entries.
+
+    Args:
+      entries: A list of directives, as output by a plugin.
+      input_entries: The sorted list of directives which were given to the plugin.
+      preserves_order: A boolean, true if the plugin declares that it returns
+        sorted entries when given sorted entries.
+    Returns:
+      A sorted list of directives.
+    """
+    if preserves_order:
+        return entries
+
+    num_input = len(input_entries)
+    if len(entries) < num_input or not all(map(operator.is_, entries, input_entries)):
+        entries.sort(key=data.entry_sortkey)
+        return entries
+
+    new_entries = entries[num_input:]
+    if not new_entries:
+        return entries
+    new_entries.sort(key=data.entry_sortkey)
+
+    sorted_entries = []
+    sortkey = data.entry_sortkey
+    start = 0
+    for entry in new_entries:
+        # Insert after the entries with the same key, as a stable sort would.
+        key = sortkey(entry)
+        low, high = start, num_input
+        while low < high:
+            middle = (low + high) // 2
+            if key < sortkey(input_entries[middle]):
+                high = middle
+            else:
+                low = middle + 1
+        sorted_entries.extend(input_entries[start:low])
+        sorted_entries.append(entry)
+        start = low
+    sorted_entries.extend(input_entries[start:])
+    return sorted_entries
+
+
 def combine_plugins(*plugin_modules):
     """Combine the plugins from the given plugin modules.
 
@@ -666,8 +2015,57 @@ def load_doc(expect_errors=False):
     return decorator
 
 
-def initialize(use_cache: bool, cache_filename: Optional[str] = None):
-    """Initialize the loader."""
+def initialize(use_cache: bool, cache_filename: Optional[str] = None,
+               use_parse_cache: Optional[bool] = None,
+               parse_workers: Optional[int] = None,
+               use_stage_cache: Optional[bool] = None,
+               cache_validation: Optional[str] = None,
+               cache_dir: Optional[str] = None,
+               use_plugin_cache: Optional[bool] = None,
+               book_workers: Optional[int] = None,
+               cache_dir_root: Optional[str] = None):
+    """Initialize the loader.
+
+    Args:
+      use_cache: A boolean, true if the final results of loading a file should be
+        cached.
+      cache_filename: A string or None, an override for the cache filename pattern.
+      use_parse_cache: A boolean, true if the results of parsing each included file
+        should be cached separately, so that only modified files get parsed again.
+        If left to None, this is enabled by the environment variable
+        BEANCOUNT_LOAD_PARSE_CACHE.
+      parse_workers: An integer, the number of processes to parse the included
+        files with. Large files are split into chunks, which are parsed on these
+        processes too. If left to None, the value of the environment variable
+        BEANCOUNT_LOAD_PARSE_WORKERS is used, if set, and files are otherwise
+        parsed serially.
+      use_stage_cache: A boolean, true if checkpoints of the booking stage should
+        be cached, so that booking resumes from the latest unchanged one. If left
+        to None, this is enabled by the environment variable
+        BEANCOUNT_LOAD_STAGE_CACHE.
+      cache_validation: One of CACHE_VALIDATION_MODES, how to check that the
+        cached results are still valid. If left to None, the value of the
+        environment variable BEANCOUNT_LOAD_CACHE_VALIDATION is used, if set, or
+        otherwise the timestamps and sizes of the input files are compared.
+      cache_dir: A string or None, the name of a directory to store all the
+        cache files in, instead of next to the top-level file, e.g. to share
+        them between ledgers. If left to None, the value of the environment
+        variable BEANCOUNT_LOAD_CACHE_DIR is used, if set. The maximum size of
+        the directory is set by BEANCOUNT_LOAD_CACHE_DIR_MAX_SIZE, in bytes.
+        An explicit cache_filename still takes precedence for the load cache.
+      use_plugin_cache: A boolean, true if the results of the plugins declaring
+        themselves pure should be cached. If left to None, this is enabled by
+        the environment variable BEANCOUNT_LOAD_PLUGIN_CACHE.
+      book_workers: An integer, the number of processes to book the transactions
+        of independent sets of accounts on. If left to None, the value of the
+        environment variable BEANCOUNT_LOAD_BOOK_WORKERS is used, if set, and
+        the transactions are otherwise booked serially.
+      cache_dir_root: A string or None, the name of a directory the names of the
+        files in the cache directory are relative to, e.g. the root of the
+        checkouts of a ledger, to share the cache between checkouts at different
+        locations. If left to None, the value of the environment variable
+        BEANCOUNT_LOAD_CACHE_DIR_ROOT is used, if set.
+    """
 
     # Unless an environment variable disables it, use the pickle load cache
     # automatically. Note that this works across all Python programs running the
@@ -675,22 +2073,85 @@ def initialize(use_cache: bool, cache_filename: Optional[str] = None):
     # pylint: disable=invalid-name
     global _load_file
 
+    # Optionally gather the cache files in a shared directory.
+    if cache_dir is None:
+        cache_dir = os.getenv('BEANCOUNT_LOAD_CACHE_DIR')
+    if cache_dir:
+        max_size = os.getenv('BEANCOUNT_LOAD_CACHE_DIR_MAX_SIZE')
+        if cache_dir_root is None:
+            cache_dir_root = os.getenv('BEANCOUNT_LOAD_CACHE_DIR_ROOT')
+        cache_directory = CacheDirectory(cache_dir, (int(max_size) if max_size
+                                                     else CACHE_DIR_MAX_SIZE),
+                                         cache_dir_root)
+        cache_filename_getter = cache_directory.get_cache_filename
+    else:
+        cache_directory = None
+        cache_filename_getter = get_cache_filename
+
     # Make a function to compute the cache filename.
     cache_pattern = (cache_filename or
                      os.getenv('BEANCOUNT_LOAD_CACHE_FILENAME') or
                      PICKLE_CACHE_FILENAME)
-    cache_getter = functools.partial(get_cache_filename, cache_pattern)
+    if cache_filename:
+        cache_getter = functools.partial(get_cache_filename, cache_pattern)
+    else:
+        cache_getter = functools.partial(cache_filename_getter, cache_pattern)
+
+    load_function = _uncached_load_file
+
+    # Optionally parse independent included files in parallel.
+    if parse_workers is None and os.getenv('BEANCOUNT_LOAD_PARSE_WORKERS'):
+        parse_workers = int(os.getenv('BEANCOUNT_LOAD_PARSE_WORKERS'))
+    if parse_workers:
+        load_function = functools.partial(load_function, parse_workers=parse_workers)
+
+    # Optionally book the transactions of independent accounts in parallel.
+    if book_workers is None and os.getenv('BEANCOUNT_LOAD_BOOK_WORKERS'):
+        book_workers = int(os.getenv('BEANCOUNT_LOAD_BOOK_WORKERS'))
+    if book_workers:
+        load_function = functools.partial(load_function, book_workers=book_workers)
+
+    # Optionally parse the included files through a per-file cache.
+    if use_parse_cache is None:
+        use_parse_cache = os.getenv('BEANCOUNT_LOAD_PARSE_CACHE') is not None
+    if use_parse_cache:
+        parse_cache_getter = functools.partial(cache_filename_getter,
+                                               PARSE_CACHE_DIRNAME)
+        load_function = parse_cache_function(parse_cache_getter, load_function,
+                                             cache_directory)
+
+    # Optionally resume booking from the checkpoints of a previous load.
+    if use_stage_cache is None:
+        use_stage_cache = os.getenv('BEANCOUNT_LOAD_STAGE_CACHE') is not None
+    if use_stage_cache:
+        stage_cache_getter = functools.partial(cache_filename_getter,
+                                               STAGE_CACHE_FILENAME)
+        load_function = stage_cache_function(stage_cache_getter, load_function)
+
+    # Optionally reuse the results of the pure plugins.
+    if use_plugin_cache is None:
+        use_plugin_cache = os.getenv('BEANCOUNT_LOAD_PLUGIN_CACHE') is not None
+    if use_plugin_cache:
+        plugin_cache_getter = functools.partial(cache_filename_getter,
+                                                PLUGIN_CACHE_DIRNAME)
+        load_function = plugin_cache_function(plugin_cache_getter, load_function)
 
     if use_cache:
+        if cache_validation is None:
+            cache_validation = os.getenv('BEANCOUNT_LOAD_CACHE_VALIDATION') or 'stat'
+            if cache_validation not in CACHE_VALIDATION_MODES:
+                logging.warning("Invalid cache validation mode %s; using timestamps.",
+                                cache_validation)
+                cache_validation = 'stat'
         _load_file = pickle_cache_function(cache_getter, PICKLE_CACHE_THRESHOLD,
-                                           _uncached_load_file)
+                                           load_function, cache_validation,
+                                           cache_directory)
     else:
         if cache_filename is not None:
             logging.warning("Cache disabled; "
                             "Explicitly overridden cache filename %s will be ignored.",
                             cache_filename)
-        _load_file = delete_cache_function(cache_getter,
-                                           _uncached_load_file)
+        _load_file = delete_cache_function(cache_getter, load_function)
 
 
 # Default is to use the cache every time.
@@ -1,17 +1,26 @@
 __copyright__ = "Copyright (C) 2014-2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import datetime
 import functools
 import logging
 import unittest
 import tempfile
 import textwrap
+import types
+import time
 import os
+import shutil
+import sys
 from unittest import mock
 from os import path
 
 from beancount import loader
+from beancount.core import compact
+from beancount.core import data
+from beancount.parser import booking_full
 from beancount.parser import parser
+from beancount.plugins import implicit_prices
 from beancount.utils import test_utils
 from beancount.utils import encryption_test
 
@@ -47,6 +56,38 @@ class TestLoader(unittest.TestCase):
             entries, errors, options_map, None)
         self.assertEqual(1, len(trans_errors))
 
+    def test_sort_entries(self):
+        entries, _, __ = parser.parse_string(TEST_INPUT)
+        entries.sort(key=data.entry_sortkey)
+        input_entries = list(entries)
+
+        # Unchanged entries are returned as is.
+        self.assertIs(entries, loader._sort_entries(entries, input_entries))
+
+        # Appended entries are inserted into position, after those that have the
+        # same sort key, like a stable sort does.
+        txn = entries[2]
+        new_entries = [
+            entries[-1]._replace(meta=data.new_metadata('<new>', 100)),
+            txn._replace(narration='Twin'),
+            entries[0]._replace(account='Assets:Other'),
+            txn._replace(meta=data.new_metadata('<new>', 0)),
+        ]
+        output = input_entries + new_entries
+        expected = sorted(output, key=data.entry_sortkey)
+        self.assertEqual(expected, loader._sort_entries(list(output), input_entries))
+        self.assertIs(new_entries[1], expected[expected.index(txn) + 1])
+
+        # Reordered or replaced entries are sorted in full.
+        output = list(reversed(input_entries))
+        self.assertEqual(input_entries, loader._sort_entries(output, input_entries))
+        output = input_entries[:2] + [txn._replace(narration='Other')] + input_entries[3:]
+        self.assertEqual(output, loader._sort_entries(list(output), input_entries))
+
+        # The plugins may declare that they preserve the order.
+        output = list(reversed(input_entries))
+        self.assertIs(output, loader._sort_entries(output, input_entries, True))
+
     def test_load(self):
         with test_utils.capture():
             with tempfile.NamedTemporaryFile('w') as tmpfile:
@@ -212,6 +253,29 @@ class TestLoadIncludes(unittest.TestCase):
         self.assertEqual(['apples.beancount', 'oranges.beancount'],
                          list(map(path.basename, options_map['include'])))
 
+    def test_load_file_with_includes_shares_symbols(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  include "oranges.beancount"
+                  2014-01-01 open Assets:Apples USD
+                """,
+                'oranges.beancount': """
+                  2014-01-02 open Assets:Oranges USD
+                  2014-01-03 * "Buy" #fruits
+                    Assets:Oranges    1 USD
+                    Assets:Apples
+                """})
+            entries, errors, options_map = loader.load_file(
+                path.join(tmp, 'apples.beancount'))
+        self.assertFalse(errors)
+        open_apples, = [entry for entry in entries
+                        if isinstance(entry, data.Open)
+                        and entry.account == 'Assets:Apples']
+        txn, = [entry for entry in entries if isinstance(entry, data.Transaction)]
+        self.assertIs(open_apples.account, txn.postings[1].account)
+        self.assertIs(open_apples.currencies[0], txn.postings[0].units.currency)
+
     def test_load_file_with_multiple_includes(self):
         # Including recursive includes and mixed and absolute.
         with test_utils.tempdir() as tmp:
@@ -310,6 +374,196 @@ class TestLoadIncludes(unittest.TestCase):
         self.assertEqual(['apples.beancount', 'bananas.beancount', 'oranges.beancount'],
                          list(map(path.basename, options_map['include'])))
 
+    def test_scan_file(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  option "title" "Fruits"
+                  option "operating_currency" "USD"
+                  include "fruits/*.beancount"
+                  include "missing.beancount"
+                  plugin "beancount.plugins.auto_accounts"
+                  2014-01-01 open Assets:Apples
+                """,
+                'fruits/oranges.beancount': """
+                  option "operating_currency" "CAD"
+                  include "../legumes/tomates.beancount"
+                  2014-01-02 open Assets:Oranges
+                """,
+                'fruits/bananas.beancount': """
+                  include "../legumes/tomates.beancount"
+                  2014-01-03 open Assets:Bananas
+                """,
+                'legumes/tomates.beancount': """
+                  plugin "beancount.plugins.implicit_prices"
+                  2014-01-04 open Assets:Tomates
+                """})
+            filename = path.join(tmp, 'apples.beancount')
+            _, errors, options_map = loader.load_file(filename)
+            scan_errors, scan_options_map = loader.scan_file(filename)
+        self.assertEqual(['apples.beancount', 'bananas.beancount',
+                          'oranges.beancount', 'tomates.beancount'],
+                         list(map(path.basename, scan_options_map['include'])))
+        self.assertEqual(options_map['include'], scan_options_map['include'])
+        self.assertEqual(['USD', 'CAD'], scan_options_map['operating_currency'])
+        self.assertEqual('Fruits', scan_options_map['title'])
+        self.assertEqual([('beancount.plugins.auto_accounts', None)],
+                         scan_options_map['plugin'])
+        self.assertEqual(2, len(scan_errors))
+        self.assertEqual([error.message for error in errors],
+                         [error.message for error in scan_errors])
+
+
+class TestLoadIncludesParallel(unittest.TestCase):
+
+    def test_load_file_parallel_matches_serial(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  include "fruits/*.beancount"
+                  include "legumes/patates.beancount"
+                  include "legumes/absent.beancount"
+                  option "operating_currency" "USD"
+                  2014-01-01 open Assets:Apples
+                """,
+                'fruits/oranges.beancount': """
+                  include "../legumes/tomates.beancount"
+                  option "operating_currency" "CAD"
+                  2014-01-02 open Assets:Oranges
+                """,
+                'fruits/bananas.beancount': """
+                  include "../legumes/patates.beancount"
+                  option "operating_currency" "EUR"
+                  2014-01-02 open Assets:Bananas
+                  2014-01-02 invalid
+                """,
+                'legumes/tomates.beancount': """
+                  2014-01-03 open Assets:Tomates
+                """,
+                'legumes/patates.beancount': """
+                  2014-01-04 open Assets:Patates
+                """})
+            sources = [(path.join(tmp, 'apples.beancount'), True)]
+            serial = loader._load(sources, None, None, None)
+            parallel = loader._load(sources, None, None, None, parse_workers=2)
+
+        serial_entries, serial_errors, serial_options_map = serial
+        entries, errors, options_map = parallel
+        self.assertEqual(5, len(entries))
+        self.assertEqual(serial_entries, entries)
+        self.assertEqual([error.message for error in serial_errors],
+                         [error.message for error in errors])
+        self.assertEqual(3, len(errors))
+        self.assertEqual(serial_options_map['include'], options_map['include'])
+        self.assertEqual(serial_options_map['operating_currency'],
+                         options_map['operating_currency'])
+        self.assertEqual({'USD', 'EUR', 'CAD'}, set(options_map['operating_currency']))
+
+
+class TestLoadChunksParallel(unittest.TestCase):
+
+    CONTENTS = """
+      option "title" "Chunks"
+      option "operating_currency" "USD"
+      2014-01-01 open Assets:Cash
+      2014-01-01 open Expenses:Food
+      pushtag #trip
+      2014-01-02 * "Lunch"
+        Expenses:Food   10.00 USD
+        Assets:Cash
+      poptag #trip
+      plugin "beancount.plugins.auto_accounts"
+      2014-01-03 * "Multi-line
+      narration"
+        Expenses:Food   2.5 CAD
+        Assets:Cash
+      include "other.beancount"
+      2013-12-31 open Assets:Bank
+      {}
+    """
+
+    def load_chunked(self, contents):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'chunks.beancount': contents,
+                'other.beancount': """
+                  2014-01-04 open Assets:Other
+                """})
+            sources = [(path.join(tmp, 'chunks.beancount'), True)]
+            serial = loader._parse_recursive(sources, None)
+            with mock.patch.object(loader, 'PARSE_CHUNK_SIZE', 64), \
+                 mock.patch.object(parser, 'find_chunk_boundaries',
+                                   wraps=parser.find_chunk_boundaries) as find:
+                chunked = loader._parse_recursive(sources, None, num_workers=2)
+            self.assertEqual(1, find.call_count)
+        return serial, chunked
+
+    def test_load_chunks_matches_serial(self):
+        serial, chunked = self.load_chunked(self.CONTENTS.format(''))
+        serial_entries, serial_errors, serial_options_map = serial
+        entries, errors, options_map = chunked
+        self.assertEqual([], serial_errors)
+        self.assertEqual([], errors)
+        self.assertEqual(6, len(entries))
+        self.assertEqual(serial_entries, entries)
+        self.assertEqual({'trip'}, entries[3].tags)
+        for key in 'title', 'operating_currency', 'plugin', 'include':
+            self.assertEqual(serial_options_map[key], options_map[key])
+        self.assertEqual(str(serial_options_map['dcontext']),
+                         str(options_map['dcontext']))
+
+    def test_load_chunks_errors(self):
+        serial, chunked = self.load_chunked(self.CONTENTS.format(
+            '2014-01-05 open Assets:Invalid Syntax'))
+        serial_entries, serial_errors, _ = serial
+        entries, errors, _ = chunked
+        self.assertTrue(errors)
+        self.assertEqual(serial_entries, entries)
+        self.assertEqual([(error.message, error.source['lineno'])
+                          for error in serial_errors],
+                         [(error.message, error.source['lineno'])
+                          for error in errors])
+
+
+class TestLoadBookParallel(unittest.TestCase):
+
+    def test_load_book_parallel_matches_serial(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  2014-01-01 open Assets:Apples
+                  2014-01-01 open Assets:Oranges "FIFO"
+                  2014-01-01 open Assets:Cash
+                  2014-01-01 open Assets:Bank
+
+                  2014-01-02 * "Apples"
+                    Assets:Apples      2 APPLE {1.00 USD}
+                    Assets:Cash
+
+                  2014-01-02 * "Oranges"
+                    Assets:Oranges     3 ORANGE {2.00 USD}
+                    Assets:Oranges     4 ORANGE {3.00 USD}
+                    Assets:Bank
+
+                  2014-01-03 * "Oranges"
+                    Assets:Oranges    -5 ORANGE {}
+                    Assets:Bank
+
+                  2014-01-03 * "Apples"
+                    Assets:Apples     -3 APPLE {}
+                    Assets:Cash
+                """})
+            sources = [(path.join(tmp, 'apples.beancount'), True)]
+            serial = loader._load(sources, None, None, None)
+            parallel = loader._load(sources, None, None, None, book_workers=2)
+
+        serial_entries, serial_errors, _ = serial
+        entries, errors, _ = parallel
+        self.assertEqual(serial_entries, entries)
+        self.assertEqual([error.message for error in serial_errors],
+                         [error.message for error in errors])
+        self.assertEqual(1, len(errors))
+
 
 class TestLoadIncludesEncrypted(encryption_test.TestEncryptedBase):
 
@@ -402,6 +656,88 @@ class TestLoadCache(unittest.TestCase):
             entries, errors, options_map = loader.load_file(top_filename)
             self.assertEqual(3, self.num_calls)
 
+    def test_load_cache_lazy(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  2014-01-01 open Assets:Apples
+                  2014-01-02 open Assets:Oranges
+                """})
+            top_filename = path.join(tmp, 'apples.beancount')
+
+            # A cache miss returns a list.
+            entries, errors, options_map = loader.load_file(top_filename, lazy=True)
+            self.assertIsInstance(entries, list)
+            self.assertEqual(1, self.num_calls)
+
+            # A cache hit returns a store.
+            lazy_entries, errors, lazy_options_map = loader.load_file(top_filename,
+                                                                      lazy=True)
+            self.assertEqual(1, self.num_calls)
+            self.assertIsInstance(lazy_entries, compact.EntryStore)
+            self.assertEqual(entries, list(lazy_entries))
+            self.assertEqual(options_map['filename'], lazy_options_map['filename'])
+            lazy_entries.close()
+
+            # Modify the file; the store is not used.
+            with open(top_filename, 'a') as file:
+                file.write('2014-01-03 open Assets:Bananas\n')
+            entries, errors, options_map = loader.load_file(top_filename, lazy=True)
+            self.assertEqual(2, self.num_calls)
+            self.assertIsInstance(entries, list)
+            self.assertEqual(3, len(entries))
+
+    def test_load_cache_content_validation(self):
+        for validation, stat_shortcut in [('content', False), ('stat+content', True)]:
+            cache_getter = functools.partial(loader.get_cache_filename,
+                                             loader.PICKLE_CACHE_FILENAME)
+            self.num_calls = 0
+            with mock.patch('beancount.loader._load_file',
+                            loader.pickle_cache_function(cache_getter, 0,
+                                                         self._load_file, validation)):
+                with test_utils.tempdir() as tmp:
+                    test_utils.create_temporary_files(tmp, {
+                        'apples.beancount': """
+                          include "oranges.beancount"
+                          2014-01-01 open Assets:Apples
+                        """,
+                        'oranges.beancount': """
+                          2014-01-02 open Assets:Oranges
+                        """})
+                    top_filename = path.join(tmp, 'apples.beancount')
+                    entries, errors, options_map = loader.load_file(top_filename)
+                    self.assertEqual(1, self.num_calls)
+                    self.assertFalse(loader.needs_refresh(options_map))
+
+                    # Rewrite a file with the same contents and a new timestamp;
+                    # the cache is still valid.
+                    oranges_filename = path.join(tmp, 'oranges.beancount')
+                    with open(oranges_filename) as file:
+                        contents = file.read()
+                    stat = os.stat(oranges_filename)
+                    with open(oranges_filename, 'w') as file:
+                        file.write(contents)
+                    os.utime(oranges_filename, ns=(stat.st_atime_ns,
+                                                   stat.st_mtime_ns + 10**9))
+                    entries, errors, options_map = loader.load_file(top_filename)
+                    self.assertEqual(1, self.num_calls)
+
+                    # Change the contents, but not the size nor the timestamp the
+                    # cache saw; this is only detected if we don't trust the
+                    # timestamps.
+                    with open(oranges_filename, 'w') as file:
+                        file.write(contents.replace('Oranges', 'Papayas'))
+                    os.utime(oranges_filename, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+                    entries, errors, options_map = loader.load_file(top_filename)
+                    self.assertEqual(1 if stat_shortcut else 2, self.num_calls)
+
+                    # Change the contents; the cache is invalidated.
+                    with open(oranges_filename, 'a') as file:
+                        file.write('2014-01-03 open Assets:Bananas\n')
+                    entries, errors, options_map = loader.load_file(top_filename)
+                    self.assertEqual(2 if stat_shortcut else 3, self.num_calls)
+                    self.assertEqual(3, len(entries))
+
     def test_load_cache_moved_file(self):
         # Create an initial set of files and load file, thus creating a cache.
         with test_utils.tempdir() as tmp:
@@ -498,6 +834,492 @@ class TestLoadCache(unittest.TestCase):
                 self.assertEqual({'apples.beancount'}, set(os.listdir(tmp)))
 
 
+class TestLoadCacheDirectory(unittest.TestCase):
+
+    @mock.patch('beancount.loader.PICKLE_CACHE_THRESHOLD', 0.0)
+    @mock.patch.object(loader, '_load_file', loader._load_file)
+    def test_load_cache_directory(self):
+        with test_utils.tempdir() as tmp:
+            cache_dir = path.join(tmp, 'cache')
+            ledger_dir = path.join(tmp, 'ledger')
+            os.mkdir(ledger_dir)
+            test_utils.create_temporary_files(ledger_dir, {
+                'apples.beancount': """
+                  2014-01-01 open Assets:Apples
+                """})
+            filename = path.join(ledger_dir, 'apples.beancount')
+            with test_utils.environ('BEANCOUNT_LOAD_CACHE_DIR', cache_dir):
+                loader.initialize(use_cache=True, use_parse_cache=True)
+            entries, errors, options_map = loader.load_file(filename)
+            self.assertEqual(1, len(entries))
+            self.assertEqual({'apples.beancount'}, set(os.listdir(ledger_dir)))
+            cache_filenames = sorted(os.listdir(cache_dir))
+            self.assertEqual(['.parsecache', '.picklecache'],
+                             sorted(path.splitext(name)[1] for name in cache_filenames))
+
+            # Another load reads from the shared cache.
+            with mock.patch('beancount.loader._load') as load_mock:
+                entries, errors, options_map = loader.load_file(filename)
+                self.assertFalse(load_mock.called)
+            self.assertEqual(1, len(entries))
+            self.assertEqual(cache_filenames, sorted(os.listdir(cache_dir)))
+
+    @unittest.skipIf(not hasattr(os, 'getuid'), "No file ownership")
+    @mock.patch('beancount.loader.PICKLE_CACHE_THRESHOLD', 0.0)
+    @mock.patch.object(loader, '_load_file', loader._load_file)
+    @mock.patch('beancount.loader.PICKLE_CACHE_THRESHOLD', 0.0)
+    @mock.patch.object(loader, '_load_file', loader._load_file)
+    def test_load_cache_directory_other_user(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  2014-01-01 open Assets:Apples
+                """})
+            filename = path.join(tmp, 'apples.beancount')
+            cache_dir = path.join(tmp, 'cache')
+            loader.initialize(use_cache=True, cache_dir=cache_dir)
+            loader.load_file(filename)
+            cache_directory = loader.CacheDirectory(cache_dir)
+            cache_filename = cache_directory.get_cache_filename(
+                loader.PICKLE_CACHE_FILENAME, filename)
+            self.assertTrue(path.exists(cache_filename))
+
+            with mock.patch('os.getuid', return_value=os.getuid() + 1):
+                # Each user has their own cache files.
+                other_cache_filename = cache_directory.get_cache_filename(
+                    loader.PICKLE_CACHE_FILENAME, filename)
+                self.assertNotEqual(cache_filename, other_cache_filename)
+
+                # The cache files of other users are never read.
+                shutil.copyfile(cache_filename, other_cache_filename)
+                with mock.patch('beancount.loader._load',
+                                wraps=loader._load) as load_mock:
+                    with self.assertLogs(level='WARNING') as logs:
+                        entries, errors, options_map = loader.load_file(filename)
+                    self.assertTrue(load_mock.called)
+            self.assertEqual(1, len(entries))
+            self.assertTrue(any('owned by another user' in line
+                                for line in logs.output))
+
+    @mock.patch('beancount.loader.PICKLE_CACHE_THRESHOLD', 0.0)
+    @mock.patch.object(loader, '_load_file', loader._load_file)
+    def test_load_cache_directory_root(self):
+        with test_utils.tempdir() as tmp:
+            checkouts = []
+            for name in 'worker1', 'worker2':
+                checkout = path.join(tmp, name)
+                test_utils.create_temporary_files(checkout, {
+                    'ledger/apples.beancount': """
+                      include "oranges.beancount"
+                      2014-01-01 open Assets:Apples
+                    """,
+                    'ledger/oranges.beancount': """
+                      2014-01-01 open Assets:Oranges
+                    """})
+                checkouts.append(checkout)
+
+            cache_dir = path.join(tmp, 'cache')
+            loader.initialize(use_cache=True, use_parse_cache=True,
+                              cache_validation='content', cache_dir=cache_dir,
+                              cache_dir_root=checkouts[0])
+            entries, _, __ = loader.load_file(
+                path.join(checkouts[0], 'ledger/apples.beancount'))
+            cache_filenames = sorted(os.listdir(cache_dir))
+
+            # The other checkout reads the same cache, relocated to its files.
+            loader.initialize(use_cache=True, use_parse_cache=True,
+                              cache_validation='content', cache_dir=cache_dir,
+                              cache_dir_root=checkouts[1])
+            filename = path.join(checkouts[1], 'ledger/apples.beancount')
+            with mock.patch('beancount.loader._load') as load_mock:
+                entries, errors, options_map = loader.load_file(filename)
+                self.assertFalse(load_mock.called)
+            self.assertEqual(cache_filenames, sorted(os.listdir(cache_dir)))
+            self.assertFalse(errors)
+            self.assertEqual(filename, options_map['filename'])
+            self.assertEqual(
+                {filename, path.join(checkouts[1], 'ledger/oranges.beancount')},
+                set(options_map['include']))
+            self.assertEqual(
+                {filename, path.join(checkouts[1], 'ledger/oranges.beancount')},
+                {entry.meta['filename'] for entry in entries})
+
+            # Changing the included file in one checkout reparses only that file.
+            with open(path.join(checkouts[1], 'ledger/oranges.beancount'), 'a') as file:
+                file.write('2014-01-02 open Assets:Pears\n')
+            with mock.patch('beancount.parser.parser.parse_file',
+                            wraps=parser.parse_file) as parse_mock:
+                entries, errors, options_map = loader.load_file(filename)
+                self.assertEqual(1, parse_mock.call_count)
+            self.assertEqual(3, len(entries))
+            self.assertEqual(
+                {filename, path.join(checkouts[1], 'ledger/oranges.beancount')},
+                {entry.meta['filename'] for entry in entries})
+
+    def test_relocate(self):
+        cache_directory = loader.CacheDirectory('/tmp/cache', root='/work/b')
+        filename = '/work/b/ledger/apples.beancount'
+        other_cache_directory = loader.CacheDirectory('/tmp/cache', root='/work/a')
+        self.assertEqual(
+            cache_directory.get_cache_filename(loader.PICKLE_CACHE_FILENAME, filename),
+            other_cache_directory.get_cache_filename(loader.PICKLE_CACHE_FILENAME,
+                                                     '/work/a/ledger/apples.beancount'))
+        meta = data.new_metadata('/work/a/ledger/apples.beancount', 1)
+        entry = data.Note(meta, datetime.date(2014, 1, 1), 'Assets:Apples',
+                          'See /work/a/ledger/apples.beancount')
+        result = ([entry], [], {'filename': '/work/a/ledger/apples.beancount',
+                                'include': ['/work/a/ledger/apples.beancount',
+                                            '/work/other.beancount']})
+        entries, _, options_map = cache_directory.relocate(result, filename)
+        self.assertEqual(filename, entries[0].meta['filename'])
+        self.assertIsInstance(entries[0], data.Note)
+        self.assertEqual('See /work/a/ledger/apples.beancount', entries[0].comment)
+        self.assertEqual([filename, '/work/other.beancount'], options_map['include'])
+        self.assertIs(result, cache_directory.relocate(
+            result, '/work/a/ledger/apples.beancount'))
+
+        # The result of another file is not reused.
+        self.assertIsNone(cache_directory.relocate(
+            result, '/work/b/ledger/oranges.beancount'))
+        self.assertIsNone(loader.CacheDirectory('/tmp/cache').relocate(result, filename))
+
+    def test_cache_filenames(self):
+        cache_directory = loader.CacheDirectory('/tmp/cache')
+        filename = cache_directory.get_cache_filename(loader.PICKLE_CACHE_FILENAME,
+                                                      '/ledger/apples.beancount')
+        self.assertEqual('/tmp/cache', path.dirname(filename))
+        self.assertTrue(filename.endswith('.picklecache'))
+        self.assertNotEqual(
+            filename, cache_directory.get_cache_filename(loader.PICKLE_CACHE_FILENAME,
+                                                         '/ledger/oranges.beancount'))
+        with mock.patch.object(loader, '__version__', '0.0.0'):
+            self.assertNotEqual(
+                filename, cache_directory.get_cache_filename(
+                    loader.PICKLE_CACHE_FILENAME, '/ledger/apples.beancount'))
+
+    def test_evict(self):
+        with test_utils.tempdir() as tmp:
+            now = time.time()
+            names = ['a.picklecache', 'b.picklecache', 'c.picklecache',
+                     'd.picklecache.1.tmp', 'e.picklecache.2.tmp']
+            names = [name[0] * 32 + name[1:] for name in names]
+            for index, name in enumerate(names):
+                filename = path.join(tmp, name)
+                with open(filename, 'wb') as file:
+                    file.write(b'x' * 100)
+                age = 10 - index if index != 4 else 2 * 24 * 3600
+                os.utime(filename, (now - age, now - age))
+
+            cache_directory = loader.CacheDirectory(tmp, max_size=250)
+            removed = cache_directory.evict()
+            # The stale temporary file and the least recently used file go; the
+            # temporary file being written is not counted.
+            self.assertEqual([names[4], names[0]],
+                             [path.basename(filename) for filename in removed])
+
+            cache_directory.touch(path.join(tmp, names[1]))
+            cache_directory.max_size = 150
+            removed = cache_directory.evict()
+            self.assertEqual([names[2]],
+                             [path.basename(filename) for filename in removed])
+            self.assertEqual({names[1], names[3]}, set(os.listdir(tmp)))
+
+    def test_evict_cache_files_only(self):
+        with test_utils.tempdir() as tmp:
+            digest = 'f' * 32
+            test_utils.create_temporary_files(tmp, {
+                'notes.txt': 'notes',
+                'sub/thesis.tex': 'thesis',
+                digest + '.txt': 'not a cache file',
+                digest + '.picklecache': 'cache',
+                digest + '.parsecache/' + digest + '.pickle': 'cache',
+                digest + '.parsecache/notes.txt': 'notes',
+                digest + '.parsecache/sub/' + digest + '.pickle': 'not a cache file',
+            })
+            cache_directory = loader.CacheDirectory(tmp, max_size=1)
+            removed = cache_directory.evict()
+            self.assertEqual({path.join(tmp, digest + '.picklecache'),
+                              path.join(tmp, digest + '.parsecache', digest + '.pickle')},
+                             set(removed))
+            self.assertEqual(
+                {'notes.txt', 'sub/thesis.tex', digest + '.txt',
+                 digest + '.parsecache/notes.txt',
+                 digest + '.parsecache/sub/' + digest + '.pickle'},
+                {path.relpath(path.join(root, filename), tmp)
+                 for root, _, filenames in os.walk(tmp)
+                 for filename in filenames})
+
+
+class TestLoadParseCache(unittest.TestCase):
+
+    def setUp(self):
+        cache_getter = functools.partial(loader.get_cache_filename,
+                                         loader.PARSE_CACHE_DIRNAME)
+        mock.patch('beancount.loader._load_file',
+                   loader.parse_cache_function(cache_getter,
+                                               loader._uncached_load_file)).start()
+        self.parse_mock = mock.patch('beancount.parser.parser.parse_file',
+                                     wraps=parser.parse_file).start()
+
+    def tearDown(self):
+        mock.patch.stopall()
+
+    def get_parsed_filenames(self):
+        filenames = sorted(path.basename(call[1]['report_filename'])
+                           for call in self.parse_mock.call_args_list)
+        self.parse_mock.reset_mock()
+        return filenames
+
+    def test_load_parse_cache(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  include "oranges.beancount"
+                  option "operating_currency" "USD"
+                  2014-01-01 open Assets:Apples
+                """,
+                'oranges.beancount': """
+                  option "operating_currency" "CAD"
+                  2014-01-02 open Assets:Oranges
+                """})
+            top_filename = path.join(tmp, 'apples.beancount')
+            entries, errors, options_map = loader.load_file(top_filename)
+            self.assertFalse(errors)
+            self.assertEqual(2, len(entries))
+            self.assertEqual(['apples.beancount', 'oranges.beancount'],
+                             self.get_parsed_filenames())
+            self.assertTrue(path.isdir(path.join(tmp, '.apples.beancount.parsecache')))
+
+            # Nothing has changed; nothing gets parsed.
+            entries2, errors, options_map2 = loader.load_file(top_filename)
+            self.assertEqual([], self.get_parsed_filenames())
+            self.assertEqual(entries, entries2)
+            self.assertEqual(['USD', 'CAD'], options_map2['operating_currency'])
+
+            # Modify one of the files; only that one gets parsed.
+            oranges_filename = path.join(tmp, 'oranges.beancount')
+            with open(oranges_filename, 'a') as file:
+                file.write('2014-01-03 open Assets:Bananas\n')
+            entries, errors, options_map = loader.load_file(top_filename)
+            self.assertFalse(errors)
+            self.assertEqual(3, len(entries))
+            self.assertEqual(['oranges.beancount'], self.get_parsed_filenames())
+
+            # Touch the file without modifying its contents; it is not parsed.
+            stat = os.stat(oranges_filename)
+            os.utime(oranges_filename, ns=(stat.st_atime_ns,
+                                           stat.st_mtime_ns + 10**9))
+            entries, errors, options_map = loader.load_file(top_filename)
+            self.assertEqual(3, len(entries))
+            self.assertEqual([], self.get_parsed_filenames())
+
+    def test_load_parse_cache_corrupted(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  2014-01-01 open Assets:Apples
+                """})
+            top_filename = path.join(tmp, 'apples.beancount')
+            loader.load_file(top_filename)
+            cache_dir = path.join(tmp, '.apples.beancount.parsecache')
+            for filename in os.listdir(cache_dir):
+                with open(path.join(cache_dir, filename), 'wb') as file:
+                    file.write(b'garbage')
+            self.get_parsed_filenames()
+            with test_utils.capture('stderr'):
+                entries, errors, options_map = loader.load_file(top_filename)
+            self.assertFalse(errors)
+            self.assertEqual(1, len(entries))
+            self.assertEqual(['apples.beancount'], self.get_parsed_filenames())
+
+
+class TestLoadPluginCache(unittest.TestCase):
+
+    def setUp(self):
+        cache_getter = functools.partial(loader.get_cache_filename,
+                                         loader.PLUGIN_CACHE_DIRNAME)
+        mock.patch('beancount.loader._load_file',
+                   loader.plugin_cache_function(cache_getter,
+                                                loader._uncached_load_file)).start()
+        self.plugin_mock = mock.patch(
+            'beancount.plugins.implicit_prices.add_implicit_prices',
+            wraps=implicit_prices.add_implicit_prices).start()
+
+    def tearDown(self):
+        mock.patch.stopall()
+
+    def test_load_plugin_cache(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  plugin "beancount.plugins.implicit_prices"
+                  2014-01-01 open Assets:Apples
+                  2014-01-01 open Assets:Cash
+                  2014-01-02 * "Buy"
+                    Assets:Apples    10 APPL @ 2.00 USD
+                    Assets:Cash     -20.00 USD
+                """})
+            top_filename = path.join(tmp, 'apples.beancount')
+            entries, errors, options_map = loader.load_file(top_filename)
+            self.assertFalse(errors)
+            self.assertEqual(4, len(entries))
+            self.assertEqual(1, self.plugin_mock.call_count)
+            self.assertTrue(path.isdir(path.join(tmp, '.apples.beancount.plugincache')))
+
+            # Nothing has changed; the plugin does not run.
+            entries2, errors, options_map = loader.load_file(top_filename)
+            self.assertEqual(1, self.plugin_mock.call_count)
+            self.assertEqual(entries, entries2)
+
+            # Modify the file; the plugin runs again.
+            with open(top_filename, 'a') as file:
+                file.write('2014-01-03 open Assets:Bananas\n')
+            entries, errors, options_map = loader.load_file(top_filename)
+            self.assertEqual(5, len(entries))
+            self.assertEqual(2, self.plugin_mock.call_count)
+
+    def test_run_transformations_fingerprint(self):
+        entries, errors, options_map = parser.parse_string(textwrap.dedent("""
+          plugin "beancount.plugins.implicit_prices"
+          2014-01-01 open Assets:Apples
+          2014-01-01 price APPL  2.00 USD
+        """))
+        with test_utils.tempdir() as tmp:
+            plugin_cache = loader.PluginCache(tmp)
+            for _ in range(2):
+                trans_entries, trans_errors = loader.run_transformations(
+                    entries, errors, options_map, None, plugin_cache)
+                self.assertEqual(2, len(trans_entries))
+            self.assertEqual(1, self.plugin_mock.call_count)
+
+            # The input is fingerprinted, not identified by its origin.
+            entries = entries + [entries[-1]._replace(date=datetime.date(2014, 1, 2))]
+            loader.run_transformations(entries, errors, options_map, None, plugin_cache)
+            self.assertEqual(2, self.plugin_mock.call_count)
+
+    def test_run_transformations_impure_plugin(self):
+        # A plugin not declared pure, which modifies the entries in place.
+        module = types.ModuleType('tag_plugin')
+        def tag_entries(entries, options_map):
+            for entry in entries:
+                entry.meta['tag'] = module.tag
+            return entries, []
+        module.__plugins__ = [tag_entries]
+
+        with test_utils.tempdir() as tmp, mock.patch.dict(sys.modules,
+                                                          tag_plugin=module):
+            plugin_cache = loader.PluginCache(tmp)
+            for tag in 'a', 'b':
+                module.tag = tag
+                entries, errors, options_map = parser.parse_string(textwrap.dedent("""
+                  plugin "tag_plugin"
+                  plugin "beancount.plugins.implicit_prices"
+                  2014-01-01 open Assets:Apples
+                  2014-01-01 price APPL  2.00 USD
+                """))
+                fingerprint = loader.PluginCache.fingerprint(entries, options_map)
+                trans_entries, trans_errors = loader.run_transformations(
+                    entries, errors, options_map, None, plugin_cache, fingerprint)
+                self.assertEqual([tag, tag], [entry.meta['tag']
+                                              for entry in trans_entries])
+            # The pure plugin runs again on the modified entries.
+            self.assertEqual(2, self.plugin_mock.call_count)
+
+    def test_write_cache_record__unpicklable(self):
+        with test_utils.tempdir() as tmp:
+            cache_filename = path.join(tmp, 'record.pickle')
+            with self.assertLogs(level='WARNING'):
+                loader.write_cache_record(cache_filename, lambda: None, 'plugin cache')
+            self.assertEqual([], os.listdir(tmp))
+
+            loader.write_cache_record(cache_filename, [1], 'plugin cache')
+            self.assertEqual(['record.pickle'], os.listdir(tmp))
+            self.assertEqual([1], loader.read_cache_record(cache_filename))
+
+
+class TestLoadStageCache(unittest.TestCase):
+
+    def setUp(self):
+        cache_getter = functools.partial(loader.get_cache_filename,
+                                         loader.STAGE_CACHE_FILENAME)
+        mock.patch('beancount.loader._load_file',
+                   loader.stage_cache_function(cache_getter,
+                                               loader._uncached_load_file)).start()
+        self.book_mock = mock.patch('beancount.parser.booking_full._book',
+                                    wraps=booking_full._book).start()
+
+    def tearDown(self):
+        mock.patch.stopall()
+
+    def get_booked_dates(self):
+        dates = sorted({entry.date.isoformat()
+                        for call in self.book_mock.call_args_list
+                        for entry in call[0][0]})
+        self.book_mock.reset_mock()
+        return dates
+
+    def test_load_stage_cache(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  2013-12-01 open Assets:Apples
+                  2013-12-01 open Assets:Cash
+
+                  2013-12-02 * "Buy"
+                    Assets:Apples     10 APPLE {1.00 USD}
+                    Assets:Cash
+
+                  2014-01-02 * "Sell"
+                    Assets:Apples     -2 APPLE {}
+                    Assets:Cash       2.00 USD
+
+                  2014-02-02 * "Sell"
+                    Assets:Apples     -3 APPLE {}
+                    Assets:Cash       3.00 USD
+                """})
+            top_filename = path.join(tmp, 'apples.beancount')
+            entries, errors, options_map = loader.load_file(top_filename)
+            self.assertFalse(errors)
+            self.assertEqual(['2013-12-01', '2013-12-02', '2014-01-02', '2014-02-02'],
+                             self.get_booked_dates())
+            self.assertTrue(path.exists(path.join(tmp, '.apples.beancount.stagecache')))
+
+            # Nothing has changed; only the last month gets booked.
+            entries2, errors, options_map = loader.load_file(top_filename)
+            self.assertFalse(errors)
+            self.assertEqual(['2014-02-02'], self.get_booked_dates())
+            self.assertEqual(entries, entries2)
+
+            # Add a late entry; only the last month gets booked.
+            with open(top_filename, 'a') as file:
+                file.write(textwrap.dedent("""
+                  2014-02-03 * "Sell"
+                    Assets:Apples     -1 APPLE {}
+                    Assets:Cash       1.00 USD
+                """))
+            entries, errors, options_map = loader.load_file(top_filename)
+            self.assertFalse(errors)
+            self.assertEqual(['2014-02-02', '2014-02-03'], self.get_booked_dates())
+            uncached_entries, _, __ = loader._load([(top_filename, True)],
+                                                   None, None, None)
+            self.assertEqual(uncached_entries, entries)
+            self.book_mock.reset_mock()
+
+            # Change the precision of an earlier entry; booking resumes from the
+            # start of the year.
+            with open(top_filename) as file:
+                contents = file.read()
+            with open(top_filename, 'w') as file:
+                file.write(contents.replace('2.00 USD', '2.000 USD'))
+            entries, errors, options_map = loader.load_file(top_filename)
+            self.assertFalse(errors)
+            self.assertEqual(['2014-01-02', '2014-02-02', '2014-02-03'],
+                             self.get_booked_dates())
+            uncached_entries, _, __ = loader._load([(top_filename, True)],
+                                                   None, None, None)
+            self.assertEqual(uncached_entries, entries)
+
+
 class TestEncoding(unittest.TestCase):
 
     def test_string_unicode(self):
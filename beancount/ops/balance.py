@@ -15,6 +15,8 @@ from beancount.core import realization
 from beancount.core import getters
 
 __plugins__ = ('check',)
+__plugins_pure__ = True
+__plugins_preserve_order__ = True
 
 
 BalanceError = collections.namedtuple('BalanceError', 'source message entry')
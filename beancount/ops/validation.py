@@ -22,6 +22,7 @@ from beancount.core import data
 from beancount.core import getters
 from beancount.core import interpolate
 from beancount.utils import misc_utils
+from beancount.utils import profiler
 
 
 # An error from one of the checks.
@@ -329,25 +330,26 @@ def validate_check_transaction_balances(entries, options_map):
     # Note: this is a bit slow; we could limit our checks to the original
     # transactions by using the hash function in the loader.
     errors = []
-    for entry in entries:
-        if isinstance(entry, Transaction):
-            # IMPORTANT: This validation is _crucial_ and cannot be skipped.
-            # This is where we actually detect and warn on unbalancing
-            # transactions. This _must_ come after the user routines, because
-            # unbalancing input is legal, as those types of transactions may be
-            # "fixed up" by a user-plugin. In other words, we want to allow
-            # users to input unbalancing transactions as long as the final
-            # transactions objects that appear on the stream (after processing
-            # the plugins) are balanced. See {9e6c14b51a59}.
-            #
-            # Detect complete sets of postings that have residual balance;
-            residual = interpolate.compute_residual(entry.postings)
-            tolerances = interpolate.infer_tolerances(entry.postings, options_map)
-            if not residual.is_small(tolerances):
-                errors.append(
-                    ValidationError(entry.meta,
-                                    "Transaction does not balance: {}".format(residual),
-                                    entry))
+    transactions = [entry for entry in entries if isinstance(entry, Transaction)]
+    tolerances_list = interpolate.infer_tolerances_batch(
+        [entry.postings for entry in transactions], options_map)
+    for entry, tolerances in zip(transactions, tolerances_list):
+        # IMPORTANT: This validation is _crucial_ and cannot be skipped.
+        # This is where we actually detect and warn on unbalancing
+        # transactions. This _must_ come after the user routines, because
+        # unbalancing input is legal, as those types of transactions may be
+        # "fixed up" by a user-plugin. In other words, we want to allow
+        # users to input unbalancing transactions as long as the final
+        # transactions objects that appear on the stream (after processing
+        # the plugins) are balanced. See {9e6c14b51a59}.
+        #
+        # Detect complete sets of postings that have residual balance;
+        residual = interpolate.compute_residual(entry.postings)
+        if not residual.is_small(tolerances):
+            errors.append(
+                ValidationError(entry.meta,
+                                "Transaction does not balance: {}".format(residual),
+                                entry))
 
     return errors
 
@@ -393,6 +395,7 @@ def validate(entries, options_map, log_timings=None, extra_validations=None):
     for validation_function in validation_tests:
         with misc_utils.log_time('function: {}'.format(validation_function.__name__),
                                  log_timings, indent=2):
+            profiler.count_entries(log_timings, len(entries), len(entries))
             new_errors = validation_function(entries, options_map)
         errors.extend(new_errors)
 
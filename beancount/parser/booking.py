@@ -18,27 +18,27 @@ from beancount.parser import booking_full
 BookingError = collections.namedtuple('BookingError', 'source message entry')
 
 
-def book(incomplete_entries, options_map):
+def book(incomplete_entries, options_map, num_workers=None):
     """Book inventory lots and complete all positions with incomplete numbers.
 
     Args:
       incomplete_entries: A list of directives, with some postings possibly left
         with incomplete amounts as produced by the parser.
       options_map: An options dict as produced by the parser.
+      num_workers: An integer, the number of processes to book the transactions
+        of independent sets of accounts on, or None, to book them all in this
+        process.
     Returns:
       A pair of
         entries: A list of completed entries with all their postings completed.
         errors: New errors produced during interpolation.
     """
     # Get the list of booking methods for each account.
-    booking_methods = collections.defaultdict(lambda: options_map["booking_method"])
-    for entry in incomplete_entries:
-        if isinstance(entry, data.Open) and entry.booking:
-            booking_methods[entry.account] = entry.booking
+    booking_methods = get_booking_methods(incomplete_entries, options_map)
 
     # Do the booking here!
     entries, booking_errors = booking_full.book(incomplete_entries, options_map,
-                                                booking_methods)
+                                                booking_methods, num_workers)
 
     # Check for MISSING elements remaining.
     missing_errors = validate_missing_eliminated(entries, options_map)
@@ -46,6 +46,23 @@ def book(incomplete_entries, options_map):
     return entries, (booking_errors + missing_errors)
 
 
+def get_booking_methods(entries, options_map):
+    """Get the booking method of each of the accounts.
+
+    Args:
+      entries: A list of directives.
+      options_map: An options dict as produced by the parser.
+    Returns:
+      A defaultdict of account name to its booking method, defaulting to the
+      booking method set in the options.
+    """
+    booking_methods = collections.defaultdict(lambda: options_map["booking_method"])
+    for entry in entries:
+        if isinstance(entry, data.Open) and entry.booking:
+            booking_methods[entry.account] = entry.booking
+    return booking_methods
+
+
 def validate_missing_eliminated(entries, unused_options_map):
     """Validate that all the missing bits of postings have been eliminated.
 
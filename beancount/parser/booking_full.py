@@ -72,9 +72,12 @@ improving on the algorithm above.
 __copyright__ = "Copyright (C) 2015-2017  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import bisect
 import collections
+import concurrent.futures
 import copy
 import enum
+import operator
 from decimal import Decimal
 from typing import Text
 import uuid
@@ -102,18 +105,25 @@ def unique_label() -> Text:
 SelfReduxError = collections.namedtuple('SelfReduxError', 'source message entry')
 
 
-def book(entries, options_map, methods):
+def book(entries, options_map, methods, num_workers=None):
     """Interpolate missing data from the entries using the full historical algorithm.
     See the internal implementation _book() for details.
     This method only stripes some of the return values.
 
+    If 'num_workers' is more than one, the transactions of independent sets of
+    accounts are booked in parallel on that many processes; see _book_parallel().
+    The results are the same.
+
     See _book() for arguments and return values.
     """
-    entries, errors, _ = _book(entries, options_map, methods)
+    if num_workers and num_workers > 1:
+        entries, errors, _ = _book_parallel(entries, options_map, methods, num_workers)
+    else:
+        entries, errors, _ = _book(entries, options_map, methods)
     return entries, errors
 
 
-def _book(entries, options_map, methods):
+def _book(entries, options_map, methods, balances=None):
     """Interpolate missing data from the entries using the full historical algorithm.
 
     Args:
@@ -122,6 +132,10 @@ def _book(entries, options_map, methods):
       options_map: An options dict as produced by the parser.
       methods: A mapping of account name to their corresponding booking
         method.
+      balances: An optional defaultdict of account name to Inventory, the
+        balances resulting from the booking of the entries preceding these ones,
+        to continue booking from. This gets updated in-place. If not provided,
+        booking starts from empty inventories.
     Returns:
       A triple of
         entries: A list of interpolated entries with all their postings completed.
@@ -130,78 +144,115 @@ def _book(entries, options_map, methods):
     """
     new_entries = []
     errors = []
-    balances = collections.defaultdict(inventory.Inventory)
+    if balances is None:
+        balances = collections.defaultdict(inventory.Inventory)
+    for entry, entry_errors in _book_iter(entries, options_map, methods, balances):
+        errors.extend(entry_errors)
+        if entry is not None:
+            new_entries.append(entry)
+
+    return new_entries, errors, balances
+
+
+def _book_iter(entries, options_map, methods, balances):
+    """Interpolate missing data from the entries, one at a time.
+
+    See _book() for the arguments.
+
+    Yields:
+      Pairs of (entry, errors), for each of the entries in order, where 'entry'
+      is the interpolated entry, or None if it had to be removed, and 'errors' a
+      list of the errors produced while interpolating it.
+    """
+    # Indexes of the lots of the balances, built as they are needed.
+    lot_indexes = {}
     for entry in entries:
+        errors = []
         if isinstance(entry, Transaction):
-            # Group postings by currency.
-            refer_groups, cat_errors = categorize_by_currency(entry, balances)
-            if cat_errors:
-                errors.extend(cat_errors)
-                continue
-            posting_groups = replace_currencies(entry.postings, refer_groups)
-
-            # Get the list of tolerances.
-            tolerances = interpolate.infer_tolerances(entry.postings, options_map)
-
-            # Resolve reductions to a particular lot in their inventory balance.
-            repl_postings = []
-            for currency, group_postings in posting_groups:
-                # Important note: the group of 'postings' here is a subset of
-                # that from entry.postings, and may include replicated
-                # auto-postings. Never use entry.postings going forward.
-
-                # (See http://furius.ca/beancount/doc/self-reductions for an
-                # explanation of how we will eventually treat each currency
-                # group in this block; Summary: We will need to run the
-                # reductions prior to the augmentations in order to support
-                # reductions between the postings of a single transaction.)
-                # Disabled.
-                if False:  # pylint: disable=using-constant-test
-                    if has_self_reduction(group_postings, methods):
-                        errors.append(SelfReduxError(
-                            entry.meta, "Self-reduction is not allowed", entry))
-
-                # Perform booking reductions, that is, match postings which
-                # reduce the ante-inventory of their accounts to an existing
-                # position in the inventory against a possibly incomplete
-                # CostSpec specification, and replace the postings' cost to the
-                # fully-specified (with a date & label) existing Cost instance.
-                # Note that 'balances' remains untouched.
-                #
-                # Also note that 'booked_postings' may include augmenting
-                # postings whose 'cost' attribute has been left to a CostSpec
-                # instance. Therefore, the postings held-at-cost may hold a
-                # mixture of Cost and CostSpec instances. This is necessary to
-                # let the interpolation do its magic on partially incomplete
-                # CostSpec instances below.
-                (booked_postings,
-                 booking_errors) = book_reductions(entry, group_postings, balances,
-                                                   methods)
-
-                # If there were any errors, skip this group of postings.
-                if booking_errors:
-                    errors.extend(booking_errors)
+            # Transactions whose postings are all complete and not held at cost
+            # need neither booking nor interpolation.
+            repl_postings = group_complete_postings(entry.postings)
+            if repl_postings is not None:
+                # The tolerances are only needed if the postings are reordered.
+                tolerances = None
+            else:
+                # Group postings by currency.
+                refer_groups, cat_errors = categorize_by_currency(entry, balances)
+                if cat_errors:
+                    errors.extend(cat_errors)
+                    yield None, errors
                     continue
+                posting_groups = replace_currencies(entry.postings, refer_groups)
+
+                # Get the list of tolerances.
+                tolerances = interpolate.infer_tolerances(entry.postings, options_map)
+
+                # Resolve reductions to a particular lot in their inventory balance.
+                repl_postings = []
+                for currency, group_postings in posting_groups:
+                    # Important note: the group of 'postings' here is a subset of
+                    # that from entry.postings, and may include replicated
+                    # auto-postings. Never use entry.postings going forward.
+
+                    # (See http://furius.ca/beancount/doc/self-reductions for an
+                    # explanation of how we will eventually treat each currency
+                    # group in this block; Summary: We will need to run the
+                    # reductions prior to the augmentations in order to support
+                    # reductions between the postings of a single transaction.)
+                    # Disabled.
+                    if False:  # pylint: disable=using-constant-test
+                        if has_self_reduction(group_postings, methods):
+                            errors.append(SelfReduxError(
+                                entry.meta, "Self-reduction is not allowed", entry))
+
+                    # Perform booking reductions, that is, match postings which
+                    # reduce the ante-inventory of their accounts to an existing
+                    # position in the inventory against a possibly incomplete
+                    # CostSpec specification, and replace the postings' cost to the
+                    # fully-specified (with a date & label) existing Cost instance.
+                    # Note that 'balances' remains untouched.
+                    #
+                    # Also note that 'booked_postings' may include augmenting
+                    # postings whose 'cost' attribute has been left to a CostSpec
+                    # instance. Therefore, the postings held-at-cost may hold a
+                    # mixture of Cost and CostSpec instances. This is necessary to
+                    # let the interpolation do its magic on partially incomplete
+                    # CostSpec instances below.
+                    (booked_postings,
+                     booking_errors) = book_reductions(entry, group_postings, balances,
+                                                       methods, lot_indexes)
+
+                    # If there were any errors, skip this group of postings.
+                    if booking_errors:
+                        errors.extend(booking_errors)
+                        continue
 
-                # Interpolate missing numbers from all postings. This
-                # includes partially incomplete CostSpec instances remaining
-                # on augmenting postings. After this interpolation, all
-                # 'inter_postings' consists entirely of postings holding
-                # instances of Cost.
-                (inter_postings,
-                 interpolation_errors,
-                 interpolated) = interpolate_group(booked_postings, balances, currency,
-                                                   tolerances)
-
-                if interpolation_errors:
-                    errors.extend(interpolation_errors)
-                repl_postings.extend(inter_postings)
-
-            # Replace postings by interpolated ones.
-            meta = entry.meta.copy()
-            meta[interpolate.AUTOMATIC_TOLERANCES] = tolerances
-            entry = entry._replace(postings=repl_postings,
-                                   meta=meta)
+                    # Interpolate missing numbers from all postings. This
+                    # includes partially incomplete CostSpec instances remaining
+                    # on augmenting postings. After this interpolation, all
+                    # 'inter_postings' consists entirely of postings holding
+                    # instances of Cost.
+                    (inter_postings,
+                     interpolation_errors,
+                     interpolated) = interpolate_group(booked_postings, balances, currency,
+                                                       tolerances)
+
+                    if interpolation_errors:
+                        errors.extend(interpolation_errors)
+                    repl_postings.extend(inter_postings)
+
+            # Replace postings by interpolated ones. Note that the transactions
+            # whose postings are all unchanged are left as they are, without
+            # their tolerances, which get inferred from the same postings when
+            # needed; see interpolate.get_tolerances().
+            if not (len(repl_postings) == len(entry.postings) and
+                    all(map(operator.is_, repl_postings, entry.postings))):
+                if tolerances is None:
+                    tolerances = interpolate.infer_tolerances(entry.postings, options_map)
+                meta = entry.meta.copy()
+                meta[interpolate.AUTOMATIC_TOLERANCES] = tolerances
+                entry = entry._replace(postings=repl_postings,
+                                       meta=meta)
 
             # Update the running balances for each account using the final,
             # booked and interpolated values. Note that we could optimize away
@@ -212,12 +263,173 @@ def _book(entries, options_map, methods):
             for posting in repl_postings:
                 balance = balances[posting.account]
                 balance.add_position(posting)
+                lot_index = lot_indexes.get((posting.account, posting.units.currency), None)
+                if lot_index is not None:
+                    lot_index.add_position(posting)
+
+        yield entry, errors
 
+
+def partition_by_accounts(entries):
+    """Partition the transactions into groups which have no account in common.
+
+    The transactions sharing an account, directly or through other transactions,
+    are put in the same group. Booking never carries any state between the
+    accounts of different groups, so each group can be booked independently.
+
+    Args:
+      entries: A list of directives.
+    Returns:
+      A list of lists of the indexes of the transactions in 'entries', in order,
+      for each group. The groups are in the order of their first transaction.
+    """
+    # Join the accounts of each transaction into sets, represented by a tree of
+    # parent accounts.
+    parents = {}
+    def find(account):
+        root = parents.setdefault(account, account)
+        while root != parents[root]:
+            parents[root] = root = parents[parents[root]]
+        return root
+
+    for entry in entries:
+        if isinstance(entry, Transaction) and entry.postings:
+            root = find(entry.postings[0].account)
+            for posting in entry.postings[1:]:
+                other_root = find(posting.account)
+                if other_root != root:
+                    parents[other_root] = root
+
+    # Gather the transactions of each set. Transactions without postings are
+    # put in groups of their own.
+    groups = {}
+    for index, entry in enumerate(entries):
+        if isinstance(entry, Transaction):
+            key = find(entry.postings[0].account) if entry.postings else index
+            groups.setdefault(key, []).append(index)
+    return list(groups.values())
+
+
+def _book_parallel(entries, options_map, methods, num_workers):
+    """Interpolate missing data from the entries, on many processes.
+
+    The transactions are partitioned into groups of independent accounts, which
+    are distributed over the workers and booked there, and the results are put
+    back in the order of the entries. The entries, errors and balances are the
+    same as those of _book(); the other directives are passed through.
+
+    Args:
+      entries: A list of directives, as for _book().
+      options_map: An options dict as produced by the parser.
+      methods: A mapping of account name to their corresponding booking
+        method.
+      num_workers: An integer, the number of processes to book on.
+    Returns:
+      A triple of (entries, errors, balances), as for _book().
+    """
+    groups = partition_by_accounts(entries)
+    if len(groups) < 2:
+        return _book(entries, options_map, methods)
+
+    # Distribute the groups over the workers, the largest ones first, to balance
+    # the number of transactions booked by each of them.
+    batches = [[] for _ in range(min(num_workers, len(groups)))]
+    for group in sorted(groups, key=len, reverse=True):
+        min(batches, key=len).extend(group)
+
+    # Note: The input is handed to the workers as they start, which does not
+    # require pickling it where the processes are forked. The booking methods
+    # are resolved for all the accounts, to make them picklable otherwise.
+    methods = {posting.account: methods[posting.account]
+               for entry in entries
+               if isinstance(entry, Transaction)
+               for posting in entry.postings}
+    results = {}
+    batches_balances = {}
+    with concurrent.futures.ProcessPoolExecutor(
+            len(batches), initializer=_init_book_batch,
+            initargs=(entries, options_map, methods)) as executor:
+        jobs = [executor.submit(_book_batch, sorted(indexes)) for indexes in batches]
+        for job in jobs:
+            booked, batch_balances = job.result()
+            results.update(booked)
+            batches_balances.update(batch_balances)
+
+    # Note: The balances are inserted in the order in which _book() first
+    # updates them, that of the postings of the booked transactions.
+    new_entries = []
+    errors = []
+    balances = collections.defaultdict(inventory.Inventory)
+    for index, entry in enumerate(entries):
+        result = results.get(index, None)
+        if result is not None:
+            entry_errors, replacement = result
+            errors.extend(entry_errors)
+            if replacement is None:
+                continue
+            if replacement:
+                postings, tolerances = replacement
+                meta = entry.meta.copy()
+                meta[interpolate.AUTOMATIC_TOLERANCES] = tolerances
+                entry = entry._replace(postings=postings, meta=meta)
+            for posting in entry.postings:
+                if posting.account not in balances:
+                    balances[posting.account] = batches_balances[posting.account]
         new_entries.append(entry)
 
     return new_entries, errors, balances
 
 
+# The input of the batches booked on a worker process, as a triple of the
+# entries, the options map and the booking methods.
+_BOOK_BATCH_INPUT = None
+
+
+def _init_book_batch(entries, options_map, methods):
+    """Set the input of the batches to be booked on a worker process.
+
+    Args:
+      entries: A list of directives.
+      options_map: An options dict as produced by the parser.
+      methods: A dict of the accounts of the transactions to their
+        corresponding booking method.
+    """
+    global _BOOK_BATCH_INPUT  # pylint: disable=global-statement
+    _BOOK_BATCH_INPUT = (entries, options_map, methods)
+
+
+def _book_batch(indexes):
+    """Interpolate missing data from a batch of transactions.
+
+    This is run on worker processes when booking in parallel.
+
+    Args:
+      indexes: A sorted list of the indexes of the transactions to book, in the
+        entries set by _init_book_batch().
+    Returns:
+      A pair of a list of (index, (errors, replacement)) for each of the
+      transactions, and of a dict of account name to the resulting balances.
+      'replacement' is a pair of the postings and tolerances of the interpolated
+      transaction, or an empty tuple if it is unchanged, or None if it had to be
+      removed.
+    """
+    entries, options_map, methods = _BOOK_BATCH_INPUT
+    batch_entries = [entries[index] for index in indexes]
+    balances = collections.defaultdict(inventory.Inventory)
+    booked = []
+    for index, input_entry, (entry, errors) in zip(
+            indexes, batch_entries,
+            _book_iter(batch_entries, options_map, methods, balances)):
+        if entry is None:
+            replacement = None
+        elif entry is input_entry:
+            replacement = ()
+        else:
+            replacement = (entry.postings, entry.meta[interpolate.AUTOMATIC_TOLERANCES])
+        booked.append((index, (errors, replacement)))
+    return booked, dict(balances)
+
+
 # An error raised if we failed to bucket a posting to a particular currency.
 CategorizationError = collections.namedtuple('CategorizationError', 'source message entry')
 
@@ -472,6 +684,44 @@ def replace_currencies(postings, refer_groups):
     return new_groups
 
 
+def group_complete_postings(postings):
+    """Group the postings by currency, if they are all complete and not at cost.
+
+    This is a shortcut for the transactions which have all their numbers and
+    currencies filled in, and no cost. categorize_by_currency() would put their
+    postings in groups of their weight currency, in which there is nothing to
+    book or interpolate, so the booked postings are only those of the groups, in
+    the order of their first postings.
+
+    Args:
+      postings: A list of Posting instances.
+    Returns:
+      A new list of the postings, ordered by group, or None if any of the
+      postings is incomplete or held at cost.
+    """
+    groups = {}
+    for posting in postings:
+        units = posting.units
+        price = posting.price
+        if (posting.cost is not None or
+            not isinstance(units, Amount) or
+            not isinstance(units.number, Decimal) or
+            not isinstance(units.currency, str)):
+            return None
+        if price is None:
+            currency = units.currency
+        elif (isinstance(price, Amount) and
+              isinstance(price.number, Decimal) and
+              isinstance(price.currency, str)):
+            currency = price.currency
+        else:
+            return None
+        groups.setdefault(currency, []).append(posting)
+    if len(groups) == 1:
+        return list(postings)
+    return [posting for group in groups.values() for posting in group]
+
+
 # An error raised if we failed to reduce the inventory balance unambiguously.
 ReductionError = collections.namedtuple('ReductionError', 'source message entry')
 
@@ -501,8 +751,352 @@ def has_self_reduction(postings, methods):
     return False
 
 
+class LotIndex:
+    """An index of the positions of a single currency of an account's inventory.
+
+    This mirrors the positions of one currency held in an Inventory, in the same
+    order, and indexes the lots held at cost by cost number, date and label, and
+    in date order, so that reductions can find the lots they refer to without
+    scanning all of them. It is kept up-to-date by adding to it the same
+    positions which are added to the inventory.
+
+    Attributes:
+      positions: A dict of Cost (or None) to Position instances, in the order of
+        the inventory.
+      sequence: A dict of Cost (or None) to an integer, the order in which the
+        position was created.
+      num_negative: An integer, the number of positions with negative units.
+      by_number: A dict of cost number to a dict of the Cost instances with that
+        number, in the order of the inventory.
+      by_date: A dict of date to a dict of the Cost instances with that date, in
+        the order of the inventory.
+      by_label: A dict of label to a dict of the Cost instances with that label,
+        in the order of the inventory.
+      dated: A sorted list of (date, sequence) pairs of the lots held at cost.
+      num_undated: An integer, the number of lots held at cost without a date.
+    """
+
+    def __init__(self, positions=None):
+        """Create an index of positions.
+
+        Args:
+          positions: An optional iterable of Position instances of a single
+            currency, to add to this index in order.
+        """
+        self.positions = {}
+        self.sequence = {}
+        self.num_negative = 0
+        self.by_number = collections.defaultdict(dict)
+        self.by_date = collections.defaultdict(dict)
+        self.by_label = collections.defaultdict(dict)
+        self.dated = []
+        self.num_undated = 0
+        self._costs = {}
+        self._counter = 0
+        if positions is not None:
+            for pos in positions:
+                self.add_position(pos)
+
+    def add_position(self, position):
+        """Add a position to the index, with the semantics of Inventory.add_position().
+
+        Args:
+          position: The Posting or Position to add to this index.
+        """
+        units = position.units
+        cost = position.cost
+        current = self.positions.get(cost, None)
+        if current is not None:
+            number = current.units.number + units.number
+            if number == ZERO:
+                self._remove(current)
+            else:
+                self.positions[cost] = Position(Amount(number, units.currency), cost)
+                self.num_negative += (number < ZERO) - (current.units.number < ZERO)
+        elif units.number != ZERO:
+            self._insert(Position(units, cost))
+
+    def _insert(self, pos):
+        """Insert a new position in the index.
+
+        Args:
+          pos: An instance of Position, whose cost is not already in the index.
+        """
+        cost = pos.cost
+        seq = self._counter
+        self._counter += 1
+        self.positions[cost] = pos
+        self.sequence[cost] = seq
+        self.num_negative += pos.units.number < ZERO
+        if cost is None:
+            return
+        self.by_number[cost.number][cost] = None
+        if cost.label:
+            self.by_label[cost.label][cost] = None
+        if cost.date is None:
+            self.num_undated += 1
+        else:
+            self.by_date[cost.date][cost] = None
+            bisect.insort(self.dated, (cost.date, seq))
+            self._costs[seq] = cost
+
+    def _remove(self, pos):
+        """Remove a position from the index.
+
+        Args:
+          pos: An instance of Position, present in the index.
+        """
+        cost = pos.cost
+        seq = self.sequence.pop(cost)
+        del self.positions[cost]
+        self.num_negative -= pos.units.number < ZERO
+        if cost is None:
+            return
+        _discard(self.by_number, cost.number, cost)
+        if cost.label:
+            _discard(self.by_label, cost.label, cost)
+        if cost.date is None:
+            self.num_undated -= 1
+        else:
+            _discard(self.by_date, cost.date, cost)
+            del self.dated[bisect.bisect_left(self.dated, (cost.date, seq))]
+            del self._costs[seq]
+
+    def iter_dated(self, reverse=False):
+        """Iterate over the lots held at cost with a date, grouped by date.
+
+        Args:
+          reverse: A boolean, true to produce the latest dates first.
+        Yields:
+          Lists of the Position instances of a single date, in the order of the
+          inventory.
+        """
+        dated = self.dated
+        if reverse:
+            end = len(dated)
+            while end > 0:
+                begin = bisect.bisect_left(dated, (dated[end - 1][0], -1), 0, end)
+                yield self._dated_positions(begin, end)
+                end = begin
+        else:
+            begin = 0
+            while begin < len(dated):
+                end = bisect.bisect_right(dated, (dated[begin][0], self._counter), begin)
+                yield self._dated_positions(begin, end)
+                begin = end
+
+    def _dated_positions(self, begin, end):
+        """Return the positions of a slice of the dated lots.
+
+        Args:
+          begin: An integer, the index of the first lot in 'dated'.
+          end: An integer, the index past the last lot in 'dated'.
+        Returns:
+          A list of Position instances.
+        """
+        positions = self.positions
+        costs = self._costs
+        return [positions[costs[seq]] for _, seq in self.dated[begin:end]]
+
+
+def _discard(mapping, key, cost):
+    """Remove a cost from one of the sets of a LotIndex.
+
+    Args:
+      mapping: A dict of key to a dict of Cost instances.
+      key: The key of the set to remove the cost from.
+      cost: An instance of Cost, present in that set.
+    """
+    costs = mapping[key]
+    del costs[cost]
+    if not costs:
+        del mapping[key]
+
+
+def get_lot_index(lot_indexes, balances, account, currency):
+    """Get the index of the lots of a currency in an account, building it if needed.
+
+    Args:
+      lot_indexes: A dict of (account, currency) to LotIndex instances, to which
+        the new index gets added.
+      balances: A dict of account name to inventory contents.
+      account: A string, the name of the account.
+      currency: A string, the currency of the lots.
+    Returns:
+      An instance of LotIndex.
+    """
+    key = (account, currency)
+    lot_index = lot_indexes.get(key, None)
+    if lot_index is None:
+        balance = balances.get(account, None)
+        lot_index = lot_indexes[key] = LotIndex(
+            pos for pos in (balance.values() if balance is not None else ())
+            if pos.units.currency == currency)
+    return lot_index
+
+
+class LotChanges:
+    """Changes to the positions of a LotIndex, without modifying it.
+
+    This stands in for the local copy of a balance while booking a transaction,
+    where the reductions of a posting need to be seen by the following ones.
+
+    Attributes:
+      lot_index: The instance of LotIndex the changes apply to.
+      changed: A dict of Cost to the Position replacing those of the index, or
+        None if it was removed.
+      added: A dict of Cost to the Position instances created since, in order.
+    """
+
+    def __init__(self, lot_index):
+        self.lot_index = lot_index
+        self.changed = {}
+        self.added = {}
+
+    def __bool__(self):
+        return bool(self.changed or self.added)
+
+    def get(self, cost):
+        """Return the current position at a cost.
+
+        Args:
+          cost: An instance of Cost, or None.
+        Returns:
+          An instance of Position, or None if there is none.
+        """
+        if cost in self.added:
+            return self.added[cost]
+        if cost in self.changed:
+            return self.changed[cost]
+        return self.lot_index.positions.get(cost, None)
+
+    def add_position(self, position):
+        """Add a position, with the semantics of Inventory.add_position().
+
+        Args:
+          position: The Posting or Position to add.
+        """
+        units = position.units
+        cost = position.cost
+        current = self.get(cost)
+        if current is not None:
+            number = current.units.number + units.number
+            pos = (Position(Amount(number, units.currency), cost)
+                   if number != ZERO
+                   else None)
+            if cost in self.added:
+                if pos is None:
+                    del self.added[cost]
+                else:
+                    self.added[cost] = pos
+            else:
+                self.changed[cost] = pos
+        elif units.number != ZERO:
+            self.added[cost] = Position(units, cost)
+
+    def positions(self, costs):
+        """Return the current positions, in the order of the inventory.
+
+        Args:
+          costs: An iterable of Cost instances of the index, in its order.
+        Returns:
+          A list of the current positions at those costs, followed by the
+          positions created since.
+        """
+        positions = self.lot_index.positions
+        changed = self.changed
+        current = [changed[cost] if cost in changed else positions[cost]
+                   for cost in costs]
+        current.extend(self.added.values())
+        return [pos for pos in current if pos is not None]
+
+    def is_reduced_by(self, units):
+        """Return true if an amount could reduce the current positions.
+
+        Args:
+          units: An instance of Amount, of the currency of the index.
+        Returns:
+          A boolean.
+        """
+        if units.number == ZERO:
+            return False
+        lot_index = self.lot_index
+        num_positions = len(lot_index.positions)
+        num_negative = lot_index.num_negative
+        for cost, pos in self.changed.items():
+            num_positions -= 1
+            num_negative -= lot_index.positions[cost].units.number < ZERO
+            if pos is not None:
+                num_positions += 1
+                num_negative += pos.units.number < ZERO
+        for pos in self.added.values():
+            num_positions += 1
+            num_negative += pos.units.number < ZERO
+        if units.number > ZERO:
+            return num_negative > 0
+        return num_positions > num_negative
+
+
+def match_lot(pos, costspec, cost_number):
+    """Return true if a position matches the cost specification of a reduction.
+
+    Args:
+      pos: An instance of Position, of the currency of the reduction.
+      costspec: The instance of CostSpec of the reducing posting.
+      cost_number: The per-unit cost number of the reduction, or None.
+    Returns:
+      A boolean.
+    """
+    cost = pos.cost
+    # Skip balance positions not held at cost.
+    if cost is None:
+        return False
+    if cost_number is not None and cost.number != cost_number:
+        return False
+    if isinstance(costspec.currency, str) and cost.currency != costspec.currency:
+        return False
+    if costspec.date and cost.date != costspec.date:
+        return False
+    if costspec.label and cost.label != costspec.label:
+        return False
+    return True
+
+
+def match_dated_lots(lot_index, posting, cost_number, reverse):
+    """Find the first lots in date order needed to book a reduction.
+
+    This returns the matches which the FIFO and LIFO methods consume: all the
+    lots of the dates up to the one where the reduction is covered, ordered by
+    date. If the reduction cannot be covered, this returns all the matches, in
+    the order of the inventory.
+
+    Args:
+      lot_index: An instance of LotIndex, without lots undated at cost.
+      posting: The reducing Posting instance.
+      cost_number: The per-unit cost number of the reduction, or None.
+      reverse: A boolean, true to match the latest lots first.
+    Returns:
+      A list of matching Position instances.
+    """
+    costspec = posting.cost
+    sign = -1 if posting.units.number < ZERO else 1
+    remaining = abs(posting.units.number)
+    matches = []
+    for positions in lot_index.iter_dated(reverse):
+        for pos in positions:
+            if match_lot(pos, costspec, cost_number):
+                matches.append(pos)
+                if pos.units.number * sign < ZERO:
+                    remaining += pos.units.number * sign
+        if remaining <= ZERO:
+            return matches
+    sequence = lot_index.sequence
+    matches.sort(key=lambda pos: sequence[pos.cost])
+    return matches
+
+
 def book_reductions(entry, group_postings, balances,
-                    methods):
+                    methods, lot_indexes=None):
     """Book inventory reductions against the ante-balances.
 
     This function accepts a dict of (account, Inventory balance) and for each
@@ -522,6 +1116,9 @@ def book_reductions(entry, group_postings, balances,
       balances: A dict of account name to inventory contents.
       methods: A mapping of account name to their corresponding booking
         method enum.
+      lot_indexes: An optional dict of (account, currency) to LotIndex instances
+        of the positions in 'balances', to which missing indexes are added. If
+        not provided, the indexes are built for this call only.
     Returns:
       A pair of
         booked_postings: A list of booked postings, with reducing lots resolved
@@ -533,13 +1130,17 @@ def book_reductions(entry, group_postings, balances,
         errors: A list of errors, if there were any.
     """
     errors = []
+    if lot_indexes is None:
+        lot_indexes = {}
 
-    # A local copy of the balances dictionary which is updated just for the
-    # duration of this function's updates, in order to take into account the
-    # cumulative effect of all the postings inferred here
-    local_balances = {}
+    # The changes local to this function to the lots of each account and
+    # currency, in order to take into account the cumulative effect of all the
+    # reductions inferred here, and the postings which made them. Note that we
+    # ensure there is no mutation on 'balances' or 'lot_indexes', to keep this
+    # function without side-effects.
+    local_changes = {}
+    local_postings = collections.defaultdict(list)
 
-    empty = inventory.Inventory()
     booked_postings = []
     for posting in group_postings:
         # Process a single posting.
@@ -547,56 +1148,56 @@ def book_reductions(entry, group_postings, balances,
         costspec = posting.cost
         account = posting.account
 
-        # Note: We ensure there is no mutation on 'balances' to keep this
-        # function without side-effects. Note that we may be able to optimize
-        # performance later on by giving up this property.
-        #
-        # Also note that if there is no existing balance, then won't be any lot
-        # reduction because none of the postings will be able to match against
-        # any currencies of the balance.
-        previous_balance = balances.get(account, empty)
-        balance = local_balances.setdefault(account, copy.copy(previous_balance))
-
         # Check if this is a lot held at cost.
         if costspec is None or units.number is MISSING:
             # This posting is not held at cost; we do nothing.
             booked_postings.append(posting)
         else:
+            # Note that if there is no existing balance, then won't be any lot
+            # reduction because none of the postings will be able to match against
+            # any currencies of the balance.
+            key = (account, units.currency)
+            changes = local_changes.get(key, None)
+            if changes is None:
+                changes = local_changes[key] = LotChanges(
+                    get_lot_index(lot_indexes, balances, account, units.currency))
+
             # This posting is held at cost; figure out if it's a reduction or an
             # augmentation.
             method = methods[account]
             if (method is not Booking.NONE and
-                balance is not None and
-                balance.is_reduced_by(units)):
+                changes.is_reduced_by(units)):
                 # This posting is a reduction.
 
-                # Match the positions.
+                # Match the positions, starting from the smallest set of lots of the
+                # index which may match.
+                lot_index = changes.lot_index
                 cost_number = compute_cost_number(costspec, units)
-                matches = []
-                for position in balance:
-                    # Skip inventory contents of a different currency.
-                    if (units.currency and
-                        position.units.currency != units.currency):
-                        continue
-                    # Skip balance positions not held at cost.
-                    if position.cost is None:
-                        continue
-                    if (cost_number is not None and
-                        position.cost.number != cost_number):
-                        continue
-                    if (isinstance(costspec.currency, str) and
-                        position.cost.currency != costspec.currency):
-                        continue
-                    if (costspec.date and
-                        position.cost.date != costspec.date):
-                        continue
-                    if (costspec.label and
-                        position.cost.label != costspec.label):
-                        continue
-                    matches.append(position)
+                costs = None
+                if cost_number is not None:
+                    costs = lot_index.by_number.get(cost_number, {})
+                if costspec.date:
+                    costs = _smallest(costs, lot_index.by_date.get(costspec.date, {}))
+                if costspec.label:
+                    costs = _smallest(costs, lot_index.by_label.get(costspec.label, {}))
+                if (costs is None and
+                    method in (Booking.FIFO, Booking.LIFO) and
+                    not changes and
+                    lot_index.num_undated == 0):
+                    matches = match_dated_lots(lot_index, posting, cost_number,
+                                               method is Booking.LIFO)
+                else:
+                    matches = [pos
+                               for pos in changes.positions(lot_index.positions
+                                                            if costs is None
+                                                            else costs)
+                               if match_lot(pos, costspec, cost_number)]
 
                 # Check for ambiguous matches.
                 if len(matches) == 0:
+                    balance = copy.copy(balances.get(account, inventory.Inventory()))
+                    for local_posting in local_postings[account]:
+                        balance.add_position(local_posting)
                     errors.append(
                         ReductionError(entry.meta,
                                        'No position matches "{}" against balance {}'.format(
@@ -614,13 +1215,14 @@ def book_reductions(entry, group_postings, balances,
                 # Add the reductions to the resulting list of booked postings.
                 booked_postings.extend(reduction_postings)
 
-                # Update the local balance in order to avoid matching against
-                # the same postings twice when processing multiple postings in
-                # the same transaction. Note that we only do this for postings
-                # held at cost because the other postings may need interpolation
-                # in order to be resolved properly.
+                # Update the local changes in order to avoid matching against the
+                # same postings twice when processing multiple postings in the same
+                # transaction. Note that we only do this for postings held at cost
+                # because the other postings may need interpolation in order to be
+                # resolved properly.
                 for posting in reduction_postings:
-                    balance.add_position(posting)
+                    changes.add_position(posting)
+                    local_postings[account].append(posting)
             else:
                 # This posting is an augmentation.
                 #
@@ -647,6 +1249,20 @@ def book_reductions(entry, group_postings, balances,
     return booked_postings, errors
 
 
+def _smallest(costs, other_costs):
+    """Return the smallest of two sets of costs.
+
+    Args:
+      costs: A dict of Cost instances, or None.
+      other_costs: A dict of Cost instances.
+    Returns:
+      The one of the two with the fewest costs.
+    """
+    if costs is None or len(other_costs) < len(costs):
+        return other_costs
+    return costs
+
+
 def compute_cost_number(costspec, units):
     """Given a CostSpec, return the cost number, if possible to compute.
 
@@ -908,9 +1524,11 @@ def interpolate_group(postings, balances, currency, tolerances):
         # Replace the number in the posting.
         if new_posting is not None:
             # Set meta-data on the new posting to indicate it was interpolated.
-            if new_posting.meta is None:
-                new_posting = new_posting._replace(meta={})
-            new_posting.meta[interpolate.AUTOMATIC_META] = True
+            # Note: Make a copy, the incomplete posting's meta-data must not be
+            # modified.
+            meta = dict(new_posting.meta) if new_posting.meta is not None else {}
+            meta[interpolate.AUTOMATIC_META] = True
+            new_posting = new_posting._replace(meta=meta)
 
             # Convert augmenting posting costs from CostSpec to a corresponding
             # Cost instance.
@@ -1250,7 +1250,13 @@ class _BookingTestBase(unittest.TestCase):
                                          test_utils.record(bm.handle_ambiguous_matches))
         reduce_patch = mock.patch.object(bf, 'book_reductions',
                                          test_utils.record(bf.book_reductions))
-        with handle_patch as handle_mock, reduce_patch as reduce_mock:
+        # Complete postings not held at cost skip book_reductions(); go through
+        # it anyway if its output is checked.
+        entry_reduced = find_first_with_tag('reduced', all_entries, None)
+        complete_patch = mock.patch.object(
+            bf, 'group_complete_postings',
+            (lambda postings: None) if entry_reduced else bf.group_complete_postings)
+        with handle_patch as handle_mock, reduce_patch as reduce_mock, complete_patch:
             book_entries, book_errors, balances = bf._book(input_entries, options_map,
                                                            methods)
 
@@ -1276,7 +1282,6 @@ class _BookingTestBase(unittest.TestCase):
 
         # If requested, check the output values to the last call to
         # book_reductions().
-        entry_reduced = find_first_with_tag('reduced', all_entries, None)
         if entry_reduced:
             # Note: If there are multiple currencies in the input entries here
             # this equality may not match.
@@ -2759,6 +2764,273 @@ class TestBookingApi(unittest.TestCase):
             self.assertEqual(entry.postings[1].account, 'Expenses:Stuff')
             self.assertEqual(entry.postings[1].units, A('-100.00 USD'))
 
+    @parser.parse_doc(allow_incomplete=True)
+    def test_book_resume_from_balances(self, entries, _, options_map):
+        """
+        2015-10-01 * "Held-at-cost, positive"
+          Assets:Account1          3 HOOL {100.00 USD}
+          Assets:Other
+
+        2015-10-02 * "Held-at-cost, reduce"
+          Assets:Account1         -1 HOOL {}
+          Assets:Other
+
+        2015-10-03 * "Held-at-cost, reduce"
+          Assets:Account1         -1 HOOL {}
+          Assets:Other
+        """
+        methods = collections.defaultdict(lambda: Booking.STRICT)
+        all_entries, all_errors, all_balances = bf._book(entries, options_map, methods)
+
+        balances = collections.defaultdict(inventory.Inventory)
+        head_entries, head_errors, head_balances = bf._book(
+            entries[:1], options_map, methods, balances)
+        self.assertIs(balances, head_balances)
+        tail_entries, tail_errors, tail_balances = bf._book(
+            entries[1:], options_map, methods, balances)
+        self.assertEqual(all_entries, head_entries + tail_entries)
+        self.assertEqual([], all_errors + head_errors + tail_errors)
+        self.assertEqual(all_balances, tail_balances)
+        self.assertEqual(I('1 HOOL {100.00 USD, 2015-10-01}'),
+                         tail_balances['Assets:Account1'])
+
+
+class TestGroupCompletePostings(unittest.TestCase):
+
+    @parser.parse_doc(allow_incomplete=True)
+    def test_group_complete_postings(self, entries, _, options_map):
+        """
+        2015-10-01 * "Complete"
+          Assets:Account1        100.00 USD
+          Assets:Account2        -90.00 EUR @ 1.20 USD
+          Assets:Account3         90.00 EUR
+          Assets:Account4       -208.00 USD
+
+        2015-10-01 * "Auto-posting"
+          Assets:Account1        100.00 USD
+          Assets:Account2
+
+        2015-10-01 * "Missing price"
+          Assets:Account1        100.00 USD
+          Assets:Account2        -90.00 EUR @ USD
+
+        2015-10-01 * "Cost"
+          Assets:Account1        1 HOOL {100.00 USD}
+          Assets:Account2     -100.00 USD
+        """
+        postings = entries[0].postings
+        self.assertEqual([postings[0], postings[1], postings[3], postings[2]],
+                         bf.group_complete_postings(postings))
+        for entry in entries[1:]:
+            self.assertIsNone(bf.group_complete_postings(entry.postings))
+
+        # The complete transactions are booked the same as the others.
+        methods = collections.defaultdict(lambda: Booking.STRICT)
+        booked_entries, errors = bf.book(entries[:1], options_map, methods)
+        with mock.patch.object(bf, 'group_complete_postings', return_value=None):
+            expected_entries, expected_errors = bf.book(entries[:1], options_map, methods)
+        self.assertEqual(expected_entries, booked_entries)
+        self.assertEqual(expected_errors, errors)
+
+    @parser.parse_doc(allow_incomplete=True)
+    def test_book_unchanged(self, entries, _, options_map):
+        """
+        2015-10-01 * "Complete"
+          Assets:Account1        100.00 USD
+          Assets:Account2       -100.00 USD
+
+        2015-10-01 * "Reordered"
+          Assets:Account1        100.00 USD
+          Assets:Account2        -90.00 EUR
+          Assets:Account3       -100.00 USD
+          Assets:Account4         90.00 EUR
+        """
+        methods = collections.defaultdict(lambda: Booking.STRICT)
+        booked_entries, errors = bf.book(entries, options_map, methods)
+        self.assertEqual([], errors)
+        self.assertIs(entries[0], booked_entries[0])
+        self.assertIsNot(entries[1], booked_entries[1])
+        self.assertIn(interpolate.AUTOMATIC_TOLERANCES, booked_entries[1].meta)
+
+
+class TestLotIndex(unittest.TestCase):
+
+    def assertIndexEqual(self, balance, lot_index, currency='HOOL'):
+        positions = [pos for pos in balance if pos.units.currency == currency]
+        self.assertEqual(positions, list(lot_index.positions.values()))
+        self.assertEqual(sum(1 for pos in positions if pos.units.number < 0),
+                         lot_index.num_negative)
+        lots = [pos.cost for pos in positions if pos.cost is not None]
+        for attribute, mapping in [('number', lot_index.by_number),
+                                   ('date', lot_index.by_date),
+                                   ('label', lot_index.by_label)]:
+            expected = collections.defaultdict(list)
+            for cost in lots:
+                if getattr(cost, attribute) is not None:
+                    expected[getattr(cost, attribute)].append(cost)
+            self.assertEqual(dict(expected),
+                             {key: list(costs) for key, costs in mapping.items()})
+        self.assertEqual(sorted((cost.date, lots.index(cost)) for cost in lots),
+                         [(date, lots.index(lot_index._costs[seq]))
+                          for date, seq in lot_index.dated])
+
+    def test_add_position(self):
+        balance = I('10 HOOL {100.00 USD, 2015-10-01}, '
+                    '5 HOOL {101.00 USD, 2015-10-01, "lot"}, '
+                    '20 USD, '
+                    '7 HOOL')
+        lot_index = bf.LotIndex(pos for pos in balance if pos.units.currency == 'HOOL')
+        self.assertIndexEqual(balance, lot_index)
+
+        for string in ['-3 HOOL {100.00 USD, 2015-10-01}',
+                       '2 HOOL {100.00 USD, 2015-10-02}',
+                       '-5 HOOL {101.00 USD, 2015-10-01, "lot"}',
+                       '-7 HOOL {100.00 USD, 2015-10-01}',
+                       '-10 HOOL',
+                       '0 HOOL {102.00 USD, 2015-10-03}',
+                       '4 HOOL {100.00 USD, 2015-10-01}']:
+            pos = position.from_string(string)
+            balance.add_position(pos)
+            lot_index.add_position(pos)
+            self.assertIndexEqual(balance, lot_index)
+
+    def test_iter_dated(self):
+        lot_index = bf.LotIndex(position.from_string(string) for string in [
+            '1 HOOL {100.00 USD, 2015-10-02}',
+            '2 HOOL {101.00 USD, 2015-10-01}',
+            '3 HOOL {102.00 USD, 2015-10-02}',
+            '4 HOOL {103.00 USD, 2015-10-03}'])
+        self.assertEqual([[2], [1, 3], [4]],
+                         [[int(pos.units.number) for pos in positions]
+                          for positions in lot_index.iter_dated()])
+        self.assertEqual([[4], [1, 3], [2]],
+                         [[int(pos.units.number) for pos in positions]
+                          for positions in lot_index.iter_dated(reverse=True)])
+
+    @parser.parse_doc(allow_incomplete=True)
+    def test_book_dated_lots(self, entries, _, options_map):
+        """
+        2015-10-01 * "Lots"
+          Assets:Account1          1 HOOL {100.00 USD}
+          Assets:Account1          2 HOOL {101.00 USD}
+          Assets:Account2          1 HOOL {100.00 USD}
+          Assets:Account2          2 HOOL {101.00 USD}
+          Assets:Other
+
+        2015-10-02 * "Lots"
+          Assets:Account1          3 HOOL {102.00 USD}
+          Assets:Account2          3 HOOL {102.00 USD}
+          Assets:Other
+
+        2015-10-03 * "Reduce"
+          Assets:Account1         -2 HOOL {}
+          Assets:Account1         -2 HOOL {}
+          Assets:Account2         -4 HOOL {}
+          Assets:Other
+        """
+        methods = collections.defaultdict(lambda: Booking.STRICT)
+        methods['Assets:Account1'] = Booking.FIFO
+        methods['Assets:Account2'] = Booking.LIFO
+        booked_entries, errors = bf.book(entries, options_map, methods)
+        self.assertEqual([], errors)
+        self.assertEqual(
+            [('Assets:Account1', D('-1'), D('100.00')),
+             ('Assets:Account1', D('-1'), D('101.00')),
+             ('Assets:Account1', D('-1'), D('101.00')),
+             ('Assets:Account1', D('-1'), D('102.00')),
+             ('Assets:Account2', D('-3'), D('102.00')),
+             ('Assets:Account2', D('-1'), D('100.00'))],
+            [(posting.account, posting.units.number, posting.cost.number)
+             for posting in booked_entries[-1].postings
+             if posting.account != 'Assets:Other'])
+
+    def test_match_dated_lots_insufficient(self):
+        positions = [position.from_string(string) for string in [
+            '1 HOOL {100.00 USD, 2015-10-02}',
+            '2 HOOL {101.00 USD, 2015-10-01}']]
+        lot_index = bf.LotIndex(positions)
+        posting = data.Posting('Assets:Account1', A('-4 HOOL'),
+                               CostSpec(MISSING, None, MISSING, None, None, False),
+                               None, None, None)
+        self.assertEqual(positions,
+                         bf.match_dated_lots(lot_index, posting, None, False))
+        posting = posting._replace(units=A('-2 HOOL'))
+        self.assertEqual(positions[1:],
+                         bf.match_dated_lots(lot_index, posting, None, False))
+
+
+class TestBookParallel(unittest.TestCase):
+
+    @parser.parse_doc(allow_incomplete=True)
+    def test_partition_by_accounts(self, entries, _, options_map):
+        """
+        2015-10-01 open Assets:Account1
+
+        2015-10-01 * "Group 1"
+          Assets:Account1          3 HOOL {100.00 USD}
+          Assets:Cash1
+
+        2015-10-02 * "Group 2"
+          Assets:Account2          3 HOOL {100.00 USD}
+          Assets:Cash2
+
+        2015-10-03 * "Group 3"
+
+        2015-10-04 * "Group 1 and 2"
+          Assets:Cash1          1.00 USD
+          Assets:Transfer
+
+        2015-10-04 * "Group 1 and 2"
+          Assets:Cash2          1.00 USD
+          Assets:Transfer
+
+        2015-10-05 * "Group 4"
+          Assets:Account3          3 HOOL {100.00 USD}
+          Assets:Cash3
+        """
+        self.assertEqual([[1, 2, 4, 5], [3], [6]], bf.partition_by_accounts(entries))
+
+    @parser.parse_doc(allow_incomplete=True)
+    def test_book_parallel(self, entries, _, options_map):
+        """
+        2015-10-01 open Assets:Account1
+        2015-10-01 open Assets:Account2 "FIFO"
+
+        2015-10-01 * "Account2"
+          Assets:Account2          3 HOOL {100.00 USD}
+          Assets:Account2          2 HOOL {101.00 USD}
+          Assets:Cash2
+
+        2015-10-01 * "Account1"
+          Assets:Account1          3 HOOL {100.00 USD}
+          Assets:Cash1
+
+        2015-10-02 * "Account1, ambiguous"
+          Assets:Account1          1 HOOL {100.00 USD}
+          Assets:Account1          1 HOOL {101.00 USD}
+          Assets:Cash1
+
+        2015-10-03 * "Account2, reduce"
+          Assets:Account2         -4 HOOL {}
+          Assets:Cash2
+
+        2015-10-03 * "Account1, reduce"
+          Assets:Account1         -2 HOOL {}
+          Assets:Cash1
+
+        2015-10-04 * "Account3, uncategorizable"
+          Assets:Account3         10
+          Assets:Cash3
+        """
+        methods = booking.get_booking_methods(entries, options_map)
+        serial = bf._book(entries, options_map, methods)
+        parallel = bf._book_parallel(entries, options_map, methods, 2)
+        self.assertEqual(serial, parallel)
+        self.assertEqual(list(serial[2].items()), list(parallel[2].items()))
+        self.assertEqual(2, len(serial[1]))
+        self.assertEqual((serial[0], serial[1]),
+                         bf.book(entries, options_map, methods, num_workers=2))
+
 
 # FIXME: TODO - Rewrite these tests. See average_test.py.
 class TestBook(unittest.TestCase):
@@ -1,8 +1,8 @@
-/* A Bison parser, made by GNU Bison 3.6.4.  */
+/* A Bison parser, made by GNU Bison 3.8.2.  */
 
 /* Bison implementation for Yacc-like parsers in C
 
-   Copyright (C) 1984, 1989-1990, 2000-2015, 2018-2020 Free Software Foundation,
+   Copyright (C) 1984, 1989-1990, 2000-2015, 2018-2021 Free Software Foundation,
    Inc.
 
    This program is free software: you can redistribute it and/or modify
@@ -16,7 +16,7 @@
    GNU General Public License for more details.
 
    You should have received a copy of the GNU General Public License
-   along with this program.  If not, see <http://www.gnu.org/licenses/>.  */
+   along with this program.  If not, see <https://www.gnu.org/licenses/>.  */
 
 /* As a special exception, you may create a larger work that contains
    part or all of the Bison parser skeleton and distribute that work
@@ -45,11 +45,11 @@
    define necessary library symbols; they are noted "INFRINGES ON
    USER NAME SPACE" below.  */
 
-/* Identify Bison output.  */
-#define YYBISON 1
+/* Identify Bison output, and Bison version.  */
+#define YYBISON 30802
 
-/* Bison version.  */
-#define YYBISON_VERSION "3.6.4"
+/* Bison version string.  */
+#define YYBISON_VERSION "3.8.2"
 
 /* Skeleton name.  */
 #define YYSKELETON_NAME "yacc.c"
@@ -58,7 +58,7 @@
 #define YYPURE 2
 
 /* Push parsers.  */
-#define YYPUSH 0
+#define YYPUSH 1
 
 /* Pull parsers.  */
 #define YYPULL 1
@@ -72,6 +72,7 @@
 
 #include "beancount/parser/macros.h"
 #include "beancount/parser/grammar.h"
+#include "beancount/parser/decimal.h"
 #include "beancount/parser/lexer.h"
 
 extern YY_DECL;
@@ -90,6 +91,23 @@ extern YY_DECL;
         YYERROR;                                                                \
     }
 
+/*
+ * Like BUILDY, but first try to build the target with the given fast path
+ * expression. It evaluates to NULL without raising an exception for the cases
+ * it does not handle, and the builder method is called for those.
+ */
+#define BUILDY_FAST(clean, target, fast, method_name, format, ...)              \
+    target = fast;                                                              \
+    if (target == NULL && !PyErr_Occurred()) {                                  \
+        target = PyObject_CallMethod(builder, method_name, "Oi" format,         \
+                                     FILENAME, LINENO, ## __VA_ARGS__);         \
+    }                                                                           \
+    clean;                                                                      \
+    if (target == NULL) {                                                       \
+        build_grammar_error_from_exception(&yyloc, builder);                    \
+        YYERROR;                                                                \
+    }
+
 #define FILENAME (yyloc).file_name
 #define LINENO (yyloc).first_line
 
@@ -143,8 +161,381 @@ void yyerror(YYLTYPE* loc, yyscan_t scanner, PyObject* builder, char const* mess
 
 #define DECREF(...) _CC_FUNC(Py_DECREF, __VA_ARGS__)
 
+/*
+ * Fast path construction of the common directives. These functions mirror the
+ * corresponding methods of the Python builder for the simple cases, using the
+ * objects it provides (see Builder.get_fast_path()), and return NULL without
+ * raising an exception for the others, to be handed to the builder. They
+ * return a new reference, or NULL with an exception set on error.
+ */
+
+/* Create an instance of a namedtuple type from its fields. */
+static PyObject* fastpath_tuple(PyObject* type, Py_ssize_t size, ...)
+{
+    PyObject* tuple = ((PyTypeObject*)type)->tp_alloc((PyTypeObject*)type, size);
+    if (!tuple) {
+        return NULL;
+    }
+    va_list fields;
+    va_start(fields, size);
+    for (Py_ssize_t i = 0; i < size; ++i) {
+        PyObject* field = va_arg(fields, PyObject*);
+        Py_INCREF(field);
+        PyTuple_SET_ITEM(tuple, i, field);
+    }
+    va_end(fields);
+    return tuple;
+}
+
+/* Create a new metadata dict with the location of a directive. */
+static PyObject* fastpath_metadata(PyObject* filename, int lineno)
+{
+    static PyObject* filename_key = NULL;
+    static PyObject* lineno_key = NULL;
+    if (!filename_key) {
+        filename_key = PyUnicode_InternFromString("filename");
+        lineno_key = PyUnicode_InternFromString("lineno");
+        if (!filename_key || !lineno_key) {
+            return NULL;
+        }
+    }
+
+    PyObject* pylineno = PyLong_FromLong(lineno);
+    if (!pylineno) {
+        return NULL;
+    }
+    PyObject* meta = PyDict_New();
+    if (!meta ||
+        PyDict_SetItem(meta, filename_key, filename) < 0 ||
+        PyDict_SetItem(meta, lineno_key, pylineno) < 0) {
+        Py_XDECREF(meta);
+        meta = NULL;
+    }
+    Py_DECREF(pylineno);
+    return meta;
+}
+
+/* Return the interned instance of a string (a borrowed reference). */
+static PyObject* fastpath_intern(PyObject* string)
+{
+    return PyDict_SetDefault(fastpath->symbols, string, string);
+}
+
+/* See Builder.account(). Only the names known to be valid are handled. */
+static PyObject* fastpath_account(PyObject* account)
+{
+    if (!fastpath) {
+        return NULL;
+    }
+    PyObject* valid = PyDict_GetItemWithError(fastpath->valid_accounts, account);
+    Py_XINCREF(valid);
+    return valid;
+}
+
+/* Record the shape of a number in the recent numbers of the fast path. */
+static void fastpath_number_push(PyObject* number, int sign, Py_ssize_t exponent,
+                                 Py_ssize_t digits)
+{
+    NumberShape* shape = &fastpath->numbers[fastpath->numbers_next];
+    fastpath->numbers_next = (fastpath->numbers_next + 1) % FASTPATH_NUMBERS;
+    Py_INCREF(number);
+    Py_XDECREF(shape->number);
+    shape->number = number;
+    shape->sign = sign;
+    shape->exponent = exponent;
+    shape->digits = digits;
+}
+
+/* Find the shape of one of the recent numbers, or return NULL. */
+static NumberShape* fastpath_number_find(PyObject* number)
+{
+    for (int i = 0; i < FASTPATH_NUMBERS; ++i) {
+        if (fastpath->numbers[i].number == number) {
+            return &fastpath->numbers[i];
+        }
+    }
+    return NULL;
+}
+
+/* Record the shape of the number of a NUMBER token, which the lexer computed
+ * from its text. */
+static void fastpath_number_token(PyObject* number)
+{
+    if (fastpath && number_token.number == number) {
+        fastpath_number_push(number, number_token.sign, number_token.exponent,
+                             number_token.digits);
+    }
+}
+
+/* Record the shape of the negation of a number, if the shape of the number is
+ * known. Zeros are never recorded, so the negation flips the sign. It only
+ * changes the rest of the shape if the number has to be rounded, which is if it
+ * has more digits than the precision of the context. */
+static void fastpath_number_negative(PyObject* result, PyObject* number)
+{
+    NumberShape* shape;
+    if (!result || !fastpath || !(shape = fastpath_number_find(number)) ||
+        shape->digits > fastpath->precision) {
+        return;
+    }
+    fastpath_number_push(result, !shape->sign, shape->exponent, shape->digits);
+}
+
+/* Return the key of the display context counts for a number, a tuple of the
+ * currency and of the shape of the number. The shapes of the recent numbers
+ * are reused, and the others are obtained from Decimal.as_tuple(). Return NULL
+ * without setting an exception for the special values. */
+static PyObject* fastpath_dcontext_key(PyObject* number, PyObject* currency)
+{
+    static PyObject* as_tuple_name = NULL;
+    PyObject* key = NULL;
+    NumberShape* shape = fastpath_number_find(number);
+    if (shape) {
+        PyObject* sign = PyLong_FromLong(shape->sign);
+        PyObject* exponent = PyLong_FromSsize_t(shape->exponent);
+        PyObject* digits = PyLong_FromSsize_t(shape->digits);
+        if (sign && exponent && digits) {
+            key = PyTuple_Pack(4, currency, sign, exponent, digits);
+        }
+        Py_XDECREF(sign);
+        Py_XDECREF(exponent);
+        Py_XDECREF(digits);
+        return key;
+    }
+
+    if (!as_tuple_name) {
+        as_tuple_name = PyUnicode_InternFromString("as_tuple");
+        if (!as_tuple_name) {
+            return NULL;
+        }
+    }
+    PyObject* num_tuple = PyObject_CallMethodObjArgs(number, as_tuple_name, NULL);
+    if (!num_tuple) {
+        return NULL;
+    }
+    PyObject* exponent = PyTuple_GET_ITEM(num_tuple, 2);
+    if (PyLong_CheckExact(exponent)) {
+        PyObject* digits = PyLong_FromSsize_t(
+            PyTuple_GET_SIZE(PyTuple_GET_ITEM(num_tuple, 1)));
+        if (digits) {
+            key = PyTuple_Pack(4, currency, PyTuple_GET_ITEM(num_tuple, 0), exponent,
+                               digits);
+            Py_DECREF(digits);
+        }
+    }
+    Py_DECREF(num_tuple);
+    return key;
+}
+
+/* See Builder.amount(). Only finite Decimal numbers with a currency are
+ * handled. Their shape is counted into the display context counts of the
+ * builder, rather than updating its display context directly. */
+static PyObject* fastpath_amount(PyObject* number, PyObject* currency)
+{
+    if (!fastpath ||
+        Py_TYPE(number) != (PyTypeObject*)decimal_type ||
+        !PyUnicode_CheckExact(currency) ||
+        PyUnicode_GET_LENGTH(currency) == 0) {
+        return NULL;
+    }
+
+    PyObject* amount = NULL;
+    PyObject* key = NULL;
+    PyObject* count = NULL;
+    currency = fastpath_intern(currency);
+    if (!currency) {
+        return NULL;
+    }
+
+    /* Count the number in the display context counts. */
+    key = fastpath_dcontext_key(number, currency);
+    if (!key) {
+        goto done;
+    }
+    count = PyDict_GetItemWithError(fastpath->dcontext_counts, key);
+    if (count) {
+        count = PyLong_FromSsize_t(PyLong_AsSsize_t(count) + 1);
+    }
+    else if (!PyErr_Occurred()) {
+        count = PyLong_FromLong(1);
+    }
+    if (!count || PyDict_SetItem(fastpath->dcontext_counts, key, count) < 0) {
+        goto done;
+    }
+
+    amount = fastpath_tuple(fastpath->amount_type, 2, number, currency);
+
+done:
+    Py_XDECREF(count);
+    Py_XDECREF(key);
+    return amount;
+}
+
+/* See Builder.posting(). Only postings without a cost nor a price are
+ * handled. */
+static PyObject* fastpath_posting(PyObject* filename, int lineno, PyObject* account,
+                                  PyObject* units, PyObject* cost, char flag)
+{
+    if (!fastpath || cost != Py_None) {
+        return NULL;
+    }
+
+    PyObject* posting = NULL;
+    PyObject* pyflag = NULL;
+    PyObject* meta = PyObject_CallFunction(fastpath->location_meta_type, "Oi",
+                                           filename, lineno);
+    if (!meta) {
+        goto done;
+    }
+    if (flag) {
+        pyflag = PyUnicode_FromOrdinal((unsigned char)flag);
+        if (!pyflag) {
+            goto done;
+        }
+    }
+    posting = fastpath_tuple(fastpath->posting_type, 6,
+                             account, units, Py_None, Py_None,
+                             pyflag ? pyflag : Py_None, meta);
+
+done:
+    Py_XDECREF(pyflag);
+    Py_XDECREF(meta);
+    return posting;
+}
+
+/* Freeze a set of tags or links, or return the empty set. */
+static PyObject* fastpath_frozenset(PyObject* set)
+{
+    if (PySet_GET_SIZE(set) == 0) {
+        Py_INCREF(fastpath->empty_set);
+        return fastpath->empty_set;
+    }
+    return PyFrozenSet_New(set);
+}
+
+/* See Builder.transaction(). Only transactions with at most two strings, and
+ * postings without metadata, outside of pushed tags and metadata, are
+ * handled. */
+static PyObject* fastpath_transaction(PyObject* filename, int lineno, PyObject* date,
+                                      char flag, PyObject* txn_strings,
+                                      PyObject* tags_links, PyObject* postings)
+{
+    Py_ssize_t num_strings = 0;
+    if (!fastpath ||
+        PyList_GET_SIZE(fastpath->tags) > 0 ||
+        PyDict_GET_SIZE(fastpath->meta) > 0) {
+        return NULL;
+    }
+    if (txn_strings != Py_None) {
+        if (!PyList_CheckExact(txn_strings)) {
+            return NULL;
+        }
+        num_strings = PyList_GET_SIZE(txn_strings);
+        if (num_strings > 2) {
+            return NULL;
+        }
+    }
+    if (postings != Py_None) {
+        if (!PyList_CheckExact(postings)) {
+            return NULL;
+        }
+        for (Py_ssize_t i = 0; i < PyList_GET_SIZE(postings); ++i) {
+            if (Py_TYPE(PyList_GET_ITEM(postings, i)) !=
+                (PyTypeObject*)fastpath->posting_type) {
+                return NULL;
+            }
+        }
+    }
+    if (!PyTuple_Check(tags_links) ||
+        PyTuple_GET_SIZE(tags_links) != 2 ||
+        !PyAnySet_Check(PyTuple_GET_ITEM(tags_links, 0)) ||
+        !PyAnySet_Check(PyTuple_GET_ITEM(tags_links, 1))) {
+        return NULL;
+    }
+
+    PyObject* transaction = NULL;
+    PyObject* tags = NULL;
+    PyObject* links = NULL;
+    PyObject* pyflag = NULL;
+    PyObject* narration = NULL;
+    PyObject* meta = fastpath_metadata(filename, lineno);
+    if (!meta) {
+        goto done;
+    }
+
+    tags = fastpath_frozenset(PyTuple_GET_ITEM(tags_links, 0));
+    links = fastpath_frozenset(PyTuple_GET_ITEM(tags_links, 1));
+    pyflag = PyUnicode_FromOrdinal((unsigned char)flag);
+    if (num_strings) {
+        narration = PyList_GET_ITEM(txn_strings, num_strings - 1);
+        Py_INCREF(narration);
+    }
+    else {
+        narration = PyUnicode_FromStringAndSize("", 0);
+    }
+    /* The list of postings built by the grammar is not shared, use it. */
+    if (postings == Py_None) {
+        postings = PyList_New(0);
+    }
+    else {
+        Py_INCREF(postings);
+    }
+    if (!tags || !links || !pyflag || !narration || !postings) {
+        goto done;
+    }
 
-#line 148 "beancount/parser/grammar.c"
+    transaction = fastpath_tuple(fastpath->transaction_type, 8,
+                                 meta, date, pyflag,
+                                 num_strings == 2 ? PyList_GET_ITEM(txn_strings, 0) : Py_None,
+                                 narration, tags, links, postings);
+
+done:
+    Py_XDECREF(postings);
+    Py_XDECREF(narration);
+    Py_XDECREF(pyflag);
+    Py_XDECREF(links);
+    Py_XDECREF(tags);
+    Py_XDECREF(meta);
+    return transaction;
+}
+
+/* See Builder.price(). Only prices without metadata are handled. */
+static PyObject* fastpath_price(PyObject* filename, int lineno, PyObject* date,
+                                PyObject* currency, PyObject* amount, PyObject* kvlist)
+{
+    if (!fastpath || kvlist != Py_None) {
+        return NULL;
+    }
+
+    currency = fastpath_intern(currency);
+    if (!currency) {
+        return NULL;
+    }
+    PyObject* meta = fastpath_metadata(filename, lineno);
+    if (!meta) {
+        return NULL;
+    }
+    PyObject* price = fastpath_tuple(fastpath->price_type, 4, meta, date, currency, amount);
+    Py_DECREF(meta);
+    return price;
+}
+
+/* See Builder.key_value(). */
+static PyObject* fastpath_key_value(PyObject* key, PyObject* value)
+{
+    if (!fastpath) {
+        return NULL;
+    }
+
+    key = fastpath_intern(key);
+    if (!key) {
+        return NULL;
+    }
+    return fastpath_tuple(fastpath->key_value_type, 2, key, value);
+}
+
+
+#line 539 "beancount/parser/grammar.c"
 
 # ifndef YY_CAST
 #  ifdef __cplusplus
@@ -167,165 +558,7 @@ void yyerror(YYLTYPE* loc, yyscan_t scanner, PyObject* builder, char const* mess
 #  endif
 # endif
 
-/* Use api.header.include to #include this header
-   instead of duplicating it here.  */
-#ifndef YY_YY_BEANCOUNT_PARSER_GRAMMAR_H_INCLUDED
-# define YY_YY_BEANCOUNT_PARSER_GRAMMAR_H_INCLUDED
-/* Debug traces.  */
-#ifndef YYDEBUG
-# define YYDEBUG 1
-#endif
-#if YYDEBUG
-extern int yydebug;
-#endif
-/* "%code requires" blocks.  */
-#line 12 "beancount/parser/grammar.y"
-
-
-#include <stdio.h>
-#include <assert.h>
-
-#include "beancount/parser/parser.h"
-
-/* Extend default location type with file name information. */
-typedef struct YYLTYPE {
-    int first_line;
-    int first_column;
-    int last_line;
-    int last_column;
-    PyObject* file_name;
-} YYLTYPE;
-
-#define YYLTYPE_IS_DECLARED 1
-
-/* Extend defult location action to copy file name over. */
-#define YYLLOC_DEFAULT(current, rhs, N)                                 \
-    do {                                                                \
-        if (N) {                                                        \
-            (current).first_line   = YYRHSLOC(rhs, 1).first_line;       \
-            (current).first_column = YYRHSLOC(rhs, 1).first_column;     \
-            (current).last_line    = YYRHSLOC(rhs, N).last_line;        \
-            (current).last_column  = YYRHSLOC(rhs, N).last_column;      \
-            (current).file_name    = YYRHSLOC(rhs, N).file_name;        \
-        } else {                                                        \
-            (current).first_line   = (current).last_line =              \
-                YYRHSLOC(rhs, 0).last_line;                             \
-            (current).first_column = (current).last_column =            \
-                YYRHSLOC(rhs, 0).last_column;                           \
-            (current).file_name    = YYRHSLOC(rhs, 0).file_name;        \
-        }                                                               \
-    } while (0)
-
-/* Get a printable version of a token name. */
-const char* token_to_string(int token);
-
-
-#line 224 "beancount/parser/grammar.c"
-
-/* Token kinds.  */
-#ifndef YYTOKENTYPE
-# define YYTOKENTYPE
-  enum yytokentype
-  {
-    YYEMPTY = -2,
-    YYEOF = 0,                     /* "end of file"  */
-    YYerror = 256,                 /* error  */
-    YYUNDEF = 257,                 /* "invalid token"  */
-    INDENT = 258,                  /* INDENT  */
-    EOL = 259,                     /* EOL  */
-    PIPE = 260,                    /* PIPE  */
-    ATAT = 261,                    /* ATAT  */
-    AT = 262,                      /* AT  */
-    LCURLCURL = 263,               /* LCURLCURL  */
-    RCURLCURL = 264,               /* RCURLCURL  */
-    LCURL = 265,                   /* LCURL  */
-    RCURL = 266,                   /* RCURL  */
-    COMMA = 267,                   /* COMMA  */
-    TILDE = 268,                   /* TILDE  */
-    HASH = 269,                    /* HASH  */
-    ASTERISK = 270,                /* ASTERISK  */
-    SLASH = 271,                   /* SLASH  */
-    COLON = 272,                   /* COLON  */
-    PLUS = 273,                    /* PLUS  */
-    MINUS = 274,                   /* MINUS  */
-    LPAREN = 275,                  /* LPAREN  */
-    RPAREN = 276,                  /* RPAREN  */
-    FLAG = 277,                    /* FLAG  */
-    TXN = 278,                     /* TXN  */
-    BALANCE = 279,                 /* BALANCE  */
-    OPEN = 280,                    /* OPEN  */
-    CLOSE = 281,                   /* CLOSE  */
-    COMMODITY = 282,               /* COMMODITY  */
-    PAD = 283,                     /* PAD  */
-    EVENT = 284,                   /* EVENT  */
-    PRICE = 285,                   /* PRICE  */
-    NOTE = 286,                    /* NOTE  */
-    DOCUMENT = 287,                /* DOCUMENT  */
-    QUERY = 288,                   /* QUERY  */
-    CUSTOM = 289,                  /* CUSTOM  */
-    PUSHTAG = 290,                 /* PUSHTAG  */
-    POPTAG = 291,                  /* POPTAG  */
-    PUSHMETA = 292,                /* PUSHMETA  */
-    POPMETA = 293,                 /* POPMETA  */
-    OPTION = 294,                  /* OPTION  */
-    INCLUDE = 295,                 /* INCLUDE  */
-    PLUGIN = 296,                  /* PLUGIN  */
-    NONE = 297,                    /* NONE  */
-    BOOL = 298,                    /* BOOL  */
-    DATE = 299,                    /* DATE  */
-    ACCOUNT = 300,                 /* ACCOUNT  */
-    CURRENCY = 301,                /* CURRENCY  */
-    STRING = 302,                  /* STRING  */
-    NUMBER = 303,                  /* NUMBER  */
-    TAG = 304,                     /* TAG  */
-    LINK = 305,                    /* LINK  */
-    KEY = 306,                     /* KEY  */
-    NEGATIVE = 307                 /* NEGATIVE  */
-  };
-  typedef enum yytokentype yytoken_kind_t;
-#endif
-
-/* Value type.  */
-#if ! defined YYSTYPE && ! defined YYSTYPE_IS_DECLARED
-union YYSTYPE
-{
-#line 145 "beancount/parser/grammar.y"
-
-    char character;
-    const char* string;
-    PyObject* pyobj;
-    struct {
-        PyObject* pyobj1;
-        PyObject* pyobj2;
-    } pairobj;
-
-#line 303 "beancount/parser/grammar.c"
-
-};
-typedef union YYSTYPE YYSTYPE;
-# define YYSTYPE_IS_TRIVIAL 1
-# define YYSTYPE_IS_DECLARED 1
-#endif
-
-/* Location type.  */
-#if ! defined YYLTYPE && ! defined YYLTYPE_IS_DECLARED
-typedef struct YYLTYPE YYLTYPE;
-struct YYLTYPE
-{
-  int first_line;
-  int first_column;
-  int last_line;
-  int last_column;
-};
-# define YYLTYPE_IS_DECLARED 1
-# define YYLTYPE_IS_TRIVIAL 1
-#endif
-
-
-
-int yyparse (yyscan_t scanner, PyObject* builder);
-
-#endif /* !YY_YY_BEANCOUNT_PARSER_GRAMMAR_H_INCLUDED  */
+#include "grammar.h"
 /* Symbol kind.  */
 enum yysymbol_kind_t
 {
@@ -478,6 +711,18 @@ typedef int_least16_t yytype_int16;
 typedef short yytype_int16;
 #endif
 
+/* Work around bug in HP-UX 11.23, which defines these macros
+   incorrectly for preprocessor constants.  This workaround can likely
+   be removed in 2023, as HPE has promised support for HP-UX 11.23
+   (aka HP-UX 11i v2) only through the end of 2022; see Table 2 of
+   <https://h20195.www2.hpe.com/V2/getpdf.aspx/4AA4-7673ENW.pdf>.  */
+#ifdef __hpux
+# undef UINT_LEAST8_MAX
+# undef UINT_LEAST16_MAX
+# define UINT_LEAST8_MAX 255
+# define UINT_LEAST16_MAX 65535
+#endif
+
 #if defined __UINT_LEAST8_MAX__ && __UINT_LEAST8_MAX__ <= __INT_MAX__
 typedef __UINT_LEAST8_TYPE__ yytype_uint8;
 #elif (!defined __UINT_LEAST8_MAX__ && defined YY_STDINT_H \
@@ -575,17 +820,23 @@ typedef int yy_state_fast_t;
 
 /* Suppress unused-variable warnings by "using" E.  */
 #if ! defined lint || defined __GNUC__
-# define YYUSE(E) ((void) (E))
+# define YY_USE(E) ((void) (E))
 #else
-# define YYUSE(E) /* empty */
+# define YY_USE(E) /* empty */
 #endif
 
-#if defined __GNUC__ && ! defined __ICC && 407 <= __GNUC__ * 100 + __GNUC_MINOR__
 /* Suppress an incorrect diagnostic about yylval being uninitialized.  */
-# define YY_IGNORE_MAYBE_UNINITIALIZED_BEGIN                            \
+#if defined __GNUC__ && ! defined __ICC && 406 <= __GNUC__ * 100 + __GNUC_MINOR__
+# if __GNUC__ * 100 + __GNUC_MINOR__ < 407
+#  define YY_IGNORE_MAYBE_UNINITIALIZED_BEGIN                           \
+    _Pragma ("GCC diagnostic push")                                     \
+    _Pragma ("GCC diagnostic ignored \"-Wuninitialized\"")
+# else
+#  define YY_IGNORE_MAYBE_UNINITIALIZED_BEGIN                           \
     _Pragma ("GCC diagnostic push")                                     \
     _Pragma ("GCC diagnostic ignored \"-Wuninitialized\"")              \
     _Pragma ("GCC diagnostic ignored \"-Wmaybe-uninitialized\"")
+# endif
 # define YY_IGNORE_MAYBE_UNINITIALIZED_END      \
     _Pragma ("GCC diagnostic pop")
 #else
@@ -618,30 +869,6 @@ typedef int yy_state_fast_t;
 
 /* The parser invokes alloca or malloc; define the necessary symbols.  */
 
-# ifdef YYSTACK_USE_ALLOCA
-#  if YYSTACK_USE_ALLOCA
-#   ifdef __GNUC__
-#    define YYSTACK_ALLOC __builtin_alloca
-#   elif defined __BUILTIN_VA_ARG_INCR
-#    include <alloca.h> /* INFRINGES ON USER NAME SPACE */
-#   elif defined _AIX
-#    define YYSTACK_ALLOC __alloca
-#   elif defined _MSC_VER
-#    include <malloc.h> /* INFRINGES ON USER NAME SPACE */
-#    define alloca _alloca
-#   else
-#    define YYSTACK_ALLOC alloca
-#    if ! defined _ALLOCA_H && ! defined EXIT_SUCCESS
-#     include <stdlib.h> /* INFRINGES ON USER NAME SPACE */
-      /* Use EXIT_SUCCESS as a witness for stdlib.h.  */
-#     ifndef EXIT_SUCCESS
-#      define EXIT_SUCCESS 0
-#     endif
-#    endif
-#   endif
-#  endif
-# endif
-
 # ifdef YYSTACK_ALLOC
    /* Pacify GCC's 'empty if-body' warning.  */
 #  define YYSTACK_FREE(Ptr) do { /* empty */; } while (0)
@@ -758,6 +985,7 @@ union yyalloc
 /* YYNSTATES -- Number of states.  */
 #define YYNSTATES  223
 
+/* YYMAXUTOK -- Last valid token kind.  */
 #define YYMAXUTOK   307
 
 
@@ -806,23 +1034,23 @@ static const yytype_int8 yytranslate[] =
 };
 
 #if YYDEBUG
-  /* YYRLINE[YYN] -- Source line where rule number YYN was defined.  */
+/* YYRLINE[YYN] -- Source line where rule number YYN was defined.  */
 static const yytype_int16 yyrline[] =
 {
-       0,   277,   277,   281,   285,   289,   294,   295,   301,   302,
-     307,   312,   317,   322,   327,   331,   336,   341,   346,   353,
-     358,   363,   369,   375,   379,   383,   387,   389,   391,   397,
-     402,   407,   412,   418,   424,   429,   430,   431,   432,   433,
-     434,   435,   436,   437,   438,   444,   449,   453,   458,   463,
-     469,   474,   478,   484,   489,   494,   500,   506,   512,   521,
-     527,   534,   535,   541,   547,   553,   559,   565,   571,   579,
-     586,   587,   593,   594,   600,   605,   610,   617,   623,   628,
-     633,   639,   644,   649,   655,   656,   657,   658,   664,   670,
-     676,   682,   688,   690,   696,   701,   706,   711,   716,   721,
-     731,   736,   742,   748,   749,   750,   751,   752,   753,   754,
-     755,   756,   757,   758,   759,   761,   767,   773,   778,   784,
-     785,   786,   787,   788,   789,   790,   792,   793,   794,   799,
-     817,   824
+       0,   669,   669,   673,   677,   681,   686,   687,   693,   698,
+     703,   708,   713,   718,   724,   728,   733,   738,   743,   750,
+     755,   760,   766,   773,   777,   781,   785,   787,   789,   796,
+     802,   807,   812,   819,   826,   831,   832,   833,   834,   835,
+     836,   837,   838,   839,   840,   846,   851,   855,   860,   865,
+     871,   876,   880,   886,   891,   896,   902,   908,   914,   923,
+     929,   936,   937,   943,   949,   955,   961,   967,   974,   983,
+     991,   992,   998,   999,  1005,  1010,  1015,  1022,  1029,  1034,
+    1039,  1045,  1050,  1055,  1061,  1062,  1063,  1064,  1070,  1077,
+    1083,  1089,  1095,  1097,  1103,  1108,  1113,  1118,  1123,  1128,
+    1138,  1143,  1149,  1155,  1156,  1157,  1158,  1159,  1160,  1161,
+    1162,  1163,  1164,  1165,  1166,  1168,  1174,  1180,  1185,  1191,
+    1192,  1193,  1194,  1195,  1196,  1197,  1199,  1200,  1201,  1206,
+    1224,  1231
 };
 #endif
 
@@ -865,20 +1093,6 @@ yysymbol_name (yysymbol_kind_t yysymbol)
 }
 #endif
 
-#ifdef YYPRINT
-/* YYTOKNUM[NUM] -- (External) token number corresponding to the
-   (internal) symbol number NUM (which must be that of a token).  */
-static const yytype_int16 yytoknum[] =
-{
-       0,   256,   257,   258,   259,   260,   261,   262,   263,   264,
-     265,   266,   267,   268,   269,   270,   271,   272,   273,   274,
-     275,   276,   277,   278,   279,   280,   281,   282,   283,   284,
-     285,   286,   287,   288,   289,   290,   291,   292,   293,   294,
-     295,   296,   297,   298,   299,   300,   301,   302,   303,   304,
-     305,   306,   307
-};
-#endif
-
 #define YYPACT_NINF (-110)
 
 #define yypact_value_is_default(Yyn) \
@@ -889,8 +1103,8 @@ static const yytype_int16 yytoknum[] =
 #define yytable_value_is_error(Yyn) \
   0
 
-  /* YYPACT[STATE-NUM] -- Index in YYTABLE of the portion describing
-     STATE-NUM.  */
+/* YYPACT[STATE-NUM] -- Index in YYTABLE of the portion describing
+   STATE-NUM.  */
 static const yytype_int16 yypact[] =
 {
     -110,   131,     9,  -110,  -110,  -110,   -34,   -23,   -16,   -10,
@@ -918,9 +1132,9 @@ static const yytype_int16 yypact[] =
     -110,  -110,  -110
 };
 
-  /* YYDEFACT[STATE-NUM] -- Default reduction number in state STATE-NUM.
-     Performed when YYTABLE does not specify something else to do.  Zero
-     means the default is an error.  */
+/* YYDEFACT[STATE-NUM] -- Default reduction number in state STATE-NUM.
+   Performed when YYTABLE does not specify something else to do.  Zero
+   means the default is an error.  */
 static const yytype_uint8 yydefact[] =
 {
      130,     0,     0,   131,   129,   126,     0,     0,     0,     0,
@@ -948,7 +1162,7 @@ static const yytype_uint8 yydefact[] =
       31,    30,    76
 };
 
-  /* YYPGOTO[NTERM-NUM].  */
+/* YYPGOTO[NTERM-NUM].  */
 static const yytype_int16 yypgoto[] =
 {
     -110,  -110,   -37,   -61,  -110,  -109,  -110,  -110,   -43,   -36,
@@ -959,10 +1173,10 @@ static const yytype_int16 yypgoto[] =
     -110,  -110
 };
 
-  /* YYDEFGOTO[NTERM-NUM].  */
-static const yytype_int16 yydefgoto[] =
+/* YYDEFGOTO[NTERM-NUM].  */
+static const yytype_uint8 yydefgoto[] =
 {
-      -1,    59,    62,   189,    83,   118,    14,   185,   215,    72,
+       0,    59,    62,   189,    83,   118,    14,   185,   215,    72,
      177,   174,   162,    96,   170,   133,   104,    15,    16,    17,
       18,    19,   132,    20,    21,    22,    23,    97,   102,   190,
      193,   202,   216,   196,   203,   204,    24,    25,    26,    27,
@@ -970,9 +1184,9 @@ static const yytype_int16 yydefgoto[] =
        1,     2
 };
 
-  /* YYTABLE[YYPACT[STATE-NUM]] -- What to do in state STATE-NUM.  If
-     positive, shift that token.  If negative, reduce the rule whose
-     number is the opposite.  If YYTABLE_NINF, syntax error.  */
+/* YYTABLE[YYPACT[STATE-NUM]] -- What to do in state STATE-NUM.  If
+   positive, shift that token.  If negative, reduce the rule whose
+   number is the opposite.  If YYTABLE_NINF, syntax error.  */
 static const yytype_int16 yytable[] =
 {
       63,   116,    65,    94,   139,    68,    70,   210,    60,    35,
@@ -1035,8 +1249,8 @@ static const yytype_int16 yycheck[] =
       29,    30,    31,    32,    33,    34
 };
 
-  /* YYSTOS[STATE-NUM] -- The (internal number of the) accessing
-     symbol of state STATE-NUM.  */
+/* YYSTOS[STATE-NUM] -- The symbol kind of the accessing symbol of
+   state STATE-NUM.  */
 static const yytype_int8 yystos[] =
 {
        0,   103,   104,     0,     1,     4,    35,    36,    37,    38,
@@ -1064,7 +1278,7 @@ static const yytype_int8 yystos[] =
       55,    55,    46
 };
 
-  /* YYR1[YYN] -- Symbol number of symbol that rule YYN derives.  */
+/* YYR1[RULE-NUM] -- Symbol kind of the left-hand side of rule RULE-NUM.  */
 static const yytype_int8 yyr1[] =
 {
        0,    53,    54,    54,    54,    54,    55,    55,    56,    56,
@@ -1083,7 +1297,7 @@ static const yytype_int8 yyr1[] =
      103,   104
 };
 
-  /* YYR2[YYN] -- Number of symbols on the right hand side of rule YYN.  */
+/* YYR2[RULE-NUM] -- Number of symbols on the right-hand side of rule RULE-NUM.  */
 static const yytype_int8 yyr2[] =
 {
        0,     2,     1,     1,     1,     1,     1,     1,     1,     3,
@@ -1111,6 +1325,7 @@ enum { YYENOMEM = -2 };
 #define YYACCEPT        goto yyacceptlab
 #define YYABORT         goto yyabortlab
 #define YYERROR         goto yyerrorlab
+#define YYNOMEM         goto yyexhaustedlab
 
 
 #define YYRECOVERING()  (!!yyerrstatus)
@@ -1178,12 +1393,19 @@ do {                                            \
 } while (0)
 
 
-/* YY_LOCATION_PRINT -- Print the location on the stream.
+/* YYLOCATION_PRINT -- Print the location on the stream.
    This macro was not mandated originally: define only if we know
    we won't break user code: when these are the locations we know.  */
 
-# ifndef YY_LOCATION_PRINT
-#  if defined YYLTYPE_IS_TRIVIAL && YYLTYPE_IS_TRIVIAL
+# ifndef YYLOCATION_PRINT
+
+#  if defined YY_LOCATION_PRINT
+
+   /* Temporary convenience wrapper in case some people defined the
+      undocumented and private YY_LOCATION_PRINT macros.  */
+#   define YYLOCATION_PRINT(File, Loc)  YY_LOCATION_PRINT(File, *(Loc))
+
+#  elif defined YYLTYPE_IS_TRIVIAL && YYLTYPE_IS_TRIVIAL
 
 /* Print *YYLOCP on YYO.  Private, do not rely on its existence. */
 
@@ -1211,15 +1433,23 @@ yy_location_print_ (FILE *yyo, YYLTYPE const * const yylocp)
         res += YYFPRINTF (yyo, "-%d", end_col);
     }
   return res;
- }
+}
+
+#   define YYLOCATION_PRINT  yy_location_print_
 
-#   define YY_LOCATION_PRINT(File, Loc)          \
-  yy_location_print_ (File, &(Loc))
+    /* Temporary convenience wrapper in case some people defined the
+       undocumented and private YY_LOCATION_PRINT macros.  */
+#   define YY_LOCATION_PRINT(File, Loc)  YYLOCATION_PRINT(File, &(Loc))
 
 #  else
-#   define YY_LOCATION_PRINT(File, Loc) ((void) 0)
+
+#   define YYLOCATION_PRINT(File, Loc) ((void) 0)
+    /* Temporary convenience wrapper in case some people defined the
+       undocumented and private YY_LOCATION_PRINT macros.  */
+#   define YY_LOCATION_PRINT  YYLOCATION_PRINT
+
 #  endif
-# endif /* !defined YY_LOCATION_PRINT */
+# endif /* !defined YYLOCATION_PRINT */
 
 
 # define YY_SYMBOL_PRINT(Title, Kind, Value, Location)                    \
@@ -1243,18 +1473,14 @@ yy_symbol_value_print (FILE *yyo,
                        yysymbol_kind_t yykind, YYSTYPE const * const yyvaluep, YYLTYPE const * const yylocationp, yyscan_t scanner, PyObject* builder)
 {
   FILE *yyoutput = yyo;
-  YYUSE (yyoutput);
-  YYUSE (yylocationp);
-  YYUSE (scanner);
-  YYUSE (builder);
+  YY_USE (yyoutput);
+  YY_USE (yylocationp);
+  YY_USE (scanner);
+  YY_USE (builder);
   if (!yyvaluep)
     return;
-# ifdef YYPRINT
-  if (yykind < YYNTOKENS)
-    YYPRINT (yyo, yytoknum[yykind], *yyvaluep);
-# endif
   YY_IGNORE_MAYBE_UNINITIALIZED_BEGIN
-  YYUSE (yykind);
+  YY_USE (yykind);
   YY_IGNORE_MAYBE_UNINITIALIZED_END
 }
 
@@ -1270,7 +1496,7 @@ yy_symbol_print (FILE *yyo,
   YYFPRINTF (yyo, "%s %s (",
              yykind < YYNTOKENS ? "token" : "nterm", yysymbol_name (yykind));
 
-  YY_LOCATION_PRINT (yyo, *yylocationp);
+  YYLOCATION_PRINT (yyo, yylocationp);
   YYFPRINTF (yyo, ": ");
   yy_symbol_value_print (yyo, yykind, yyvaluep, yylocationp, scanner, builder);
   YYFPRINTF (yyo, ")");
@@ -1357,12 +1583,46 @@ int yydebug;
 #ifndef YYMAXDEPTH
 # define YYMAXDEPTH 10000
 #endif
+/* Parser data structure.  */
+struct yypstate
+  {
+    /* Number of syntax errors so far.  */
+    int yynerrs;
+
+    yy_state_fast_t yystate;
+    /* Number of tokens to shift before error messages enabled.  */
+    int yyerrstatus;
+
+    /* Refer to the stacks through separate pointers, to allow yyoverflow
+       to reallocate them elsewhere.  */
+
+    /* Their size.  */
+    YYPTRDIFF_T yystacksize;
+
+    /* The state stack: array, bottom, top.  */
+    yy_state_t yyssa[YYINITDEPTH];
+    yy_state_t *yyss;
+    yy_state_t *yyssp;
+
+    /* The semantic value stack: array, bottom, top.  */
+    YYSTYPE yyvsa[YYINITDEPTH];
+    YYSTYPE *yyvs;
+    YYSTYPE *yyvsp;
+
+    /* The location stack: array, bottom, top.  */
+    YYLTYPE yylsa[YYINITDEPTH];
+    YYLTYPE *yyls;
+    YYLTYPE *yylsp;
+    /* Whether this instance has not started parsing yet.
+     * If 2, it corresponds to a finished parsing.  */
+    int yynew;
+  };
 
 
 /* Context of a parse error.  */
 typedef struct
 {
-  yy_state_t *yyssp;
+  yypstate* yyps;
   yysymbol_kind_t yytoken;
   YYLTYPE *yylloc;
 } yypcontext_t;
@@ -1374,12 +1634,12 @@ typedef struct
    Return 0 if there are more than YYARGN expected tokens, yet fill
    YYARG up to YYARGN. */
 static int
-yypcontext_expected_tokens (const yypcontext_t *yyctx,
-                            yysymbol_kind_t yyarg[], int yyargn)
+yypstate_expected_tokens (yypstate *yyps,
+                          yysymbol_kind_t yyarg[], int yyargn)
 {
   /* Actual size of YYARG. */
   int yycount = 0;
-  int yyn = yypact[+*yyctx->yyssp];
+  int yyn = yypact[+*yyps->yyssp];
   if (!yypact_value_is_default (yyn))
     {
       /* Start YYX at -YYN if negative to avoid negative indexes in
@@ -1408,6 +1668,13 @@ yypcontext_expected_tokens (const yypcontext_t *yyctx,
 }
 
 
+/* Similar to the previous function.  */
+static int
+yypcontext_expected_tokens (const yypcontext_t *yyctx,
+                            yysymbol_kind_t yyarg[], int yyargn)
+{
+  return yypstate_expected_tokens (yyctx->yyps, yyarg, yyargn);
+}
 
 
 #ifndef yystrlen
@@ -1639,16 +1906,16 @@ static void
 yydestruct (const char *yymsg,
             yysymbol_kind_t yykind, YYSTYPE *yyvaluep, YYLTYPE *yylocationp, yyscan_t scanner, PyObject* builder)
 {
-  YYUSE (yyvaluep);
-  YYUSE (yylocationp);
-  YYUSE (scanner);
-  YYUSE (builder);
+  YY_USE (yyvaluep);
+  YY_USE (yylocationp);
+  YY_USE (scanner);
+  YY_USE (builder);
   if (!yymsg)
     yymsg = "Deleting";
   YY_SYMBOL_PRINT (yymsg, yykind, yyvaluep, yylocationp);
 
   YY_IGNORE_MAYBE_UNINITIALIZED_BEGIN
-  YYUSE (yykind);
+  YY_USE (yykind);
   YY_IGNORE_MAYBE_UNINITIALIZED_END
 }
 
@@ -1656,15 +1923,119 @@ yydestruct (const char *yymsg,
 
 
 
+int
+yyparse (yyscan_t scanner, PyObject* builder)
+{
+  yypstate *yyps = yypstate_new ();
+  if (!yyps)
+    {
+      static YYLTYPE yyloc_default
+# if defined YYLTYPE_IS_TRIVIAL && YYLTYPE_IS_TRIVIAL
+  = { 1, 1, 1, 1 }
+# endif
+;
+      YYLTYPE yylloc = yyloc_default;
+      yyerror (&yylloc, scanner, builder, YY_("memory exhausted"));
+      return 2;
+    }
+  int yystatus = yypull_parse (yyps, scanner, builder);
+  yypstate_delete (yyps);
+  return yystatus;
+}
+
+int
+yypull_parse (yypstate *yyps, yyscan_t scanner, PyObject* builder)
+{
+  YY_ASSERT (yyps);
+  static YYLTYPE yyloc_default
+# if defined YYLTYPE_IS_TRIVIAL && YYLTYPE_IS_TRIVIAL
+  = { 1, 1, 1, 1 }
+# endif
+;
+  YYLTYPE yylloc = yyloc_default;
+  int yystatus;
+  do {
+    YYSTYPE yylval;
+    int yychar = yylex (&yylval, &yylloc, scanner, builder);
+    yystatus = yypush_parse (yyps, yychar, &yylval, &yylloc, scanner, builder);
+  } while (yystatus == YYPUSH_MORE);
+  return yystatus;
+}
 
-/*----------.
-| yyparse.  |
-`----------*/
+#define yynerrs yyps->yynerrs
+#define yystate yyps->yystate
+#define yyerrstatus yyps->yyerrstatus
+#define yyssa yyps->yyssa
+#define yyss yyps->yyss
+#define yyssp yyps->yyssp
+#define yyvsa yyps->yyvsa
+#define yyvs yyps->yyvs
+#define yyvsp yyps->yyvsp
+#define yylsa yyps->yylsa
+#define yyls yyps->yyls
+#define yylsp yyps->yylsp
+#define yystacksize yyps->yystacksize
+
+/* Initialize the parser data structure.  */
+static void
+yypstate_clear (yypstate *yyps)
+{
+  yynerrs = 0;
+  yystate = 0;
+  yyerrstatus = 0;
+
+  yyssp = yyss;
+  yyvsp = yyvs;
+  yylsp = yyls;
+
+  /* Initialize the state stack, in case yypcontext_expected_tokens is
+     called before the first call to yyparse. */
+  *yyssp = 0;
+  yyps->yynew = 1;
+}
+
+/* Initialize the parser data structure.  */
+yypstate *
+yypstate_new (void)
+{
+  yypstate *yyps;
+  yyps = YY_CAST (yypstate *, YYMALLOC (sizeof *yyps));
+  if (!yyps)
+    return YY_NULLPTR;
+  yystacksize = YYINITDEPTH;
+  yyss = yyssa;
+  yyvs = yyvsa;
+  yyls = yylsa;
+  yypstate_clear (yyps);
+  return yyps;
+}
+
+void
+yypstate_delete (yypstate *yyps)
+{
+  if (yyps)
+    {
+#ifndef yyoverflow
+      /* If the stack was reallocated but the parse did not complete, then the
+         stack still needs to be freed.  */
+      if (yyss != yyssa)
+        YYSTACK_FREE (yyss);
+#endif
+      YYFREE (yyps);
+    }
+}
+
+
+
+/*---------------.
+| yypush_parse.  |
+`---------------*/
 
 int
-yyparse (yyscan_t scanner, PyObject* builder)
+yypush_parse (yypstate *yyps,
+              int yypushed_char, YYSTYPE const *yypushed_val, YYLTYPE *yypushed_loc, yyscan_t scanner, PyObject* builder)
 {
-/* The lookahead symbol.  */
+/* Lookahead token kind.  */
 int yychar;
 
 
@@ -1682,43 +2053,10 @@ static YYLTYPE yyloc_default
 ;
 YYLTYPE yylloc = yyloc_default;
 
-    /* Number of syntax errors so far.  */
-    int yynerrs;
-
-    yy_state_fast_t yystate;
-    /* Number of tokens to shift before error messages enabled.  */
-    int yyerrstatus;
-
-    /* The stacks and their tools:
-       'yyss': related to states.
-       'yyvs': related to semantic values.
-       'yyls': related to locations.
-
-       Refer to the stacks through separate pointers, to allow yyoverflow
-       to reallocate them elsewhere.  */
-
-    /* Their size.  */
-    YYPTRDIFF_T yystacksize;
-
-    /* The state stack.  */
-    yy_state_t yyssa[YYINITDEPTH];
-    yy_state_t *yyss;
-    yy_state_t *yyssp;
-
-    /* The semantic value stack.  */
-    YYSTYPE yyvsa[YYINITDEPTH];
-    YYSTYPE *yyvs;
-    YYSTYPE *yyvsp;
-
-    /* The location stack.  */
-    YYLTYPE yylsa[YYINITDEPTH];
-    YYLTYPE *yyls;
-    YYLTYPE *yylsp;
-
   int yyn;
   /* The return value of yyparse.  */
   int yyresult;
-  /* Lookahead token as an internal (translated) token number.  */
+  /* Lookahead symbol kind.  */
   yysymbol_kind_t yytoken = YYSYMBOL_YYEMPTY;
   /* The variables used to return semantic value and location from the
      action routines.  */
@@ -1739,20 +2077,25 @@ YYLTYPE yylloc = yyloc_default;
      Keep to zero when no symbol should be popped.  */
   int yylen = 0;
 
-  yynerrs = 0;
-  yystate = 0;
-  yyerrstatus = 0;
+  switch (yyps->yynew)
+    {
+    case 0:
+      yyn = yypact[yystate];
+      goto yyread_pushed_token;
 
-  yystacksize = YYINITDEPTH;
-  yyssp = yyss = yyssa;
-  yyvsp = yyvs = yyvsa;
-  yylsp = yyls = yylsa;
+    case 2:
+      yypstate_clear (yyps);
+      break;
 
+    default:
+      break;
+    }
 
   YYDPRINTF ((stderr, "Starting parse\n"));
 
   yychar = YYEMPTY; /* Cause a token to be read.  */
-  yylsp[0] = yylloc;
+
+  yylsp[0] = *yypushed_loc;
   goto yysetstate;
 
 
@@ -1778,7 +2121,7 @@ yysetstate:
 
   if (yyss + yystacksize - 1 <= yyssp)
 #if !defined yyoverflow && !defined YYSTACK_RELOCATE
-    goto yyexhaustedlab;
+    YYNOMEM;
 #else
     {
       /* Get the current used size of the three stacks, in elements.  */
@@ -1809,7 +2152,7 @@ yysetstate:
 # else /* defined YYSTACK_RELOCATE */
       /* Extend the stack our own way.  */
       if (YYMAXDEPTH <= yystacksize)
-        goto yyexhaustedlab;
+        YYNOMEM;
       yystacksize *= 2;
       if (YYMAXDEPTH < yystacksize)
         yystacksize = YYMAXDEPTH;
@@ -1820,7 +2163,7 @@ yysetstate:
           YY_CAST (union yyalloc *,
                    YYSTACK_ALLOC (YY_CAST (YYSIZE_T, YYSTACK_BYTES (yystacksize))));
         if (! yyptr)
-          goto yyexhaustedlab;
+          YYNOMEM;
         YYSTACK_RELOCATE (yyss_alloc, yyss);
         YYSTACK_RELOCATE (yyvs_alloc, yyvs);
         YYSTACK_RELOCATE (yyls_alloc, yyls);
@@ -1844,6 +2187,7 @@ yysetstate:
     }
 #endif /* !defined yyoverflow && !defined YYSTACK_RELOCATE */
 
+
   if (yystate == YYFINAL)
     YYACCEPT;
 
@@ -1867,8 +2211,20 @@ yybackup:
   /* YYCHAR is either empty, or end-of-input, or a valid lookahead.  */
   if (yychar == YYEMPTY)
     {
+      if (!yyps->yynew)
+        {
+          YYDPRINTF ((stderr, "Return for a new token:\n"));
+          yyresult = YYPUSH_MORE;
+          goto yypushreturn;
+        }
+      yyps->yynew = 0;
+yyread_pushed_token:
       YYDPRINTF ((stderr, "Reading a token\n"));
-      yychar = yylex (&yylval, &yylloc, scanner, builder);
+      yychar = yypushed_char;
+      if (yypushed_val)
+        yylval = *yypushed_val;
+      if (yypushed_loc)
+        yylloc = *yypushed_loc;
     }
 
   if (yychar <= YYEOF)
@@ -1959,375 +2315,390 @@ yyreduce:
   YY_REDUCE_PRINT (yyn);
   switch (yyn)
     {
-  case 2:
-#line 278 "beancount/parser/grammar.y"
+  case 2: /* txn: TXN  */
+#line 670 "beancount/parser/grammar.y"
     {
         (yyval.character) = '*';
     }
-#line 1968 "beancount/parser/grammar.c"
+#line 2324 "beancount/parser/grammar.c"
     break;
 
-  case 3:
-#line 282 "beancount/parser/grammar.y"
+  case 3: /* txn: FLAG  */
+#line 674 "beancount/parser/grammar.y"
     {
         (yyval.character) = (yyvsp[0].character);
     }
-#line 1976 "beancount/parser/grammar.c"
+#line 2332 "beancount/parser/grammar.c"
     break;
 
-  case 4:
-#line 286 "beancount/parser/grammar.y"
+  case 4: /* txn: ASTERISK  */
+#line 678 "beancount/parser/grammar.y"
     {
         (yyval.character) = '*';
     }
-#line 1984 "beancount/parser/grammar.c"
+#line 2340 "beancount/parser/grammar.c"
     break;
 
-  case 5:
-#line 290 "beancount/parser/grammar.y"
+  case 5: /* txn: HASH  */
+#line 682 "beancount/parser/grammar.y"
     {
         (yyval.character) = '#';
     }
-#line 1992 "beancount/parser/grammar.c"
+#line 2348 "beancount/parser/grammar.c"
     break;
 
-  case 9:
-#line 303 "beancount/parser/grammar.y"
+  case 8: /* number_expr: NUMBER  */
+#line 694 "beancount/parser/grammar.y"
+            {
+                (yyval.pyobj) = (yyvsp[0].pyobj);
+                fastpath_number_token((yyvsp[0].pyobj));
+            }
+#line 2357 "beancount/parser/grammar.c"
+    break;
+
+  case 9: /* number_expr: number_expr PLUS number_expr  */
+#line 699 "beancount/parser/grammar.y"
             {
                 (yyval.pyobj) = PyNumber_Add((yyvsp[-2].pyobj), (yyvsp[0].pyobj));
                 DECREF((yyvsp[-2].pyobj), (yyvsp[0].pyobj));
             }
-#line 2001 "beancount/parser/grammar.c"
+#line 2366 "beancount/parser/grammar.c"
     break;
 
-  case 10:
-#line 308 "beancount/parser/grammar.y"
+  case 10: /* number_expr: number_expr MINUS number_expr  */
+#line 704 "beancount/parser/grammar.y"
             {
                 (yyval.pyobj) = PyNumber_Subtract((yyvsp[-2].pyobj), (yyvsp[0].pyobj));
                 DECREF((yyvsp[-2].pyobj), (yyvsp[0].pyobj));
             }
-#line 2010 "beancount/parser/grammar.c"
+#line 2375 "beancount/parser/grammar.c"
     break;
 
-  case 11:
-#line 313 "beancount/parser/grammar.y"
+  case 11: /* number_expr: number_expr ASTERISK number_expr  */
+#line 709 "beancount/parser/grammar.y"
             {
                 (yyval.pyobj) = PyNumber_Multiply((yyvsp[-2].pyobj), (yyvsp[0].pyobj));
                 DECREF((yyvsp[-2].pyobj), (yyvsp[0].pyobj));
             }
-#line 2019 "beancount/parser/grammar.c"
+#line 2384 "beancount/parser/grammar.c"
     break;
 
-  case 12:
-#line 318 "beancount/parser/grammar.y"
+  case 12: /* number_expr: number_expr SLASH number_expr  */
+#line 714 "beancount/parser/grammar.y"
             {
                 (yyval.pyobj) = PyNumber_TrueDivide((yyvsp[-2].pyobj), (yyvsp[0].pyobj));
                 DECREF((yyvsp[-2].pyobj), (yyvsp[0].pyobj));
             }
-#line 2028 "beancount/parser/grammar.c"
+#line 2393 "beancount/parser/grammar.c"
     break;
 
-  case 13:
-#line 323 "beancount/parser/grammar.y"
+  case 13: /* number_expr: MINUS number_expr  */
+#line 719 "beancount/parser/grammar.y"
             {
                 (yyval.pyobj) = PyNumber_Negative((yyvsp[0].pyobj));
+                fastpath_number_negative((yyval.pyobj), (yyvsp[0].pyobj));
                 DECREF((yyvsp[0].pyobj));
             }
-#line 2037 "beancount/parser/grammar.c"
+#line 2403 "beancount/parser/grammar.c"
     break;
 
-  case 14:
-#line 328 "beancount/parser/grammar.y"
+  case 14: /* number_expr: PLUS number_expr  */
+#line 725 "beancount/parser/grammar.y"
             {
                 (yyval.pyobj) = (yyvsp[0].pyobj);
             }
-#line 2045 "beancount/parser/grammar.c"
+#line 2411 "beancount/parser/grammar.c"
     break;
 
-  case 15:
-#line 332 "beancount/parser/grammar.y"
+  case 15: /* number_expr: LPAREN number_expr RPAREN  */
+#line 729 "beancount/parser/grammar.y"
             {
                 (yyval.pyobj) = (yyvsp[-1].pyobj);
             }
-#line 2053 "beancount/parser/grammar.c"
+#line 2419 "beancount/parser/grammar.c"
     break;
 
-  case 16:
-#line 337 "beancount/parser/grammar.y"
+  case 16: /* txn_strings: %empty  */
+#line 734 "beancount/parser/grammar.y"
             {
                 Py_INCREF(Py_None);
                 (yyval.pyobj) = Py_None;
             }
-#line 2062 "beancount/parser/grammar.c"
+#line 2428 "beancount/parser/grammar.c"
     break;
 
-  case 17:
-#line 342 "beancount/parser/grammar.y"
+  case 17: /* txn_strings: txn_strings STRING  */
+#line 739 "beancount/parser/grammar.y"
             {
                 BUILDY(DECREF((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                        (yyval.pyobj), "handle_list", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
             }
-#line 2071 "beancount/parser/grammar.c"
+#line 2437 "beancount/parser/grammar.c"
     break;
 
-  case 18:
-#line 347 "beancount/parser/grammar.y"
+  case 18: /* txn_strings: txn_strings PIPE  */
+#line 744 "beancount/parser/grammar.y"
             {
                 BUILDY(,
                        (yyval.pyobj), "pipe_deprecated_error", "");
                 (yyval.pyobj) = (yyvsp[-1].pyobj);
             }
-#line 2081 "beancount/parser/grammar.c"
+#line 2447 "beancount/parser/grammar.c"
     break;
 
-  case 19:
-#line 354 "beancount/parser/grammar.y"
+  case 19: /* tags_links: %empty  */
+#line 751 "beancount/parser/grammar.y"
            {
                BUILDY(,
                       (yyval.pyobj), "tag_link_new", "");
            }
-#line 2090 "beancount/parser/grammar.c"
+#line 2456 "beancount/parser/grammar.c"
     break;
 
-  case 20:
-#line 359 "beancount/parser/grammar.y"
+  case 20: /* tags_links: tags_links LINK  */
+#line 756 "beancount/parser/grammar.y"
            {
                BUILDY(DECREF((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                       (yyval.pyobj), "tag_link_LINK", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
            }
-#line 2099 "beancount/parser/grammar.c"
+#line 2465 "beancount/parser/grammar.c"
     break;
 
-  case 21:
-#line 364 "beancount/parser/grammar.y"
+  case 21: /* tags_links: tags_links TAG  */
+#line 761 "beancount/parser/grammar.y"
            {
                BUILDY(DECREF((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                       (yyval.pyobj), "tag_link_TAG", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
            }
-#line 2108 "beancount/parser/grammar.c"
+#line 2474 "beancount/parser/grammar.c"
     break;
 
-  case 22:
-#line 370 "beancount/parser/grammar.y"
+  case 22: /* transaction: DATE txn txn_strings tags_links eol posting_or_kv_list  */
+#line 767 "beancount/parser/grammar.y"
             {
-                BUILDY(DECREF((yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
-                       (yyval.pyobj), "transaction", "ObOOO", (yyvsp[-5].pyobj), (yyvsp[-4].character), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
+                BUILDY_FAST(DECREF((yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
+                            (yyval.pyobj), fastpath_transaction(FILENAME, LINENO, (yyvsp[-5].pyobj), (yyvsp[-4].character), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
+                            "transaction", "ObOOO", (yyvsp[-5].pyobj), (yyvsp[-4].character), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
             }
-#line 2117 "beancount/parser/grammar.c"
+#line 2484 "beancount/parser/grammar.c"
     break;
 
-  case 23:
-#line 376 "beancount/parser/grammar.y"
+  case 23: /* optflag: %empty  */
+#line 774 "beancount/parser/grammar.y"
         {
             (yyval.character) = '\0';
         }
-#line 2125 "beancount/parser/grammar.c"
+#line 2492 "beancount/parser/grammar.c"
     break;
 
-  case 24:
-#line 380 "beancount/parser/grammar.y"
+  case 24: /* optflag: ASTERISK  */
+#line 778 "beancount/parser/grammar.y"
         {
             (yyval.character) = '*';
         }
-#line 2133 "beancount/parser/grammar.c"
+#line 2500 "beancount/parser/grammar.c"
     break;
 
-  case 25:
-#line 384 "beancount/parser/grammar.y"
+  case 25: /* optflag: HASH  */
+#line 782 "beancount/parser/grammar.y"
         {
             (yyval.character) = '#';
         }
-#line 2141 "beancount/parser/grammar.c"
+#line 2508 "beancount/parser/grammar.c"
     break;
 
-  case 28:
-#line 392 "beancount/parser/grammar.y"
+  case 28: /* account: ACCOUNT  */
+#line 790 "beancount/parser/grammar.y"
         {
-            BUILDY(DECREF((yyvsp[0].pyobj)),
-                   (yyval.pyobj), "account", "O", (yyvsp[0].pyobj));
+            BUILDY_FAST(DECREF((yyvsp[0].pyobj)),
+                        (yyval.pyobj), fastpath_account((yyvsp[0].pyobj)),
+                        "account", "O", (yyvsp[0].pyobj));
         }
-#line 2150 "beancount/parser/grammar.c"
+#line 2518 "beancount/parser/grammar.c"
     break;
 
-  case 29:
-#line 398 "beancount/parser/grammar.y"
+  case 29: /* posting: INDENT optflag account incomplete_amount cost_spec eol  */
+#line 797 "beancount/parser/grammar.y"
         {
-            BUILDY(DECREF((yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[-1].pyobj)),
-                   (yyval.pyobj), "posting", "OOOOOb", (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[-1].pyobj), Py_None, Py_False, (yyvsp[-4].character));
+            BUILDY_FAST(DECREF((yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[-1].pyobj)),
+                        (yyval.pyobj), fastpath_posting(FILENAME, LINENO, (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[-1].pyobj), (yyvsp[-4].character)),
+                        "posting", "OOOOOb", (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[-1].pyobj), Py_None, Py_False, (yyvsp[-4].character));
         }
-#line 2159 "beancount/parser/grammar.c"
+#line 2528 "beancount/parser/grammar.c"
     break;
 
-  case 30:
-#line 403 "beancount/parser/grammar.y"
+  case 30: /* posting: INDENT optflag account incomplete_amount cost_spec AT price_annotation eol  */
+#line 803 "beancount/parser/grammar.y"
         {
             BUILDY(DECREF((yyvsp[-5].pyobj), (yyvsp[-4].pyobj), (yyvsp[-3].pyobj), (yyvsp[-1].pyobj)),
                    (yyval.pyobj), "posting", "OOOOOb", (yyvsp[-5].pyobj), (yyvsp[-4].pyobj), (yyvsp[-3].pyobj), (yyvsp[-1].pyobj), Py_False, (yyvsp[-6].character));
         }
-#line 2168 "beancount/parser/grammar.c"
+#line 2537 "beancount/parser/grammar.c"
     break;
 
-  case 31:
-#line 408 "beancount/parser/grammar.y"
+  case 31: /* posting: INDENT optflag account incomplete_amount cost_spec ATAT price_annotation eol  */
+#line 808 "beancount/parser/grammar.y"
         {
             BUILDY(DECREF((yyvsp[-5].pyobj), (yyvsp[-4].pyobj), (yyvsp[-3].pyobj), (yyvsp[-1].pyobj)),
                    (yyval.pyobj), "posting", "OOOOOb", (yyvsp[-5].pyobj), (yyvsp[-4].pyobj), (yyvsp[-3].pyobj), (yyvsp[-1].pyobj), Py_True, (yyvsp[-6].character));
         }
-#line 2177 "beancount/parser/grammar.c"
+#line 2546 "beancount/parser/grammar.c"
     break;
 
-  case 32:
-#line 413 "beancount/parser/grammar.y"
+  case 32: /* posting: INDENT optflag account eol  */
+#line 813 "beancount/parser/grammar.y"
         {
-            BUILDY(DECREF((yyvsp[-1].pyobj)),
-                   (yyval.pyobj), "posting", "OOOOOb", (yyvsp[-1].pyobj), missing_obj, Py_None, Py_None, Py_False, (yyvsp[-2].character));
+            BUILDY_FAST(DECREF((yyvsp[-1].pyobj)),
+                        (yyval.pyobj), fastpath_posting(FILENAME, LINENO, (yyvsp[-1].pyobj), missing_obj, Py_None, (yyvsp[-2].character)),
+                        "posting", "OOOOOb", (yyvsp[-1].pyobj), missing_obj, Py_None, Py_None, Py_False, (yyvsp[-2].character));
         }
-#line 2186 "beancount/parser/grammar.c"
+#line 2556 "beancount/parser/grammar.c"
     break;
 
-  case 33:
-#line 419 "beancount/parser/grammar.y"
+  case 33: /* key_value: KEY COLON key_value_value  */
+#line 820 "beancount/parser/grammar.y"
           {
-              BUILDY(DECREF((yyvsp[-1].string), (yyvsp[0].pyobj)),
-                     (yyval.pyobj), "key_value", "OO", (yyvsp[-1].string), (yyvsp[0].pyobj));
+              BUILDY_FAST(DECREF((yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
+                          (yyval.pyobj), fastpath_key_value((yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
+                          "key_value", "OO", (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
           }
-#line 2195 "beancount/parser/grammar.c"
+#line 2566 "beancount/parser/grammar.c"
     break;
 
-  case 34:
-#line 425 "beancount/parser/grammar.y"
+  case 34: /* key_value_line: INDENT key_value eol  */
+#line 827 "beancount/parser/grammar.y"
                {
                    (yyval.pyobj) = (yyvsp[-1].pyobj);
                }
-#line 2203 "beancount/parser/grammar.c"
+#line 2574 "beancount/parser/grammar.c"
     break;
 
-  case 44:
-#line 439 "beancount/parser/grammar.y"
+  case 44: /* key_value_value: %empty  */
+#line 841 "beancount/parser/grammar.y"
                 {
                     Py_INCREF(Py_None);
                     (yyval.pyobj) = Py_None;
                 }
-#line 2212 "beancount/parser/grammar.c"
+#line 2583 "beancount/parser/grammar.c"
     break;
 
-  case 45:
-#line 445 "beancount/parser/grammar.y"
+  case 45: /* posting_or_kv_list: %empty  */
+#line 847 "beancount/parser/grammar.y"
                    {
                        Py_INCREF(Py_None);
                        (yyval.pyobj) = Py_None;
                    }
-#line 2221 "beancount/parser/grammar.c"
+#line 2592 "beancount/parser/grammar.c"
     break;
 
-  case 46:
-#line 450 "beancount/parser/grammar.y"
+  case 46: /* posting_or_kv_list: posting_or_kv_list INDENT eol  */
+#line 852 "beancount/parser/grammar.y"
                    {
                        (yyval.pyobj) = (yyvsp[-2].pyobj);
                    }
-#line 2229 "beancount/parser/grammar.c"
+#line 2600 "beancount/parser/grammar.c"
     break;
 
-  case 47:
-#line 454 "beancount/parser/grammar.y"
+  case 47: /* posting_or_kv_list: posting_or_kv_list INDENT tags_links eol  */
+#line 856 "beancount/parser/grammar.y"
                    {
                        BUILDY(DECREF((yyvsp[-3].pyobj), (yyvsp[-1].pyobj)),
                               (yyval.pyobj), "handle_list", "OO", (yyvsp[-3].pyobj), (yyvsp[-1].pyobj));
                    }
-#line 2238 "beancount/parser/grammar.c"
+#line 2609 "beancount/parser/grammar.c"
     break;
 
-  case 48:
-#line 459 "beancount/parser/grammar.y"
+  case 48: /* posting_or_kv_list: posting_or_kv_list key_value_line  */
+#line 861 "beancount/parser/grammar.y"
                    {
                        BUILDY(DECREF((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                               (yyval.pyobj), "handle_list", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
                    }
-#line 2247 "beancount/parser/grammar.c"
+#line 2618 "beancount/parser/grammar.c"
     break;
 
-  case 49:
-#line 464 "beancount/parser/grammar.y"
+  case 49: /* posting_or_kv_list: posting_or_kv_list posting  */
+#line 866 "beancount/parser/grammar.y"
                    {
                        BUILDY(DECREF((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                               (yyval.pyobj), "handle_list", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
                    }
-#line 2256 "beancount/parser/grammar.c"
+#line 2627 "beancount/parser/grammar.c"
     break;
 
-  case 50:
-#line 470 "beancount/parser/grammar.y"
+  case 50: /* key_value_list: %empty  */
+#line 872 "beancount/parser/grammar.y"
                {
                    Py_INCREF(Py_None);
                    (yyval.pyobj) = Py_None;
                }
-#line 2265 "beancount/parser/grammar.c"
+#line 2636 "beancount/parser/grammar.c"
     break;
 
-  case 51:
-#line 475 "beancount/parser/grammar.y"
+  case 51: /* key_value_list: key_value_list INDENT eol  */
+#line 877 "beancount/parser/grammar.y"
                {
                    (yyval.pyobj) = (yyvsp[-2].pyobj);
                }
-#line 2273 "beancount/parser/grammar.c"
+#line 2644 "beancount/parser/grammar.c"
     break;
 
-  case 52:
-#line 479 "beancount/parser/grammar.y"
+  case 52: /* key_value_list: key_value_list key_value_line  */
+#line 881 "beancount/parser/grammar.y"
                {
                    BUILDY(DECREF((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                           (yyval.pyobj), "handle_list", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
                }
-#line 2282 "beancount/parser/grammar.c"
+#line 2653 "beancount/parser/grammar.c"
     break;
 
-  case 53:
-#line 485 "beancount/parser/grammar.y"
+  case 53: /* currency_list: %empty  */
+#line 887 "beancount/parser/grammar.y"
               {
                   Py_INCREF(Py_None);
                   (yyval.pyobj) = Py_None;
               }
-#line 2291 "beancount/parser/grammar.c"
+#line 2662 "beancount/parser/grammar.c"
     break;
 
-  case 54:
-#line 490 "beancount/parser/grammar.y"
+  case 54: /* currency_list: CURRENCY  */
+#line 892 "beancount/parser/grammar.y"
               {
                   BUILDY(DECREF((yyvsp[0].pyobj)),
                          (yyval.pyobj), "handle_list", "OO", Py_None, (yyvsp[0].pyobj));
               }
-#line 2300 "beancount/parser/grammar.c"
+#line 2671 "beancount/parser/grammar.c"
     break;
 
-  case 55:
-#line 495 "beancount/parser/grammar.y"
+  case 55: /* currency_list: currency_list COMMA CURRENCY  */
+#line 897 "beancount/parser/grammar.y"
               {
                   BUILDY(DECREF((yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                          (yyval.pyobj), "handle_list", "OO", (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
               }
-#line 2309 "beancount/parser/grammar.c"
+#line 2680 "beancount/parser/grammar.c"
     break;
 
-  case 56:
-#line 501 "beancount/parser/grammar.y"
+  case 56: /* pushtag: PUSHTAG TAG eol  */
+#line 903 "beancount/parser/grammar.y"
          {
              BUILDY(DECREF((yyvsp[-1].pyobj)),
                     (yyval.pyobj), "pushtag", "O", (yyvsp[-1].pyobj));
          }
-#line 2318 "beancount/parser/grammar.c"
+#line 2689 "beancount/parser/grammar.c"
     break;
 
-  case 57:
-#line 507 "beancount/parser/grammar.y"
+  case 57: /* poptag: POPTAG TAG eol  */
+#line 909 "beancount/parser/grammar.y"
        {
            BUILDY(DECREF((yyvsp[-1].pyobj)),
                   (yyval.pyobj), "poptag", "O", (yyvsp[-1].pyobj));
        }
-#line 2327 "beancount/parser/grammar.c"
+#line 2698 "beancount/parser/grammar.c"
     break;
 
-  case 58:
-#line 513 "beancount/parser/grammar.y"
+  case 58: /* pushmeta: PUSHMETA key_value eol  */
+#line 915 "beancount/parser/grammar.y"
          {
              /* Note: key_value is a tuple, Py_BuildValue() won't wrap it up
               * within a tuple, so expand in the method (it receives two
@@ -2335,314 +2706,319 @@ yyreduce:
              BUILDY(DECREF((yyvsp[-1].pyobj)),
                     (yyval.pyobj), "pushmeta", "O", (yyvsp[-1].pyobj));
          }
-#line 2339 "beancount/parser/grammar.c"
+#line 2710 "beancount/parser/grammar.c"
     break;
 
-  case 59:
-#line 522 "beancount/parser/grammar.y"
+  case 59: /* popmeta: POPMETA KEY COLON eol  */
+#line 924 "beancount/parser/grammar.y"
         {
             BUILDY(DECREF((yyvsp[-2].pyobj)),
                    (yyval.pyobj), "popmeta", "O", (yyvsp[-2].pyobj));
         }
-#line 2348 "beancount/parser/grammar.c"
+#line 2719 "beancount/parser/grammar.c"
     break;
 
-  case 60:
-#line 528 "beancount/parser/grammar.y"
+  case 60: /* open: DATE OPEN account currency_list opt_booking eol key_value_list  */
+#line 930 "beancount/parser/grammar.y"
      {
          BUILDY(DECREF((yyvsp[-6].pyobj), (yyvsp[-4].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                 (yyval.pyobj), "open", "OOOOO", (yyvsp[-6].pyobj), (yyvsp[-4].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
          ;
      }
-#line 2358 "beancount/parser/grammar.c"
+#line 2729 "beancount/parser/grammar.c"
     break;
 
-  case 62:
-#line 536 "beancount/parser/grammar.y"
+  case 62: /* opt_booking: %empty  */
+#line 938 "beancount/parser/grammar.y"
             {
                 Py_INCREF(Py_None);
                 (yyval.pyobj) = Py_None;
             }
-#line 2367 "beancount/parser/grammar.c"
+#line 2738 "beancount/parser/grammar.c"
     break;
 
-  case 63:
-#line 542 "beancount/parser/grammar.y"
+  case 63: /* close: DATE CLOSE account eol key_value_list  */
+#line 944 "beancount/parser/grammar.y"
       {
           BUILDY(DECREF((yyvsp[-4].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                  (yyval.pyobj), "close", "OOO", (yyvsp[-4].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
       }
-#line 2376 "beancount/parser/grammar.c"
+#line 2747 "beancount/parser/grammar.c"
     break;
 
-  case 64:
-#line 548 "beancount/parser/grammar.y"
+  case 64: /* commodity: DATE COMMODITY CURRENCY eol key_value_list  */
+#line 950 "beancount/parser/grammar.y"
           {
               BUILDY(DECREF((yyvsp[-4].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                      (yyval.pyobj), "commodity", "OOO", (yyvsp[-4].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
           }
-#line 2385 "beancount/parser/grammar.c"
+#line 2756 "beancount/parser/grammar.c"
     break;
 
-  case 65:
-#line 554 "beancount/parser/grammar.y"
+  case 65: /* pad: DATE PAD account account eol key_value_list  */
+#line 956 "beancount/parser/grammar.y"
     {
         BUILDY(DECREF((yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                (yyval.pyobj), "pad", "OOOO", (yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
     }
-#line 2394 "beancount/parser/grammar.c"
+#line 2765 "beancount/parser/grammar.c"
     break;
 
-  case 66:
-#line 560 "beancount/parser/grammar.y"
+  case 66: /* balance: DATE BALANCE account amount_tolerance eol key_value_list  */
+#line 962 "beancount/parser/grammar.y"
         {
             BUILDY(DECREF((yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[0].pyobj), (yyvsp[-2].pairobj).pyobj1, (yyvsp[-2].pairobj).pyobj2),
                    (yyval.pyobj), "balance", "OOOOO", (yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pairobj).pyobj1, (yyvsp[-2].pairobj).pyobj2, (yyvsp[0].pyobj));
         }
-#line 2403 "beancount/parser/grammar.c"
+#line 2774 "beancount/parser/grammar.c"
     break;
 
-  case 67:
-#line 566 "beancount/parser/grammar.y"
+  case 67: /* amount: number_expr CURRENCY  */
+#line 968 "beancount/parser/grammar.y"
        {
-           BUILDY(DECREF((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
-                  (yyval.pyobj), "amount", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
+           BUILDY_FAST(DECREF((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
+                       (yyval.pyobj), fastpath_amount((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
+                       "amount", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
        }
-#line 2412 "beancount/parser/grammar.c"
+#line 2784 "beancount/parser/grammar.c"
     break;
 
-  case 68:
-#line 572 "beancount/parser/grammar.y"
+  case 68: /* amount_tolerance: number_expr CURRENCY  */
+#line 975 "beancount/parser/grammar.y"
                  {
-                     BUILDY(DECREF((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
-                            (yyval.pairobj).pyobj1, "amount", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
+                     BUILDY_FAST(DECREF((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
+                                 (yyval.pairobj).pyobj1, fastpath_amount((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
+                                 "amount", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
                      (yyval.pairobj).pyobj2 = Py_None;
                      Py_INCREF(Py_None);
                      ;
                  }
-#line 2424 "beancount/parser/grammar.c"
+#line 2797 "beancount/parser/grammar.c"
     break;
 
-  case 69:
-#line 580 "beancount/parser/grammar.y"
+  case 69: /* amount_tolerance: number_expr TILDE number_expr CURRENCY  */
+#line 984 "beancount/parser/grammar.y"
                  {
-                     BUILDY(DECREF((yyvsp[-3].pyobj), (yyvsp[0].pyobj)),
-                            (yyval.pairobj).pyobj1, "amount", "OO", (yyvsp[-3].pyobj), (yyvsp[0].pyobj));
+                     BUILDY_FAST(DECREF((yyvsp[-3].pyobj), (yyvsp[0].pyobj)),
+                                 (yyval.pairobj).pyobj1, fastpath_amount((yyvsp[-3].pyobj), (yyvsp[0].pyobj)),
+                                 "amount", "OO", (yyvsp[-3].pyobj), (yyvsp[0].pyobj));
                      (yyval.pairobj).pyobj2 = (yyvsp[-1].pyobj);
                  }
-#line 2434 "beancount/parser/grammar.c"
+#line 2808 "beancount/parser/grammar.c"
     break;
 
-  case 71:
-#line 588 "beancount/parser/grammar.y"
+  case 71: /* maybe_number: %empty  */
+#line 993 "beancount/parser/grammar.y"
              {
                  Py_INCREF(missing_obj);
                  (yyval.pyobj) = missing_obj;
              }
-#line 2443 "beancount/parser/grammar.c"
+#line 2817 "beancount/parser/grammar.c"
     break;
 
-  case 73:
-#line 595 "beancount/parser/grammar.y"
+  case 73: /* maybe_currency: %empty  */
+#line 1000 "beancount/parser/grammar.y"
                {
                    Py_INCREF(missing_obj);
                    (yyval.pyobj) = missing_obj;
                }
-#line 2452 "beancount/parser/grammar.c"
+#line 2826 "beancount/parser/grammar.c"
     break;
 
-  case 74:
-#line 601 "beancount/parser/grammar.y"
+  case 74: /* compound_amount: maybe_number CURRENCY  */
+#line 1006 "beancount/parser/grammar.y"
                 {
                     BUILDY(DECREF((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                            (yyval.pyobj), "compound_amount", "OOO", (yyvsp[-1].pyobj), Py_None, (yyvsp[0].pyobj));
                 }
-#line 2461 "beancount/parser/grammar.c"
+#line 2835 "beancount/parser/grammar.c"
     break;
 
-  case 75:
-#line 606 "beancount/parser/grammar.y"
+  case 75: /* compound_amount: number_expr maybe_currency  */
+#line 1011 "beancount/parser/grammar.y"
                 {
                     BUILDY(DECREF((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                            (yyval.pyobj), "compound_amount", "OOO", (yyvsp[-1].pyobj), Py_None, (yyvsp[0].pyobj));
                 }
-#line 2470 "beancount/parser/grammar.c"
+#line 2844 "beancount/parser/grammar.c"
     break;
 
-  case 76:
-#line 611 "beancount/parser/grammar.y"
+  case 76: /* compound_amount: maybe_number HASH maybe_number CURRENCY  */
+#line 1016 "beancount/parser/grammar.y"
                 {
                     BUILDY(DECREF((yyvsp[-3].pyobj), (yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                            (yyval.pyobj), "compound_amount", "OOO", (yyvsp[-3].pyobj), (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
                     ;
                 }
-#line 2480 "beancount/parser/grammar.c"
+#line 2854 "beancount/parser/grammar.c"
     break;
 
-  case 77:
-#line 618 "beancount/parser/grammar.y"
+  case 77: /* incomplete_amount: maybe_number maybe_currency  */
+#line 1023 "beancount/parser/grammar.y"
                   {
-                      BUILDY(DECREF((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
-                             (yyval.pyobj), "amount", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
+                      BUILDY_FAST(DECREF((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
+                                  (yyval.pyobj), fastpath_amount((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
+                                  "amount", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
                   }
-#line 2489 "beancount/parser/grammar.c"
+#line 2864 "beancount/parser/grammar.c"
     break;
 
-  case 78:
-#line 624 "beancount/parser/grammar.y"
+  case 78: /* cost_spec: LCURL cost_comp_list RCURL  */
+#line 1030 "beancount/parser/grammar.y"
           {
               BUILDY(DECREF((yyvsp[-1].pyobj)),
                      (yyval.pyobj), "cost_spec", "OO", (yyvsp[-1].pyobj), Py_False);
           }
-#line 2498 "beancount/parser/grammar.c"
+#line 2873 "beancount/parser/grammar.c"
     break;
 
-  case 79:
-#line 629 "beancount/parser/grammar.y"
+  case 79: /* cost_spec: LCURLCURL cost_comp_list RCURLCURL  */
+#line 1035 "beancount/parser/grammar.y"
           {
               BUILDY(DECREF((yyvsp[-1].pyobj)),
                      (yyval.pyobj), "cost_spec", "OO", (yyvsp[-1].pyobj), Py_True);
           }
-#line 2507 "beancount/parser/grammar.c"
+#line 2882 "beancount/parser/grammar.c"
     break;
 
-  case 80:
-#line 634 "beancount/parser/grammar.y"
+  case 80: /* cost_spec: %empty  */
+#line 1040 "beancount/parser/grammar.y"
           {
               Py_INCREF(Py_None);
               (yyval.pyobj) = Py_None;
           }
-#line 2516 "beancount/parser/grammar.c"
+#line 2891 "beancount/parser/grammar.c"
     break;
 
-  case 81:
-#line 640 "beancount/parser/grammar.y"
+  case 81: /* cost_comp_list: %empty  */
+#line 1046 "beancount/parser/grammar.y"
                {
                    /* We indicate that there was a cost if there */
                    (yyval.pyobj) = PyList_New(0);
                }
-#line 2525 "beancount/parser/grammar.c"
+#line 2900 "beancount/parser/grammar.c"
     break;
 
-  case 82:
-#line 645 "beancount/parser/grammar.y"
+  case 82: /* cost_comp_list: cost_comp  */
+#line 1051 "beancount/parser/grammar.y"
                {
                    BUILDY(DECREF((yyvsp[0].pyobj)),
                           (yyval.pyobj), "handle_list", "OO", Py_None, (yyvsp[0].pyobj));
                }
-#line 2534 "beancount/parser/grammar.c"
+#line 2909 "beancount/parser/grammar.c"
     break;
 
-  case 83:
-#line 650 "beancount/parser/grammar.y"
+  case 83: /* cost_comp_list: cost_comp_list COMMA cost_comp  */
+#line 1056 "beancount/parser/grammar.y"
                {
                    BUILDY(DECREF((yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                           (yyval.pyobj), "handle_list", "OO", (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
                }
-#line 2543 "beancount/parser/grammar.c"
+#line 2918 "beancount/parser/grammar.c"
     break;
 
-  case 87:
-#line 659 "beancount/parser/grammar.y"
+  case 87: /* cost_comp: ASTERISK  */
+#line 1065 "beancount/parser/grammar.y"
           {
               BUILDY(,
                      (yyval.pyobj), "cost_merge", "O", Py_None);
           }
-#line 2552 "beancount/parser/grammar.c"
+#line 2927 "beancount/parser/grammar.c"
     break;
 
-  case 88:
-#line 665 "beancount/parser/grammar.y"
+  case 88: /* price: DATE PRICE CURRENCY amount eol key_value_list  */
+#line 1071 "beancount/parser/grammar.y"
       {
-          BUILDY(DECREF((yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
-                 (yyval.pyobj), "price", "OOOO", (yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
+          BUILDY_FAST(DECREF((yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
+                      (yyval.pyobj), fastpath_price(FILENAME, LINENO, (yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
+                      "price", "OOOO", (yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
       }
-#line 2561 "beancount/parser/grammar.c"
+#line 2937 "beancount/parser/grammar.c"
     break;
 
-  case 89:
-#line 671 "beancount/parser/grammar.y"
+  case 89: /* event: DATE EVENT STRING STRING eol key_value_list  */
+#line 1078 "beancount/parser/grammar.y"
       {
           BUILDY(DECREF((yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                  (yyval.pyobj), "event", "OOOO", (yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
       }
-#line 2570 "beancount/parser/grammar.c"
+#line 2946 "beancount/parser/grammar.c"
     break;
 
-  case 90:
-#line 677 "beancount/parser/grammar.y"
+  case 90: /* query: DATE QUERY STRING STRING eol key_value_list  */
+#line 1084 "beancount/parser/grammar.y"
          {
              BUILDY(DECREF((yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                     (yyval.pyobj), "query", "OOOO", (yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
          }
-#line 2579 "beancount/parser/grammar.c"
+#line 2955 "beancount/parser/grammar.c"
     break;
 
-  case 91:
-#line 683 "beancount/parser/grammar.y"
+  case 91: /* note: DATE NOTE account STRING eol key_value_list  */
+#line 1090 "beancount/parser/grammar.y"
       {
           BUILDY(DECREF((yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                  (yyval.pyobj), "note", "OOOO", (yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
       }
-#line 2588 "beancount/parser/grammar.c"
+#line 2964 "beancount/parser/grammar.c"
     break;
 
-  case 93:
-#line 691 "beancount/parser/grammar.y"
+  case 93: /* document: DATE DOCUMENT account filename tags_links eol key_value_list  */
+#line 1098 "beancount/parser/grammar.y"
          {
              BUILDY(DECREF((yyvsp[-6].pyobj), (yyvsp[-4].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                     (yyval.pyobj), "document", "OOOOO", (yyvsp[-6].pyobj), (yyvsp[-4].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
          }
-#line 2597 "beancount/parser/grammar.c"
+#line 2973 "beancount/parser/grammar.c"
     break;
 
-  case 94:
-#line 697 "beancount/parser/grammar.y"
+  case 94: /* custom_value: STRING  */
+#line 1104 "beancount/parser/grammar.y"
              {
                  BUILDY(DECREF((yyvsp[0].pyobj)),
                         (yyval.pyobj), "custom_value", "OO", (yyvsp[0].pyobj), Py_None);
              }
-#line 2606 "beancount/parser/grammar.c"
+#line 2982 "beancount/parser/grammar.c"
     break;
 
-  case 95:
-#line 702 "beancount/parser/grammar.y"
+  case 95: /* custom_value: DATE  */
+#line 1109 "beancount/parser/grammar.y"
              {
                  BUILDY(DECREF((yyvsp[0].pyobj)),
                         (yyval.pyobj), "custom_value", "OO", (yyvsp[0].pyobj), Py_None);
              }
-#line 2615 "beancount/parser/grammar.c"
+#line 2991 "beancount/parser/grammar.c"
     break;
 
-  case 96:
-#line 707 "beancount/parser/grammar.y"
+  case 96: /* custom_value: BOOL  */
+#line 1114 "beancount/parser/grammar.y"
              {
                  BUILDY(DECREF((yyvsp[0].pyobj)),
                         (yyval.pyobj), "custom_value", "OO", (yyvsp[0].pyobj), Py_None);
              }
-#line 2624 "beancount/parser/grammar.c"
+#line 3000 "beancount/parser/grammar.c"
     break;
 
-  case 97:
-#line 712 "beancount/parser/grammar.y"
+  case 97: /* custom_value: amount  */
+#line 1119 "beancount/parser/grammar.y"
              {
                  BUILDY(DECREF((yyvsp[0].pyobj)),
                         (yyval.pyobj), "custom_value", "OO", (yyvsp[0].pyobj), Py_None);
              }
-#line 2633 "beancount/parser/grammar.c"
+#line 3009 "beancount/parser/grammar.c"
     break;
 
-  case 98:
-#line 717 "beancount/parser/grammar.y"
+  case 98: /* custom_value: number_expr  */
+#line 1124 "beancount/parser/grammar.y"
              {
                  BUILDY(DECREF((yyvsp[0].pyobj)),
                         (yyval.pyobj), "custom_value", "OO", (yyvsp[0].pyobj), Py_None);
              }
-#line 2642 "beancount/parser/grammar.c"
+#line 3018 "beancount/parser/grammar.c"
     break;
 
-  case 99:
-#line 722 "beancount/parser/grammar.y"
+  case 99: /* custom_value: account  */
+#line 1129 "beancount/parser/grammar.y"
              {
                  /* Obtain beancount.core.account.TYPE */
                  PyObject* module = PyImport_ImportModule("beancount.core.account");
@@ -2651,83 +3027,83 @@ yyreduce:
                  BUILDY(DECREF((yyvsp[0].pyobj), dtype),
                         (yyval.pyobj), "custom_value", "OO", (yyvsp[0].pyobj), dtype);
              }
-#line 2655 "beancount/parser/grammar.c"
+#line 3031 "beancount/parser/grammar.c"
     break;
 
-  case 100:
-#line 732 "beancount/parser/grammar.y"
+  case 100: /* custom_value_list: %empty  */
+#line 1139 "beancount/parser/grammar.y"
                   {
                       Py_INCREF(Py_None);
                       (yyval.pyobj) = Py_None;
                   }
-#line 2664 "beancount/parser/grammar.c"
+#line 3040 "beancount/parser/grammar.c"
     break;
 
-  case 101:
-#line 737 "beancount/parser/grammar.y"
+  case 101: /* custom_value_list: custom_value_list custom_value  */
+#line 1144 "beancount/parser/grammar.y"
                   {
                       BUILDY(DECREF((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                              (yyval.pyobj), "handle_list", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
                   }
-#line 2673 "beancount/parser/grammar.c"
+#line 3049 "beancount/parser/grammar.c"
     break;
 
-  case 102:
-#line 743 "beancount/parser/grammar.y"
+  case 102: /* custom: DATE CUSTOM STRING custom_value_list eol key_value_list  */
+#line 1150 "beancount/parser/grammar.y"
        {
            BUILDY(DECREF((yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj)),
                   (yyval.pyobj), "custom", "OOOO", (yyvsp[-5].pyobj), (yyvsp[-3].pyobj), (yyvsp[-2].pyobj), (yyvsp[0].pyobj));
        }
-#line 2682 "beancount/parser/grammar.c"
+#line 3058 "beancount/parser/grammar.c"
     break;
 
-  case 115:
-#line 762 "beancount/parser/grammar.y"
+  case 115: /* option: OPTION STRING STRING eol  */
+#line 1169 "beancount/parser/grammar.y"
        {
            BUILDY(DECREF((yyvsp[-2].pyobj), (yyvsp[-1].pyobj)),
                   (yyval.pyobj), "option", "OO", (yyvsp[-2].pyobj), (yyvsp[-1].pyobj));
        }
-#line 2691 "beancount/parser/grammar.c"
+#line 3067 "beancount/parser/grammar.c"
     break;
 
-  case 116:
-#line 768 "beancount/parser/grammar.y"
+  case 116: /* include: INCLUDE STRING eol  */
+#line 1175 "beancount/parser/grammar.y"
        {
            BUILDY(DECREF((yyvsp[-1].pyobj)),
                   (yyval.pyobj), "include", "O", (yyvsp[-1].pyobj));
        }
-#line 2700 "beancount/parser/grammar.c"
+#line 3076 "beancount/parser/grammar.c"
     break;
 
-  case 117:
-#line 774 "beancount/parser/grammar.y"
+  case 117: /* plugin: PLUGIN STRING eol  */
+#line 1181 "beancount/parser/grammar.y"
        {
            BUILDY(DECREF((yyvsp[-1].pyobj)),
                   (yyval.pyobj), "plugin", "OO", (yyvsp[-1].pyobj), Py_None);
        }
-#line 2709 "beancount/parser/grammar.c"
+#line 3085 "beancount/parser/grammar.c"
     break;
 
-  case 118:
-#line 779 "beancount/parser/grammar.y"
+  case 118: /* plugin: PLUGIN STRING STRING eol  */
+#line 1186 "beancount/parser/grammar.y"
        {
            BUILDY(DECREF((yyvsp[-2].pyobj), (yyvsp[-1].pyobj)),
                   (yyval.pyobj), "plugin", "OO", (yyvsp[-2].pyobj), (yyvsp[-1].pyobj));
        }
-#line 2718 "beancount/parser/grammar.c"
+#line 3094 "beancount/parser/grammar.c"
     break;
 
-  case 128:
-#line 795 "beancount/parser/grammar.y"
+  case 128: /* declarations: declarations entry  */
+#line 1202 "beancount/parser/grammar.y"
              {
                  BUILDY(DECREF((yyvsp[-1].pyobj), (yyvsp[0].pyobj)),
                         (yyval.pyobj), "handle_list", "OO", (yyvsp[-1].pyobj), (yyvsp[0].pyobj));
              }
-#line 2727 "beancount/parser/grammar.c"
+#line 3103 "beancount/parser/grammar.c"
     break;
 
-  case 129:
-#line 800 "beancount/parser/grammar.y"
+  case 129: /* declarations: declarations error  */
+#line 1207 "beancount/parser/grammar.y"
              {
                  /*
                   * Ignore the error and continue reducing ({3d95e55b654e}).
@@ -2745,29 +3121,29 @@ yyreduce:
                   */
                  (yyval.pyobj) = (yyvsp[-1].pyobj);
              }
-#line 2749 "beancount/parser/grammar.c"
+#line 3125 "beancount/parser/grammar.c"
     break;
 
-  case 130:
-#line 818 "beancount/parser/grammar.y"
+  case 130: /* declarations: %empty  */
+#line 1225 "beancount/parser/grammar.y"
              {
                   Py_INCREF(Py_None);
                   (yyval.pyobj) = Py_None;
              }
-#line 2758 "beancount/parser/grammar.c"
+#line 3134 "beancount/parser/grammar.c"
     break;
 
-  case 131:
-#line 825 "beancount/parser/grammar.y"
+  case 131: /* file: declarations $end  */
+#line 1232 "beancount/parser/grammar.y"
      {
          BUILDY(DECREF((yyvsp[-1].pyobj)),
                 (yyval.pyobj), "store_result", "O", (yyvsp[-1].pyobj));
      }
-#line 2767 "beancount/parser/grammar.c"
+#line 3143 "beancount/parser/grammar.c"
     break;
 
 
-#line 2771 "beancount/parser/grammar.c"
+#line 3147 "beancount/parser/grammar.c"
 
       default: break;
     }
@@ -2817,7 +3193,7 @@ yyerrlab:
       ++yynerrs;
       {
         yypcontext_t yyctx
-          = {yyssp, yytoken, &yylloc};
+          = {yyps, yytoken, &yylloc};
         char const *yymsgp = YY_("syntax error");
         int yysyntax_error_status;
         yysyntax_error_status = yysyntax_error (&yymsg_alloc, &yymsg, &yyctx);
@@ -2844,7 +3220,7 @@ yyerrlab:
           }
         yyerror (&yylloc, scanner, builder, yymsgp);
         if (yysyntax_error_status == YYENOMEM)
-          goto yyexhaustedlab;
+          YYNOMEM;
       }
     }
 
@@ -2881,6 +3257,7 @@ yyerrorlab:
      label yyerrorlab therefore never appears in user code.  */
   if (0)
     YYERROR;
+  ++yynerrs;
 
   /* Do not reclaim the symbols of the rule whose action triggered
      this YYERROR.  */
@@ -2944,7 +3321,7 @@ yyerrlab1:
 `-------------------------------------*/
 yyacceptlab:
   yyresult = 0;
-  goto yyreturn;
+  goto yyreturnlab;
 
 
 /*-----------------------------------.
@@ -2952,24 +3329,22 @@ yyacceptlab:
 `-----------------------------------*/
 yyabortlab:
   yyresult = 1;
-  goto yyreturn;
+  goto yyreturnlab;
 
 
-#if 1
-/*-------------------------------------------------.
-| yyexhaustedlab -- memory exhaustion comes here.  |
-`-------------------------------------------------*/
+/*-----------------------------------------------------------.
+| yyexhaustedlab -- YYNOMEM (memory exhaustion) comes here.  |
+`-----------------------------------------------------------*/
 yyexhaustedlab:
   yyerror (&yylloc, scanner, builder, YY_("memory exhausted"));
   yyresult = 2;
-  /* Fall through.  */
-#endif
+  goto yyreturnlab;
 
 
-/*-----------------------------------------------------.
-| yyreturn -- parsing is finished, return the result.  |
-`-----------------------------------------------------*/
-yyreturn:
+/*----------------------------------------------------------.
+| yyreturnlab -- parsing is finished, clean up and return.  |
+`----------------------------------------------------------*/
+yyreturnlab:
   if (yychar != YYEMPTY)
     {
       /* Make sure we have latest lookahead translation.  See comments at
@@ -2988,16 +3363,32 @@ yyreturn:
                   YY_ACCESSING_SYMBOL (+*yyssp), yyvsp, yylsp, scanner, builder);
       YYPOPSTACK (1);
     }
-#ifndef yyoverflow
-  if (yyss != yyssa)
-    YYSTACK_FREE (yyss);
-#endif
+  yyps->yynew = 2;
+  goto yypushreturn;
+
+
+/*-------------------------.
+| yypushreturn -- return.  |
+`-------------------------*/
+yypushreturn:
   if (yymsg != yymsgbuf)
     YYSTACK_FREE (yymsg);
   return yyresult;
 }
-
-#line 833 "beancount/parser/grammar.y"
+#undef yynerrs
+#undef yystate
+#undef yyerrstatus
+#undef yyssa
+#undef yyss
+#undef yyssp
+#undef yyvsa
+#undef yyvs
+#undef yyvsp
+#undef yylsa
+#undef yyls
+#undef yylsp
+#undef yystacksize
+#line 1240 "beancount/parser/grammar.y"
 
 
 /* Get a printable version of a token name. */
@@ -5,6 +5,7 @@ __license__ = "GNU GPLv2"
 
 import collections
 import copy
+import decimal
 import re
 import sys
 import traceback
@@ -30,6 +31,7 @@ from beancount.core.data import Note
 from beancount.core.data import Document
 from beancount.core.data import Custom
 from beancount.core.data import new_metadata
+from beancount.core.data import LocationMeta
 from beancount.core.data import Posting
 from beancount.core.data import Booking
 from beancount.core.data import EMPTY_SET
@@ -113,7 +115,18 @@ class Builder(lexer.LexBuilder):
     the data objects corresponding to rules parsed from the input file."""
 
     # pylint: disable=too-many-instance-attributes
-    def __init__(self):
+    def __init__(self, symbols=None, options_map=None):
+        """Create a builder.
+
+        Args:
+          symbols: A dict of strings to themselves, used to intern the account
+            names, currencies, tags, links and metadata keys, or None, to create
+            a new one. The loader shares a single one between all the files it
+            parses, so that their entries share the same string objects.
+          options_map: A dict of options to start from, or None, to start from
+            the default options. This is used to parse the rest of a file whose
+            option directives have already been parsed. It is copied.
+        """
         lexer.LexBuilder.__init__(self)
 
         # A stack of the current active tags.
@@ -126,23 +139,41 @@ class Builder(lexer.LexBuilder):
         self.entries = []
 
         # Accumulated and unprocessed options.
-        self.options = copy.deepcopy(options.OPTIONS_DEFAULTS)
+        self.options = copy.deepcopy(options.OPTIONS_DEFAULTS
+                                     if options_map is None
+                                     else options_map)
 
-        # A mapping of all the accounts created.
-        self.accounts = {}
+        # A mapping of all the symbol strings created, to intern them.
+        self.symbols = {} if symbols is None else symbols
 
         # Make the account regexp more restrictive than the default: check
         # types. Warning: This overrides the value in the base class.
         self.account_regexp = valid_account_regexp(self.options)
 
+        # A mapping of the account names which matched the account regexp, to
+        # themselves. This is cleared when the regexp changes.
+        self.valid_accounts = {}
+
         # A display context builder.
         self.dcontext = display_context.DisplayContext()
         self.display_context_update = self.dcontext.update
 
+        # A mapping of (currency, sign, exponent, number of digits) to the count
+        # of the numbers of that shape seen by the parser. These are folded into
+        # the display context in get_options(), which is cheaper than updating it
+        # for each number.
+        self.dcontext_counts = {}
+
     def _dcupdate(self, number, currency):
-        """Update the display context."""
+        """Count the shape of a number into the display context counts."""
         if isinstance(number, Decimal) and currency and currency is not MISSING:
-            self.display_context_update(number, currency)
+            sign, digits, exponent = number.as_tuple()
+            if exponent.__class__ is not int:
+                self.display_context_update(number, currency)
+                return
+            key = (currency, sign, exponent, len(digits))
+            counts = self.dcontext_counts
+            counts[key] = counts.get(key, 0) + 1
 
     def finalize(self):
         """Finalize the parser, check for final errors and return the triple.
@@ -187,6 +218,13 @@ class Builder(lexer.LexBuilder):
         Returns:
           A dict of option names to options.
         """
+        # Fold in the numbers counted by the parser. The dict is emptied in
+        # place because the parser holds onto it.
+        update_digits = self.dcontext.update_digits
+        for (currency, sign, exponent, num_digits), count in self.dcontext_counts.items():
+            update_digits(currency, sign, exponent, num_digits, count)
+        self.dcontext_counts.clear()
+
         # Build and store the inferred DisplayContext instance.
         self.options['dcontext'] = self.dcontext
 
@@ -196,6 +234,30 @@ class Builder(lexer.LexBuilder):
         """See base class."""
         return self.options['long_string_maxlines']
 
+    def get_fast_path(self):
+        """Return the objects the parser needs to build directives by itself.
+
+        The parser constructs the common simple accounts, amounts, postings,
+        transactions, prices and key-values directly, and only calls the
+        corresponding methods of this class for the other cases. This is only
+        possible if these methods are not overridden.
+
+        Returns:
+          A tuple of the symbols, valid accounts, display context counts, active
+          tags and active metadata of this builder, followed by the Amount,
+          Posting, Transaction, Price, KeyValue and LocationMeta types, the
+          empty set and the precision of the decimal context, or None, if the
+          parser has to call back all the methods.
+        """
+        cls = type(self)
+        if any(getattr(cls, name) is not method
+               for name, method in _FAST_PATH_METHODS.items()):
+            return None
+        return (self.symbols, self.valid_accounts, self.dcontext_counts,
+                self.tags, self.meta,
+                Amount, Posting, Transaction, Price, KeyValue, LocationMeta,
+                EMPTY_SET, decimal.getcontext().prec)
+
     def store_result(self, filename, lineno, entries):
         """Start rule stores the final result here.
 
@@ -238,13 +300,16 @@ class Builder(lexer.LexBuilder):
         Returns:
           A string, the account name.
         """
-        if not self.account_regexp.match(account):
+        # Intern account names. This should reduces memory usage a
+        # fair bit because these strings are repeated liberally.
+        account = self.symbols.setdefault(account, account)
+        if self.account_regexp.match(account):
+            self.valid_accounts[account] = account
+        else:
             meta = new_metadata(filename, lineno)
             self.errors.append(
                 ParserError(meta, "Invalid account name: {}".format(account), None))
-        # Intern account names. This should reduces memory usage a
-        # fair bit because these strings are repeated liberally.
-        return self.accounts.setdefault(account, account)
+        return account
 
     def pipe_deprecated_error(self, filename, lineno):
         """Issue a 'Pipe deprecated' error.
@@ -267,7 +332,7 @@ class Builder(lexer.LexBuilder):
         Args:
           tag: A string, a tag to be added.
         """
-        self.tags.append(tag)
+        self.tags.append(self.symbols.setdefault(tag, tag))
 
     def poptag(self, filename, lineno, tag):
         """Pop a tag off the current set of stacks.
@@ -386,6 +451,7 @@ class Builder(lexer.LexBuilder):
             if key.startswith('name_'):
                 # Update the set of valid account types.
                 self.account_regexp = valid_account_regexp(self.options)
+                self.valid_accounts.clear()
             elif key == 'insert_pythonpath':
                 # Insert the PYTHONPATH to this file when and only if you
                 # encounter this option.
@@ -425,6 +491,8 @@ class Builder(lexer.LexBuilder):
         # Update the mapping that stores the parsed precisions.
         # Note: This is relatively slow, adds about 70ms because of number.as_tuple().
         self._dcupdate(number, currency)
+        if currency.__class__ is str:
+            currency = self.symbols.setdefault(currency, currency)
         return Amount(number, currency)
 
     def compound_amount(self, filename, lineno, number_per, number_total, currency):
@@ -442,6 +510,8 @@ class Builder(lexer.LexBuilder):
         # Note: This is relatively slow, adds about 70ms because of number.as_tuple().
         self._dcupdate(number_per, currency)
         self._dcupdate(number_total, currency)
+        if currency.__class__ is str:
+            currency = self.symbols.setdefault(currency, currency)
 
         # Note that we are not able to reduce the value to a number per-share
         # here because we only get the number of units in the full lot spec.
@@ -581,6 +651,9 @@ class Builder(lexer.LexBuilder):
         else:
             booking = None
 
+        if currencies:
+            currencies = [self.symbols.setdefault(currency, currency)
+                          for currency in currencies]
         entry = Open(meta, date, account, currencies, booking)
         if error:
             self.errors.append(ParserError(meta,
@@ -616,6 +689,7 @@ class Builder(lexer.LexBuilder):
           A new Close object.
         """
         meta = new_metadata(filename, lineno, kvlist)
+        currency = self.symbols.setdefault(currency, currency)
         return Commodity(meta, date, currency)
 
     def pad(self, filename, lineno, date, account, source_account, kvlist):
@@ -702,6 +776,7 @@ class Builder(lexer.LexBuilder):
           A new Price object.
         """
         meta = new_metadata(filename, lineno, kvlist)
+        currency = self.symbols.setdefault(currency, currency)
         return Price(meta, date, currency, amount)
 
     def note(self, filename, lineno, date, account, comment, kvlist):
@@ -783,7 +858,7 @@ class Builder(lexer.LexBuilder):
         Returns:
           A new KeyValue object.
         """
-        return KeyValue(key, value)
+        return KeyValue(self.symbols.setdefault(key, key), value)
 
     def posting(self, filename, lineno, account, units, cost, price, istotal, flag):
         """Process a posting grammar rule.
@@ -801,7 +876,9 @@ class Builder(lexer.LexBuilder):
         Returns:
           A new Posting object, with no parent entry.
         """
-        meta = new_metadata(filename, lineno)
+        # Most postings have no metadata besides their location; use the compact
+        # representation, which is replaced by a dict if any gets attached.
+        meta = LocationMeta(filename, lineno)
 
         # Prices may not be negative.
         if price and isinstance(price.number, Decimal) and price.number < ZERO:
@@ -863,7 +940,7 @@ class Builder(lexer.LexBuilder):
         Returns:
           An updated TagsLinks instance.
         """
-        tags_links.tags.add(tag)
+        tags_links.tags.add(self.symbols.setdefault(tag, tag))
         return tags_links
 
     def tag_link_LINK(self, filename, lineno, tags_links, link):
@@ -875,7 +952,7 @@ class Builder(lexer.LexBuilder):
         Returns:
           An updated TagsLinks instance.
         """
-        tags_links.links.add(link)
+        tags_links.links.add(self.symbols.setdefault(link, link))
         return tags_links
 
     def _unpack_txn_strings(self, txn_strings, meta):
@@ -971,8 +1048,11 @@ class Builder(lexer.LexBuilder):
                                 meta, "Duplicate metadata field on entry: {}".format(
                                     posting_or_kv), None))
                     else:
-                        if last_posting.meta is None:
-                            last_posting = last_posting._replace(meta={})
+                        if type(last_posting.meta) is not dict:
+                            last_posting = last_posting._replace(
+                                meta=(last_posting.meta.copy()
+                                      if last_posting.meta is not None
+                                      else {}))
                             postings.pop(-1)
                             postings.append(last_posting)
 
@@ -1020,3 +1100,41 @@ class Builder(lexer.LexBuilder):
         # Create the transaction.
         return Transaction(meta, date, chr(flag),
                            payee, narration, tags, links, postings)
+
+
+# The methods of Builder which the parser replaces with its own code, unless they
+# are overridden. See Builder.get_fast_path().
+_FAST_PATH_METHODS = {name: getattr(Builder, name)
+                      for name in ('account', 'amount', 'posting', 'transaction',
+                                   'price', 'key_value')}
+
+
+class StreamingBuilder(Builder):
+    """A builder that hands out the directives as they are parsed.
+
+    Instead of accumulating the directives of the file until the end of the
+    parse, this collects them in a list of pending directives, which its user
+    empties as the parse progresses. See parser.parse_iter().
+    """
+
+    def __init__(self, symbols=None):
+        super().__init__(symbols)
+
+        # The directives parsed since the last call to pop_entries().
+        self.pending = []
+
+    def handle_list(self, filename, lineno, object_list, new_object):
+        """See base class. Directives are diverted to the list of pending ones."""
+        if object_list is None and isinstance(new_object, data.ALL_DIRECTIVES):
+            self.pending.append(new_object)
+            return None
+        return super().handle_list(filename, lineno, object_list, new_object)
+
+    def pop_entries(self):
+        """Return the directives parsed since the last call and forget them.
+
+        Returns:
+          A list of directives, in the order of the input.
+        """
+        entries, self.pending = self.pending, []
+        return entries
@@ -54,6 +54,7 @@ const char* token_to_string(int token);
 
 #include "beancount/parser/macros.h"
 #include "beancount/parser/grammar.h"
+#include "beancount/parser/decimal.h"
 #include "beancount/parser/lexer.h"
 
 extern YY_DECL;
@@ -72,6 +73,23 @@ extern YY_DECL;
         YYERROR;                                                                \
     }
 
+/*
+ * Like BUILDY, but first try to build the target with the given fast path
+ * expression. It evaluates to NULL without raising an exception for the cases
+ * it does not handle, and the builder method is called for those.
+ */
+#define BUILDY_FAST(clean, target, fast, method_name, format, ...)              \
+    target = fast;                                                              \
+    if (target == NULL && !PyErr_Occurred()) {                                  \
+        target = PyObject_CallMethod(builder, method_name, "Oi" format,         \
+                                     FILENAME, LINENO, ## __VA_ARGS__);         \
+    }                                                                           \
+    clean;                                                                      \
+    if (target == NULL) {                                                       \
+        build_grammar_error_from_exception(&yyloc, builder);                    \
+        YYERROR;                                                                \
+    }
+
 #define FILENAME (yyloc).file_name
 #define LINENO (yyloc).first_line
 
@@ -125,6 +143,379 @@ void yyerror(YYLTYPE* loc, yyscan_t scanner, PyObject* builder, char const* mess
 
 #define DECREF(...) _CC_FUNC(Py_DECREF, __VA_ARGS__)
 
+/*
+ * Fast path construction of the common directives. These functions mirror the
+ * corresponding methods of the Python builder for the simple cases, using the
+ * objects it provides (see Builder.get_fast_path()), and return NULL without
+ * raising an exception for the others, to be handed to the builder. They
+ * return a new reference, or NULL with an exception set on error.
+ */
+
+/* Create an instance of a namedtuple type from its fields. */
+static PyObject* fastpath_tuple(PyObject* type, Py_ssize_t size, ...)
+{
+    PyObject* tuple = ((PyTypeObject*)type)->tp_alloc((PyTypeObject*)type, size);
+    if (!tuple) {
+        return NULL;
+    }
+    va_list fields;
+    va_start(fields, size);
+    for (Py_ssize_t i = 0; i < size; ++i) {
+        PyObject* field = va_arg(fields, PyObject*);
+        Py_INCREF(field);
+        PyTuple_SET_ITEM(tuple, i, field);
+    }
+    va_end(fields);
+    return tuple;
+}
+
+/* Create a new metadata dict with the location of a directive. */
+static PyObject* fastpath_metadata(PyObject* filename, int lineno)
+{
+    static PyObject* filename_key = NULL;
+    static PyObject* lineno_key = NULL;
+    if (!filename_key) {
+        filename_key = PyUnicode_InternFromString("filename");
+        lineno_key = PyUnicode_InternFromString("lineno");
+        if (!filename_key || !lineno_key) {
+            return NULL;
+        }
+    }
+
+    PyObject* pylineno = PyLong_FromLong(lineno);
+    if (!pylineno) {
+        return NULL;
+    }
+    PyObject* meta = PyDict_New();
+    if (!meta ||
+        PyDict_SetItem(meta, filename_key, filename) < 0 ||
+        PyDict_SetItem(meta, lineno_key, pylineno) < 0) {
+        Py_XDECREF(meta);
+        meta = NULL;
+    }
+    Py_DECREF(pylineno);
+    return meta;
+}
+
+/* Return the interned instance of a string (a borrowed reference). */
+static PyObject* fastpath_intern(PyObject* string)
+{
+    return PyDict_SetDefault(fastpath->symbols, string, string);
+}
+
+/* See Builder.account(). Only the names known to be valid are handled. */
+static PyObject* fastpath_account(PyObject* account)
+{
+    if (!fastpath) {
+        return NULL;
+    }
+    PyObject* valid = PyDict_GetItemWithError(fastpath->valid_accounts, account);
+    Py_XINCREF(valid);
+    return valid;
+}
+
+/* Record the shape of a number in the recent numbers of the fast path. */
+static void fastpath_number_push(PyObject* number, int sign, Py_ssize_t exponent,
+                                 Py_ssize_t digits)
+{
+    NumberShape* shape = &fastpath->numbers[fastpath->numbers_next];
+    fastpath->numbers_next = (fastpath->numbers_next + 1) % FASTPATH_NUMBERS;
+    Py_INCREF(number);
+    Py_XDECREF(shape->number);
+    shape->number = number;
+    shape->sign = sign;
+    shape->exponent = exponent;
+    shape->digits = digits;
+}
+
+/* Find the shape of one of the recent numbers, or return NULL. */
+static NumberShape* fastpath_number_find(PyObject* number)
+{
+    for (int i = 0; i < FASTPATH_NUMBERS; ++i) {
+        if (fastpath->numbers[i].number == number) {
+            return &fastpath->numbers[i];
+        }
+    }
+    return NULL;
+}
+
+/* Record the shape of the number of a NUMBER token, which the lexer computed
+ * from its text. */
+static void fastpath_number_token(PyObject* number)
+{
+    if (fastpath && number_token.number == number) {
+        fastpath_number_push(number, number_token.sign, number_token.exponent,
+                             number_token.digits);
+    }
+}
+
+/* Record the shape of the negation of a number, if the shape of the number is
+ * known. Zeros are never recorded, so the negation flips the sign. It only
+ * changes the rest of the shape if the number has to be rounded, which is if it
+ * has more digits than the precision of the context. */
+static void fastpath_number_negative(PyObject* result, PyObject* number)
+{
+    NumberShape* shape;
+    if (!result || !fastpath || !(shape = fastpath_number_find(number)) ||
+        shape->digits > fastpath->precision) {
+        return;
+    }
+    fastpath_number_push(result, !shape->sign, shape->exponent, shape->digits);
+}
+
+/* Return the key of the display context counts for a number, a tuple of the
+ * currency and of the shape of the number. The shapes of the recent numbers
+ * are reused, and the others are obtained from Decimal.as_tuple(). Return NULL
+ * without setting an exception for the special values. */
+static PyObject* fastpath_dcontext_key(PyObject* number, PyObject* currency)
+{
+    static PyObject* as_tuple_name = NULL;
+    PyObject* key = NULL;
+    NumberShape* shape = fastpath_number_find(number);
+    if (shape) {
+        PyObject* sign = PyLong_FromLong(shape->sign);
+        PyObject* exponent = PyLong_FromSsize_t(shape->exponent);
+        PyObject* digits = PyLong_FromSsize_t(shape->digits);
+        if (sign && exponent && digits) {
+            key = PyTuple_Pack(4, currency, sign, exponent, digits);
+        }
+        Py_XDECREF(sign);
+        Py_XDECREF(exponent);
+        Py_XDECREF(digits);
+        return key;
+    }
+
+    if (!as_tuple_name) {
+        as_tuple_name = PyUnicode_InternFromString("as_tuple");
+        if (!as_tuple_name) {
+            return NULL;
+        }
+    }
+    PyObject* num_tuple = PyObject_CallMethodObjArgs(number, as_tuple_name, NULL);
+    if (!num_tuple) {
+        return NULL;
+    }
+    PyObject* exponent = PyTuple_GET_ITEM(num_tuple, 2);
+    if (PyLong_CheckExact(exponent)) {
+        PyObject* digits = PyLong_FromSsize_t(
+            PyTuple_GET_SIZE(PyTuple_GET_ITEM(num_tuple, 1)));
+        if (digits) {
+            key = PyTuple_Pack(4, currency, PyTuple_GET_ITEM(num_tuple, 0), exponent,
+                               digits);
+            Py_DECREF(digits);
+        }
+    }
+    Py_DECREF(num_tuple);
+    return key;
+}
+
+/* See Builder.amount(). Only finite Decimal numbers with a currency are
+ * handled. Their shape is counted into the display context counts of the
+ * builder, rather than updating its display context directly. */
+static PyObject* fastpath_amount(PyObject* number, PyObject* currency)
+{
+    if (!fastpath ||
+        Py_TYPE(number) != (PyTypeObject*)decimal_type ||
+        !PyUnicode_CheckExact(currency) ||
+        PyUnicode_GET_LENGTH(currency) == 0) {
+        return NULL;
+    }
+
+    PyObject* amount = NULL;
+    PyObject* key = NULL;
+    PyObject* count = NULL;
+    currency = fastpath_intern(currency);
+    if (!currency) {
+        return NULL;
+    }
+
+    /* Count the number in the display context counts. */
+    key = fastpath_dcontext_key(number, currency);
+    if (!key) {
+        goto done;
+    }
+    count = PyDict_GetItemWithError(fastpath->dcontext_counts, key);
+    if (count) {
+        count = PyLong_FromSsize_t(PyLong_AsSsize_t(count) + 1);
+    }
+    else if (!PyErr_Occurred()) {
+        count = PyLong_FromLong(1);
+    }
+    if (!count || PyDict_SetItem(fastpath->dcontext_counts, key, count) < 0) {
+        goto done;
+    }
+
+    amount = fastpath_tuple(fastpath->amount_type, 2, number, currency);
+
+done:
+    Py_XDECREF(count);
+    Py_XDECREF(key);
+    return amount;
+}
+
+/* See Builder.posting(). Only postings without a cost nor a price are
+ * handled. */
+static PyObject* fastpath_posting(PyObject* filename, int lineno, PyObject* account,
+                                  PyObject* units, PyObject* cost, char flag)
+{
+    if (!fastpath || cost != Py_None) {
+        return NULL;
+    }
+
+    PyObject* posting = NULL;
+    PyObject* pyflag = NULL;
+    PyObject* meta = PyObject_CallFunction(fastpath->location_meta_type, "Oi",
+                                           filename, lineno);
+    if (!meta) {
+        goto done;
+    }
+    if (flag) {
+        pyflag = PyUnicode_FromOrdinal((unsigned char)flag);
+        if (!pyflag) {
+            goto done;
+        }
+    }
+    posting = fastpath_tuple(fastpath->posting_type, 6,
+                             account, units, Py_None, Py_None,
+                             pyflag ? pyflag : Py_None, meta);
+
+done:
+    Py_XDECREF(pyflag);
+    Py_XDECREF(meta);
+    return posting;
+}
+
+/* Freeze a set of tags or links, or return the empty set. */
+static PyObject* fastpath_frozenset(PyObject* set)
+{
+    if (PySet_GET_SIZE(set) == 0) {
+        Py_INCREF(fastpath->empty_set);
+        return fastpath->empty_set;
+    }
+    return PyFrozenSet_New(set);
+}
+
+/* See Builder.transaction(). Only transactions with at most two strings, and
+ * postings without metadata, outside of pushed tags and metadata, are
+ * handled. */
+static PyObject* fastpath_transaction(PyObject* filename, int lineno, PyObject* date,
+                                      char flag, PyObject* txn_strings,
+                                      PyObject* tags_links, PyObject* postings)
+{
+    Py_ssize_t num_strings = 0;
+    if (!fastpath ||
+        PyList_GET_SIZE(fastpath->tags) > 0 ||
+        PyDict_GET_SIZE(fastpath->meta) > 0) {
+        return NULL;
+    }
+    if (txn_strings != Py_None) {
+        if (!PyList_CheckExact(txn_strings)) {
+            return NULL;
+        }
+        num_strings = PyList_GET_SIZE(txn_strings);
+        if (num_strings > 2) {
+            return NULL;
+        }
+    }
+    if (postings != Py_None) {
+        if (!PyList_CheckExact(postings)) {
+            return NULL;
+        }
+        for (Py_ssize_t i = 0; i < PyList_GET_SIZE(postings); ++i) {
+            if (Py_TYPE(PyList_GET_ITEM(postings, i)) !=
+                (PyTypeObject*)fastpath->posting_type) {
+                return NULL;
+            }
+        }
+    }
+    if (!PyTuple_Check(tags_links) ||
+        PyTuple_GET_SIZE(tags_links) != 2 ||
+        !PyAnySet_Check(PyTuple_GET_ITEM(tags_links, 0)) ||
+        !PyAnySet_Check(PyTuple_GET_ITEM(tags_links, 1))) {
+        return NULL;
+    }
+
+    PyObject* transaction = NULL;
+    PyObject* tags = NULL;
+    PyObject* links = NULL;
+    PyObject* pyflag = NULL;
+    PyObject* narration = NULL;
+    PyObject* meta = fastpath_metadata(filename, lineno);
+    if (!meta) {
+        goto done;
+    }
+
+    tags = fastpath_frozenset(PyTuple_GET_ITEM(tags_links, 0));
+    links = fastpath_frozenset(PyTuple_GET_ITEM(tags_links, 1));
+    pyflag = PyUnicode_FromOrdinal((unsigned char)flag);
+    if (num_strings) {
+        narration = PyList_GET_ITEM(txn_strings, num_strings - 1);
+        Py_INCREF(narration);
+    }
+    else {
+        narration = PyUnicode_FromStringAndSize("", 0);
+    }
+    /* The list of postings built by the grammar is not shared, use it. */
+    if (postings == Py_None) {
+        postings = PyList_New(0);
+    }
+    else {
+        Py_INCREF(postings);
+    }
+    if (!tags || !links || !pyflag || !narration || !postings) {
+        goto done;
+    }
+
+    transaction = fastpath_tuple(fastpath->transaction_type, 8,
+                                 meta, date, pyflag,
+                                 num_strings == 2 ? PyList_GET_ITEM(txn_strings, 0) : Py_None,
+                                 narration, tags, links, postings);
+
+done:
+    Py_XDECREF(postings);
+    Py_XDECREF(narration);
+    Py_XDECREF(pyflag);
+    Py_XDECREF(links);
+    Py_XDECREF(tags);
+    Py_XDECREF(meta);
+    return transaction;
+}
+
+/* See Builder.price(). Only prices without metadata are handled. */
+static PyObject* fastpath_price(PyObject* filename, int lineno, PyObject* date,
+                                PyObject* currency, PyObject* amount, PyObject* kvlist)
+{
+    if (!fastpath || kvlist != Py_None) {
+        return NULL;
+    }
+
+    currency = fastpath_intern(currency);
+    if (!currency) {
+        return NULL;
+    }
+    PyObject* meta = fastpath_metadata(filename, lineno);
+    if (!meta) {
+        return NULL;
+    }
+    PyObject* price = fastpath_tuple(fastpath->price_type, 4, meta, date, currency, amount);
+    Py_DECREF(meta);
+    return price;
+}
+
+/* See Builder.key_value(). */
+static PyObject* fastpath_key_value(PyObject* key, PyObject* value)
+{
+    if (!fastpath) {
+        return NULL;
+    }
+
+    key = fastpath_intern(key);
+    if (!key) {
+        return NULL;
+    }
+    return fastpath_tuple(fastpath->key_value_type, 2, key, value);
+}
+
 %}
 
 
@@ -138,6 +529,7 @@ void yyerror(YYLTYPE* loc, yyscan_t scanner, PyObject* builder, char const* mess
 %locations
 %define parse.error verbose
 %define api.pure full
+%define api.push-pull both
 %param {yyscan_t scanner}
 %param {PyObject* builder}
 
@@ -299,6 +691,10 @@ eol : EOL
    be backwards compatible, so this is just a bit of a temporary hack
    (blais, 2015-04-18). */
 number_expr : NUMBER
+            {
+                $$ = $1;
+                fastpath_number_token($1);
+            }
             | number_expr PLUS number_expr
             {
                 $$ = PyNumber_Add($1, $3);
@@ -322,6 +718,7 @@ number_expr : NUMBER
             | MINUS number_expr %prec NEGATIVE
             {
                 $$ = PyNumber_Negative($2);
+                fastpath_number_negative($$, $2);
                 DECREF($2);
             }
             | PLUS number_expr %prec NEGATIVE
@@ -368,8 +765,9 @@ tags_links : %empty
 
 transaction : DATE txn txn_strings tags_links eol posting_or_kv_list
             {
-                BUILDY(DECREF($1, $3, $4, $6),
-                       $$, "transaction", "ObOOO", $1, $2, $3, $4, $6);
+                BUILDY_FAST(DECREF($1, $3, $4, $6),
+                            $$, fastpath_transaction(FILENAME, LINENO, $1, $2, $3, $4, $6),
+                            "transaction", "ObOOO", $1, $2, $3, $4, $6);
             }
 
 optflag : %empty
@@ -390,14 +788,16 @@ price_annotation : incomplete_amount
 
 account : ACCOUNT
         {
-            BUILDY(DECREF($1),
-                   $$, "account", "O", $1);
+            BUILDY_FAST(DECREF($1),
+                        $$, fastpath_account($1),
+                        "account", "O", $1);
         }
 
 posting : INDENT optflag account incomplete_amount cost_spec eol
         {
-            BUILDY(DECREF($3, $4, $5),
-                   $$, "posting", "OOOOOb", $3, $4, $5, Py_None, Py_False, $2);
+            BUILDY_FAST(DECREF($3, $4, $5),
+                        $$, fastpath_posting(FILENAME, LINENO, $3, $4, $5, $2),
+                        "posting", "OOOOOb", $3, $4, $5, Py_None, Py_False, $2);
         }
         | INDENT optflag account incomplete_amount cost_spec AT price_annotation eol
         {
@@ -411,14 +811,16 @@ posting : INDENT optflag account incomplete_amount cost_spec eol
         }
         | INDENT optflag account eol
         {
-            BUILDY(DECREF($3),
-                   $$, "posting", "OOOOOb", $3, missing_obj, Py_None, Py_None, Py_False, $2);
+            BUILDY_FAST(DECREF($3),
+                        $$, fastpath_posting(FILENAME, LINENO, $3, missing_obj, Py_None, $2),
+                        "posting", "OOOOOb", $3, missing_obj, Py_None, Py_None, Py_False, $2);
         }
 
 key_value : KEY COLON key_value_value
           {
-              BUILDY(DECREF($2, $3),
-                     $$, "key_value", "OO", $2, $3);
+              BUILDY_FAST(DECREF($1, $3),
+                          $$, fastpath_key_value($1, $3),
+                          "key_value", "OO", $1, $3);
           }
 
 key_value_line : INDENT key_value eol
@@ -564,22 +966,25 @@ balance : DATE BALANCE account amount_tolerance eol key_value_list
 
 amount : number_expr CURRENCY
        {
-           BUILDY(DECREF($1, $2),
-                  $$, "amount", "OO", $1, $2);
+           BUILDY_FAST(DECREF($1, $2),
+                       $$, fastpath_amount($1, $2),
+                       "amount", "OO", $1, $2);
        }
 
 amount_tolerance : number_expr CURRENCY
                  {
-                     BUILDY(DECREF($1, $2),
-                            $$.pyobj1, "amount", "OO", $1, $2);
+                     BUILDY_FAST(DECREF($1, $2),
+                                 $$.pyobj1, fastpath_amount($1, $2),
+                                 "amount", "OO", $1, $2);
                      $$.pyobj2 = Py_None;
                      Py_INCREF(Py_None);
                      ;
                  }
                  | number_expr TILDE number_expr CURRENCY
                  {
-                     BUILDY(DECREF($1, $4),
-                            $$.pyobj1, "amount", "OO", $1, $4);
+                     BUILDY_FAST(DECREF($1, $4),
+                                 $$.pyobj1, fastpath_amount($1, $4),
+                                 "amount", "OO", $1, $4);
                      $$.pyobj2 = $3;
                  }
 
@@ -616,8 +1021,9 @@ compound_amount : maybe_number CURRENCY
 
 incomplete_amount : maybe_number maybe_currency
                   {
-                      BUILDY(DECREF($1, $2),
-                             $$, "amount", "OO", $1, $2);
+                      BUILDY_FAST(DECREF($1, $2),
+                                  $$, fastpath_amount($1, $2),
+                                  "amount", "OO", $1, $2);
                   }
 
 cost_spec : LCURL cost_comp_list RCURL
@@ -663,8 +1069,9 @@ cost_comp : compound_amount
 
 price : DATE PRICE CURRENCY amount eol key_value_list
       {
-          BUILDY(DECREF($1, $3, $4, $6),
-                 $$, "price", "OOOO", $1, $3, $4, $6);
+          BUILDY_FAST(DECREF($1, $3, $4, $6),
+                      $$, fastpath_price(FILENAME, LINENO, $1, $3, $4, $6),
+                      "price", "OOOO", $1, $3, $4, $6);
       }
 
 event : DATE EVENT STRING STRING eol key_value_list
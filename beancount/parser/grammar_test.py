@@ -23,6 +23,7 @@ from beancount.parser import parser
 from beancount.parser import lexer
 from beancount.core import data
 from beancount.core import amount
+from beancount.core import display_context
 from beancount.utils import test_utils
 from beancount.parser import cmptest
 
@@ -1428,6 +1429,8 @@ class TestMetaData(unittest.TestCase):
         self.assertEqual(1, len(entries))
         self.assertEqual({'test': 'Something'},
                          self.strip_meta(entries[0].postings[0].meta))
+        self.assertIs(dict, type(entries[0].postings[0].meta))
+        self.assertIs(data.LocationMeta, type(entries[0].postings[1].meta))
 
     @parser.parse_doc()
     def test_metadata_transaction__end(self, entries, errors, _):
@@ -2538,6 +2541,102 @@ class TestDocument(unittest.TestCase):
         self.assertEqual({'something'}, entries[0].links)
 
 
+class TestFastPath(unittest.TestCase):
+
+    def test_same_as_builder(self):
+        input_string = textwrap.dedent("""
+          2014-01-01 open Assets:Cash  USD,CAD
+          2014-01-01 open Assets:Investments:HOOL
+          2014-01-01 open Expenses:Food
+
+          2014-02-01 * "Store" "Groceries" #food ^receipt
+            Expenses:Food                       12.34 USD
+            Assets:Cash
+
+          2014-02-02 txn "No payee"
+            key: "value"
+            Expenses:Food                   (3 + 4.5) CAD
+              posting-key: 2014-01-01
+            ! Assets:Cash                       -7.5000 CAD
+
+          pushtag #trip
+          2014-02-03 * "Trip"
+            Expenses:Food                       -1 USD @ 1.2 CAD
+            Assets:Cash                          1.20 CAD
+          poptag #trip
+
+          2014-02-04 * "Buy"
+            #investment
+            Assets:Investments:HOOL       10 HOOL {500.00 USD}
+            Assets:Cash                    -5000 USD
+
+          2014-02-05 *
+            Assets:Cash                    -5000 USD @@ 6000 CAD
+            Assets:Cash                     6000 CAD
+
+          2014-02-06 * "A" "B" "C"
+            Assets:Cash                        0 USD
+
+          2014-02-07 price HOOL  510.00 USD
+          2014-02-07 price HOOL  511.00 USD
+            source: "manual"
+          2014-02-08 balance Assets:Cash  -3.5 ~ 0.01 USD
+          2014-02-09 balance Assets:Cash  -3.5 CAD
+        """)
+        entries, errors, options_map = parser.parse_string(input_string)
+        self.assertEqual(1, len(errors))
+
+        with mock.patch('beancount.parser.grammar.Builder.get_fast_path',
+                        lambda self: None):
+            expected_entries, expected_errors, expected_options_map = (
+                parser.parse_string(input_string))
+        self.assertEqual(expected_entries, entries)
+        self.assertEqual(expected_errors, errors)
+        self.assertEqual(str(expected_options_map['dcontext']),
+                         str(options_map['dcontext']))
+        for entry, expected_entry in zip(entries, expected_entries):
+            for posting, expected_posting in zip(getattr(entry, 'postings', ()),
+                                                 getattr(expected_entry, 'postings', ())):
+                self.assertIs(type(expected_posting.meta), type(posting.meta))
+
+    def test_display_context(self):
+        # The display context is the same as if updated with each number.
+        numbers = ['0', '0.00', '-0.00', '-1', '1,234.50', '-1,234.50', '1.', '007',
+                   '-0.050', '(1 + 2)', '-(5.5)', '- -5', '+3.25', '10 / 3',
+                   '1' * 40, '-' + '9' * 40 + '.5']
+        input_string = ''.join('2014-01-01 price HOOL {} {}\n'.format(number, currency)
+                               for number in numbers
+                               for currency in ('USD', 'CAD'))
+        entries, errors, options_map = parser.parse_string(input_string)
+        self.assertFalse(errors)
+
+        expected_dcontext = display_context.DisplayContext()
+        for entry in entries:
+            expected_dcontext.update(entry.amount.number, entry.amount.currency)
+        self.assertEqual(str(expected_dcontext), str(options_map['dcontext']))
+
+    def test_disabled_when_overridden(self):
+        self.assertIsNotNone(grammar.Builder().get_fast_path())
+
+        class AmountBuilder(grammar.Builder):
+            def amount(self, filename, lineno, number, currency):
+                return super().amount(filename, lineno, number, currency)
+        self.assertIsNone(AmountBuilder().get_fast_path())
+
+        with mock.patch('beancount.parser.grammar.Builder.posting', raise_exception):
+            self.assertIsNone(grammar.Builder().get_fast_path())
+
+    @parser.parse_doc(expect_errors=True)
+    def test_account_names_option(self, entries, errors, _):
+        """
+          2014-01-01 open Assets:Cash
+          option "name_assets" "Actif"
+          2014-01-02 close Assets:Cash
+        """
+        self.assertEqual(1, len(errors))
+        self.assertRegex(errors[0].message, 'Invalid account name: Assets:Cash')
+
+
 class TestMethodsSignature(unittest.TestCase):
 
     def test_signatures(self):
@@ -22,17 +22,19 @@ yyscan_t yylex_free(yyscan_t scanner);
 /**
  * Initialize scanner private data.
  *
- * Setup @scanner to read from the Python file-like object @file. Set
- * the reported file name to @filename, if not NULL and not None.
+ * Setup @scanner to scan @file from memory if it supports the buffer
+ * protocol, or else to read it as a Python file-like object. A
+ * writable buffer ending with two NUL bytes is scanned in place, the
+ * contents of any other buffer are copied once. Set the reported file
+ * name to @filename, if not NULL and not None.
  * Otherwise try to obtain the file name from the @name attribute of
- * the @file object. If this fails, use the empty string. @encoding is
- * used to decode strings read from the input file, if not NULL,
- * otherwise the default UTF-8 encoding is used. Python objects
+ * the @file object, or use the empty string. @encoding is used to
+ * decode strings, if not NULL, otherwise UTF-8 is used. Python object
  * references are incremented. It is safe to call this multiple times.
  */
 void yylex_initialize(PyObject* file, PyObject* filename, int lineno, const char* encoding, yyscan_t scanner);
 
-#line 35 "beancount/parser/lexer.c"
+#line 37 "beancount/parser/lexer.c"
 
 #define  YY_INT_ALIGNED short int
 
@@ -1040,7 +1042,7 @@ static const flex_int32_t yy_rule_can_match_eol[59] =
 /* Top Code. This is included in the FLex generated header file. */
 
 /* Definitions. */
-#line 57 "beancount/parser/lexer.l"
+#line 59 "beancount/parser/lexer.l"
 
 #include <math.h>
 #include <stdlib.h>
@@ -1055,6 +1057,10 @@ struct _yyextra_t {
 
     /* The encoding to use for converting strings. */
     const char* encoding;
+
+    /* The buffer exported by the input object, if it is scanned in place.
+     * Otherwise, the 'obj' member of the buffer is NULL. */
+    Py_buffer input_buffer;
 };
 
 #define yy_filename yyget_extra(yyscanner)->filename
@@ -1082,13 +1088,13 @@ int pyfile_read_into(PyObject *file, char *buf, size_t max_size);
         yycolumn += yyleng;                                             \
     }
 
-#line 1085 "beancount/parser/lexer.c"
+#line 1091 "beancount/parser/lexer.c"
 
-#line 115 "beancount/parser/lexer.l"
+#line 121 "beancount/parser/lexer.l"
  /* Characters that may be used as flags. Make sure to include all the
   * values from beancount.core.flags to allow round-trips between text
   * and entries. {5307d8fa1e7b} */
-#line 1091 "beancount/parser/lexer.c"
+#line 1097 "beancount/parser/lexer.c"
 
 #define INITIAL 0
 #define INVALID 1
@@ -1375,11 +1381,11 @@ YY_DECL
 		}
 
 	{
-#line 121 "beancount/parser/lexer.l"
+#line 127 "beancount/parser/lexer.l"
 
 
  /* Newlines are output as explicit tokens, because lines matter in the syntax. */
-#line 1382 "beancount/parser/lexer.c"
+#line 1388 "beancount/parser/lexer.c"
 
 	while ( /*CONSTCOND*/1 )		/* loops until end-of-file is reached */
 		{
@@ -1448,7 +1454,7 @@ do_action:	/* This label is used only to access EOF actions. */
 case 1:
 /* rule 1 can match eol */
 YY_RULE_SETUP
-#line 124 "beancount/parser/lexer.l"
+#line 130 "beancount/parser/lexer.l"
 {
     yycolumn = 1;
     return EOL;
@@ -1463,109 +1469,109 @@ case 2:
 yyg->yy_c_buf_p = yy_cp -= 1;
 YY_DO_BEFORE_ACTION; /* set up yytext again */
 YY_RULE_SETUP
-#line 133 "beancount/parser/lexer.l"
+#line 139 "beancount/parser/lexer.l"
 { return INDENT; }
 	YY_BREAK
 case 3:
 YY_RULE_SETUP
-#line 134 "beancount/parser/lexer.l"
+#line 140 "beancount/parser/lexer.l"
 { }
 	YY_BREAK
 /* Comments. */
 case 4:
 YY_RULE_SETUP
-#line 137 "beancount/parser/lexer.l"
+#line 143 "beancount/parser/lexer.l"
 { }
 	YY_BREAK
 /* Characters with special meanings have their own tokens. */
 case 5:
 YY_RULE_SETUP
-#line 140 "beancount/parser/lexer.l"
+#line 146 "beancount/parser/lexer.l"
 { return PIPE; }
 	YY_BREAK
 case 6:
 YY_RULE_SETUP
-#line 141 "beancount/parser/lexer.l"
+#line 147 "beancount/parser/lexer.l"
 { return ATAT; }
 	YY_BREAK
 case 7:
 YY_RULE_SETUP
-#line 142 "beancount/parser/lexer.l"
+#line 148 "beancount/parser/lexer.l"
 { return AT; }
 	YY_BREAK
 case 8:
 YY_RULE_SETUP
-#line 143 "beancount/parser/lexer.l"
+#line 149 "beancount/parser/lexer.l"
 { return LCURLCURL; }
 	YY_BREAK
 case 9:
 YY_RULE_SETUP
-#line 144 "beancount/parser/lexer.l"
+#line 150 "beancount/parser/lexer.l"
 { return RCURLCURL; }
 	YY_BREAK
 case 10:
 YY_RULE_SETUP
-#line 145 "beancount/parser/lexer.l"
+#line 151 "beancount/parser/lexer.l"
 { return LCURL; }
 	YY_BREAK
 case 11:
 YY_RULE_SETUP
-#line 146 "beancount/parser/lexer.l"
+#line 152 "beancount/parser/lexer.l"
 { return RCURL; }
 	YY_BREAK
 case 12:
 YY_RULE_SETUP
-#line 147 "beancount/parser/lexer.l"
+#line 153 "beancount/parser/lexer.l"
 { return COMMA; }
 	YY_BREAK
 case 13:
 YY_RULE_SETUP
-#line 148 "beancount/parser/lexer.l"
+#line 154 "beancount/parser/lexer.l"
 { return TILDE; }
 	YY_BREAK
 case 14:
 YY_RULE_SETUP
-#line 149 "beancount/parser/lexer.l"
+#line 155 "beancount/parser/lexer.l"
 { return PLUS; }
 	YY_BREAK
 case 15:
 YY_RULE_SETUP
-#line 150 "beancount/parser/lexer.l"
+#line 156 "beancount/parser/lexer.l"
 { return MINUS; }
 	YY_BREAK
 case 16:
 YY_RULE_SETUP
-#line 151 "beancount/parser/lexer.l"
+#line 157 "beancount/parser/lexer.l"
 { return SLASH; }
 	YY_BREAK
 case 17:
 YY_RULE_SETUP
-#line 152 "beancount/parser/lexer.l"
+#line 158 "beancount/parser/lexer.l"
 { return LPAREN; }
 	YY_BREAK
 case 18:
 YY_RULE_SETUP
-#line 153 "beancount/parser/lexer.l"
+#line 159 "beancount/parser/lexer.l"
 { return RPAREN; }
 	YY_BREAK
 case 19:
 YY_RULE_SETUP
-#line 154 "beancount/parser/lexer.l"
+#line 160 "beancount/parser/lexer.l"
 { return HASH; }
 	YY_BREAK
 case 20:
 YY_RULE_SETUP
-#line 155 "beancount/parser/lexer.l"
+#line 161 "beancount/parser/lexer.l"
 { return ASTERISK; }
 	YY_BREAK
 case 21:
 YY_RULE_SETUP
-#line 156 "beancount/parser/lexer.l"
+#line 162 "beancount/parser/lexer.l"
 { return COLON; }
 	YY_BREAK
 case 22:
 YY_RULE_SETUP
-#line 158 "beancount/parser/lexer.l"
+#line 164 "beancount/parser/lexer.l"
 {
     yylval->character = yytext[0];
     return FLAG;
@@ -1574,117 +1580,117 @@ YY_RULE_SETUP
 /* Keywords. */
 case 23:
 YY_RULE_SETUP
-#line 164 "beancount/parser/lexer.l"
+#line 170 "beancount/parser/lexer.l"
 { return TXN; }
 	YY_BREAK
 case 24:
 YY_RULE_SETUP
-#line 165 "beancount/parser/lexer.l"
+#line 171 "beancount/parser/lexer.l"
 { return BALANCE; }
 	YY_BREAK
 case 25:
 YY_RULE_SETUP
-#line 166 "beancount/parser/lexer.l"
+#line 172 "beancount/parser/lexer.l"
 { return OPEN; }
 	YY_BREAK
 case 26:
 YY_RULE_SETUP
-#line 167 "beancount/parser/lexer.l"
+#line 173 "beancount/parser/lexer.l"
 { return CLOSE; }
 	YY_BREAK
 case 27:
 YY_RULE_SETUP
-#line 168 "beancount/parser/lexer.l"
+#line 174 "beancount/parser/lexer.l"
 { return COMMODITY; }
 	YY_BREAK
 case 28:
 YY_RULE_SETUP
-#line 169 "beancount/parser/lexer.l"
+#line 175 "beancount/parser/lexer.l"
 { return PAD; }
 	YY_BREAK
 case 29:
 YY_RULE_SETUP
-#line 170 "beancount/parser/lexer.l"
+#line 176 "beancount/parser/lexer.l"
 { return EVENT; }
 	YY_BREAK
 case 30:
 YY_RULE_SETUP
-#line 171 "beancount/parser/lexer.l"
+#line 177 "beancount/parser/lexer.l"
 { return QUERY; }
 	YY_BREAK
 case 31:
 YY_RULE_SETUP
-#line 172 "beancount/parser/lexer.l"
+#line 178 "beancount/parser/lexer.l"
 { return CUSTOM; }
 	YY_BREAK
 case 32:
 YY_RULE_SETUP
-#line 173 "beancount/parser/lexer.l"
+#line 179 "beancount/parser/lexer.l"
 { return PRICE; }
 	YY_BREAK
 case 33:
 YY_RULE_SETUP
-#line 174 "beancount/parser/lexer.l"
+#line 180 "beancount/parser/lexer.l"
 { return NOTE; }
 	YY_BREAK
 case 34:
 YY_RULE_SETUP
-#line 175 "beancount/parser/lexer.l"
+#line 181 "beancount/parser/lexer.l"
 { return DOCUMENT; }
 	YY_BREAK
 case 35:
 YY_RULE_SETUP
-#line 176 "beancount/parser/lexer.l"
+#line 182 "beancount/parser/lexer.l"
 { return PUSHTAG; }
 	YY_BREAK
 case 36:
 YY_RULE_SETUP
-#line 177 "beancount/parser/lexer.l"
+#line 183 "beancount/parser/lexer.l"
 { return POPTAG; }
 	YY_BREAK
 case 37:
 YY_RULE_SETUP
-#line 178 "beancount/parser/lexer.l"
+#line 184 "beancount/parser/lexer.l"
 { return PUSHMETA; }
 	YY_BREAK
 case 38:
 YY_RULE_SETUP
-#line 179 "beancount/parser/lexer.l"
+#line 185 "beancount/parser/lexer.l"
 { return POPMETA; }
 	YY_BREAK
 case 39:
 YY_RULE_SETUP
-#line 180 "beancount/parser/lexer.l"
+#line 186 "beancount/parser/lexer.l"
 { return OPTION; }
 	YY_BREAK
 case 40:
 YY_RULE_SETUP
-#line 181 "beancount/parser/lexer.l"
+#line 187 "beancount/parser/lexer.l"
 { return PLUGIN; }
 	YY_BREAK
 case 41:
 YY_RULE_SETUP
-#line 182 "beancount/parser/lexer.l"
+#line 188 "beancount/parser/lexer.l"
 { return INCLUDE; }
 	YY_BREAK
 /* Boolean values. */
 case 42:
 YY_RULE_SETUP
-#line 185 "beancount/parser/lexer.l"
+#line 191 "beancount/parser/lexer.l"
 {
     return token(BOOL, true);
 }
 	YY_BREAK
 case 43:
 YY_RULE_SETUP
-#line 189 "beancount/parser/lexer.l"
+#line 195 "beancount/parser/lexer.l"
 {
     return token(BOOL, false);
 }
 	YY_BREAK
 case 44:
 YY_RULE_SETUP
-#line 193 "beancount/parser/lexer.l"
+#line 199 "beancount/parser/lexer.l"
 {
     return token(NONE);
 }
@@ -1692,7 +1698,7 @@ YY_RULE_SETUP
 /* Dates. */
 case 45:
 YY_RULE_SETUP
-#line 198 "beancount/parser/lexer.l"
+#line 204 "beancount/parser/lexer.l"
 {
     return token(DATE, yytext);
 }
@@ -1700,7 +1706,7 @@ YY_RULE_SETUP
 /* Account names. */
 case 46:
 YY_RULE_SETUP
-#line 203 "beancount/parser/lexer.l"
+#line 209 "beancount/parser/lexer.l"
 {
     return token(ACCOUNT, yytext);
 }
@@ -1709,7 +1715,7 @@ YY_RULE_SETUP
   * syntax. This is kept in sync with beancount.core.amount.CURRENCY_RE. */
 case 47:
 YY_RULE_SETUP
-#line 209 "beancount/parser/lexer.l"
+#line 215 "beancount/parser/lexer.l"
 {
     return token(CURRENCY, yytext, yyleng);
 }
@@ -1718,7 +1724,7 @@ YY_RULE_SETUP
 case 48:
 /* rule 48 can match eol */
 YY_RULE_SETUP
-#line 214 "beancount/parser/lexer.l"
+#line 220 "beancount/parser/lexer.l"
 {
     return token(STRING, yytext + 1, yyleng - 2, yy_encoding);
 }
@@ -1726,7 +1732,7 @@ YY_RULE_SETUP
 /* Numbers */
 case 49:
 YY_RULE_SETUP
-#line 219 "beancount/parser/lexer.l"
+#line 225 "beancount/parser/lexer.l"
 {
     return token(NUMBER, yytext);
 }
@@ -1734,7 +1740,7 @@ YY_RULE_SETUP
 /* Tags */
 case 50:
 YY_RULE_SETUP
-#line 224 "beancount/parser/lexer.l"
+#line 230 "beancount/parser/lexer.l"
 {
     return token(TAG, yytext + 1, yyleng - 1);
 }
@@ -1742,7 +1748,7 @@ YY_RULE_SETUP
 /* Links */
 case 51:
 YY_RULE_SETUP
-#line 229 "beancount/parser/lexer.l"
+#line 235 "beancount/parser/lexer.l"
 {
     return token(LINK, yytext + 1, yyleng - 1);
 }
@@ -1753,7 +1759,7 @@ case 52:
 yyg->yy_c_buf_p = yy_cp -= 1;
 YY_DO_BEFORE_ACTION; /* set up yytext again */
 YY_RULE_SETUP
-#line 234 "beancount/parser/lexer.l"
+#line 240 "beancount/parser/lexer.l"
 {
     return token(KEY, yytext, yyleng);
 }
@@ -1766,7 +1772,7 @@ case 53:
 yyg->yy_c_buf_p = yy_cp = yy_bp + 1;
 YY_DO_BEFORE_ACTION; /* set up yytext again */
 YY_RULE_SETUP
-#line 241 "beancount/parser/lexer.l"
+#line 247 "beancount/parser/lexer.l"
 { BEGIN(IGNORE); }
 	YY_BREAK
 case 54:
@@ -1774,13 +1780,13 @@ case 54:
 yyg->yy_c_buf_p = yy_cp = yy_bp + 1;
 YY_DO_BEFORE_ACTION; /* set up yytext again */
 YY_RULE_SETUP
-#line 242 "beancount/parser/lexer.l"
+#line 248 "beancount/parser/lexer.l"
 { BEGIN(IGNORE); }
 	YY_BREAK
 /* Default rule. {bf253a29a820} */
 case 55:
 YY_RULE_SETUP
-#line 245 "beancount/parser/lexer.l"
+#line 251 "beancount/parser/lexer.l"
 {
     unput(*yytext);
     BEGIN(INVALID);
@@ -1789,7 +1795,7 @@ YY_RULE_SETUP
 case YY_STATE_EOF(INITIAL):
 case YY_STATE_EOF(INVALID):
 case YY_STATE_EOF(IGNORE):
-#line 250 "beancount/parser/lexer.l"
+#line 256 "beancount/parser/lexer.l"
 {
     /* Ensure location data is populated. */
     YY_USER_ACTION;
@@ -1802,7 +1808,7 @@ case YY_STATE_EOF(IGNORE):
     this and more. {bba169a1d35a} */
 case 56:
 YY_RULE_SETUP
-#line 260 "beancount/parser/lexer.l"
+#line 266 "beancount/parser/lexer.l"
 {
     PyObject* input = PyUnicode_Decode(yytext, yyleng, "utf-8", "backslashreplace");
     build_lexer_error(yylloc, builder, "Invalid token: '%U'", input);
@@ -1812,17 +1818,17 @@ YY_RULE_SETUP
 	YY_BREAK
 case 57:
 YY_RULE_SETUP
-#line 267 "beancount/parser/lexer.l"
+#line 273 "beancount/parser/lexer.l"
 {
     BEGIN(INITIAL);
 }
 	YY_BREAK
 case 58:
 YY_RULE_SETUP
-#line 271 "beancount/parser/lexer.l"
+#line 277 "beancount/parser/lexer.l"
 ECHO;
 	YY_BREAK
-#line 1825 "beancount/parser/lexer.c"
+#line 1831 "beancount/parser/lexer.c"
 
 	case YY_END_OF_BUFFER:
 		{
@@ -3027,7 +3033,7 @@ void yyfree (void * ptr , yyscan_t yyscanner)
 
 #define YYTABLES_NAME "yytables"
 
-#line 271 "beancount/parser/lexer.l"
+#line 277 "beancount/parser/lexer.l"
 
 
 yyscan_t yylex_new(void)
@@ -3040,6 +3046,7 @@ yyscan_t yylex_new(void)
         return NULL;
 
     extra->filename = NULL;
+    extra->input_buffer.obj = NULL;
 
     yylex_init_extra(extra, &scanner);
     if (!scanner) {
@@ -3055,6 +3062,9 @@ yyscan_t yylex_free(yyscan_t scanner)
     yyextra_t* extra = yyget_extra(scanner);
 
     Py_XDECREF(extra->filename);
+    if (extra->input_buffer.obj) {
+        PyBuffer_Release(&extra->input_buffer);
+    }
     free(extra);
 
     Py_XDECREF(yyget_in(scanner));
@@ -3072,6 +3082,51 @@ static void yybegin(yyscan_t scanner)
     BEGIN(INITIAL);
 }
 
+/* Setup the scanner to scan the memory of @file, if it supports the
+ * buffer protocol. Return 0 if it does not, for it to be read as a
+ * file. */
+static int yyscan_pybuffer(PyObject* file, yyscan_t scanner)
+{
+    yyextra_t* extra = yyget_extra(scanner);
+    Py_buffer* buffer = &extra->input_buffer;
+    YY_BUFFER_STATE state;
+
+    if (!PyObject_CheckBuffer(file)) {
+        return 0;
+    }
+
+    /* Scan in place a writable buffer that ends with the two NUL bytes
+     * Flex requires, such as the one read by parser.parse_file(). The
+     * buffer is held until the next input, which prevents resizing it. */
+    state = NULL;
+    if (PyObject_GetBuffer(file, buffer, PyBUF_WRITABLE) == 0) {
+        char* base = buffer->buf;
+        if (buffer->len >= 2 && !base[buffer->len - 2] && !base[buffer->len - 1]) {
+            state = yy_scan_buffer(base, buffer->len, scanner);
+        } else {
+            PyBuffer_Release(buffer);
+        }
+    } else {
+        PyErr_Clear();
+        buffer->obj = NULL;
+    }
+
+    /* Copy the contents of any other buffer, once. */
+    if (!state) {
+        Py_buffer contents;
+        if (PyObject_GetBuffer(file, &contents, PyBUF_SIMPLE) < 0) {
+            PyErr_Clear();
+            return 0;
+        }
+        state = yy_scan_bytes(contents.buf, contents.len, scanner);
+        PyBuffer_Release(&contents);
+    }
+
+    /* yylex() sets yyin from the buffer state when it loads it. */
+    state->yy_input_file = (void *)file;
+    return 1;
+}
+
 void yylex_initialize(PyObject* file, PyObject* filename, int lineno, const char* encoding, yyscan_t scanner)
 {
     yyextra_t* extra = yyget_extra(scanner);
@@ -3095,9 +3150,19 @@ void yylex_initialize(PyObject* file, PyObject* filename, int lineno, const char
 
     extra->encoding = encoding ? encoding : "utf-8";
 
+    /* Discard the buffer of the previous input, which may be scanned in
+     * place, before releasing it. */
+    yypop_buffer_state(scanner);
+    if (extra->input_buffer.obj) {
+        PyBuffer_Release(&extra->input_buffer);
+    }
+
     Py_XDECREF(yyget_in(scanner));
     Py_INCREF(file);
-    yyrestart((void *)file, scanner);
+    if (!yyscan_pybuffer(file, scanner)) {
+        yyrestart((void *)file, scanner);
+    }
+    yyset_in((void *)file, scanner);
     yybegin(scanner);
 
     yyset_lineno(lineno, scanner);
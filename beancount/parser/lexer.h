@@ -26,17 +26,19 @@ yyscan_t yylex_free(yyscan_t scanner);
 /**
  * Initialize scanner private data.
  *
- * Setup @scanner to read from the Python file-like object @file. Set
- * the reported file name to @filename, if not NULL and not None.
+ * Setup @scanner to scan @file from memory if it supports the buffer
+ * protocol, or else to read it as a Python file-like object. A
+ * writable buffer ending with two NUL bytes is scanned in place, the
+ * contents of any other buffer are copied once. Set the reported file
+ * name to @filename, if not NULL and not None.
  * Otherwise try to obtain the file name from the @name attribute of
- * the @file object. If this fails, use the empty string. @encoding is
- * used to decode strings read from the input file, if not NULL,
- * otherwise the default UTF-8 encoding is used. Python objects
+ * the @file object, or use the empty string. @encoding is used to
+ * decode strings, if not NULL, otherwise UTF-8 is used. Python object
  * references are incremented. It is safe to call this multiple times.
  */
 void yylex_initialize(PyObject* file, PyObject* filename, int lineno, const char* encoding, yyscan_t scanner);
 
-#line 39 "beancount/parser/lexer.h"
+#line 41 "beancount/parser/lexer.h"
 
 #define  YY_INT_ALIGNED short int
 
@@ -550,9 +552,9 @@ extern int yylex \
 #undef yyTABLES_NAME
 #endif
 
-#line 271 "beancount/parser/lexer.l"
+#line 277 "beancount/parser/lexer.l"
 
 
-#line 556 "beancount/parser/lexer.h"
+#line 558 "beancount/parser/lexer.h"
 #undef yyIN_HEADER
 #endif /* yyHEADER_H */
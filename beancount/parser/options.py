@@ -202,6 +202,14 @@ OUTPUT_OPTION_GROUPS = [
       timestamps of the input files. (Internal use only; do not rely on this.)
     """, [Opt("input_hash", "", "841ee3be9acef165feba2342")]),
 
+    OptGroup("""
+      A pair of a boolean and a dict of each input filename to a fingerprint of
+      its contents, or None. This is set by the load cache when it validates its
+      contents by hashing the input files rather than by their timestamps. The
+      boolean is true if unchanged file timestamps and sizes are trusted to skip
+      hashing the file. (Internal use only; do not rely on this.)
+    """, [Opt("input_fingerprints", None)]),
+
     OptGroup("""
       An instance of DisplayContext, which is used to format numbers for output
       with precision inferred from that in the input file. This is created
@@ -82,10 +82,81 @@ extern YY_DECL;
 /* Placeholder object for missing cost specifications. */
 PyObject* missing_obj;
 
+/* Fast path of the builder of the running parse, or NULL. */
+FastPath* fastpath = NULL;
+
+/* Release the numbers whose shapes are kept by a fast path. */
+static void fastpath_clear_numbers(FastPath* fp)
+{
+    for (int i = 0; i < FASTPATH_NUMBERS; ++i) {
+        Py_CLEAR(fp->numbers[i].number);
+    }
+    fp->numbers_next = 0;
+}
+
+/* Fetch the fast path objects from the builder.
+ *
+ * Builders which do not provide a get_fast_path() method, or return None from
+ * it, are called back for all the grammar rules. Returns -1 and sets an
+ * exception on error.
+ */
+static int fastpath_init(FastPath* fp, PyObject* builder)
+{
+    PyObject* objects;
+
+    Py_CLEAR(fp->objects);
+    fastpath_clear_numbers(fp);
+    if (!PyObject_HasAttrString(builder, "get_fast_path")) {
+        return 0;
+    }
+    objects = PyObject_CallMethod(builder, "get_fast_path", NULL);
+    if (!objects) {
+        return -1;
+    }
+    if (objects == Py_None) {
+        Py_DECREF(objects);
+        return 0;
+    }
+    if (!PyArg_ParseTuple(objects, "O!O!O!O!O!O!O!O!O!O!OO!n:get_fast_path",
+                          &PyDict_Type, &fp->symbols,
+                          &PyDict_Type, &fp->valid_accounts,
+                          &PyDict_Type, &fp->dcontext_counts,
+                          &PyList_Type, &fp->tags,
+                          &PyDict_Type, &fp->meta,
+                          &PyType_Type, &fp->amount_type,
+                          &PyType_Type, &fp->posting_type,
+                          &PyType_Type, &fp->transaction_type,
+                          &PyType_Type, &fp->price_type,
+                          &PyType_Type, &fp->key_value_type,
+                          &fp->location_meta_type,
+                          &PyFrozenSet_Type, &fp->empty_set,
+                          &fp->precision)) {
+        Py_DECREF(objects);
+        return -1;
+    }
+
+    /* The grammar fills in the fields of the instances of these types. */
+    PyObject* tuple_types[] = {fp->amount_type, fp->posting_type, fp->transaction_type,
+                               fp->price_type, fp->key_value_type};
+    for (size_t i = 0; i < sizeof(tuple_types) / sizeof(tuple_types[0]); ++i) {
+        if (!PyType_IsSubtype((PyTypeObject*)tuple_types[i], &PyTuple_Type)) {
+            PyErr_Format(PyExc_TypeError, "Fast path type is not a tuple: %R",
+                         tuple_types[i]);
+            Py_DECREF(objects);
+            return -1;
+        }
+    }
+
+    fp->objects = objects;
+    return 0;
+}
+
 typedef struct {
     PyObject_HEAD
     yyscan_t scanner;
     PyObject* builder;
+    yypstate* pstate;
+    FastPath fastpath;
 } Parser;
 
 PyDoc_STRVAR(parser_doc,
@@ -114,6 +185,10 @@ static PyObject* parser_new(PyTypeObject* type, PyObject* args, PyObject* kwds)
     }
 
     self->builder = NULL;
+    self->pstate = NULL;
+    self->fastpath.objects = NULL;
+    memset(self->fastpath.numbers, 0, sizeof(self->fastpath.numbers));
+    self->fastpath.numbers_next = 0;
     return (PyObject*)self;
 }
 
@@ -141,8 +216,15 @@ static int parser_init(Parser* self, PyObject* args, PyObject* kwds)
 /* Destructor. */
 static void parser_dealloc(Parser* self)
 {
-    /* Free the builder. */
+    /* Free the builder and its fast path. */
     Py_XDECREF(self->builder);
+    Py_XDECREF(self->fastpath.objects);
+    fastpath_clear_numbers(&self->fastpath);
+
+    /* Free the state of an incremental parse left unfinished. */
+    if (self->pstate) {
+        yypstate_delete(self->pstate);
+    }
 
     /* Finalize the scanner state. */
     yylex_free(self->scanner);
@@ -153,7 +235,10 @@ static void parser_dealloc(Parser* self)
 PyDoc_STRVAR(parser_parse_doc,
              "parse(file, filename=None, lineno=1, encoding='utf8')\n"
              "\n"
-             "Parse input from file object. The filename and lineno keyword\n"
+             "Parse input from file object. An object supporting the buffer\n"
+             "protocol, such as bytes, is scanned from memory instead: in place\n"
+             "if it is writable and ends with two NUL bytes, as a copy otherwise.\n"
+             "The filename and lineno keyword\n"
              "arguments allow to specify the file name and start line number to be\n"
              "used in error reporting and in the returned metadata objects. If\n"
              "filename is not specified or None, the name attribute of the file\n"
@@ -167,6 +252,7 @@ static PyObject* parser_parse(Parser* self, PyObject* args, PyObject* kwds)
     const char* encoding = NULL;
     PyObject* filename = NULL;
     PyObject* file;
+    FastPath* previous;
     int lineno = 1;
     int ret;
 
@@ -175,11 +261,19 @@ static PyObject* parser_parse(Parser* self, PyObject* args, PyObject* kwds)
         return NULL;
     }
 
+    /* Fetch the fast path of the builder. */
+    if (fastpath_init(&self->fastpath, self->builder) < 0) {
+        return NULL;
+    }
+
     /* Initialize the scanner state. */
     yylex_initialize(file, filename, lineno, encoding, self->scanner);
 
     /* Run the parser. */
+    previous = fastpath;
+    fastpath = self->fastpath.objects ? &self->fastpath : NULL;
     ret = yyparse(self->scanner, self->builder);
+    fastpath = previous;
 
     /* Signal if an exception has been raised */
     if (PyErr_Occurred()) {
@@ -199,6 +293,113 @@ static PyObject* parser_parse(Parser* self, PyObject* args, PyObject* kwds)
     }
 }
 
+PyDoc_STRVAR(parser_parse_begin_doc,
+             "parse_begin(file, filename=None, lineno=1, encoding='utf8')\n"
+             "\n"
+             "Start an incremental parse of the input file object. The arguments\n"
+             "are the same as for parse(). Nothing is parsed until parse_continue()\n"
+             "is called.");
+
+static PyObject* parser_parse_begin(Parser* self, PyObject* args, PyObject* kwds)
+{
+    static char* kwlist[] = {"file", "filename", "lineno", "encoding", NULL};
+    const char* encoding = NULL;
+    PyObject* filename = NULL;
+    PyObject* file;
+    int lineno = 1;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|Oiz", kwlist,
+                                     &file, &filename, &lineno, &encoding)) {
+        return NULL;
+    }
+
+    /* Fetch the fast path of the builder. */
+    if (fastpath_init(&self->fastpath, self->builder) < 0) {
+        return NULL;
+    }
+
+    /* Discard the state of a previous incremental parse. */
+    if (self->pstate) {
+        yypstate_delete(self->pstate);
+    }
+    self->pstate = yypstate_new();
+    if (!self->pstate) {
+        return PyErr_NoMemory();
+    }
+
+    /* Initialize the scanner state. */
+    yylex_initialize(file, filename, lineno, encoding, self->scanner);
+
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(parser_parse_continue_doc,
+             "parse_continue(max_tokens=1024)\n"
+             "\n"
+             "Feed up to max_tokens tokens of the input started with parse_begin()\n"
+             "to the parser, and return True if there is more input to parse, or\n"
+             "False if the parse is complete. The rules reduced meanwhile are\n"
+             "processed by the Builder object as they are for parse().");
+
+static PyObject* parser_parse_continue(Parser* self, PyObject* args, PyObject* kwds)
+{
+    static char* kwlist[] = {"max_tokens", NULL};
+    Py_ssize_t max_tokens = 1024;
+    YYSTYPE yylval;
+    YYLTYPE yylloc;
+    FastPath* previous;
+    int token;
+    int ret = YYPUSH_MORE;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|n", kwlist, &max_tokens)) {
+        return NULL;
+    }
+
+    /* Ensure an incremental parse has been started. */
+    if (!self->pstate) {
+        PyErr_SetString(PyExc_ValueError, "Incremental parse not started");
+        return NULL;
+    }
+
+    /* Push tokens through the parser until the budget or the input runs out. */
+    previous = fastpath;
+    fastpath = self->fastpath.objects ? &self->fastpath : NULL;
+    for (Py_ssize_t i = 0; i < max_tokens && ret == YYPUSH_MORE; ++i) {
+        token = yylex(&yylval, &yylloc, self->scanner, self->builder);
+        ret = yypush_parse(self->pstate, token, &yylval, &yylloc,
+                           self->scanner, self->builder);
+        if (PyErr_Occurred()) {
+            break;
+        }
+    }
+    fastpath = previous;
+    if (ret == YYPUSH_MORE && !PyErr_Occurred()) {
+        Py_RETURN_TRUE;
+    }
+
+    /* The parse is complete. */
+    yypstate_delete(self->pstate);
+    self->pstate = NULL;
+
+    /* Signal if an exception has been raised */
+    if (PyErr_Occurred()) {
+        return NULL;
+    }
+
+    /* Check for internal errors during parsing. */
+    switch (ret) {
+    case 0:
+        Py_RETURN_FALSE;
+    case 1:
+        return PyErr_Format(PyExc_RuntimeError, "Parser internal error");
+    case 2:
+        return PyErr_Format(PyExc_MemoryError, "Parser ran out of memory");
+    default:
+        return PyErr_Format(PyExc_ValueError,
+                            "Unexpected yypush_parse() return value: %d", ret);
+    }
+}
+
 PyDoc_STRVAR(parser_lex_doc,
              "lex(file, filename=None, lineno=1, encoding='utf8')\n"
              "\n"
@@ -275,6 +476,10 @@ static PyObject* parser_iternext(Parser* self)
 
 static PyMethodDef parser_methods[] = {
     {"parse", (PyCFunction)parser_parse, METH_VARARGS | METH_KEYWORDS, parser_parse_doc},
+    {"parse_begin", (PyCFunction)parser_parse_begin, METH_VARARGS | METH_KEYWORDS,
+     parser_parse_begin_doc},
+    {"parse_continue", (PyCFunction)parser_parse_continue, METH_VARARGS | METH_KEYWORDS,
+     parser_parse_continue_doc},
     {"lex", (PyCFunction)parser_lex, METH_VARARGS | METH_KEYWORDS, parser_lex_doc},
     {NULL, NULL}
 };
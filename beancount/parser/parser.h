@@ -17,6 +17,63 @@ typedef void* yyscan_t;
 /* A global constant pointing to the special 'MISSING' object. */
 extern PyObject* missing_obj;
 
+/**
+ * The shape of a number, as counted in the display context: the sign, the
+ * exponent and the number of digits of the Decimal.as_tuple() of @number.
+ */
+typedef struct {
+    PyObject* number;
+    int sign;
+    Py_ssize_t exponent;
+    Py_ssize_t digits;
+} NumberShape;
+
+/**
+ * The shape of the last number converted by pydecimal_from_cstring(),
+ * computed from its string representation. Its @number is a borrowed
+ * reference, or NULL if that number is zero, whose sign depends on
+ * the rounding mode when it gets negated.
+ */
+extern NumberShape number_token;
+
+/* The number of recent numbers whose shapes are kept by the fast path. */
+#define FASTPATH_NUMBERS 4
+
+/**
+ * The objects used by the grammar to construct the common directives without
+ * calling back into the Python builder. These are borrowed from the tuple
+ * returned by the get_fast_path() method of the builder, which is owned by
+ * this structure.
+ */
+typedef struct {
+    PyObject* objects;
+    PyObject* symbols;
+    PyObject* valid_accounts;
+    PyObject* dcontext_counts;
+    PyObject* tags;
+    PyObject* meta;
+    PyObject* amount_type;
+    PyObject* posting_type;
+    PyObject* transaction_type;
+    PyObject* price_type;
+    PyObject* key_value_type;
+    PyObject* location_meta_type;
+    PyObject* empty_set;
+
+    /* The precision of the decimal context. */
+    Py_ssize_t precision;
+
+    /* The shapes of the most recent numbers parsed, used to count them into
+     * the display context without calling their as_tuple() method. These hold
+     * references to their numbers. */
+    NumberShape numbers[FASTPATH_NUMBERS];
+    int numbers_next;
+} FastPath;
+
+/* The fast path of the builder of the running parse, or NULL to always call
+ * back the builder. */
+extern FastPath* fastpath;
+
 /**
  * Convert an ASCII string to a PyDate object.
  *
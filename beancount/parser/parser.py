@@ -109,10 +109,13 @@ corresponding expected values.
 __copyright__ = "Copyright (C) 2013-2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import bisect
 import functools
 import inspect
 import textwrap
 import io
+import os
+import re
 import sys
 
 from beancount.parser import _parser
@@ -175,12 +178,39 @@ def is_entry_incomplete(entry):
     return False
 
 
-def parse_file(file, report_filename=None, report_firstline=1, **kw):
+def _read_file(filename):
+    """Read a file in memory, for the lexer to scan it in place.
+
+    Args:
+      filename: A string, the name of the file.
+    Returns:
+      A bytearray of the contents of the file, followed by the two NUL bytes
+      the lexer requires at the end of a buffer to scan it without a copy.
+    """
+    with open(filename, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        contents = bytearray(size + 2)
+        with memoryview(contents) as view:
+            size = file.readinto(view[:size])
+        # Read the rest of the files whose size is not known, such as pipes.
+        contents[size:-2] = file.read()
+    return contents
+
+
+def parse_file(file, report_filename=None, report_firstline=1, symbols=None,
+               options_map=None, **kw):
     """Parse a beancount input file and return Ledger with the list of
     transactions and tree of accounts.
 
     Args:
-      file: file object or path to the file to be parsed.
+      file: file object or path to the file to be parsed. A file given by its
+        path is read in memory at once, for the lexer to scan it there.
+      symbols: A dict of strings to themselves, used to intern the account
+        names, currencies, tags, links, metadata keys and filename of the
+        parsed entries, or None. Share one between calls to have the entries
+        of several files share the same string objects.
+      options_map: A dict of options to start parsing with, or None, for the
+        defaults. See grammar.Builder.
       kw: a dict of keywords to be applied to the C parser.
     Returns:
       A tuple of (
@@ -194,13 +224,51 @@ def parse_file(file, report_filename=None, report_firstline=1, **kw):
     # that does not work for io.BytesIO despite it implementing the
     # readinto() method.
     elif not isinstance(file, io.IOBase):
-        file = open(file, 'rb')
-    builder = grammar.Builder()
+        if report_filename is None:
+            report_filename = file
+        file = _read_file(file)
+    if symbols is not None and report_filename is not None:
+        report_filename = symbols.setdefault(report_filename, report_filename)
+    builder = grammar.Builder(symbols, options_map)
     parser = _parser.Parser(builder)
     parser.parse(file, filename=report_filename, lineno=report_firstline, **kw)
     return builder.finalize()
 
 
+def parse_iter(file, builder=None, report_filename=None, report_firstline=1,
+               **kw):
+    """An iterator that yields the directives of a file as they get parsed.
+
+    Unlike parse_file(), this does not accumulate the directives, so that very
+    large inputs can be processed in constant memory. The directives are
+    yielded in the order in which they appear in the input, not sorted.
+
+    Args:
+      file: file object or path to the file to be parsed.
+      builder: An instance of grammar.StreamingBuilder. If not specified, one is
+        created and discarded along with the errors and options. Otherwise,
+        once the iterator is exhausted, its finalize() method returns the
+        errors and options map of the file.
+      kw: a dict of keywords to be applied to the C parser.
+    Yields:
+      The directives parsed from the file, which may need completion.
+    """
+    if file == '-':
+        file = sys.stdin.buffer
+    elif not isinstance(file, io.IOBase):
+        if report_filename is None:
+            report_filename = file
+        file = _read_file(file)
+    if builder is None:
+        builder = grammar.StreamingBuilder()
+    parser = _parser.Parser(builder)
+    parser.parse_begin(file, filename=report_filename, lineno=report_firstline, **kw)
+    more = True
+    while more:
+        more = parser.parse_continue()
+        yield from builder.pop_entries()
+
+
 def parse_string(string, report_filename=None, **kw):
     """Parse a beancount input file and return Ledger with the list of
     transactions and tree of accounts.
@@ -225,6 +293,183 @@ def parse_string(string, report_filename=None, **kw):
     return parse_file(file, report_filename=report_filename, **kw)
 
 
+# A dated directive at the beginning of a line, where a file may be split.
+_CHUNK_START_RE = re.compile(rb'^[0-9]{4,}[-/][0-9]+[-/][0-9]+', re.M)
+
+
+def _find_line_starts(contents, prefix):
+    """Find the lines starting with a prefix.
+
+    Args:
+      contents: A bytes-like object, the contents of a file.
+      prefix: A bytes object.
+    Returns:
+      A list of the offsets of the lines starting with the prefix.
+    """
+    offsets = [0] if contents[:len(prefix)] == prefix else []
+    pattern = b'\n' + prefix
+    offset = contents.find(pattern)
+    while offset != -1:
+        offsets.append(offset + 1)
+        offset = contents.find(pattern, offset + 1)
+    return offsets
+
+
+def find_chunk_boundaries(contents, chunk_size):
+    """Find where to split a file into chunks that can be parsed independently.
+
+    A chunk may only start with a dated directive at the beginning of a line,
+    outside of pushtag and pushmeta regions, and after the last option directive
+    of the file. The parse of such a chunk only depends on the options set
+    before it, so the chunks can be parsed separately, starting from the options
+    parsed from the first chunk. The input is searched for the beginnings of
+    these lines rather than lexed, so that this is fast; string literals are not
+    accounted for, and a split within a multi-line string results in parse
+    errors in both of the chunks around it.
+
+    Args:
+      contents: A bytes-like object, such as an mmap, the contents of the file.
+      chunk_size: An integer, the approximate size of the chunks, in bytes.
+    Returns:
+      A list of (offset, lineno) pairs, the offset in bytes and the line number
+      of the start of each chunk but the first one. The first chunk ends at the
+      first dated directive after the last option directive.
+    """
+    # The first chunk must contain all the options.
+    start = contents.rfind(b'\noption') + 1
+
+    # The offsets at which the depth of the pushtag and pushmeta regions changes.
+    events = sorted([(offset, 1)
+                     for prefix in (b'pushtag', b'pushmeta')
+                     for offset in _find_line_starts(contents, prefix)] +
+                    [(offset, -1)
+                     for prefix in (b'poptag', b'popmeta')
+                     for offset in _find_line_starts(contents, prefix)])
+    region_offsets, region_depths = [], []
+    depth = 0
+    for offset, delta in events:
+        depth = max(depth + delta, 0)
+        region_offsets.append(offset)
+        region_depths.append(depth)
+
+    boundaries = []
+    lineno, line_offset = 1, 0
+    while True:
+        match = _CHUNK_START_RE.search(contents, start)
+        if match is None:
+            break
+        offset = match.start()
+
+        # Skip to the end of the enclosing region, if any.
+        index = bisect.bisect_right(region_offsets, offset)
+        if index and region_depths[index - 1]:
+            for index in range(index, len(region_depths)):
+                if region_depths[index] == 0:
+                    start = region_offsets[index]
+                    break
+            else:
+                break
+            continue
+
+        lineno += contents[line_offset:offset].count(b'\n')
+        line_offset = offset
+        boundaries.append((offset, lineno))
+        start = offset + chunk_size
+    return boundaries
+
+
+# The keywords of the directives which are processed by scan_file().
+_SCAN_KEYWORDS = (b'option', b'include', b'plugin')
+
+
+def _find_directive_lines(contents):
+    """Find the option, include and plugin directives of a file.
+
+    Those directives may not be indented, so only the beginnings of lines are
+    searched for their keywords. A directive normally ends with its line, but it
+    is extended over the following lines while it has an unterminated string.
+
+    Args:
+      contents: A bytes-like object, the contents of a file.
+    Returns:
+      A sorted list of (offset, end, lineno) tuples, the offset in bytes of the
+      beginning and end of each directive and its line number.
+    """
+    offsets = sorted(offset
+                     for keyword in _SCAN_KEYWORDS
+                     for offset in _find_line_starts(contents, keyword))
+    directives = []
+    lineno, line_offset = 1, 0
+    for offset in offsets:
+        end = contents.find(b'\n', offset)
+        while end != -1 and (contents.count(b'"', offset, end) -
+                             contents.count(b'\\"', offset, end)) % 2:
+            end = contents.find(b'\n', end + 1)
+        if end == -1:
+            end = len(contents)
+        lineno += contents.count(b'\n', line_offset, offset)
+        line_offset = offset
+        directives.append((offset, end, lineno))
+    return directives
+
+
+def scan_file(file, report_filename=None, options_map=None, **kw):
+    """Scan a beancount input file for its options, plugins and includes only.
+
+    This is a lot faster than parse_file(), as the rest of the input is skipped
+    over without being lexed: only the lines starting with the 'option',
+    'include' and 'plugin' keywords are found and run through the parser, in the
+    order in which they appear and with their own line numbers. The resulting
+    options and errors on those directives are the same as those of a full
+    parse, unless one of those keywords starts a line within a multi-line
+    string of another directive.
+
+    Args:
+      file: file object or path to the file to be scanned.
+      report_filename: A string, the filename to report in errors, if any.
+      options_map: A dict of options to start scanning with, or None, for the
+        defaults. See grammar.Builder.
+      kw: a dict of keywords to be applied to the C parser.
+    Returns:
+      The same as parse_file(), with an empty list of entries.
+    """
+    if file == '-':
+        contents = sys.stdin.buffer.read()
+    elif isinstance(file, io.IOBase):
+        contents = file.read()
+    else:
+        if report_filename is None:
+            report_filename = file
+        with open(file, 'rb') as infile:
+            contents = infile.read()
+    builder = grammar.Builder(None, options_map)
+    parser = _parser.Parser(builder)
+    # Parse an empty input if there are no directives, for the parser to record
+    # the name of the file in the options, as it does in a full parse.
+    for offset, end, lineno in _find_directive_lines(contents) or [(0, 0, 1)]:
+        parser.parse(contents[offset:end], filename=report_filename, lineno=lineno,
+                     **kw)
+    return builder.finalize()
+
+
+def scan_string(string, report_filename=None, **kw):
+    """Scan a beancount input string for its options, plugins and includes only.
+
+    Args:
+      string: A string, the contents to be scanned instead of a file's.
+      report_filename: A string, the source filename from which this string
+        has been extracted, if any.
+      **kw: See scan_file().
+    Return:
+      Same as the output of scan_file().
+    """
+    if isinstance(string, str):
+        string = string.encode('utf8')
+    if report_filename is None:
+        report_filename = '<string>'
+    return scan_file(io.BytesIO(string), report_filename=report_filename, **kw)
+
+
 def parse_doc(expect_errors=False, allow_incomplete=False):
     """Factory of decorators that parse the function's docstring as an argument.
 
@@ -91,6 +91,27 @@ class TestParserInputs(unittest.TestCase):
             self.assertEqual(1, len(entries))
             self.assertEqual(0, len(errors))
 
+    def test_parse_filename_empty(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.beancount') as file:
+            entries, errors, options_map = parser.parse_file(file.name)
+            self.assertEqual(0, len(entries))
+            self.assertEqual(0, len(errors))
+            self.assertEqual(file.name, options_map['filename'])
+
+    def test_parse_buffer(self):
+        # Objects supporting the buffer protocol are scanned from memory, in
+        # place for a writable buffer ending with two NUL bytes.
+        contents = self.INPUT.encode('utf-8')
+        for buffer in (contents, memoryview(contents), bytearray(contents),
+                       bytearray(contents + b'\0\0')):
+            builder = grammar.Builder()
+            _parser.Parser(builder).parse(buffer, filename='<buffer>', lineno=10)
+            entries, errors, _ = builder.finalize()
+            self.assertEqual(1, len(entries))
+            self.assertEqual(0, len(errors))
+            self.assertEqual(11, entries[0].meta['lineno'])
+            self.assertEqual(contents, bytes(buffer).rstrip(b'\0'))
+
     def test_parse_file(self):
         with tempfile.TemporaryFile('w+b', suffix='.beancount') as file:
             file.write(self.INPUT.encode('utf-8'))
@@ -124,6 +145,212 @@ class TestParserInputs(unittest.TestCase):
         with self.assertRaises(TypeError):
             entries, errors, _ = parser.parse_file(None)
 
+    def test_parse_string_symbols(self):
+        symbols = {}
+        entries1, errors, _ = parser.parse_string("""
+          2013-05-18 * "Dinner" #food ^receipt
+            key: "value"
+            Expenses:Restaurant         100 USD
+            Assets:US:Cash
+        """, dedent=True, symbols=symbols)
+        self.assertFalse(errors)
+        entries2, errors, _ = parser.parse_string("""
+          2013-05-19 open Assets:US:Cash USD
+            key: "other"
+          2013-05-20 * "Lunch" #food ^receipt
+            Expenses:Restaurant         20 USD
+            Assets:US:Cash
+        """, dedent=True, symbols=symbols)
+        self.assertFalse(errors)
+
+        txn1, (open_entry, txn2) = entries1[0], entries2
+        self.assertIs(txn1.postings[0].account, txn2.postings[0].account)
+        self.assertIs(txn1.postings[1].account, open_entry.account)
+        self.assertIs(txn1.postings[0].units.currency, txn2.postings[0].units.currency)
+        self.assertIs(txn1.postings[0].units.currency, open_entry.currencies[0])
+        self.assertIs(next(iter(txn1.tags)), next(iter(txn2.tags)))
+        self.assertIs(next(iter(txn1.links)), next(iter(txn2.links)))
+        key1, = [key for key in txn1.meta if key == 'key']
+        key2, = [key for key in open_entry.meta if key == 'key']
+        self.assertIs(key1, key2)
+        self.assertIs(txn1.meta['filename'], open_entry.meta['filename'])
+
+
+class TestParseIter(unittest.TestCase):
+
+    INPUT = textwrap.dedent("""
+      2013-05-18 * "Nice dinner at Mermaid Inn"
+        Expenses:Restaurant         100 USD
+        Assets:US:Cash
+
+      option "title" "Streamed"
+      2013-05-01 open Assets:US:Cash
+
+      2013-05-02 open Assets:US:Cash Invalid Syntax
+
+      2013-05-03 open Expenses:Restaurant
+    """)
+
+    def test_parse_iter(self):
+        builder = grammar.StreamingBuilder()
+        entries = list(parser.parse_iter(io.BytesIO(self.INPUT.encode('utf-8')),
+                                         builder, report_filename='<iter>'))
+        self.assertEqual([data.Transaction, data.Open, data.Open],
+                         list(map(type, entries)))
+        self.assertEqual([2, 7, 11], [entry.meta['lineno'] for entry in entries])
+        self.assertEqual('<iter>', entries[0].meta['filename'])
+        self.assertEqual([], builder.pop_entries())
+
+        _, errors, options_map = builder.finalize()
+        self.assertTrue(errors)
+        self.assertEqual('Streamed', options_map['title'])
+
+        # The same directives as parse_file(), but not sorted.
+        full_entries, full_errors, _ = parser.parse_string(
+            self.INPUT, report_filename='<iter>')
+        self.assertEqual(sorted(entries, key=data.entry_sortkey), full_entries)
+        self.assertEqual(len(full_errors), len(errors))
+
+    def test_parse_iter_incremental(self):
+        # Check that the directives are produced before the end of the input.
+        num_entries = 10000
+        oss = io.StringIO()
+        for index in range(num_entries):
+            oss.write('2013-05-01 open Assets:Account{}\n'.format(index))
+        iterator = parser.parse_iter(io.BytesIO(oss.getvalue().encode('utf-8')))
+        entry = next(iterator)
+        self.assertEqual('Assets:Account0', entry.account)
+        self.assertEqual(num_entries - 1, len(list(iterator)))
+
+    def test_parse_iter_filename(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.beancount') as file:
+            file.write(self.INPUT)
+            file.flush()
+            entries = list(parser.parse_iter(file.name))
+        self.assertEqual(3, len(entries))
+        self.assertEqual(file.name, entries[0].meta['filename'])
+
+    def test_parse_continue_not_started(self):
+        with self.assertRaises(ValueError):
+            _parser.Parser(grammar.StreamingBuilder()).parse_continue()
+
+
+class TestFindChunkBoundaries(unittest.TestCase):
+
+    def find_boundaries(self, string, chunk_size=1):
+        contents = textwrap.dedent(string).encode('utf8')
+        return [(contents[offset:].split(b'\n', 1)[0].decode('utf8'), lineno)
+                for offset, lineno in parser.find_chunk_boundaries(contents, chunk_size)]
+
+    def test_find_chunk_boundaries(self):
+        self.assertEqual([
+            ('2014-01-01 open Assets:Cash', 3),
+            ('2014-01-02 * "Multi-line', 4),
+            ('2014-01-03 open Assets:Other', 9),
+        ], self.find_boundaries("""\
+          option "title" "Chunks"
+          ; A comment.
+          2014-01-01 open Assets:Cash
+          2014-01-02 * "Multi-line
+          narration"
+            Assets:Cash   1 USD
+            Assets:Cash  -1 USD
+
+          2014-01-03 open Assets:Other
+        """))
+
+    def test_find_chunk_boundaries_size(self):
+        contents = ''.join('2014-01-01 open Assets:Account{:02d}\n'.format(index)
+                           for index in range(20))
+        boundaries = self.find_boundaries(contents, chunk_size=len(contents) // 4)
+        self.assertEqual([1, 6, 11, 16], [lineno for _, lineno in boundaries])
+
+    def test_find_chunk_boundaries_after_options(self):
+        self.assertEqual([
+            ('2014-01-03 open Assets:Other', 4),
+        ], self.find_boundaries("""\
+          2014-01-01 open Assets:Cash
+          2014-01-02 open Assets:Bank
+          option "title" "Chunks"
+          2014-01-03 open Assets:Other
+        """))
+
+    def test_find_chunk_boundaries_regions(self):
+        self.assertEqual([
+            ('2014-01-01 open Assets:Cash', 1),
+            ('2014-01-05 open Assets:Last', 8),
+        ], self.find_boundaries("""\
+          2014-01-01 open Assets:Cash
+          pushtag #trip
+          pushmeta location: "Paris"
+          2014-01-02 open Assets:Other
+          popmeta location:
+          2014-01-03 open Assets:Other2
+          poptag #trip
+          2014-01-05 open Assets:Last
+          pushtag #unbalanced
+          2014-01-06 open Assets:Unbalanced
+        """))
+
+    def test_find_chunk_boundaries_none(self):
+        self.assertEqual([], self.find_boundaries("""\
+          option "title" "Chunks"
+        """))
+
+
+class TestScanFile(unittest.TestCase):
+
+    INPUT = textwrap.dedent("""\
+      option "title" "Scanned"
+      option "operating_currency" "USD"
+      option "name_assets" "Actifs"
+      include "other.beancount" ; A comment.
+      2014-01-01 open Actifs:Cash
+      2014-01-02 * "Multi-line
+      narration"
+        Actifs:Cash   1 USD
+        Actifs:Cash  -1 USD
+        option: "Not an option"
+      plugin "beancount.plugins.auto_accounts"
+      plugin "beancount.plugins.other" "config
+      on two lines"
+      option "operating_currency" "CAD"
+      option "unknown_option" "Error"
+      plugin "missing_string
+    """)
+
+    def test_scan_string(self):
+        _, errors, options_map = parser.parse_string(self.INPUT)
+        _, scan_errors, scan_options_map = parser.scan_string(self.INPUT)
+        self.assertEqual(2, len(errors))
+        self.assertEqual([(error.source['lineno'], error.message) for error in errors],
+                         [(error.source['lineno'], error.message)
+                          for error in scan_errors])
+        del options_map['dcontext'], scan_options_map['dcontext']
+        self.assertEqual(options_map, scan_options_map)
+        self.assertEqual('Scanned', scan_options_map['title'])
+        self.assertEqual(['USD', 'CAD'], scan_options_map['operating_currency'])
+        self.assertEqual(['other.beancount'], scan_options_map['include'])
+        self.assertEqual([('beancount.plugins.auto_accounts', None),
+                          ('beancount.plugins.other', 'config\non two lines')],
+                         scan_options_map['plugin'])
+
+    def test_scan_file(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.beancount') as file:
+            file.write(self.INPUT)
+            file.flush()
+            entries, errors, options_map = parser.scan_file(file.name)
+            self.assertEqual([], entries)
+            self.assertEqual(file.name, options_map['filename'])
+            self.assertTrue(all(error.source['filename'] == file.name
+                                for error in errors))
+
+    def test_scan_string_empty(self):
+        _, errors, options_map = parser.scan_string('2014-01-01 open Assets:Cash\n')
+        self.assertFalse(errors)
+        self.assertEqual('<string>', options_map['filename'])
+        self.assertEqual([], options_map['include'])
+
 
 class TestUnicodeErrors(unittest.TestCase):
 
@@ -327,6 +554,41 @@ class TestReferenceCounting(unittest.TestCase):
         self.assertEqual(sys.getrefcount(name), 3)
         self.assertEqual(sys.getrefcount(f), 2)
 
+    def test_parser_parse_buffer(self):
+        contents = bytearray(b"2013-05-01 open Assets:Cash\n\0\0")
+        self.assertEqual(sys.getrefcount(contents), 2)
+
+        builder = grammar.Builder()
+        parser = _parser.Parser(builder)
+        parser.parse(contents, filename='<buffer>')
+        self.assertEqual(1, len(builder.entries))
+        # The Parser object keeps a reference to the input, and to the
+        # buffer exported from it, which it scans in place. This prevents
+        # resizing it.
+        self.assertEqual(sys.getrefcount(contents), 4)
+        with self.assertRaises(BufferError):
+            contents.append(0)
+
+        # Parsing another input releases the buffer.
+        parser.parse(io.BytesIO(b""))
+        self.assertEqual(sys.getrefcount(contents), 2)
+        contents.append(0)
+
+        parser.parse(contents)
+        del parser
+        self.assertEqual(sys.getrefcount(contents), 2)
+
+    def test_parser_parse_buffer_copy(self):
+        # The contents of a buffer which does not end with two NUL bytes are
+        # copied, and the buffer is not held.
+        contents = bytearray(b"2013-05-01 open Assets:Cash\n")
+        builder = grammar.Builder()
+        parser = _parser.Parser(builder)
+        parser.parse(contents, filename='<buffer>')
+        self.assertEqual(1, len(builder.entries))
+        self.assertEqual(sys.getrefcount(contents), 3)
+        contents.append(0)
+
 
 class TestLineno(unittest.TestCase):
 
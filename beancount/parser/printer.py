@@ -5,6 +5,7 @@ __license__ = "GNU GPLv2"
 
 import codecs
 import datetime
+import functools
 import io
 import re
 import sys
@@ -22,6 +23,27 @@ from beancount.core import display_context
 from beancount.utils import misc_utils
 
 
+# A function to search for the first currency character of a rendered position.
+_search_currency = re.compile('[A-Z]').search
+
+
+@functools.lru_cache(maxsize=None)
+def _align_formats(max_before, max_after, max_total):
+    """Build the format functions used to align positions to given widths.
+
+    Args:
+      max_before: An integer, the width before the first currency character.
+      max_after: An integer, the width from the first currency character.
+      max_total: An integer, the total width, used for the strings without a
+        currency character.
+    Returns:
+      A pair of the format functions for the strings with and without a
+      currency character.
+    """
+    return ("{{:>{0}}}{{:{1}}}".format(max_before, max_after).format,
+            "{{:<{0}}}".format(max_total).format)
+
+
 def align_position_strings(strings):
     """A helper used to align rendered amounts positions to their first currency
     character (an uppercase letter). This class accepts a list of rendered
@@ -53,7 +75,7 @@ def align_position_strings(strings):
     max_unknown = 0
 
     string_items = []
-    search = re.compile('[A-Z]').search
+    search = _search_currency
     for string in strings:
         match = search(string)
         if match:
@@ -70,8 +92,7 @@ def align_position_strings(strings):
     # Compute formatting string.
     max_total = max(max_before + max_after, max_unknown)
     max_after_prime = max_total - max_before
-    fmt = "{{:>{0}}}{{:{1}}}".format(max_before, max_after_prime).format
-    fmt_unknown = "{{:<{0}}}".format(max_total).format
+    fmt, fmt_unknown = _align_formats(max_before, max_after_prime, max_total)
 
     # Align the strings and return them.
     aligned_strings = []
@@ -109,6 +130,7 @@ class EntryPrinter:
         self.min_width_account = min_width_account
         self.prefix = prefix or '  '
         self.stringify_invalid_types = stringify_invalid_types
+        self._posting_formats = {}
 
     def __call__(self, obj):
         """Render a directive.
@@ -181,14 +203,13 @@ class EntryPrinter:
         oss.write('{e.date} {e.flag} {}\n'.format(' '.join(strings), e=entry))
         self.write_metadata(entry.meta, oss)
 
-        rows = [self.render_posting_strings(posting)
+        rows = [self.render_posting_strings(posting, self.render_weight)
                 for posting in entry.postings]
         strs_account = [row[0] for row in rows]
         width_account = (max(len(flag_account) for flag_account in strs_account)
                          if strs_account
                          else 1)
         strs_position, width_position = align_position_strings(row[1] for row in rows)
-        strs_weight, width_weight = align_position_strings(row[2] for row in rows)
 
         if self.min_width_account and self.min_width_account > width_account:
             width_account = self.min_width_account
@@ -197,6 +218,7 @@ class EntryPrinter:
                                if self.render_weight
                                else False)
         if non_trivial_balance:
+            strs_weight, width_weight = align_position_strings(row[2] for row in rows)
             fmt = "{0}{{:{1}}}  {{:{2}}}  ; {{:{3}}}\n".format(
                 self.prefix, width_account, width_position, width_weight).format
             for posting, account, position_str, weight_str in zip(entry.postings,
@@ -209,9 +231,7 @@ class EntryPrinter:
                 if posting.meta:
                     self.write_metadata(posting.meta, oss, '    ')
         else:
-            fmt_str = "{0}{{:{1}}}  {{:{2}}}\n".format(
-                self.prefix, width_account, max(1, width_position))
-            fmt = fmt_str.format
+            fmt = self._posting_format(width_account, max(1, width_position))
             for posting, account, position_str in zip(entry.postings,
                                                       strs_account,
                                                       strs_position):
@@ -219,13 +239,33 @@ class EntryPrinter:
                 if posting.meta:
                     self.write_metadata(posting.meta, oss, '    ')
 
-    def render_posting_strings(self, posting):
+    def _posting_format(self, width_account, width_position):
+        """Return the format function of the posting lines of a transaction.
+
+        These are cached, as there are few distinct widths in a ledger.
+
+        Args:
+          width_account: An integer, the width of the account column.
+          width_position: An integer, the width of the position column.
+        Returns:
+          A format function of the account and position strings.
+        """
+        key = (width_account, width_position)
+        fmt = self._posting_formats.get(key)
+        if fmt is None:
+            fmt = self._posting_formats[key] = "{0}{{:{1}}}  {{:{2}}}\n".format(
+                self.prefix, width_account, width_position).format
+        return fmt
+
+    def render_posting_strings(self, posting, render_weight=True):
         """This renders the three components of a posting: the account and its optional
         posting flag, the position, and finally, the weight of the position. The
         purpose is to align these in the caller.
 
         Args:
           posting: An instance of Posting, the posting to render.
+          render_weight: A boolean, false to skip rendering the weight, which is
+            then rendered as an empty string.
         Returns:
           A tuple of
             flag_account: A string, the account name including the flag.
@@ -242,8 +282,9 @@ class EntryPrinter:
         if isinstance(posting.units, amount.Amount):
             position_str = position.to_string(posting, self.dformat)
             # Note: we render weights at maximum precision, for debugging.
-            if posting.cost is None or (isinstance(posting.cost, position.Cost) and
-                                        isinstance(posting.cost.number, Decimal)):
+            if render_weight and (
+                    posting.cost is None or (isinstance(posting.cost, position.Cost) and
+                                             isinstance(posting.cost.number, Decimal))):
                 weight_str = str(convert.get_weight(posting))
         else:
             position_str = ''
@@ -373,6 +414,11 @@ def print_entry(entry, dcontext=None, render_weights=False, file=None):
     output.write('\n')
 
 
+# The number of characters of rendered entries print_entries() accumulates
+# before writing them out.
+PRINT_BUFFER_SIZE = 1 << 16
+
+
 # TODO(blais): Change this to a function which accepts the same optional
 # arguments as the printer object. Isolate the spacer/segmentation algorithm to
 # its own function.
@@ -394,17 +440,29 @@ def print_entries(entries, dcontext=None, render_weights=False, file=None, prefi
         output.write(prefix)
     previous_type = type(entries[0]) if entries else None
     eprinter = EntryPrinter(dcontext, render_weights)
+
+    # Render all the entries to the same buffer, which is written out in large
+    # blocks, rather than rendering each of them to its own string.
+    methods = {}
+    oss = io.StringIO()
     for entry in entries:
         # Insert a newline between transactions and between blocks of directives
         # of the same type.
         entry_type = type(entry)
         if (entry_type in (data.Transaction, data.Commodity) or
             entry_type is not previous_type):
-            output.write('\n')
+            oss.write('\n')
             previous_type = entry_type
 
-        string = eprinter(entry)
-        output.write(string)
+        method = methods.get(entry_type)
+        if method is None:
+            method = methods[entry_type] = getattr(eprinter, entry_type.__name__)
+        method(entry, oss)
+        if oss.tell() >= PRINT_BUFFER_SIZE:
+            output.write(oss.getvalue())
+            oss.seek(0)
+            oss.truncate()
+    output.write(oss.getvalue())
 
 
 # TODO(blais): Rename to format_source() to be consistent, better:
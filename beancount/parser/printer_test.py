@@ -6,6 +6,7 @@ from datetime import date
 import unittest
 import re
 import textwrap
+from unittest import mock
 
 from beancount.parser import printer
 from beancount.parser import cmptest
@@ -276,6 +277,29 @@ class TestPrinterSpacing(unittest.TestCase):
 
         self.assertEqual(expected_classes, actual_classes)
 
+    def test_print_entries_buffered(self):
+        entries, _, __ = loader.load_string(textwrap.dedent("""\
+        2014-01-01 open Assets:Account1
+        2014-01-01 open Assets:Cash
+
+        2014-06-08 * "Narration"
+          Assets:Account1       111.00 BEAN
+          Assets:Cash
+
+        2014-06-09 * "Narration"
+          Assets:Account1       222.00 BEAN
+          Assets:Cash
+        """))
+        oss = io.StringIO()
+        printer.print_entries(entries, file=oss)
+
+        # Flush the rendered entries after each of them.
+        with mock.patch.object(printer, 'PRINT_BUFFER_SIZE', 1):
+            oss_flushed = io.StringIO()
+            printer.print_entries(entries, file=oss_flushed)
+        self.assertEqual(oss.getvalue(), oss_flushed.getvalue())
+        self.assertIn(printer.format_entry(entries[-1]), oss.getvalue())
+
 
 class TestDisplayContext(test_utils.TestCase):
 
@@ -52,10 +52,15 @@ ssize_t validate_decimal_number(const char* str, char* buffer, size_t len)
     return dst - buffer;
 }
 
+NumberShape number_token;
+
 PyObject* pydecimal_from_cstring(const char* str)
 {
     char buffer[256];
     Py_ssize_t len;
+    PyObject* number;
+    const char* dot;
+    const char* digits;
 
     len = validate_decimal_number(str, buffer, sizeof(buffer));
     if (len < 0) {
@@ -63,7 +68,17 @@ PyObject* pydecimal_from_cstring(const char* str)
         return NULL;
     }
 
-    return PyDec_FromCString(buffer, len);
+    number = PyDec_FromCString(buffer, len);
+
+    /* The leading zeros are not digits of the Decimal number. */
+    dot = memchr(buffer, '.', len);
+    for (digits = buffer; digits < buffer + len && (*digits == '0' || *digits == '.'); ++digits);
+    number_token.number = digits < buffer + len ? number : NULL;
+    number_token.sign = 0;
+    number_token.exponent = dot ? dot - (buffer + len - 1) : 0;
+    number_token.digits = buffer + len - digits - (dot && dot > digits);
+
+    return number;
 }
 
 ssize_t cunescape(const char* string, size_t len, int strict, char** ret, int* lines)
@@ -14,6 +14,8 @@ from beancount.core import data
 from beancount.core.amount import CURRENCY_RE
 
 __plugins__ = ('validate_commodity_directives',)
+__plugins_pure__ = True
+__plugins_preserve_order__ = True
 
 
 CheckCommodityError = collections.namedtuple('CheckCommodityError', 'source message entry')
@@ -12,6 +12,7 @@ from beancount.core import amount
 from beancount.core import inventory
 
 __plugins__ = ('add_implicit_prices',)
+__plugins_pure__ = True
 
 
 ImplicitPriceError = collections.namedtuple('ImplicitPriceError', 'source message entry')
@@ -11,6 +11,7 @@ import sys
 from beancount import loader
 from beancount.ops import validation
 from beancount.utils import misc_utils
+from beancount.utils import profiler
 from beancount.parser import version
 
 
@@ -31,6 +32,34 @@ def main():
                         help='Disable the cache from the command-line.')
     parser.add_argument('--cache-filename', action='store',
                         help='Override the name of the cache')
+    parser.add_argument('--parse-cache', action='store_true', default=None,
+                        help='Cache the parsing of each included file separately.')
+    parser.add_argument('-j', '--parse-workers', action='store', type=int,
+                        help=('Parse included files, and chunks of large files, in '
+                              'parallel, on that many processes.'))
+    parser.add_argument('--book-workers', action='store', type=int,
+                        help=('Book the transactions of independent sets of accounts '
+                              'in parallel, on that many processes.'))
+    parser.add_argument('--stage-cache', action='store_true', default=None,
+                        help='Resume booking from the checkpoints of the last run.')
+    parser.add_argument('--cache-validation', action='store',
+                        choices=loader.CACHE_VALIDATION_MODES,
+                        help=('How to detect changes to the input files: by timestamp '
+                              '("stat", the default), by hashing their contents, '
+                              'or by hashing those whose timestamp changed.'))
+    parser.add_argument('--plugin-cache', action='store_true', default=None,
+                        help='Reuse the results of the plugins declared pure.')
+    parser.add_argument('--profile', action='store', metavar='FILENAME',
+                        help=('Write a profile of the stages of the loader as JSON '
+                              'to this file, or "-" for stdout.'))
+    parser.add_argument('--profile-memory', action='store_true',
+                        help=('Measure the memory of each stage accurately in the '
+                              'profile. This is slow.'))
+    parser.add_argument('--cache-dir', action='store',
+                        help='Store the cache files in this shared directory.')
+    parser.add_argument('--cache-dir-root', action='store',
+                        help=('Name the files in the cache directory relative to this '
+                              'directory, to share them between checkouts.'))
 
     opts = parser.parse_args()
 
@@ -40,19 +69,36 @@ def main():
 
     # Override loader caching setup if disabled or if the filename is
     # overridden.
-    if not opts.use_cache or opts.cache_filename:
-        loader.initialize(opts.use_cache, opts.cache_filename)
+    if (not opts.use_cache or opts.cache_filename or
+        opts.parse_cache or opts.parse_workers or opts.stage_cache or
+        opts.cache_validation or opts.cache_dir or opts.plugin_cache or
+        opts.book_workers or opts.cache_dir_root):
+        loader.initialize(opts.use_cache, opts.cache_filename,
+                          opts.parse_cache, opts.parse_workers, opts.stage_cache,
+                          opts.cache_validation, opts.cache_dir, opts.plugin_cache,
+                          opts.book_workers, opts.cache_dir_root)
 
-    with misc_utils.log_time('beancount.loader (total)', logging.info):
+    log_timings = logging.info
+    if opts.profile:
+        log_timings = profiler.Profiler(logging.info, opts.profile_memory)
+
+    with misc_utils.log_time('beancount.loader (total)', log_timings):
         # Load up the file, print errors, checking and validation are invoked
         # automatically.
         entries, errors, _ = loader.load_file(
             opts.filename,
-            log_timings=logging.info,
+            log_timings=log_timings,
             log_errors=sys.stderr,
             # Force slow and hardcore validations, just for check.
             extra_validations=validation.HARDCORE_VALIDATIONS)
 
+    if opts.profile:
+        if opts.profile == '-':
+            log_timings.to_json(sys.stdout)
+        else:
+            with open(opts.profile, 'w') as file:
+                log_timings.to_json(file)
+
     # Exit with an error code if there were any errors, so this can be used in a
     # shell conditional.
     return 1 if errors else 0
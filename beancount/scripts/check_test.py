@@ -1,6 +1,7 @@
 __copyright__ = "Copyright (C) 2014, 2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import json
 import unittest
 
 from beancount.utils import test_utils
@@ -42,6 +43,26 @@ class TestScriptCheck(test_utils.TestCase):
         self.assertRegex(stderr.getvalue(), "Balance failed")
         self.assertRegex(stderr.getvalue(), "Assets:Cash")
 
+    @test_utils.docfile
+    def test_profile(self, filename):
+        """
+        2013-01-01 open Expenses:Restaurant
+        2013-01-01 open Assets:Cash
+
+        2014-03-02 * "Something"
+          Expenses:Restaurant   50.02 USD
+          Assets:Cash
+        """
+        with test_utils.capture('stdout', 'stderr') as (stdout, _):
+            result = test_utils.run_with_args(check.main, ['--no-cache', '--profile', '-',
+                                                           filename])
+        self.assertEqual(0, result)
+        total, = json.loads(stdout.getvalue())['stages']
+        self.assertEqual('beancount.loader (total)', total['name'])
+        self.assertEqual(['parse', 'booking', 'run_transformations',
+                          'beancount.ops.validate'],
+                         [stage['name'] for stage in total['children']])
+
 
 if __name__ == '__main__':
     unittest.main()
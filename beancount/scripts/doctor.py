@@ -40,13 +40,22 @@ do_dump_lexer = do_lex
 
 
 def do_parse(filename, unused_args):
-    """Run the parser in debug mode.
+    """Dump the parser output for a Beancount syntax file.
+
+    The directives are printed as they are parsed, in the order of the input, so
+    that files of any size can be processed.
 
     Args:
       filename: A string, the Beancount input filename.
     """
+    from beancount.parser import grammar
     from beancount.parser import parser
-    entries, errors, _ = parser.parse_file(filename, yydebug=1)
+    from beancount.parser import printer
+    builder = grammar.StreamingBuilder()
+    for entry in parser.parse_iter(filename, builder):
+        printer.print_entry(entry)
+    _, errors, __ = builder.finalize()
+    printer.print_errors(errors)
 
 
 def do_roundtrip(filename, unused_args):
@@ -163,6 +172,23 @@ def do_print_options(filename, *args):
         print('{}: {}'.format(key, value))
 
 
+def do_includes(filename, *args):
+    """Print out the names of the files of a ledger and its plugins, without loading it.
+
+    Args:
+      unused_args: Ignored.
+    """
+    from beancount import loader
+    from beancount.parser import printer
+    errors, options_map = loader.scan_file(filename)
+    printer.print_errors(errors, sys.stderr)
+    for include_filename in options_map['include']:
+        print(include_filename)
+    for plugin_name, plugin_config in options_map['plugin']:
+        print('plugin {}{}'.format(plugin_name,
+                                   ' "{}"'.format(plugin_config) if plugin_config else ''))
+
+
 def get_commands():
     """Return a list of available commands in this file.
 
@@ -382,6 +408,26 @@ def do_display_context(filename, args):
     sys.stdout.write(str(dcontext))
 
 
+def do_profile(filename, args):
+    """Print out a profile of the stages of loading a file, as JSON.
+
+    The load cache is bypassed, so that all the stages are run.
+
+    Args:
+      filename: A string, which consists in the filename.
+      args: A tuple of the rest of arguments. If it contains "memory", the memory
+        usage of each stage is measured accurately, which is slow.
+    """
+    from beancount import loader
+    from beancount.ops import validation
+    from beancount.utils import profiler
+    load_profiler = profiler.Profiler(trace_memory='memory' in args)
+    with misc_utils.log_time('beancount.loader (total)', load_profiler):
+        loader._load([(path.abspath(filename), True)], load_profiler,
+                     validation.HARDCORE_VALIDATIONS, None)
+    load_profiler.to_json(sys.stdout)
+
+
 def do_validate_html(directory, args):
     """Validate all the HTML files under a directory hierarchy.
 
@@ -1,6 +1,7 @@
 __copyright__ = "Copyright (C) 2014-2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import json
 import os
 import re
 import textwrap
@@ -55,6 +56,31 @@ class TestScriptDoctor(test_utils.TestCase):
         """
         self.assertLines(expected_output, stdout.getvalue())
 
+    @test_utils.docfile
+    def test_parse(self, filename):
+        """
+        2014-03-02 * "Something"
+          Expenses:Restaurant   50.02 USD
+          Assets:Cash
+
+        2013-01-01 open Expenses:Restaurant
+        2013-01-01 open Assets:Cash
+        """
+        with test_utils.capture() as stdout:
+            test_utils.run_with_args(doctor.main, ['parse', filename])
+
+        # Note: The directives are output in the order of the file.
+        expected_output = """
+            2014-03-02 * "Something"
+              Expenses:Restaurant  50.02 USD
+              Assets:Cash
+
+            2013-01-01 open Expenses:Restaurant
+
+            2013-01-01 open Assets:Cash
+        """
+        self.assertLines(expected_output, stdout.getvalue())
+
     # pylint: disable=empty-docstring
     @test_utils.docfile
     def test_dump_lexer_empty(self, filename):
@@ -85,6 +111,25 @@ class TestScriptDoctor(test_utils.TestCase):
             test_utils.run_with_args(doctor.main, ['deps'])
             test_utils.run_with_args(doctor.main, ['checkdeps'])
 
+    def test_includes(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  include "oranges.beancount"
+                  plugin "beancount.plugins.auto_accounts"
+                  2014-01-01 open Assets:Apples
+                """,
+                'oranges.beancount': """
+                  2014-01-02 open Assets:Oranges
+                """})
+            with test_utils.capture('stdout') as stdout:
+                test_utils.run_with_args(doctor.main, [
+                    'includes', path.join(tmp, 'apples.beancount')])
+        self.assertEqual([path.join(tmp, 'apples.beancount'),
+                          path.join(tmp, 'oranges.beancount'),
+                          'plugin beancount.plugins.auto_accounts'],
+                         stdout.getvalue().splitlines())
+
 
 class TestScriptCheckDirectories(directories_test.TestScriptCheckDirectories):
 
@@ -172,6 +217,27 @@ class TestScriptDisplayContext(cmptest.TestCase):
         self.assertTrue(stdout.getvalue())
 
 
+class TestScriptProfile(test_utils.TestCase):
+
+    @test_utils.docfile
+    def test_profile(self, filename):
+        """
+            2013-01-01 open Expenses:Movie
+            2013-01-01 open Assets:Cash
+
+            2014-03-03 * "Something"
+              Expenses:Movie        25.00 USD
+              Assets:Cash
+        """
+        with test_utils.capture() as stdout:
+            test_utils.run_with_args(doctor.main, ['profile', filename])
+        total, = json.loads(stdout.getvalue())['stages']
+        stages = {stage['name']: stage for stage in total['children']}
+        self.assertEqual(3, stages['parse']['entries_out'])
+        self.assertEqual(3, stages['run_transformations']['entries_out'])
+        self.assertTrue(stages['beancount.ops.validate']['children'])
+
+
 class TestScriptContextualCommands(cmptest.TestCase):
 
     @test_utils.docfile
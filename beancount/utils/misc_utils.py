@@ -14,6 +14,8 @@ import re
 import sys
 import warnings
 
+from beancount.utils import profiler
+
 
 def deprecated(message):
     """A decorator generator to mark functions as deprecated and log a warning."""
@@ -36,7 +38,9 @@ def log_time(operation_name, log_timings, indent=0):
     Args:
       operation_name: A string, a label for the name of the operation.
       log_timings: A function to write log messages to. If left to None,
-        no timings are written (this becomes a no-op).
+        no timings are written (this becomes a no-op). If this is an instance
+        of beancount.utils.profiler.Profiler, the block is also profiled as one
+        of its stages.
       indent: An integer, the indentation level for the format of the timing
         line. This is useful if you're logging timing to a hierarchy of
         operations.
@@ -44,7 +48,11 @@ def log_time(operation_name, log_timings, indent=0):
       The start time of the operation.
     """
     time1 = time()
-    yield time1
+    if isinstance(log_timings, profiler.Profiler):
+        with log_timings.stage(operation_name):
+            yield time1
+    else:
+        yield time1
     time2 = time()
     if log_timings:
         log_timings("Operation: {:48} Time: {}{:6.0f} ms".format(
@@ -0,0 +1,207 @@
+"""A structured profile of the stages of loading a ledger.
+
+A Profiler instance can be passed to the loader wherever a 'log_timings'
+function is accepted. Every operation timed with misc_utils.log_time() then
+gets recorded as a stage, nested under the stage enclosing it, with its wall
+time, its CPU time, the growth of the peak memory usage during the stage and,
+where the loader reports them, the number of entries going in and out of it.
+The profile can be rendered to JSON.
+"""
+__copyright__ = "Copyright (C) 2026  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import contextlib
+import json
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class Stage:
+    """The profile of a stage of the loader.
+
+    Attributes:
+      name: A string, the name of the operation.
+      wall_time: A float, the elapsed time, in seconds.
+      cpu_time: A float, the CPU time of the process, in seconds.
+      memory_delta: An integer, the number of bytes by which the peak memory
+        usage has grown during the stage, or None, if unavailable.
+      entries_in: An integer, the number of entries given to the stage, or None.
+      entries_out: An integer, the number of entries output by the stage, or None.
+      children: A list of Stage instances, the stages nested in this one.
+    """
+    __slots__ = ('name', 'wall_time', 'cpu_time', 'memory_delta',
+                 'entries_in', 'entries_out', 'children', '_peak_memory')
+
+    def __init__(self, name):
+        self.name = name
+        self.wall_time = None
+        self.cpu_time = None
+        self.memory_delta = None
+        self.entries_in = None
+        self.entries_out = None
+        self.children = []
+        self._peak_memory = None
+
+    def to_dict(self):
+        """Convert the stage and its children to a JSON-compatible dict.
+
+        Returns:
+          A dict.
+        """
+        return {'name': self.name,
+                'wall_time': self.wall_time,
+                'cpu_time': self.cpu_time,
+                'memory_delta': self.memory_delta,
+                'entries_in': self.entries_in,
+                'entries_out': self.entries_out,
+                'children': [child.to_dict() for child in self.children]}
+
+
+class Profiler:
+    """A recorder of the profile of nested stages.
+
+    The peak memory usage is measured from the maximum resident set size of the
+    process by default, which is cheap but coarse: it only grows when a stage
+    uses more memory than any stage before it. If 'trace_memory' is set, it is
+    measured with the tracemalloc module instead, which is accurate for each
+    stage, but slows down the program significantly.
+
+    Attributes:
+      stages: A list of the top-level Stage instances.
+      log_timings: A function to forward the timing log lines to, or None.
+      trace_memory: A boolean, true if memory is measured with tracemalloc.
+    """
+
+    def __init__(self, log_timings=None, trace_memory=False):
+        self.stages = []
+        self.log_timings = log_timings
+        self.trace_memory = trace_memory
+        self._stack = []
+
+    def __call__(self, message):
+        """Forward a timing log line, so that this can be used as 'log_timings'."""
+        if self.log_timings is not None:
+            self.log_timings(message)
+
+    @contextlib.contextmanager
+    def stage(self, name, entries_in=None):
+        """A context manager that profiles the block as a stage.
+
+        Args:
+          name: A string, the name of the operation.
+          entries_in: An integer, the number of entries given to the stage, or None.
+        Yields:
+          The Stage instance, on which the number of entries output can be set.
+        """
+        stage = Stage(name)
+        stage.entries_in = entries_in
+        (self._stack[-1].children if self._stack else self.stages).append(stage)
+        self._stack.append(stage)
+        memory_before = self._start_memory(stage)
+        cpu_before = time.process_time()
+        wall_before = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.wall_time = time.perf_counter() - wall_before
+            stage.cpu_time = time.process_time() - cpu_before
+            self._stop_memory(stage, memory_before)
+            self._stack.pop()
+
+    def count_entries(self, entries_in=None, entries_out=None):
+        """Set the number of entries in and out of the innermost current stage.
+
+        Args:
+          entries_in: An integer, or None, to leave it unchanged.
+          entries_out: An integer, or None, to leave it unchanged.
+        """
+        if not self._stack:
+            return
+        stage = self._stack[-1]
+        if entries_in is not None:
+            stage.entries_in = entries_in
+        if entries_out is not None:
+            stage.entries_out = entries_out
+
+    def _start_memory(self, stage):
+        """Start measuring the memory usage of a stage.
+
+        Returns:
+          The memory usage to compute the delta from, or None.
+        """
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            current, peak = tracemalloc.get_traced_memory()
+            # Account for the peak so far in the enclosing stage, before
+            # resetting it to measure this one.
+            if len(self._stack) > 1:
+                parent = self._stack[-2]
+                parent._peak_memory = max(parent._peak_memory, peak)
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            stage._peak_memory = current
+            return current
+        return _get_max_rss()
+
+    def _stop_memory(self, stage, memory_before):
+        """Compute the growth of the peak memory usage of a stage."""
+        if self.trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, stage._peak_memory)
+            stage.memory_delta = peak - memory_before
+            if len(self._stack) > 1:
+                parent = self._stack[-2]
+                parent._peak_memory = max(parent._peak_memory, peak)
+        elif memory_before is not None:
+            stage.memory_delta = _get_max_rss() - memory_before
+
+    def to_dict(self):
+        """Convert the profile to a JSON-compatible dict.
+
+        Returns:
+          A dict with the list of stages.
+        """
+        return {'stages': [stage.to_dict() for stage in self.stages]}
+
+    def to_json(self, file=None):
+        """Render the profile as JSON.
+
+        Args:
+          file: A file object to write to, or None, to return a string.
+        Returns:
+          A string, if no file was provided.
+        """
+        if file is None:
+            return json.dumps(self.to_dict(), indent=2)
+        json.dump(self.to_dict(), file, indent=2)
+        file.write('\n')
+        return None
+
+
+def _get_max_rss():
+    """Return the maximum resident set size of the process, in bytes, or None."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Note: This is in kilobytes on Linux, but in bytes on macOS.
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def count_entries(log_timings, entries_in=None, entries_out=None):
+    """Report the number of entries in and out of a stage, if profiling.
+
+    Args:
+      log_timings: A Profiler instance, or any other 'log_timings' value, in
+        which case this is a no-op.
+      entries_in: An integer, or None.
+      entries_out: An integer, or None.
+    """
+    if isinstance(log_timings, Profiler):
+        log_timings.count_entries(entries_in, entries_out)
@@ -0,0 +1,90 @@
+__copyright__ = "Copyright (C) 2026  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import io
+import json
+import unittest
+
+from beancount.utils import misc_utils
+from beancount.utils import profiler
+from beancount import loader
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_stages(self):
+        lines = []
+        prof = profiler.Profiler(lines.append)
+        with misc_utils.log_time('outer', prof):
+            with prof.stage('inner', entries_in=3) as stage:
+                stage.entries_out = 4
+            with misc_utils.log_time('logged', prof, indent=1):
+                profiler.count_entries(prof, 4, 2)
+        with misc_utils.log_time('next', prof):
+            pass
+
+        self.assertEqual(['outer', 'next'], [stage.name for stage in prof.stages])
+        outer = prof.stages[0]
+        self.assertEqual(['inner', 'logged'], [stage.name for stage in outer.children])
+        inner, logged = outer.children
+        self.assertEqual((3, 4), (inner.entries_in, inner.entries_out))
+        self.assertEqual((4, 2), (logged.entries_in, logged.entries_out))
+        self.assertIsNone(outer.entries_in)
+        for stage in (outer, inner, logged):
+            self.assertGreaterEqual(stage.wall_time, 0)
+            self.assertGreaterEqual(stage.cpu_time, 0)
+
+        # The timing lines are still forwarded.
+        self.assertEqual(3, len(lines))
+        self.assertRegex(lines[0], "'logged'")
+
+    def test_trace_memory(self):
+        prof = profiler.Profiler(trace_memory=True)
+        with prof.stage('outer'):
+            with prof.stage('allocate'):
+                data = [bytes(1000) for _ in range(1000)]
+                del data
+            with prof.stage('nothing'):
+                pass
+        outer = prof.stages[0]
+        allocate, nothing = outer.children
+        self.assertGreaterEqual(allocate.memory_delta, 1000 * 1000)
+        self.assertLess(nothing.memory_delta, 1000 * 1000)
+        self.assertGreaterEqual(outer.memory_delta, allocate.memory_delta)
+
+    def test_count_entries_not_profiling(self):
+        profiler.count_entries(None, 1, 2)
+        profiler.count_entries(print, 1, 2)
+
+    def test_load_to_json(self):
+        prof = profiler.Profiler()
+        entries, errors, options_map = loader.load_string("""
+          2014-01-01 open Assets:Cash
+          2014-01-01 open Expenses:Food
+          2014-01-02 * "Lunch"
+            Expenses:Food   10.00 USD
+            Assets:Cash
+        """, log_timings=prof, dedent=True)
+        self.assertFalse(errors)
+
+        file = io.StringIO()
+        prof.to_json(file)
+        stages = json.loads(file.getvalue())['stages']
+        self.assertEqual(json.loads(prof.to_json())['stages'], stages)
+        self.assertEqual(['parse', 'booking', 'run_transformations',
+                          'beancount.ops.validate'],
+                         [stage['name'] for stage in stages])
+        self.assertEqual(3, stages[0]['entries_out'])
+        self.assertEqual((3, 3), (stages[1]['entries_in'], stages[1]['entries_out']))
+        plugins = stages[2]['children']
+        self.assertIn('beancount.ops.pad', [stage['name'] for stage in plugins])
+        for stage in plugins:
+            self.assertEqual(3, stage['entries_in'])
+            self.assertEqual(3, stage['entries_out'])
+        validators = stages[3]['children']
+        self.assertTrue(validators)
+        self.assertTrue(all(stage['entries_in'] == 3 for stage in validators))
+
+
+if __name__ == '__main__':
+    unittest.main()
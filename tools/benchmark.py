@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 """Estimate and compare the performance of a list of revisions.
+
+See tools/benchmark_suite.py to measure the stages of the processing separately.
 """
 __copyright__ = "Copyright (C) 2020  Martin Blais"
 __license__ = "GNU GPLv2"
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""Measure the throughput of each stage of processing a ledger.
+
+This generates synthetic ledgers of configurable size with the generators of
+the example file script, and measures the time spent in the lexer, the parser,
+booking, plugins, validation and realization separately, as well as for the
+entire load. The results are written as JSON, which can be compared across
+commits with the 'compare' command. See tools/benchmark.py for timing whole
+runs of bean-check over a list of revisions.
+"""
+__copyright__ = "Copyright (C) 2026  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import argparse
+import datetime
+import gc
+import io
+import json
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from os import path
+
+from beancount.core import data
+from beancount.core import prices
+from beancount.core import realization
+from beancount.ops import validation
+from beancount.parser import booking
+from beancount.parser import lexer
+from beancount.parser import parser
+from beancount.parser import printer
+from beancount.scripts import example
+from beancount import loader
+
+
+# The version of the format of the results.
+RESULTS_VERSION = 1
+
+# The date of birth of the character of the example file.
+DATE_BIRTH = datetime.date(1980, 5, 12)
+
+# The plugins enabled in generated ledgers by default.
+DEFAULT_PLUGINS = ['beancount.plugins.implicit_prices']
+
+# Metadata attached to the transactions and postings of generated ledgers, as
+# pairs of key and value, rendered in the input syntax.
+METADATA_VALUES = [('benchmark-ref', '"REF-{index:06d}"'),
+                   ('benchmark-number', '{index}.25'),
+                   ('benchmark-date', '2000-01-01'),
+                   ('benchmark-flag', 'TRUE')]
+
+
+def generate_expenses(date_begin, date_end, num_accounts):
+    """Generate regular expenses over a number of accounts.
+
+    Args:
+      date_begin: A datetime.date instance, the beginning date.
+      date_end: A datetime.date instance, the end date.
+      num_accounts: An integer, the number of expense accounts.
+    Returns:
+      A list of directives.
+    """
+    account_from = 'Liabilities:Benchmark:CreditCard'
+    accounts = ['Expenses:Benchmark:Category{:04d}'.format(index)
+                for index in range(num_accounts)]
+    entries = example.generate_open_entries(date_begin, [account_from] + accounts)
+    for account in accounts:
+        entries.extend(example.generate_periodic_expenses(
+            example.date_random_seq(date_begin, date_end, 1, 30),
+            example.RESTAURANT_NAMES, example.RESTAURANT_NARRATIONS,
+            account_from, account,
+            lambda: random.uniform(5, 200)))
+    return entries
+
+
+def generate_trading(date_begin, date_end, num_portfolios, num_stocks):
+    """Generate investment accounts trading lots of stocks.
+
+    Args:
+      date_begin: A datetime.date instance, the beginning date.
+      date_end: A datetime.date instance, the end date.
+      num_portfolios: An integer, the number of investment accounts.
+      num_stocks: An integer, the number of stocks traded in each of them.
+    Returns:
+      A list of the contents of each of the investment accounts, and their
+      prices, as strings.
+    """
+    stocks = ['BSTK{:02d}'.format(index) for index in range(num_stocks)]
+    price_entries = example.generate_prices(date_begin, date_end, stocks, 'CCY')
+    price_map = prices.build_price_map(price_entries)
+
+    sections = []
+    for index in range(num_portfolios):
+        # The investment generator trades from the cash received by the account.
+        deposits = example.generate_periodic_expenses(
+            example.date_random_seq(date_begin, date_end, 5, 10),
+            'Deposit', 'Deposit to the investment account',
+            'Income:CC:Deposits', 'Assets:CC:Investment:Cash',
+            lambda: random.uniform(500, 3000))
+        entries = (example.generate_open_entries(date_begin, ['Income:CC:Deposits']) +
+                   deposits +
+                   example.generate_taxable_investment(date_begin, date_end,
+                                                       data.sorted(deposits),
+                                                       price_map, stocks))
+        # Give each investment account its own names.
+        sections.append(example.replace(render_entries(entries),
+                                        {'CC': 'Broker{:02d}'.format(index)}))
+    sections.append(render_entries(price_entries))
+    return sections
+
+
+def render_entries(entries):
+    """Render a list of directives to the input syntax.
+
+    Args:
+      entries: A list of directives.
+    Returns:
+      A string.
+    """
+    oss = io.StringIO()
+    printer.print_entries(data.sorted(entries), file=oss)
+    return oss.getvalue()
+
+
+def add_metadata(contents, density, rand):
+    """Attach metadata to some of the transactions and postings of a ledger.
+
+    Args:
+      contents: A string, the input ledger.
+      density: A float, the fraction of the transactions and postings to attach
+        metadata to.
+      rand: An instance of random.Random.
+    Returns:
+      A string, the modified input.
+    """
+    if density <= 0:
+        return contents
+    lines = []
+    index = 0
+    in_transaction = False
+    for line in contents.splitlines():
+        lines.append(line)
+        match = re.match(r'( *)([!*] +)?[A-Z][A-Za-z0-9\-]*:', line)
+        if re.match(r'\d{4}-\d\d-\d\d +(txn|[*!])', line):
+            in_transaction = True
+            indent = '  '
+        elif in_transaction and match and match.group(1):
+            indent = match.group(1) + '  '
+        else:
+            in_transaction = in_transaction and line.startswith(' ')
+            continue
+        if rand.random() < density:
+            key, value = METADATA_VALUES[index % len(METADATA_VALUES)]
+            lines.append('{}{}: {}'.format(indent, key, value.format(index=index)))
+            index += 1
+    return '\n'.join(lines) + '\n'
+
+
+def generate_ledger(years=2, num_accounts=50, num_portfolios=2, num_stocks=4,
+                    metadata_density=0.1, plugins=None, seed=0,
+                    date_end=datetime.date(2020, 1, 1)):
+    """Generate a synthetic ledger.
+
+    This is the history of the example file, to which regular expenses over a
+    number of accounts and the lot trading of a number of investment accounts
+    are added, and where metadata are attached to some of the transactions and
+    postings. The output is fully determined by the arguments.
+
+    Args:
+      years: An integer, the number of years of history.
+      num_accounts: An integer, the number of additional expense accounts.
+      num_portfolios: An integer, the number of additional investment accounts.
+      num_stocks: An integer, the number of stocks traded in each of them.
+      metadata_density: A float, the fraction of the transactions and postings
+        to attach metadata to.
+      plugins: A list of the names of the plugins to enable, or None, for
+        DEFAULT_PLUGINS.
+      seed: An integer, the seed of the random generator.
+      date_end: A datetime.date instance, the end date of the history.
+    Returns:
+      A string, the contents of the ledger.
+    """
+    if plugins is None:
+        plugins = DEFAULT_PLUGINS
+    date_begin = date_end.replace(year=date_end.year - years)
+
+    # Note: The generators of the example file use the global random generator.
+    random.seed(seed)
+    oss = io.StringIO()
+    example.write_example_file(DATE_BIRTH, date_begin, date_end, False, oss)
+    sections = [''.join('plugin "{}"\n'.format(plugin) for plugin in plugins),
+                oss.getvalue(),
+                render_entries(generate_expenses(date_begin, date_end, num_accounts))]
+    sections.extend(generate_trading(date_begin, date_end, num_portfolios, num_stocks))
+    contents = example.replace('\n\n'.join(sections), {'CCY': 'USD'})
+
+    return add_metadata(contents, metadata_density, random.Random(seed))
+
+
+def measure(function, repeat):
+    """Time a number of runs of a function.
+
+    Args:
+      function: A callable with no arguments.
+      repeat: An integer, the number of runs.
+    Returns:
+      A pair of a list of the times of each run in seconds, and the value
+      returned by the last run.
+    """
+    times = []
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+
+def stage_results(name, times, unit, count, num_bytes=None):
+    """Summarize the measurements of a stage.
+
+    Args:
+      name: A string, the name of the stage.
+      times: A list of floats, the times of each run in seconds.
+      unit: A string, the name of the items processed by the stage.
+      count: An integer, the number of items processed by the stage.
+      num_bytes: An integer, the size of the input processed, or None.
+    Returns:
+      A dict.
+    """
+    best = min(times)
+    return {'name': name,
+            'times': times,
+            'best': best,
+            'median': statistics.median(times),
+            'unit': unit,
+            'count': count,
+            'throughput': count / best if best else None,
+            'bytes_per_second': num_bytes / best if num_bytes and best else None}
+
+
+def run_benchmarks(filename, repeat=3):
+    """Measure each of the stages of processing a ledger.
+
+    Each stage is run on the output of the previous one, computed outside of the
+    timed runs.
+
+    Args:
+      filename: A string, the absolute filename of the ledger.
+      repeat: An integer, the number of runs of each stage.
+    Returns:
+      A pair of a dict describing the ledger and a list of dicts, the results
+      of each stage.
+    """
+    num_bytes = path.getsize(filename)
+    stages = []
+
+    times, num_tokens = measure(lambda: sum(1 for _ in lexer.lex_iter(filename)), repeat)
+    stages.append(stage_results('lexer', times, 'tokens', num_tokens, num_bytes))
+
+    times, (entries, errors, options_map) = measure(
+        lambda: parser.parse_file(filename), repeat)
+    stages.append(stage_results('parser', times, 'entries', len(entries), num_bytes))
+
+    times, (entries, _) = measure(lambda: booking.book(entries, options_map), repeat)
+    stages.append(stage_results('booking', times, 'entries', len(entries)))
+
+    times, (entries, _) = measure(
+        lambda: loader.run_transformations(entries, errors, options_map, None), repeat)
+    stages.append(stage_results('plugins', times, 'entries', len(entries)))
+
+    times, _ = measure(lambda: validation.validate(entries, options_map), repeat)
+    stages.append(stage_results('validation', times, 'entries', len(entries)))
+
+    times, _ = measure(lambda: realization.realize(entries), repeat)
+    stages.append(stage_results('realization', times, 'entries', len(entries)))
+
+    times, (_, load_errors, _) = measure(
+        lambda: loader._load([(filename, True)], None, None, None), repeat)
+    stages.append(stage_results('load', times, 'entries', len(entries), num_bytes))
+
+    transactions = list(data.filter_txns(entries))
+    ledger = {'filename': filename,
+              'num_bytes': num_bytes,
+              'num_tokens': num_tokens,
+              'num_entries': len(entries),
+              'num_transactions': len(transactions),
+              'num_postings': sum(len(entry.postings) for entry in transactions),
+              'num_errors': len(load_errors)}
+    return ledger, stages
+
+
+def get_revision():
+    """Return the revision of the source code being measured.
+
+    Returns:
+      A string, the git commit hash, suffixed with '+' if there are local
+      changes, or None, if this is not run from a git repository.
+    """
+    cwd = path.dirname(path.dirname(path.abspath(__file__)))
+    try:
+        revision = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=cwd,
+                                           stderr=subprocess.DEVNULL)
+        changes = subprocess.check_output(['git', 'status', '--short', '--untracked=no'],
+                                          cwd=cwd, stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return revision.decode().strip() + ('+' if changes.strip() else '')
+
+
+def compare_results(results_old, results_new, file):
+    """Print a comparison of the times of the stages of two sets of results.
+
+    Args:
+      results_old: A dict, the results of the reference run.
+      results_new: A dict, the results to compare to it.
+      file: A file object to write to.
+    """
+    for key in 'num_bytes', 'num_entries':
+        if results_old['ledger'][key] != results_new['ledger'][key]:
+            file.write("Warning: The ledgers differ ({}: {} != {}).\n".format(
+                key, results_old['ledger'][key], results_new['ledger'][key]))
+    file.write("Old: {}\nNew: {}\n\n".format(results_old['revision'],
+                                              results_new['revision']))
+    stages_old = {stage['name']: stage for stage in results_old['stages']}
+    linefmt = '{:<12} {:>10} {:>10} {:>8}\n'
+    file.write(linefmt.format('stage', 'old (s)', 'new (s)', 'change'))
+    for stage in results_new['stages']:
+        stage_old = stages_old.get(stage['name'])
+        if stage_old is None:
+            continue
+        change = (stage['best'] - stage_old['best']) / stage_old['best']
+        file.write(linefmt.format(stage['name'],
+                                  '{:.4f}'.format(stage_old['best']),
+                                  '{:.4f}'.format(stage['best']),
+                                  '{:+.1%}'.format(change)))
+
+
+def add_generate_arguments(argparser):
+    """Add the arguments of generate_ledger() to a parser.
+
+    Args:
+      argparser: An instance of argparse.ArgumentParser.
+    """
+    argparser.add_argument('--years', type=int, default=2,
+                           help="Number of years of history.")
+    argparser.add_argument('--accounts', dest='num_accounts', type=int, default=50,
+                           help="Number of additional expense accounts.")
+    argparser.add_argument('--portfolios', dest='num_portfolios', type=int, default=2,
+                           help="Number of additional investment accounts trading lots.")
+    argparser.add_argument('--stocks', dest='num_stocks', type=int, default=4,
+                           help="Number of stocks traded in each investment account.")
+    argparser.add_argument('--metadata-density', type=float, default=0.1,
+                           help=("Fraction of the transactions and postings "
+                                 "with metadata."))
+    argparser.add_argument('--plugin', dest='plugins', action='append',
+                           help=("Name of a plugin to enable (repeatable). "
+                                 "Default: {}".format(', '.join(DEFAULT_PLUGINS))))
+    argparser.add_argument('--seed', type=int, default=0,
+                           help="Seed of the random generator.")
+
+
+def generate_arguments(opts):
+    """Extract the arguments of generate_ledger() from parsed options.
+
+    Args:
+      opts: An argparse.Namespace, as parsed with add_generate_arguments().
+    Returns:
+      A dict of keyword arguments.
+    """
+    return {name: getattr(opts, name)
+            for name in ('years', 'num_accounts', 'num_portfolios', 'num_stocks',
+                         'metadata_density', 'plugins', 'seed')}
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.strip())
+    subparsers = argparser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    generate_parser = subparsers.add_parser('generate', help="Generate a ledger.")
+    add_generate_arguments(generate_parser)
+    generate_parser.add_argument('output', help="Filename of the ledger to write.")
+
+    run_parser = subparsers.add_parser(
+        'run', help="Measure the stages on a ledger, generated if none is given.")
+    add_generate_arguments(run_parser)
+    run_parser.add_argument('--ledger', action='store',
+                            help="Filename of a ledger to measure.")
+    run_parser.add_argument('-n', '--repeat', type=int, default=3,
+                            help="Number of runs of each stage.")
+    run_parser.add_argument('-o', '--output', action='store',
+                            help="Filename of the JSON results (default stdout).")
+
+    compare_parser = subparsers.add_parser('compare', help="Compare two results.")
+    compare_parser.add_argument('old', help="Filename of the reference results.")
+    compare_parser.add_argument('new', help="Filename of the results to compare.")
+
+    opts = argparser.parse_args()
+
+    if opts.command == 'generate':
+        with open(opts.output, 'w') as outfile:
+            outfile.write(generate_ledger(**generate_arguments(opts)))
+
+    elif opts.command == 'run':
+        parameters = None
+        with tempfile.TemporaryDirectory() as tmpdir:
+            if opts.ledger:
+                filename = path.abspath(opts.ledger)
+            else:
+                parameters = generate_arguments(opts)
+                filename = path.join(tmpdir, 'ledger.beancount')
+                with open(filename, 'w') as outfile:
+                    outfile.write(generate_ledger(**parameters))
+            ledger, stages = run_benchmarks(filename, opts.repeat)
+        ledger['parameters'] = parameters
+        results = {'version': RESULTS_VERSION,
+                   'revision': get_revision(),
+                   'python': platform.python_version(),
+                   'platform': platform.platform(),
+                   'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                   'ledger': ledger,
+                   'stages': stages}
+        if opts.output:
+            with open(opts.output, 'w') as outfile:
+                json.dump(results, outfile, indent=2)
+        else:
+            json.dump(results, sys.stdout, indent=2)
+            sys.stdout.write('\n')
+
+    elif opts.command == 'compare':
+        with open(opts.old) as infile:
+            results_old = json.load(infile)
+        with open(opts.new) as infile:
+            results_new = json.load(infile)
+        compare_results(results_old, results_new, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+__copyright__ = "Copyright (C) 2026  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import io
+import os
+import tempfile
+import unittest
+
+from beancount.core import data
+from beancount import loader
+from tools import benchmark_suite
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.contents = benchmark_suite.generate_ledger(
+            years=1, num_accounts=3, num_portfolios=1, num_stocks=2,
+            metadata_density=0.5)
+
+    def test_generate_ledger(self):
+        entries, errors, options_map = loader.load_string(self.contents)
+        self.assertFalse(errors)
+        self.assertEqual(['beancount.plugins.implicit_prices'],
+                         [name for name, _ in options_map['plugin']])
+
+        accounts = {entry.account for entry in entries if isinstance(entry, data.Open)}
+        self.assertLessEqual({'Expenses:Benchmark:Category0000',
+                              'Expenses:Benchmark:Category0002',
+                              'Assets:Broker00:Investment:BSTK01'}, accounts)
+        self.assertTrue(any(posting.cost is not None
+                            for entry in data.filter_txns(entries)
+                            for posting in entry.postings))
+        self.assertTrue(any('benchmark-ref' in entry.meta
+                            for entry in data.filter_txns(entries)))
+        self.assertTrue(any(posting.meta and 'benchmark-number' in posting.meta
+                            for entry in data.filter_txns(entries)
+                            for posting in entry.postings))
+
+        self.assertEqual(self.contents, benchmark_suite.generate_ledger(
+            years=1, num_accounts=3, num_portfolios=1, num_stocks=2,
+            metadata_density=0.5))
+
+    def test_run_benchmarks(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'ledger.beancount')
+            with open(filename, 'w') as outfile:
+                outfile.write(self.contents)
+            ledger, stages = benchmark_suite.run_benchmarks(filename, repeat=1)
+
+        self.assertEqual(len(self.contents.encode('utf8')), ledger['num_bytes'])
+        self.assertEqual(0, ledger['num_errors'])
+        self.assertEqual(['lexer', 'parser', 'booking', 'plugins', 'validation',
+                          'realization', 'load'],
+                         [stage['name'] for stage in stages])
+        for stage in stages:
+            self.assertEqual(1, len(stage['times']))
+            self.assertGreater(stage['count'], 0)
+
+        results = {'revision': 'abc', 'ledger': ledger, 'stages': stages}
+        oss = io.StringIO()
+        benchmark_suite.compare_results(results, results, oss)
+        self.assertRegex(oss.getvalue(), r'validation .* \+0\.0%')
+
+
+if __name__ == '__main__':
+    unittest.main()